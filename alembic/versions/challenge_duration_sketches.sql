@@ -0,0 +1,71 @@
+-- Migration: per-challenge duration sketches for the speed badge
+-- This file can be applied in Supabase SQL editor or via psql.
+-- Function signature expected by application (AchievementsRepository.merge_duration_sketch):
+-- merge_challenge_duration_sketch(p_challenge_id text, p_sketch jsonb, p_replace boolean) RETURNS jsonb
+
+-- A sketch is {"alpha": <relative accuracy>, "count": <n>, "bins": {"<bucket>": <count>, ...}} where
+-- bucket i counts the submitted attempts whose duration_seconds lies in (gamma^(i-1), gamma^i],
+-- gamma = (1 + alpha) / (1 - alpha) (see app/features/achievements/duration_sketch.py).
+-- Sketches of the same alpha merge by adding bucket counts, so every application process
+-- adds the durations it has seen since its last flush and gets the merged sketch back.
+
+CREATE TABLE IF NOT EXISTS public.challenge_duration_sketches (
+    challenge_id text PRIMARY KEY,
+    alpha double precision NOT NULL,
+    count bigint NOT NULL DEFAULT 0,
+    bins jsonb NOT NULL DEFAULT '{}'::jsonb,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Adds p_sketch's buckets to the stored sketch, or stores p_sketch as is when p_replace is true,
+-- when nothing is stored yet, or when the stored sketch has a different alpha.
+-- Returns the stored sketch as {"alpha", "count", "bins"}.
+CREATE OR REPLACE FUNCTION public.merge_challenge_duration_sketch(
+    p_challenge_id text,
+    p_sketch jsonb,
+    p_replace boolean DEFAULT false
+) RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_row public.challenge_duration_sketches;
+    v_alpha double precision := (p_sketch ->> 'alpha')::double precision;
+    v_bins jsonb := COALESCE(p_sketch -> 'bins', '{}'::jsonb);
+BEGIN
+    SELECT * INTO v_row FROM public.challenge_duration_sketches WHERE challenge_id = p_challenge_id FOR UPDATE;
+
+    IF FOUND AND NOT p_replace AND v_row.alpha = v_alpha THEN
+        SELECT COALESCE(jsonb_object_agg(e.key, e.total), '{}'::jsonb)
+        INTO v_bins
+        FROM (
+            SELECT key, SUM(value::bigint) AS total
+            FROM (
+                SELECT key, value FROM jsonb_each_text(v_row.bins)
+                UNION ALL
+                SELECT key, value FROM jsonb_each_text(v_bins)
+            ) b
+            GROUP BY key
+        ) e;
+    END IF;
+
+    INSERT INTO public.challenge_duration_sketches AS s (challenge_id, alpha, count, bins, updated_at)
+    VALUES (
+        p_challenge_id,
+        v_alpha,
+        (SELECT COALESCE(SUM(value::bigint), 0) FROM jsonb_each_text(v_bins)),
+        v_bins,
+        now()
+    )
+    ON CONFLICT (challenge_id) DO UPDATE
+    SET alpha = EXCLUDED.alpha,
+        count = EXCLUDED.count,
+        bins = EXCLUDED.bins,
+        updated_at = EXCLUDED.updated_at
+    RETURNING * INTO v_row;
+
+    RETURN jsonb_build_object('alpha', v_row.alpha, 'count', v_row.count, 'bins', v_row.bins);
+END;
+$$;
+
+-- Until this is applied each process seeds its sketches from challenge_attempts once and keeps
+-- them in memory (set ACHIEVEMENT_SPEED_SKETCH=false to use the exact scan on every submission).
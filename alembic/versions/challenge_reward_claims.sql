@@ -0,0 +1,43 @@
+-- Migration: durable claim marking a finalised challenge attempt as rewarded
+-- This file can be applied in Supabase SQL editor or via psql.
+-- Function signature expected by application (app/features/submissions/rewards.py):
+-- claim_challenge_rewards(p_attempt_id text) RETURNS boolean
+
+-- Rewards (ELO, GPA, badges, titles, progress rows) for an attempt are applied by whichever
+-- process first sets rewards_claimed_at; the conditional update makes the claim atomic, so
+-- a retry, a restart's recovery sweep or another replica never applies them twice.
+-- rewards_applied_at is set once the rewards went through. An attempt claimed long ago with
+-- no rewards_applied_at was claimed by a process that stopped or failed mid-way; its rewards
+-- are not re-applied automatically (part of them may already be in place).
+
+ALTER TABLE public.challenge_attempts
+    ADD COLUMN IF NOT EXISTS rewards_claimed_at timestamptz,
+    ADD COLUMN IF NOT EXISTS rewards_applied_at timestamptz;
+
+-- Attempts submitted before this migration were rewarded in-process (or lost); mark them
+-- claimed so the recovery sweep does not reward them a second time.
+UPDATE public.challenge_attempts
+SET rewards_claimed_at = COALESCE(submitted_at, now()),
+    rewards_applied_at = COALESCE(submitted_at, now())
+WHERE status = 'submitted' AND rewards_claimed_at IS NULL;
+
+-- The recovery sweep reads recent submitted attempts that were never claimed
+CREATE INDEX IF NOT EXISTS idx_challenge_attempts_unclaimed_rewards
+    ON public.challenge_attempts USING btree (submitted_at)
+    WHERE status = 'submitted' AND rewards_claimed_at IS NULL;
+
+-- True when this call claimed the attempt; false when it was claimed before (or does not exist).
+CREATE OR REPLACE FUNCTION public.claim_challenge_rewards(p_attempt_id text)
+RETURNS boolean
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE public.challenge_attempts
+    SET rewards_claimed_at = now()
+    WHERE id::text = p_attempt_id AND rewards_claimed_at IS NULL;
+    RETURN FOUND;
+END;
+$$;
+
+-- Until this is applied rewards fall back to checking elo_events for the attempt, and the
+-- reward recovery sweep (REWARD_RECOVERY) finds nothing to republish.
@@ -0,0 +1,114 @@
+-- Migration: create stored procedures log_test_batches and log_test_batch
+-- This file can be applied in Supabase SQL editor or via psql.
+-- Function signatures expected by application (CodeResultsRepository.write_test_batches):
+-- log_test_batches(p_batches jsonb) RETURNS SETOF uuid
+-- log_test_batch(p_submission jsonb, p_results jsonb) RETURNS uuid
+
+-- A batch is one graded question: {"p_submission": <code_submissions row>, "p_results": [<code_results rows>]}
+-- exactly as the application would insert them through PostgREST. The application assigns
+-- every id (the submission's results_id is the id of its first result); a submission without
+-- an id gets a new one. Keys that are not columns of the table are ignored.
+-- code_submissions.results_id and code_results.submission_id reference each other, so the
+-- results are inserted first, then the submissions, then the results are linked back - the
+-- same three steps as the separate PostgREST calls, but as three multi-row statements for
+-- all batches, in one round trip and one transaction: results never exist without their
+-- submission. Returns the submission ids in batch order.
+
+CREATE OR REPLACE FUNCTION public.log_test_batches(
+    p_batches jsonb
+) RETURNS SETOF uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_batches jsonb;
+    v_results jsonb;
+    v_submissions jsonb;
+    v_columns text;
+BEGIN
+    SELECT jsonb_agg(
+        jsonb_set(
+            b.batch,
+            '{p_submission,id}',
+            to_jsonb(COALESCE(b.batch #>> '{p_submission,id}', gen_random_uuid()::text))
+        )
+        ORDER BY b.ord
+    )
+    INTO v_batches
+    FROM jsonb_array_elements(p_batches) WITH ORDINALITY AS b(batch, ord);
+
+    IF v_batches IS NULL THEN
+        RETURN;
+    END IF;
+
+    SELECT jsonb_agg(r.row_json)
+    INTO v_results
+    FROM jsonb_array_elements(v_batches) AS b(batch),
+         jsonb_array_elements(b.batch -> 'p_results') AS r(row_json);
+
+    SELECT jsonb_agg(b.batch -> 'p_submission')
+    INTO v_submissions
+    FROM jsonb_array_elements(v_batches) AS b(batch);
+
+    -- 1) every code_results row, without submission_id yet (missing keys become NULL, as with a PostgREST bulk insert)
+    IF v_results IS NOT NULL THEN
+        SELECT string_agg(quote_ident(c.column_name), ', ' ORDER BY c.ordinal_position)
+        INTO v_columns
+        FROM information_schema.columns c
+        WHERE c.table_schema = 'public'
+          AND c.table_name = 'code_results'
+          AND c.column_name <> 'submission_id'
+          AND EXISTS (
+              SELECT 1 FROM jsonb_array_elements(v_results) AS r(row_json)
+              WHERE r.row_json ? c.column_name
+          );
+
+        EXECUTE format(
+            'INSERT INTO public.code_results (%1$s) SELECT %1$s FROM jsonb_populate_recordset(NULL::public.code_results, $1)',
+            v_columns
+        ) USING v_results;
+    END IF;
+
+    -- 2) every code_submissions row, pointing at its first result
+    SELECT string_agg(quote_ident(c.column_name), ', ' ORDER BY c.ordinal_position)
+    INTO v_columns
+    FROM information_schema.columns c
+    WHERE c.table_schema = 'public'
+      AND c.table_name = 'code_submissions'
+      AND EXISTS (
+          SELECT 1 FROM jsonb_array_elements(v_submissions) AS s(row_json)
+          WHERE s.row_json ? c.column_name
+      );
+
+    EXECUTE format(
+        'INSERT INTO public.code_submissions (%1$s) SELECT %1$s FROM jsonb_populate_recordset(NULL::public.code_submissions, $1)',
+        v_columns
+    ) USING v_submissions;
+
+    -- 3) link the results back
+    UPDATE public.code_results cr
+    SET submission_id = (b.batch #>> '{p_submission,id}')::uuid
+    FROM jsonb_array_elements(v_batches) AS b(batch),
+         jsonb_array_elements(b.batch -> 'p_results') AS r(row_json)
+    WHERE cr.id = (r.row_json ->> 'id')::uuid;
+
+    RETURN QUERY
+    SELECT (b.batch #>> '{p_submission,id}')::uuid
+    FROM jsonb_array_elements(v_batches) WITH ORDINALITY AS b(batch, ord)
+    ORDER BY b.ord;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.log_test_batch(
+    p_submission jsonb,
+    p_results jsonb
+) RETURNS uuid
+LANGUAGE sql
+AS $$
+    SELECT public.log_test_batches(
+        jsonb_build_array(jsonb_build_object('p_submission', p_submission, 'p_results', p_results))
+    );
+$$;
+
+-- Note: this function uses gen_random_uuid() which is provided by the pgcrypto extension on many Postgres installs.
+-- Until it is applied the application keeps using three separate PostgREST calls per batch
+-- (set CODE_RESULTS_BATCH_RPC=false to force that path).
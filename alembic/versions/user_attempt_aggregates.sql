@@ -0,0 +1,122 @@
+-- Migration: running attempt aggregates kept next to user_elo, and the functions that maintain them
+-- This file can be applied in Supabase SQL editor or via psql.
+-- Function signatures expected by application (AchievementsRepository):
+-- record_attempt_aggregate(p_student_id integer, p_attempt_id text, p_ratio double precision, p_tier text, p_topic text) RETURNS jsonb
+-- replace_attempt_aggregate(p_student_id integer, p_aggregate jsonb, p_attempt_ids text[]) RETURNS jsonb
+
+-- One row per student with the totals the achievements engine used to recompute from every
+-- submitted challenge_attempts row on each submission: the sum of GPA ratios and the attempt
+-- count (running GPA = ratio_sum / attempt_count * 4), completed attempts per tier and
+-- mastered attempts per topic. user_attempt_aggregate_attempts lists the attempts already
+-- counted, so recording the same attempt twice is a no-op.
+
+CREATE TABLE IF NOT EXISTS public.user_attempt_aggregates (
+    student_id integer PRIMARY KEY REFERENCES public.profiles (id) ON UPDATE CASCADE ON DELETE CASCADE,
+    ratio_sum double precision NOT NULL DEFAULT 0,
+    attempt_count integer NOT NULL DEFAULT 0,
+    tier_successes jsonb NOT NULL DEFAULT '{}'::jsonb,
+    topic_successes jsonb NOT NULL DEFAULT '{}'::jsonb,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    verified_at timestamptz
+);
+
+CREATE TABLE IF NOT EXISTS public.user_attempt_aggregate_attempts (
+    attempt_id text PRIMARY KEY,
+    student_id integer NOT NULL REFERENCES public.user_attempt_aggregates (student_id) ON DELETE CASCADE,
+    counted_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_attempt_aggregate_attempts_student
+    ON public.user_attempt_aggregate_attempts USING btree (student_id);
+
+-- Adds one submitted attempt to the student's totals in O(1) and returns the row.
+-- Returns NULL when the student has no row yet: the application then builds it from the
+-- attempt history with replace_attempt_aggregate, which already includes this attempt.
+-- p_tier / p_topic are NULL when the attempt does not count as a tier completion / topic success.
+CREATE OR REPLACE FUNCTION public.record_attempt_aggregate(
+    p_student_id integer,
+    p_attempt_id text,
+    p_ratio double precision,
+    p_tier text,
+    p_topic text
+) RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_row public.user_attempt_aggregates;
+    v_counted integer;
+BEGIN
+    SELECT * INTO v_row FROM public.user_attempt_aggregates WHERE student_id = p_student_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO public.user_attempt_aggregate_attempts (attempt_id, student_id)
+    VALUES (p_attempt_id, p_student_id)
+    ON CONFLICT (attempt_id) DO NOTHING;
+    GET DIAGNOSTICS v_counted = ROW_COUNT;
+
+    IF v_counted > 0 THEN
+        UPDATE public.user_attempt_aggregates
+        SET ratio_sum = ratio_sum + COALESCE(p_ratio, 0),
+            attempt_count = attempt_count + 1,
+            tier_successes = CASE
+                WHEN p_tier IS NULL THEN tier_successes
+                ELSE jsonb_set(tier_successes, ARRAY[p_tier], to_jsonb(COALESCE((tier_successes ->> p_tier)::integer, 0) + 1))
+            END,
+            topic_successes = CASE
+                WHEN p_topic IS NULL THEN topic_successes
+                ELSE jsonb_set(topic_successes, ARRAY[p_topic], to_jsonb(COALESCE((topic_successes ->> p_topic)::integer, 0) + 1))
+            END,
+            updated_at = now()
+        WHERE student_id = p_student_id
+        RETURNING * INTO v_row;
+    END IF;
+
+    RETURN to_jsonb(v_row);
+END;
+$$;
+
+-- Replaces the student's totals with ones rebuilt from history (first use, or the
+-- verification job repairing drift) together with the list of attempts they cover.
+CREATE OR REPLACE FUNCTION public.replace_attempt_aggregate(
+    p_student_id integer,
+    p_aggregate jsonb,
+    p_attempt_ids text[]
+) RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_row public.user_attempt_aggregates;
+BEGIN
+    INSERT INTO public.user_attempt_aggregates AS a (
+        student_id, ratio_sum, attempt_count, tier_successes, topic_successes, updated_at, verified_at
+    ) VALUES (
+        p_student_id,
+        COALESCE((p_aggregate ->> 'ratio_sum')::double precision, 0),
+        COALESCE((p_aggregate ->> 'attempt_count')::integer, 0),
+        COALESCE(p_aggregate -> 'tier_successes', '{}'::jsonb),
+        COALESCE(p_aggregate -> 'topic_successes', '{}'::jsonb),
+        now(),
+        now()
+    )
+    ON CONFLICT (student_id) DO UPDATE
+    SET ratio_sum = EXCLUDED.ratio_sum,
+        attempt_count = EXCLUDED.attempt_count,
+        tier_successes = EXCLUDED.tier_successes,
+        topic_successes = EXCLUDED.topic_successes,
+        updated_at = EXCLUDED.updated_at,
+        verified_at = EXCLUDED.verified_at
+    RETURNING * INTO v_row;
+
+    DELETE FROM public.user_attempt_aggregate_attempts WHERE student_id = p_student_id;
+    INSERT INTO public.user_attempt_aggregate_attempts (attempt_id, student_id)
+    SELECT DISTINCT unnest(COALESCE(p_attempt_ids, ARRAY[]::text[])), p_student_id
+    ON CONFLICT (attempt_id) DO NOTHING;
+
+    RETURN to_jsonb(v_row);
+END;
+$$;
+
+-- Until this is applied the application keeps recomputing the totals from challenge_attempts
+-- (set ACHIEVEMENT_AGGREGATES=false to force that path).
@@ -28,6 +28,23 @@ class Settings:
         self.judge0_api_url = os.getenv("JUDGE0_URL") or os.getenv("JUDGE0_BASE_URL", "")
         self.judge0_api_key = os.getenv("JUDGE0_KEY", "")  # optional (RapidAPI legacy)
         self.judge0_host = os.getenv("JUDGE0_HOST", "")    # optional (RapidAPI legacy)
+        # Several Judge0 instances (comma separated); falls back to the single JUDGE0_URL
+        self.judge0_urls = [u.strip() for u in os.getenv("JUDGE0_URLS", "").split(",") if u.strip()]
+        if not self.judge0_urls and self.judge0_api_url:
+            self.judge0_urls = [self.judge0_api_url]
+        try:
+            self.judge0_breaker_failure_threshold = int(os.getenv("JUDGE0_BREAKER_FAILURE_THRESHOLD", "5"))
+        except Exception:
+            self.judge0_breaker_failure_threshold = 5
+        try:
+            self.judge0_breaker_reset_timeout_s = float(os.getenv("JUDGE0_BREAKER_RESET_TIMEOUT", "15"))
+        except Exception:
+            self.judge0_breaker_reset_timeout_s = 15.0
+        try:
+            self.judge0_health_check_interval_s = float(os.getenv("JUDGE0_HEALTH_CHECK_INTERVAL", "10"))
+        except Exception:
+            self.judge0_health_check_interval_s = 10.0
+        self.judge0_health_check_path = os.getenv("JUDGE0_HEALTH_CHECK_PATH", "/about") or "/about"
         try:
             self.judge0_timeout_s = float(os.getenv("JUDGE0_TIMEOUT", "30"))
         except Exception:
@@ -40,6 +57,217 @@ class Settings:
             self.judge0_batch_poll_concurrency = int(os.getenv("JUDGE0_BATCH_POLL_CONCURRENCY", "8"))
         except Exception:
             self.judge0_batch_poll_concurrency = 8
+        # Long-lived Judge0 HTTP client pool
+        try:
+            self.judge0_max_connections = int(os.getenv("JUDGE0_MAX_CONNECTIONS", "20"))
+        except Exception:
+            self.judge0_max_connections = 20
+        try:
+            self.judge0_max_keepalive_connections = int(os.getenv("JUDGE0_MAX_KEEPALIVE_CONNECTIONS", "10"))
+        except Exception:
+            self.judge0_max_keepalive_connections = 10
+        try:
+            self.judge0_keepalive_expiry_s = float(os.getenv("JUDGE0_KEEPALIVE_EXPIRY", "30"))
+        except Exception:
+            self.judge0_keepalive_expiry_s = 30.0
+        self.judge0_http2 = os.getenv("JUDGE0_HTTP2", "false").lower() == "true"
+        # Content-addressed cache of finished executions (identical resubmissions skip Judge0)
+        self.judge0_result_cache_enabled = os.getenv("JUDGE0_RESULT_CACHE_ENABLED", "true").lower() == "true"
+        try:
+            self.judge0_result_cache_max_bytes = int(os.getenv("JUDGE0_RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        except Exception:
+            self.judge0_result_cache_max_bytes = 64 * 1024 * 1024
+        try:
+            self.judge0_result_cache_max_entries = int(os.getenv("JUDGE0_RESULT_CACHE_MAX_ENTRIES", "20000"))
+        except Exception:
+            self.judge0_result_cache_max_entries = 20000
+        try:
+            self.judge0_result_cache_ttl_s = float(os.getenv("JUDGE0_RESULT_CACHE_TTL", "600"))
+        except Exception:
+            self.judge0_result_cache_ttl_s = 600.0
+        # Concurrent identical executions share one Judge0 submission
+        self.judge0_singleflight_enabled = os.getenv("JUDGE0_SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+        # Process-wide poll coalescing (one batch GET per tick for all in-flight tokens)
+        self.judge0_poll_coalesce = os.getenv("JUDGE0_POLL_COALESCE", "true").lower() == "true"
+        try:
+            self.judge0_poll_batch_size = int(os.getenv("JUDGE0_POLL_BATCH_SIZE", "20"))
+        except Exception:
+            self.judge0_poll_batch_size = 20
+        try:
+            self.judge0_poll_min_interval_s = float(os.getenv("JUDGE0_POLL_MIN_INTERVAL", "0.25"))
+        except Exception:
+            self.judge0_poll_min_interval_s = 0.25
+        try:
+            self.judge0_poll_max_interval_s = float(os.getenv("JUDGE0_POLL_MAX_INTERVAL", "1.5"))
+        except Exception:
+            self.judge0_poll_max_interval_s = 1.5
+        # Admission control in front of Judge0 (budget counted in executions, i.e. test cases)
+        self.judge0_admission_enabled = os.getenv("JUDGE0_ADMISSION_ENABLED", "true").lower() == "true"
+        try:
+            self.judge0_max_in_flight = int(os.getenv("JUDGE0_MAX_IN_FLIGHT", "32"))
+        except Exception:
+            self.judge0_max_in_flight = 32
+        try:
+            self.judge0_admission_max_queue = int(os.getenv("JUDGE0_ADMISSION_MAX_QUEUE", "500"))
+        except Exception:
+            self.judge0_admission_max_queue = 500
+        try:
+            self.judge0_admission_deadline_s = float(os.getenv("JUDGE0_ADMISSION_DEADLINE", "20"))
+        except Exception:
+            self.judge0_admission_deadline_s = 20.0
+        # Completion mode: "poll" (default) or "callback" (Judge0 PUTs results to JUDGE0_CALLBACK_URL)
+        self.judge0_completion_mode = (os.getenv("JUDGE0_COMPLETION_MODE", "poll") or "poll").strip().lower()
+        self.judge0_callback_url = (os.getenv("JUDGE0_CALLBACK_URL", "") or "").strip()
+        self.judge0_callback_secret = os.getenv("JUDGE0_CALLBACK_SECRET", "")
+        try:
+            self.judge0_callback_safety_poll_interval_s = float(os.getenv("JUDGE0_CALLBACK_SAFETY_POLL_INTERVAL", "5"))
+        except Exception:
+            self.judge0_callback_safety_poll_interval_s = 5.0
+        # Run all of a Python question's tests in one Judge0 submission (opt-in)
+        self.python_multi_test_harness = os.getenv("PYTHON_MULTI_TEST_HARNESS", "false").lower() == "true"
+        try:
+            self.python_harness_case_timeout_s = float(os.getenv("PYTHON_HARNESS_CASE_TIMEOUT", "5"))
+        except Exception:
+            self.python_harness_case_timeout_s = 5.0
+        try:
+            self.python_harness_cpu_time_limit_s = float(os.getenv("PYTHON_HARNESS_CPU_TIME_LIMIT", "15"))
+        except Exception:
+            self.python_harness_cpu_time_limit_s = 15.0
+        try:
+            self.python_harness_wall_time_limit_s = float(os.getenv("PYTHON_HARNESS_WALL_TIME_LIMIT", "20"))
+        except Exception:
+            self.python_harness_wall_time_limit_s = 20.0
+        # Questions of one challenge submission graded concurrently
+        try:
+            self.submission_grading_concurrency = int(os.getenv("SUBMISSION_GRADING_CONCURRENCY", "3"))
+        except Exception:
+            self.submission_grading_concurrency = 3
+        # Background challenge submission jobs (submit-challenge?mode=job)
+        try:
+            self.submission_job_workers = int(os.getenv("SUBMISSION_JOB_WORKERS", "4"))
+        except Exception:
+            self.submission_job_workers = 4
+        try:
+            self.submission_job_max_pending = int(os.getenv("SUBMISSION_JOB_MAX_PENDING", "200"))
+        except Exception:
+            self.submission_job_max_pending = 200
+        try:
+            self.submission_job_retention_s = float(os.getenv("SUBMISSION_JOB_RETENTION", "900"))
+        except Exception:
+            self.submission_job_retention_s = 900.0
+        # Seconds shutdown waits for queued and running jobs before cancelling them
+        try:
+            self.submission_job_drain_timeout_s = float(os.getenv("SUBMISSION_JOB_DRAIN_TIMEOUT", "20"))
+        except Exception:
+            self.submission_job_drain_timeout_s = 20.0
+        # Reward pipeline: ELO/GPA/badges/titles applied by background workers after submit-challenge
+        self.reward_pipeline = os.getenv("REWARD_PIPELINE", "true").lower() == "true"
+        try:
+            self.reward_workers = int(os.getenv("REWARD_WORKERS", "2"))
+        except Exception:
+            self.reward_workers = 2
+        try:
+            self.reward_max_pending = int(os.getenv("REWARD_MAX_PENDING", "500"))
+        except Exception:
+            self.reward_max_pending = 500
+        try:
+            self.reward_retention_s = float(os.getenv("REWARD_RETENTION", "900"))
+        except Exception:
+            self.reward_retention_s = 900.0
+        # Startup sweep republishing finalised attempts whose queued rewards a stopped process lost
+        self.reward_recovery = os.getenv("REWARD_RECOVERY", "true").lower() == "true"
+        try:
+            self.reward_recovery_delay_s = float(os.getenv("REWARD_RECOVERY_DELAY", "30"))
+        except Exception:
+            self.reward_recovery_delay_s = 30.0
+        try:
+            self.reward_recovery_lookback_s = float(os.getenv("REWARD_RECOVERY_LOOKBACK", "86400"))
+        except Exception:
+            self.reward_recovery_lookback_s = 86400.0
+        try:
+            self.reward_recovery_limit = int(os.getenv("REWARD_RECOVERY_LIMIT", "500"))
+        except Exception:
+            self.reward_recovery_limit = 500
+        # Running GPA / tier / topic totals kept in user_attempt_aggregates instead of rescanning attempts
+        self.achievement_aggregates = os.getenv("ACHIEVEMENT_AGGREGATES", "true").lower() == "true"
+        try:
+            self.achievement_aggregates_verify_interval_s = float(os.getenv("ACHIEVEMENT_AGGREGATES_VERIFY_INTERVAL", "3600"))
+        except Exception:
+            self.achievement_aggregates_verify_interval_s = 3600.0
+        # Speed badge threshold from a per-challenge duration sketch (challenge_duration_sketches)
+        self.achievement_speed_sketch = os.getenv("ACHIEVEMENT_SPEED_SKETCH", "true").lower() == "true"
+        try:
+            self.speed_sketch_accuracy = float(os.getenv("SPEED_SKETCH_ACCURACY", "0.01"))
+        except Exception:
+            self.speed_sketch_accuracy = 0.01
+        try:
+            self.speed_sketch_flush_interval_s = float(os.getenv("SPEED_SKETCH_FLUSH_INTERVAL", "30"))
+        except Exception:
+            self.speed_sketch_flush_interval_s = 30.0
+        # Badge/title catalogue cached in process (admin refresh: POST /admin/achievements/catalogue/refresh)
+        self.achievement_catalogue_cache_enabled = os.getenv("ACHIEVEMENT_CATALOGUE_CACHE_ENABLED", "true").lower() == "true"
+        try:
+            self.achievement_catalogue_ttl_s = float(os.getenv("ACHIEVEMENT_CATALOGUE_TTL", "3600"))
+        except Exception:
+            self.achievement_catalogue_ttl_s = 3600.0
+        # In-process question bundle cache (invalidated on regeneration, prewarmed on publish)
+        self.question_bundle_cache_enabled = os.getenv("QUESTION_BUNDLE_CACHE_ENABLED", "true").lower() == "true"
+        try:
+            self.question_bundle_cache_max_bytes = int(os.getenv("QUESTION_BUNDLE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+        except Exception:
+            self.question_bundle_cache_max_bytes = 32 * 1024 * 1024
+        try:
+            self.question_bundle_cache_max_entries = int(os.getenv("QUESTION_BUNDLE_CACHE_MAX_ENTRIES", "5000"))
+        except Exception:
+            self.question_bundle_cache_max_entries = 5000
+        try:
+            self.question_bundle_cache_ttl_s = float(os.getenv("QUESTION_BUNDLE_CACHE_TTL", "900"))
+        except Exception:
+            self.question_bundle_cache_ttl_s = 900.0
+        # Persist graded test batches with one call to the log_test_batch Postgres function
+        self.code_results_batch_rpc = os.getenv("CODE_RESULTS_BATCH_RPC", "true").lower() == "true"
+        # Write-behind for graded batches: queue in process, flush in bulk (opt-in)
+        self.code_results_write_behind = os.getenv("CODE_RESULTS_WRITE_BEHIND", "false").lower() == "true"
+        try:
+            self.code_results_flush_interval_s = float(os.getenv("CODE_RESULTS_FLUSH_INTERVAL", "0.2"))
+        except Exception:
+            self.code_results_flush_interval_s = 0.2
+        try:
+            self.code_results_flush_rows = int(os.getenv("CODE_RESULTS_FLUSH_ROWS", "500"))
+        except Exception:
+            self.code_results_flush_rows = 500
+        try:
+            self.code_results_max_pending = int(os.getenv("CODE_RESULTS_MAX_PENDING", "2000"))
+        except Exception:
+            self.code_results_max_pending = 2000
+        # Append-only spool that replays unwritten batches after a crash; one file per process
+        self.code_results_spool_path = (os.getenv("CODE_RESULTS_SPOOL_PATH", "") or "").strip()
+        # Code executor: "judge0" (default) or "local" (subprocess sandbox, Python only; dev/CI)
+        self.code_executor = (os.getenv("CODE_EXECUTOR", "judge0") or "judge0").strip().lower()
+        try:
+            self.local_executor_workers = int(os.getenv("LOCAL_EXECUTOR_WORKERS", "0"))
+        except Exception:
+            self.local_executor_workers = 0
+        try:
+            self.local_executor_cpu_time_limit_s = float(os.getenv("LOCAL_EXECUTOR_CPU_TIME_LIMIT", "5"))
+        except Exception:
+            self.local_executor_cpu_time_limit_s = 5.0
+        try:
+            self.local_executor_wall_time_limit_s = float(os.getenv("LOCAL_EXECUTOR_WALL_TIME_LIMIT", "10"))
+        except Exception:
+            self.local_executor_wall_time_limit_s = 10.0
+        try:
+            self.local_executor_memory_limit_kb = int(os.getenv("LOCAL_EXECUTOR_MEMORY_LIMIT_KB", "128000"))
+        except Exception:
+            self.local_executor_memory_limit_kb = 128000
+        try:
+            self.local_executor_max_file_size_kb = int(os.getenv("LOCAL_EXECUTOR_MAX_FILE_SIZE_KB", "1024"))
+        except Exception:
+            self.local_executor_max_file_size_kb = 1024
+        try:
+            self.local_executor_max_processes = int(os.getenv("LOCAL_EXECUTOR_MAX_PROCESSES", "60"))
+        except Exception:
+            self.local_executor_max_processes = 60
         # Hugging Face content generation
         self.hf_api_token = os.getenv("HUGGINGFACE_API_TOKEN", "")
         self.hf_model_id = os.getenv("HF_MODEL_ID", "mistralai/Mistral-7B-Instruct-v0.3")
@@ -0,0 +1,191 @@
+"""In-process catalogue of badge definitions and titles.
+
+``check_achievements`` and ``check_title_after_elo_update`` need the whole ``badges`` and
+``titles`` tables, which change perhaps once a semester. The catalogue loads both once (at
+startup, then on demand) into an immutable ``CatalogueSnapshot`` indexed for the lookups
+the achievement rules make:
+
+* badges by normalised slug (``slug``, else ``code``, else ``name``), first row wins;
+* titles by id, and by ELO threshold in a sorted list so the title for an ELO is a binary
+  search.
+
+A snapshot lives for ``ttl_seconds``; ``invalidate`` (the admin refresh endpoint) drops it
+at once. Concurrent misses share one load. Each invalidation bumps the generation and a load
+that started under an older generation is returned to its callers but not kept, so a slow
+read can never reinstate the catalogue that was just invalidated. If a reload fails while a
+snapshot is held, the old snapshot keeps being served (and the next call retries).
+The TTL only bounds staleness in the other processes, which do not see an invalidation.
+Snapshot rows are shared: treat them as read-only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional
+
+from app.Core.config import get_settings
+
+logger = logging.getLogger("achievements.catalogue")
+
+
+def _normalise_slug(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    slug = "".join(ch for ch in str(value).lower() if ch.isalnum() or ch in {"-", "_"})
+    return slug or None
+
+
+def _threshold(row: Dict[str, Any]) -> int:
+    try:
+        return int(row.get("min_elo") or row.get("elo_threshold") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class CatalogueSnapshot:
+    """Badge and title rows as loaded at ``generation``, with lookup indexes."""
+
+    def __init__(self, badges: List[Dict[str, Any]], titles: List[Dict[str, Any]], generation: int = 0) -> None:
+        self.badges = list(badges or [])
+        self.titles = list(titles or [])
+        self.generation = generation
+        self._badges_by_slug: Dict[str, Dict[str, Any]] = {}
+        for badge in self.badges:
+            slug = _normalise_slug(badge.get("slug") or badge.get("code") or badge.get("name"))
+            if slug:
+                self._badges_by_slug.setdefault(slug, badge)
+        self._titles_by_id: Dict[str, Dict[str, Any]] = {}
+        for row in self.titles:
+            rid = row.get("id") or row.get("title_id")
+            self._titles_by_id.setdefault(str(rid), row)
+        # One row per threshold (the first listed), ascending
+        ladder: Dict[int, Dict[str, Any]] = {}
+        for row in sorted(self.titles, key=_threshold):
+            ladder.setdefault(_threshold(row), row)
+        self._thresholds: List[int] = list(ladder)
+        self._ladder: List[Dict[str, Any]] = list(ladder.values())
+
+    def badge(self, *slug_candidates: str) -> Optional[Dict[str, Any]]:
+        for candidate in slug_candidates:
+            found = self._badges_by_slug.get(_normalise_slug(candidate))
+            if found is not None:
+                return found
+        return None
+
+    def title(self, title_id: Any) -> Optional[Dict[str, Any]]:
+        return self._titles_by_id.get(str(title_id))
+
+    def title_for_elo(self, elo: int) -> Optional[Dict[str, Any]]:
+        """Highest-threshold title at or below ``elo``; ``None`` if ``elo`` is below all of them."""
+        index = bisect_right(self._thresholds, elo) - 1
+        return self._ladder[index] if index >= 0 else None
+
+    def lowest_title(self) -> Optional[Dict[str, Any]]:
+        return self._ladder[0] if self._ladder else None
+
+
+class AchievementCatalogue:
+    """TTL cache of the ``CatalogueSnapshot`` with generation-based invalidation."""
+
+    def __init__(self, repo: Any = None, *, ttl_seconds: float = 3600.0, enabled: bool = True) -> None:
+        self._repo = repo
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.enabled = enabled
+        self._snapshot: Optional[CatalogueSnapshot] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._loading: Optional["asyncio.Task[CatalogueSnapshot]"] = None
+        self.hits = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.invalidations = 0
+
+    @property
+    def repo(self) -> Any:
+        if self._repo is None:
+            from .repository import achievements_repository
+
+            self._repo = achievements_repository
+        return self._repo
+
+    async def snapshot(self) -> CatalogueSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._expires_at:
+            self.hits += 1
+            return snapshot
+        loop = asyncio.get_running_loop()
+        task = self._loading
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._load(self._generation))
+            task.add_done_callback(self._load_finished)
+            self._loading = task
+        return await asyncio.shield(task)
+
+    def _load_finished(self, task: "asyncio.Task[CatalogueSnapshot]") -> None:
+        if self._loading is task:
+            self._loading = None
+
+    async def _load(self, generation: int) -> CatalogueSnapshot:
+        self.loads += 1
+        try:
+            badges, titles = await asyncio.gather(self.repo.list_badge_definitions(), self.repo.list_titles())
+        except Exception:
+            self.load_failures += 1
+            if self._snapshot is not None:
+                logger.warning("Achievement catalogue reload failed; serving the previous snapshot", exc_info=True)
+                return self._snapshot
+            raise
+        snapshot = CatalogueSnapshot(badges, titles, generation)
+        if self.enabled and generation == self._generation:
+            self._snapshot = snapshot
+            self._expires_at = time.monotonic() + self.ttl_seconds
+        return snapshot
+
+    async def preload(self) -> bool:
+        """Load the catalogue ahead of the first submission; failures are logged, not raised."""
+        try:
+            await self.snapshot()
+            return True
+        except Exception:
+            logger.warning("Failed to preload the achievement catalogue", exc_info=True)
+            return False
+
+    def invalidate(self) -> None:
+        """Drop the snapshot; the next lookup reloads both tables."""
+        self._generation += 1
+        self.invalidations += 1
+        self._snapshot = None
+        self._expires_at = 0.0
+        self._loading = None
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "enabled": self.enabled,
+            "loaded": snapshot is not None,
+            "generation": self._generation,
+            "badges": len(snapshot.badges) if snapshot else 0,
+            "titles": len(snapshot.titles) if snapshot else 0,
+            "ttl_seconds": self.ttl_seconds,
+            "expires_in": round(max(0.0, self._expires_at - time.monotonic()), 3) if snapshot else 0.0,
+            "hits": self.hits,
+            "loads": self.loads,
+            "load_failures": self.load_failures,
+            "invalidations": self.invalidations,
+        }
+
+
+def _build_catalogue() -> AchievementCatalogue:
+    settings = get_settings()
+    return AchievementCatalogue(
+        ttl_seconds=getattr(settings, "achievement_catalogue_ttl_s", 3600.0),
+        enabled=bool(getattr(settings, "achievement_catalogue_cache_enabled", True)),
+    )
+
+
+achievement_catalogue = _build_catalogue()
+
+__all__ = ["AchievementCatalogue", "CatalogueSnapshot", "achievement_catalogue"]
@@ -0,0 +1,246 @@
+"""Per-challenge streaming sketch of attempt durations for the speed badge.
+
+The speed badge goes to attempts finished within the fastest 10% for their challenge. Rather
+than loading and sorting every attempt of the challenge on each submission, each challenge
+keeps a ``DurationSketch``: a histogram over logarithmic buckets (the DDSketch layout).
+Adding a duration and answering a quantile cost O(1) in the number of attempts; the bucket
+count depends only on the spread of durations (about 570 buckets between 1 second and a day
+at 1% accuracy).
+
+Accuracy: bucket ``i`` holds durations in ``(gamma**(i-1), gamma**i]`` with
+``gamma = (1 + alpha) / (1 - alpha)``. Bucket counts are exact, so the rank of the 10th
+percentile is exact and only its value is approximate, by at most ``alpha`` relative error.
+The speed badge compares buckets rather than values: a duration qualifies when its bucket is
+not above the bucket of the exact 10th-percentile duration ``t``. Every duration ``<= t``
+still qualifies (as before), and a duration that qualifies is at most ``gamma * t``
+(about ``t * 1.02`` at the default ``alpha = 0.01``).
+
+Sketches merge by adding bucket counts, so each process keeps the updates it has seen as a
+delta and ``flush`` adds them into the stored sketch (``merge_challenge_duration_sketch``)
+every ``flush_interval`` seconds, taking the merged sketch back. A challenge without a stored
+sketch is seeded once from its submitted attempts.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from app.Core.config import get_settings
+
+logger = logging.getLogger("achievements.duration_sketch")
+
+
+class DurationSketch:
+    def __init__(self, alpha: float = 0.01, bins: Optional[Dict[int, int]] = None) -> None:
+        if not 0.0 < alpha < 1.0:
+            raise ValueError("alpha must be between 0 and 1")
+        self.alpha = float(alpha)
+        self.gamma = (1.0 + self.alpha) / (1.0 - self.alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {int(k): int(v) for k, v in (bins or {}).items() if int(v) > 0}
+        self.count = sum(self.bins.values())
+
+    def key(self, value: float) -> int:
+        return int(math.ceil(math.log(value) / self._log_gamma))
+
+    def value(self, key: int) -> float:
+        """Representative value of a bucket: within ``alpha`` of everything in it."""
+        return 2.0 * self.gamma ** key / (self.gamma + 1.0)
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value is None or value <= 0:
+            return
+        k = self.key(float(value))
+        self.bins[k] = self.bins.get(k, 0) + count
+        self.count += count
+
+    def merge(self, other: "DurationSketch") -> None:
+        if abs(other.alpha - self.alpha) > 1e-12:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for k, v in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + v
+        self.count += other.count
+
+    def rank_key(self, q: float) -> Optional[int]:
+        """Bucket of the ``ceil(q * n)``-th smallest duration (the order statistic the exact scan picked)."""
+        if self.count <= 0:
+            return None
+        rank = max(1, int(math.ceil(self.count * q)))
+        seen = 0
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen >= rank:
+                return k
+        return max(self.bins)
+
+    def quantile(self, q: float) -> Optional[float]:
+        k = self.rank_key(q)
+        return None if k is None else self.value(k)
+
+    def within_quantile(self, value: float, q: float) -> bool:
+        """True when ``value`` falls in the bucket of the ``q`` quantile or a lower one."""
+        k = self.rank_key(q)
+        if k is None or value is None:
+            return False
+        return value <= 0 or self.key(float(value)) <= k
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"alpha": self.alpha, "count": self.count, "bins": {str(k): v for k, v in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DurationSketch":
+        return cls(alpha=float(data.get("alpha") or 0.01), bins=data.get("bins") or {})
+
+    @classmethod
+    def from_durations(cls, durations: Iterable[Any], alpha: float = 0.01) -> "DurationSketch":
+        sketch = cls(alpha=alpha)
+        for duration in durations:
+            try:
+                value = float(duration)
+            except (TypeError, ValueError):
+                continue
+            sketch.add(value)
+        return sketch
+
+
+def _attempt_duration(attempt: Dict[str, Any]) -> float:
+    try:
+        return float(attempt.get("duration_seconds") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ChallengeDurationSketches:
+    """Process-wide sketches per challenge: local deltas, periodically merged into storage."""
+
+    def __init__(
+        self,
+        repo: Any = None,
+        *,
+        alpha: float = 0.01,
+        flush_interval: float = 30.0,
+        max_challenges: int = 2000,
+        remember_attempts: int = 10000,
+    ) -> None:
+        self._repo = repo
+        self.alpha = float(alpha)
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.max_challenges = max(1, int(max_challenges))
+        self.remember_attempts = max(1, int(remember_attempts))
+        self._sketches: "OrderedDict[str, DurationSketch]" = OrderedDict()
+        self._pending: Dict[str, DurationSketch] = {}
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._last_flush = time.monotonic()
+        self.seeded_total = 0
+        self.observed_total = 0
+        self.flushes = 0
+        self.flush_failures = 0
+
+    @property
+    def repo(self) -> Any:
+        if self._repo is None:
+            from .repository import achievements_repository
+
+            self._repo = achievements_repository
+        return self._repo
+
+    async def sketch(self, challenge_id: str) -> DurationSketch:
+        """The challenge's sketch, loaded from storage or seeded from its attempts on first use."""
+        challenge_id = str(challenge_id)
+        sketch = self._sketches.get(challenge_id)
+        if sketch is not None:
+            self._sketches.move_to_end(challenge_id)
+            return sketch
+        stored = await self.repo.get_duration_sketch(challenge_id)
+        if stored and abs(float(stored.get("alpha") or 0) - self.alpha) < 1e-12:
+            sketch = DurationSketch.from_dict(stored)
+        else:
+            # Not stored yet (or stored at another accuracy): seed once from the attempts so far
+            attempts = await self.repo.list_attempts_for_challenge(challenge_id)
+            sketch = DurationSketch.from_durations((_attempt_duration(a) for a in attempts), alpha=self.alpha)
+            for attempt in attempts:
+                if attempt.get("id") is not None:
+                    self._remember(str(attempt["id"]))
+            self.seeded_total += 1
+            await self.repo.merge_duration_sketch(challenge_id, sketch.to_dict(), replace=True)
+        self._sketches[challenge_id] = sketch
+        # Evicting only drops the cached view; unsaved deltas stay in _pending until the next flush
+        while len(self._sketches) > self.max_challenges:
+            self._sketches.popitem(last=False)
+        return sketch
+
+    def _remember(self, attempt_id: str) -> bool:
+        """Record an attempt id; ``False`` if it was already counted here."""
+        if attempt_id in self._seen:
+            return False
+        self._seen[attempt_id] = None
+        while len(self._seen) > self.remember_attempts:
+            self._seen.popitem(last=False)
+        return True
+
+    async def observe(self, challenge_id: str, attempt_id: str, duration: Any) -> DurationSketch:
+        """Add a finalised attempt's duration (once per attempt) and return the challenge sketch."""
+        challenge_id = str(challenge_id)
+        sketch = await self.sketch(challenge_id)
+        try:
+            value = float(duration)
+        except (TypeError, ValueError):
+            value = 0.0
+        if value > 0 and self._remember(str(attempt_id)):
+            sketch.add(value)
+            self._pending.setdefault(challenge_id, DurationSketch(alpha=self.alpha)).add(value)
+            self.observed_total += 1
+        if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+        return sketch
+
+    async def flush(self) -> int:
+        """Merge local deltas into the stored sketches; returns how many challenges were saved."""
+        self._last_flush = time.monotonic()
+        pending, self._pending = self._pending, {}
+        saved = 0
+        for challenge_id, delta in pending.items():
+            try:
+                merged = await self.repo.merge_duration_sketch(challenge_id, delta.to_dict())
+            except Exception:
+                merged = None
+                logger.debug("duration sketch flush failed for %s", challenge_id, exc_info=True)
+            if merged is None:
+                if self.repo.sketches_available:
+                    self.flush_failures += 1
+                    self._pending.setdefault(challenge_id, DurationSketch(alpha=self.alpha)).merge(delta)
+                continue
+            saved += 1
+            if challenge_id in self._sketches:
+                # Take the merged view so updates from other processes show up here too
+                self._sketches[challenge_id] = DurationSketch.from_dict(merged)
+        self.flushes += 1
+        return saved
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "alpha": self.alpha,
+            "challenges": len(self._sketches),
+            "pending_challenges": len(self._pending),
+            "seeded_total": self.seeded_total,
+            "observed_total": self.observed_total,
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+        }
+
+
+def _build_sketches() -> ChallengeDurationSketches:
+    settings = get_settings()
+    return ChallengeDurationSketches(
+        alpha=getattr(settings, "speed_sketch_accuracy", 0.01),
+        flush_interval=getattr(settings, "speed_sketch_flush_interval_s", 30.0),
+    )
+
+
+challenge_duration_sketches = _build_sketches()
+
+__all__ = ["ChallengeDurationSketches", "DurationSketch", "challenge_duration_sketches"]
@@ -26,6 +26,12 @@ def _parse_datetime(value: Any) -> Optional[datetime]:
     return None
 
 
+def _is_missing_object(exc: Exception) -> bool:
+    """True when PostgREST reports an undeployed table or function."""
+    message = str(exc)
+    return any(marker in message for marker in ("PGRST202", "PGRST205", "42883", "42P01", "schema cache", "does not exist"))
+
+
 class AchievementsRepository:
     """Low-level access helpers for achievements related Supabase tables.
 
@@ -305,6 +311,153 @@ class AchievementsRepository:
         query = client.table("elo_events").insert(payload)
         await self._execute(query.execute(), op="elo_events.insert")
 
+    # --- Attempt aggregates -----------------------------------------------
+
+    # Set once the aggregate functions or tables turn out not to be deployed
+    _aggregates_missing = False
+
+    def _note_aggregates_error(self, exc: Exception, op: str) -> None:
+        if _is_missing_object(exc):
+            AchievementsRepository._aggregates_missing = True
+            logger.info("attempt aggregates unavailable (%s); recomputing from history", op)
+        else:
+            logger.warning("supabase_%s_failed error=%s", op, exc)
+
+    @property
+    def aggregates_available(self) -> bool:
+        return not AchievementsRepository._aggregates_missing
+
+    async def get_attempt_aggregate(self, student_id: int) -> Optional[Dict[str, Any]]:
+        if AchievementsRepository._aggregates_missing:
+            return None
+        client = await self._client()
+        query = client.table("user_attempt_aggregates").select("*").eq("student_id", student_id).limit(1)
+        try:
+            resp = await query.execute()
+        except Exception as exc:
+            self._note_aggregates_error(exc, "user_attempt_aggregates.select")
+            return None
+        rows = getattr(resp, "data", None) or []
+        return rows[0] if rows else None
+
+    async def list_attempt_aggregate_students(self) -> List[int]:
+        if AchievementsRepository._aggregates_missing:
+            return []
+        client = await self._client()
+        query = client.table("user_attempt_aggregates").select("student_id").order("student_id")
+        try:
+            resp = await query.execute()
+        except Exception as exc:
+            self._note_aggregates_error(exc, "user_attempt_aggregates.list")
+            return []
+        return [row["student_id"] for row in getattr(resp, "data", None) or [] if row.get("student_id") is not None]
+
+    async def record_attempt_aggregate(
+        self,
+        student_id: int,
+        attempt_id: str,
+        *,
+        ratio: float,
+        tier: Optional[str],
+        topic: Optional[str],
+    ) -> Optional[Dict[str, Any]]:
+        """Add one attempt to the stored totals (idempotent per attempt); ``None`` when not seeded."""
+        if AchievementsRepository._aggregates_missing:
+            return None
+        client = await self._client()
+        params = {
+            "p_student_id": student_id,
+            "p_attempt_id": str(attempt_id),
+            "p_ratio": ratio,
+            "p_tier": tier,
+            "p_topic": topic,
+        }
+        try:
+            resp = await client.rpc("record_attempt_aggregate", params).execute()
+        except Exception as exc:
+            self._note_aggregates_error(exc, "record_attempt_aggregate")
+            return None
+        data = getattr(resp, "data", None)
+        if isinstance(data, list):
+            data = data[0] if data else None
+        return data or None
+
+    async def replace_attempt_aggregate(
+        self,
+        student_id: int,
+        aggregate: Dict[str, Any],
+        attempt_ids: Iterable[str],
+    ) -> Optional[Dict[str, Any]]:
+        """Overwrite the stored totals with ones rebuilt from ``attempt_ids``."""
+        if AchievementsRepository._aggregates_missing:
+            return None
+        client = await self._client()
+        params = {
+            "p_student_id": student_id,
+            "p_aggregate": aggregate,
+            "p_attempt_ids": [str(attempt_id) for attempt_id in attempt_ids],
+        }
+        try:
+            resp = await client.rpc("replace_attempt_aggregate", params).execute()
+        except Exception as exc:
+            self._note_aggregates_error(exc, "replace_attempt_aggregate")
+            return None
+        data = getattr(resp, "data", None)
+        if isinstance(data, list):
+            data = data[0] if data else None
+        return data or None
+
+    # --- Challenge duration sketches ----------------------------------------
+
+    # Set once the sketch function or table turns out not to be deployed
+    _sketches_missing = False
+
+    def _note_sketches_error(self, exc: Exception, op: str) -> None:
+        if _is_missing_object(exc):
+            AchievementsRepository._sketches_missing = True
+            logger.info("duration sketches unavailable (%s); keeping them in memory only", op)
+        else:
+            logger.warning("supabase_%s_failed error=%s", op, exc)
+
+    @property
+    def sketches_available(self) -> bool:
+        return not AchievementsRepository._sketches_missing
+
+    async def get_duration_sketch(self, challenge_id: str) -> Optional[Dict[str, Any]]:
+        if AchievementsRepository._sketches_missing:
+            return None
+        client = await self._client()
+        query = client.table("challenge_duration_sketches").select("*").eq("challenge_id", challenge_id).limit(1)
+        try:
+            resp = await query.execute()
+        except Exception as exc:
+            self._note_sketches_error(exc, "challenge_duration_sketches.select")
+            return None
+        rows = getattr(resp, "data", None) or []
+        return rows[0] if rows else None
+
+    async def merge_duration_sketch(
+        self,
+        challenge_id: str,
+        sketch: Dict[str, Any],
+        *,
+        replace: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """Add ``sketch``'s bucket counts to the stored sketch (or replace it); returns the result."""
+        if AchievementsRepository._sketches_missing:
+            return None
+        client = await self._client()
+        params = {"p_challenge_id": str(challenge_id), "p_sketch": sketch, "p_replace": replace}
+        try:
+            resp = await client.rpc("merge_challenge_duration_sketch", params).execute()
+        except Exception as exc:
+            self._note_sketches_error(exc, "merge_challenge_duration_sketch")
+            return None
+        data = getattr(resp, "data", None)
+        if isinstance(data, list):
+            data = data[0] if data else None
+        return data or None
+
     # --- User Scores & Progress -------------------------------------------
 
     async def update_user_scores(
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import math
 import logging
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, date, timedelta
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
+from .catalogue import CatalogueSnapshot, _normalise_slug, achievement_catalogue
+from .duration_sketch import challenge_duration_sketches
 from .repository import achievements_repository, _parse_datetime
+from app.Core.config import get_settings
 from app.features.admin.repository import ModuleRepository
 from app.features.challenges.tier_utils import BASE_TIER, normalise_challenge_tier
 from .schemas import (
@@ -71,13 +75,6 @@ def _normalise_ratio(numerator: int, denominator: int) -> float:
     return max(0.0, min(1.0, numerator / denominator))
 
 
-def _normalise_slug(value: Optional[str]) -> Optional[str]:
-    if not value:
-        return None
-    slug = "".join(ch for ch in str(value).lower() if ch.isalnum() or ch in {"-", "_"})
-    return slug or None
-
-
 def _extract_snapshot_count(raw: Any) -> int:
     if raw is None:
         return 0
@@ -108,11 +105,199 @@ class AttemptSummary:
     module_code: Optional[str]
     week_number: Optional[int]
     metadata: Dict[str, Any]
+    attempt: Dict[str, Any] = field(default_factory=dict)
+
+
+def _attempt_topic(attempt: Dict[str, Any]) -> Any:
+    topic = attempt.get("topic_id")
+    if topic is None:
+        topic = (attempt.get("challenge") or {}).get("topic_id")
+    return topic
+
+
+@dataclass
+class AttemptAggregates:
+    """Running totals over a student's submitted attempts, built one attempt at a time.
+
+    ``contribution`` is the single definition of what an attempt adds, so totals kept
+    incrementally and totals rebuilt from history agree.
+    """
+
+    ratio_sum: float = 0.0
+    attempt_count: int = 0
+    tier_successes: Dict[str, int] = field(default_factory=dict)
+    topic_successes: Dict[str, int] = field(default_factory=dict)
+
+    @staticmethod
+    def contribution(attempt: Dict[str, Any]) -> Tuple[float, Optional[str], Optional[str]]:
+        """(GPA ratio, tier it completes, topic it masters) for one submitted attempt."""
+        correct = _safe_int(attempt.get("correct_count"), default=0)
+        snapshot_total = _extract_snapshot_count(attempt.get("snapshot_questions"))
+
+        gpa_total = snapshot_total
+        if gpa_total <= 0:
+            gpa_total = _safe_int(attempt.get("total_public_tests"), default=0)
+        if gpa_total <= 0:
+            gpa_total = _safe_int(attempt.get("total_questions"), default=0)
+        ratio = _normalise_ratio(correct, gpa_total if gpa_total > 0 else 1)
+
+        tier = _normalise_slug(attempt.get("tier") or (attempt.get("challenge") or {}).get("tier"))
+        tier = normalise_challenge_tier(tier) or tier or BASE_TIER
+        total = snapshot_total if snapshot_total > 0 else _safe_int(attempt.get("total_questions"), default=0)
+        tests_total = _safe_int(attempt.get("tests_total"), default=0)
+        if tests_total > 0:
+            total = tests_total
+        tests_passed = _safe_int(attempt.get("tests_passed"), default=0)
+        completed = (
+            (total > 0 and correct >= total)
+            or (tests_total > 0 and tests_passed >= tests_total)
+            or _normalise_ratio(correct, total if total > 0 else 1) >= 0.999
+        )
+
+        mastered_topic: Optional[str] = None
+        topic = _attempt_topic(attempt)
+        topic_total = snapshot_total
+        if topic_total <= 0:
+            topic_total = tests_total
+        if topic_total <= 0:
+            topic_total = _safe_int(attempt.get("total_questions"), default=0)
+        if topic is not None and topic_total > 0:
+            topic_correct = _safe_int(attempt.get("correct_count"), default=tests_passed)
+            if _normalise_ratio(max(topic_correct, tests_passed), topic_total) >= 0.85:
+                mastered_topic = str(topic)
+
+        return ratio, (tier if completed else None), mastered_topic
+
+    def add(self, attempt: Dict[str, Any]) -> None:
+        ratio, tier, topic = self.contribution(attempt)
+        self.ratio_sum += ratio
+        self.attempt_count += 1
+        if tier is not None:
+            self.tier_successes[tier] = self.tier_successes.get(tier, 0) + 1
+        if topic is not None:
+            self.topic_successes[topic] = self.topic_successes.get(topic, 0) + 1
+
+    @classmethod
+    def from_attempts(cls, attempts: Sequence[Dict[str, Any]]) -> "AttemptAggregates":
+        aggregates = cls()
+        for attempt in attempts:
+            aggregates.add(attempt)
+        return aggregates
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "AttemptAggregates":
+        def _counts(raw: Any) -> Dict[str, int]:
+            if isinstance(raw, str):
+                try:
+                    raw = json.loads(raw)
+                except Exception:
+                    raw = {}
+            return {str(k): _safe_int(v) for k, v in (raw or {}).items()}
+
+        try:
+            ratio_sum = float(row.get("ratio_sum") or 0.0)
+        except Exception:
+            ratio_sum = 0.0
+        return cls(
+            ratio_sum=ratio_sum,
+            attempt_count=_safe_int(row.get("attempt_count"), default=0),
+            tier_successes=_counts(row.get("tier_successes")),
+            topic_successes=_counts(row.get("topic_successes")),
+        )
+
+    def to_row(self) -> Dict[str, Any]:
+        return {
+            "ratio_sum": self.ratio_sum,
+            "attempt_count": self.attempt_count,
+            "tier_successes": dict(self.tier_successes),
+            "topic_successes": dict(self.topic_successes),
+        }
+
+    def matches(self, other: "AttemptAggregates") -> bool:
+        return (
+            self.attempt_count == other.attempt_count
+            and abs(self.ratio_sum - other.ratio_sum) < 1e-6
+            and {k: v for k, v in self.tier_successes.items() if v} == {k: v for k, v in other.tier_successes.items() if v}
+            and {k: v for k, v in self.topic_successes.items() if v} == {k: v for k, v in other.topic_successes.items() if v}
+        )
+
+    @property
+    def running_gpa(self) -> float:
+        if self.attempt_count <= 0:
+            return 0.0
+        return round(self.ratio_sum / self.attempt_count * 4.0, 2)
+
+
+def _student_number(user_id: Any) -> Optional[int]:
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class _EvaluationContext:
+    """Datasets read while evaluating one attempt for one user, each loaded at most once.
+
+    A loader starts on first use and its result is shared by every rule that asks for it, so
+    repeated reads cost nothing and ``prefetch`` runs the independent ones concurrently.
+    """
+
+    def __init__(self, service: "AchievementsService", user_id: str, submission_id: str) -> None:
+        self.service = service
+        self.repo = service.repo
+        self.user_id = user_id
+        self.submission_id = submission_id
+        self._loads: Dict[Any, "asyncio.Future[Any]"] = {}
+
+    def _once(self, key: Any, load: Callable[[], Awaitable[Any]]) -> "asyncio.Future[Any]":
+        future = self._loads.get(key)
+        if future is None:
+            future = asyncio.ensure_future(load())
+            self._loads[key] = future
+        return future
+
+    def summary(self) -> "asyncio.Future[AttemptSummary]":
+        return self._once("summary", lambda: self.service._load_attempt_summary(self.submission_id, self.user_id))
+
+    def submitted_attempts(self) -> "asyncio.Future[List[Dict[str, Any]]]":
+        return self._once("submitted_attempts", lambda: self.repo.list_submitted_attempts(self.user_id))
+
+    def catalogue(self) -> "asyncio.Future[CatalogueSnapshot]":
+        """Badge definitions and titles, from the shared catalogue cache."""
+        return self._once("catalogue", self.service.catalogue.snapshot)
+
+    def owned_badge_ids(self) -> "asyncio.Future[Set[Any]]":
+        """Badge ids the user holds; rules add the badges they award to the same set."""
+        return self._once("owned_badge_ids", self._load_owned_badge_ids)
+
+    async def _load_owned_badge_ids(self) -> Set[Any]:
+        rows = await self.repo.get_badges_for_user(self.user_id)
+        return {row.get("badge_id") or (row.get("badge") or {}).get("id") for row in rows}
+
+    def aggregates(self) -> "asyncio.Future[AttemptAggregates]":
+        """Totals over the user's submitted attempts, this one included."""
+        return self._once("aggregates", lambda: self.service._attempt_aggregates(self))
+
+    def speed_qualified(self) -> "asyncio.Future[bool]":
+        """Whether the attempt's duration is within the fastest 10% for its challenge."""
+        return self._once("speed_qualified", lambda: self.service._speed_qualified(self))
+
+    async def prefetch(self) -> None:
+        """Start every read that depends only on the user and attempt; errors surface on use."""
+        await asyncio.gather(
+            self.summary(),
+            self.aggregates(),
+            self.catalogue(),
+            self.owned_badge_ids(),
+            return_exceptions=True,
+        )
 
 
 class AchievementsService:
     def __init__(self):
         self.repo = achievements_repository
+        self.duration_sketches = challenge_duration_sketches
+        self.catalogue = achievement_catalogue
         self.log = logger
 
     def _env_semester_start(self) -> date:
@@ -217,12 +402,12 @@ class AchievementsService:
             semester_end=semester_end,
         )
         old_elo = _safe_int(elo_record.get("elo_points"), default=BASE_ELO)
+        gpa = await self._compute_running_gpa(user_id)
         gpa_before = elo_record.get("running_gpa")
         if gpa_before is None:
-            gpa_before = await self._compute_running_gpa(user_id)
+            gpa_before = gpa
         delta, reasons = self._compute_elo_delta_with_reasons(summary, old_elo)
         new_elo = max(BASE_ELO, min(MAX_ELO, old_elo + delta))
-        gpa = await self._compute_running_gpa(user_id)
         await self.repo.update_user_elo(
             user_id,
             elo_points=new_elo,
@@ -273,17 +458,18 @@ class AchievementsService:
         return [self._serialise_badge_row(row) for row in rows]
 
     async def add_badge(self, user_id: str, req: BadgeRequest) -> BadgeResponse:
-        awarded = await self._evaluate_badges(user_id, req.submission_id)
+        awarded = await self._evaluate_badges(_EvaluationContext(self, user_id, req.submission_id))
         if not awarded:
             raise ValueError("no_badge_awarded")
         return awarded[0]
 
     async def add_badges_batch(self, user_id: str, req: BadgeBatchAddRequest) -> BadgeBatchAddResponse:
-        awarded = await self._evaluate_badges(user_id, req.submission_id)
+        awarded = await self._evaluate_badges(_EvaluationContext(self, user_id, req.submission_id))
         return BadgeBatchAddResponse(badges=awarded)
 
-    async def get_title(self, user_id: str) -> Optional[TitleInfo]:
-        titles = await self.repo.list_titles()
+    async def get_title(self, user_id: str, *, catalogue: Optional[CatalogueSnapshot] = None) -> Optional[TitleInfo]:
+        if catalogue is None:
+            catalogue = await self.catalogue.snapshot()
         profile = await self.repo.get_user_elo(user_id)
         current_id = None
         if profile:
@@ -297,19 +483,26 @@ class AchievementsService:
             except Exception:  # pragma: no cover - best effort fallback
                 current_id = None
         if not current_id:
-            return self._default_title(titles)
-        title_row = self._find_title_by_id(titles, current_id)
+            return self._default_title(catalogue)
+        title_row = self._find_title_by_id(catalogue, current_id)
         if not title_row:
-            return self._default_title(titles)
+            return self._default_title(catalogue)
         return self._serialise_title(title_row)
 
-    async def check_title_after_elo_update(self, user_id: str, old_elo: int) -> TitleResponse:
-        titles = await self.repo.list_titles()
+    async def check_title_after_elo_update(
+        self,
+        user_id: str,
+        old_elo: int,
+        *,
+        catalogue: Optional[CatalogueSnapshot] = None,
+    ) -> TitleResponse:
+        if catalogue is None:
+            catalogue = await self.catalogue.snapshot()
         current_record = await self._ensure_user_elo_record(user_id)
         current_elo = _safe_int(current_record.get("elo_points"), default=BASE_ELO)
-        current_title = await self.get_title(user_id)
-        expected_old_title = self._title_for_elo(titles, old_elo)
-        expected_new_title = self._title_for_elo(titles, current_elo)
+        current_title = await self.get_title(user_id, catalogue=catalogue)
+        expected_old_title = self._title_for_elo(catalogue, old_elo)
+        expected_new_title = self._title_for_elo(catalogue, current_elo)
         changed = False
         if expected_new_title and expected_old_title:
             changed = expected_new_title.id != expected_old_title.id
@@ -318,7 +511,7 @@ class AchievementsService:
                 await self.repo.update_profile_title(user_id, expected_new_title.id)
             except Exception:  # pragma: no cover - Supabase failure resilience
                 pass
-        fallback_current = current_title or expected_new_title or expected_old_title or self._default_title(titles)
+        fallback_current = current_title or expected_new_title or expected_old_title or self._default_title(catalogue)
         return TitleResponse(
             user_id=user_id,
             current_title=fallback_current,
@@ -335,7 +528,10 @@ class AchievementsService:
         logger = logging.getLogger("achievements")
         logger.info(f"🏆 check_achievements CALLED for user {user_id}, submission {req.submission_id}")
         
-        summary = await self._load_attempt_summary(req.submission_id, user_id)
+        # Attempt, running totals, badge catalogue, owned badges and titles are independent reads
+        ctx = _EvaluationContext(self, user_id, req.submission_id)
+        await ctx.prefetch()
+        summary = await ctx.summary()
         logger.info(f"   Loaded attempt summary: tier={summary.tier}, badges={req.badge_tiers}")
         
         if not isinstance(summary.metadata, dict):
@@ -352,6 +548,8 @@ class AchievementsService:
             perf = summary.metadata.get("performance")
             if isinstance(perf, dict):
                 module_code = perf.get("module_code") or module_code
+        if summary.metadata.get("duration_seconds") is not None:
+            ctx.speed_qualified()  # settle the speed badge while the ELO row loads
         semester_id, semester_start, semester_end = await self._resolve_semester_context(module_code)
 
         elo_record = await self._ensure_user_elo_record(
@@ -362,9 +560,10 @@ class AchievementsService:
             semester_end=semester_end,
         )
         old_elo = _safe_int(elo_record.get("elo_points"), default=BASE_ELO)
+        gpa = (await ctx.aggregates()).running_gpa
         gpa_before = elo_record.get("running_gpa")
         if gpa_before is None:
-            gpa_before = await self._compute_running_gpa(user_id)
+            gpa_before = gpa
 
         if req.elo_delta_override is not None:
             delta = int(req.elo_delta_override)
@@ -373,7 +572,6 @@ class AchievementsService:
             delta, reasons = self._compute_elo_delta_with_reasons(summary, old_elo)
 
         new_elo = max(BASE_ELO, min(MAX_ELO, old_elo + delta))
-        gpa = await self._compute_running_gpa(user_id)
         
         logger.info(f"   ELO: {old_elo} + {delta} = {new_elo}, GPA: {gpa}")
         logger.info(f"   Calling update_user_elo...")
@@ -404,14 +602,11 @@ class AchievementsService:
             semester_end=semester_end,
         )
 
-        badge_defs = await self.repo.list_badge_definitions()
-        owned_rows = await self.repo.get_badges_for_user(user_id)
-        owned_ids = {row.get("badge_id") or (row.get("badge") or {}).get("id") for row in owned_rows}
-
-        tier_badges = await self._award_badges_for_tiers(user_id, summary, req.badge_tiers or [], badge_defs, owned_ids)
-        topic_badges = await self._award_topic_mastery_badge(user_id, summary, badge_defs, owned_ids)
-        speed_badges = await self._award_speed_badge(user_id, summary, badge_defs, owned_ids)
-        other_badges = await self._evaluate_badges(user_id, req.submission_id)
+        # Badge rules run in turn: each one records what it awards in the shared owned set
+        tier_badges = await self._award_badges_for_tiers(ctx, req.badge_tiers or [])
+        topic_badges = await self._award_topic_mastery_badge(ctx)
+        speed_badges = await self._award_speed_badge(ctx)
+        other_badges = await self._evaluate_badges(ctx)
 
         combined: List[BadgeResponse] = []
         seen_ids = set()
@@ -440,7 +635,7 @@ class AchievementsService:
                 )
             )
 
-        title_resp = await self.check_title_after_elo_update(user_id, old_elo)
+        title_resp = await self.check_title_after_elo_update(user_id, old_elo, catalogue=await ctx.catalogue())
         reward_summary = RewardSummary(
             elo=RewardEloSummary(before=old_elo, after=new_elo, delta=delta, reasons=reasons),
             gpa=RewardGpaSummary(before=gpa_before, after=gpa),
@@ -489,24 +684,66 @@ class AchievementsService:
             base_record["semester_id"] = semester_id
         return base_record
 
-    async def _compute_running_gpa(self, user_id: str) -> float:
-        attempts = await self.repo.list_submitted_attempts(user_id)
-        if not attempts:
-            return 0.0
-        ratios: List[float] = []
-        for attempt in attempts:
-            total = _extract_snapshot_count(attempt.get("snapshot_questions"))
-            if total <= 0:
-                total = _safe_int(attempt.get("total_public_tests"), default=0)
-            if total <= 0:
-                total = _safe_int(attempt.get("total_questions"), default=0)
-            correct = _safe_int(attempt.get("correct_count"), default=0)
-            ratio = _normalise_ratio(correct, total if total > 0 else 1)
-            ratios.append(ratio)
-        if not ratios:
-            return 0.0
-        avg_ratio = sum(ratios) / len(ratios)
-        return round(avg_ratio * 4.0, 2)
+    async def _compute_running_gpa(self, user_id: str, *, attempts: Optional[List[Dict[str, Any]]] = None) -> float:
+        if attempts is None:
+            attempts = await self.repo.list_submitted_attempts(user_id)
+        return AttemptAggregates.from_attempts(attempts).running_gpa
+
+    def _aggregates_enabled(self) -> bool:
+        return bool(getattr(get_settings(), "achievement_aggregates", True)) and self.repo.aggregates_available
+
+    async def _attempt_aggregates(self, ctx: "_EvaluationContext") -> AttemptAggregates:
+        """Stored totals with this attempt added in O(1); rebuilt from history when not stored yet."""
+        summary = await ctx.summary()
+        student_id = _student_number(ctx.user_id)
+        use_stored = student_id is not None and self._aggregates_enabled()
+        if use_stored:
+            if summary.status == "submitted":
+                ratio, tier, topic = AttemptAggregates.contribution(summary.attempt)
+                row = await self.repo.record_attempt_aggregate(
+                    student_id, summary.attempt_id, ratio=ratio, tier=tier, topic=topic
+                )
+            else:
+                row = await self.repo.get_attempt_aggregate(student_id)
+            if row:
+                return AttemptAggregates.from_row(row)
+        attempts = await ctx.submitted_attempts()
+        aggregates = AttemptAggregates.from_attempts(attempts)
+        if use_stored:
+            await self.repo.replace_attempt_aggregate(
+                student_id, aggregates.to_row(), [a.get("id") for a in attempts if a.get("id") is not None]
+            )
+        return aggregates
+
+    async def verify_attempt_aggregates(self, user_id: str, *, repair: bool = True) -> Dict[str, Any]:
+        """Rebuild a student's totals from history and compare them with the stored ones.
+
+        With ``repair`` the stored row is replaced when the two disagree (or is missing).
+        """
+        student_id = _student_number(user_id)
+        if student_id is None:
+            raise ValueError("student_number_required")
+        stored_row, attempts = await asyncio.gather(
+            self.repo.get_attempt_aggregate(student_id),
+            self.repo.list_submitted_attempts(str(student_id)),
+        )
+        rebuilt = AttemptAggregates.from_attempts(attempts)
+        stored = AttemptAggregates.from_row(stored_row) if stored_row else None
+        drift = stored is None or not stored.matches(rebuilt)
+        repaired = False
+        if drift and repair:
+            repaired = bool(
+                await self.repo.replace_attempt_aggregate(
+                    student_id, rebuilt.to_row(), [a.get("id") for a in attempts if a.get("id") is not None]
+                )
+            )
+        return {
+            "student_id": student_id,
+            "drift": drift,
+            "repaired": repaired,
+            "stored": stored.to_row() if stored else None,
+            "rebuilt": rebuilt.to_row(),
+        }
 
     async def _load_attempt_summary(self, submission_id: str, user_id: str) -> AttemptSummary:
         attempt = await self.repo.fetch_challenge_attempt(submission_id)
@@ -556,6 +793,7 @@ class AchievementsService:
             module_code=module_code,
             week_number=week_number,
             metadata=metadata,
+            attempt=attempt,
         )
 
     def _performance_score_from_summary(self, summary: AttemptSummary) -> tuple[float, List[str]]:
@@ -724,55 +962,18 @@ class AchievementsService:
             self.log.debug("failed to log elo event", exc_info=True)
 
 
-    async def _tier_completion_counts(self, user_id: str) -> Dict[str, int]:
-        attempts = await self.repo.list_submitted_attempts(user_id)
-        counts: Dict[str, int] = {}
-        for attempt in attempts:
-            tier = _normalise_slug(attempt.get("tier") or (attempt.get("challenge") or {}).get("tier"))
-            tier = normalise_challenge_tier(tier) or tier or BASE_TIER
-            total = _extract_snapshot_count(attempt.get("snapshot_questions"))
-            if total <= 0:
-                total = _safe_int(attempt.get("total_questions"), default=0)
-            tests_total = _safe_int(attempt.get("tests_total"), default=0)
-            if tests_total > 0:
-                total = tests_total
-            correct = _safe_int(attempt.get("correct_count"), default=0)
-            tests_passed = _safe_int(attempt.get("tests_passed"), default=0)
-            ratio = _normalise_ratio(correct, total if total > 0 else 1)
-            success = False
-            if total > 0 and correct >= total:
-                success = True
-            if tests_total > 0 and tests_passed >= tests_total:
-                success = True
-            if ratio >= 0.999:
-                success = True
-            if not success:
-                continue
-            counts[tier] = counts.get(tier, 0) + 1
-        return counts
-    async def _award_badges_for_tiers(
-        self,
-        user_id: str,
-        summary: AttemptSummary,
-        tiers: List[str],
-        badge_defs: List[Dict[str, Any]],
-        owned_ids: set,
-    ) -> List[BadgeResponse]:
+    async def _award_badges_for_tiers(self, ctx: _EvaluationContext, tiers: List[str]) -> List[BadgeResponse]:
         if not tiers:
             return []
-        counts = await self._tier_completion_counts(user_id)
-        slug_map: Dict[str, Dict[str, Any]] = {}
-        for definition in badge_defs:
-            slug = _normalise_slug(definition.get("slug") or definition.get("code") or definition.get("name"))
-            if slug and definition.get("id"):
-                slug_map[slug] = definition
+        counts = (await ctx.aggregates()).tier_successes
+        catalogue = await ctx.catalogue()
         awarded: List[BadgeResponse] = []
         for tier_value in tiers:
             slug = _normalise_slug(tier_value)
             if not slug:
                 continue
-            definition = slug_map.get(slug)
-            if not definition:
+            definition = catalogue.badge(slug)
+            if not definition or not definition.get("id"):
                 continue
             criteria = definition.get("criteria") or definition.get("metadata") or {}
             if isinstance(criteria, str):
@@ -783,43 +984,49 @@ class AchievementsService:
             threshold = criteria.get("required_passes") or _TIER_COMPLETION_THRESHOLDS.get(slug, 1)
             if counts.get(slug, 0) < threshold:
                 continue
-            badge = await self._award_single_badge(user_id, summary, definition, owned_ids)
+            badge = await self._award_single_badge(ctx, definition)
             if badge:
                 awarded.append(badge)
         return awarded
 
-    async def _award_topic_mastery_badge(
-        self,
-        user_id: str,
-        summary: AttemptSummary,
-        badge_defs: List[Dict[str, Any]],
-        owned_ids: set,
-    ) -> List[BadgeResponse]:
+    async def _award_topic_mastery_badge(self, ctx: _EvaluationContext) -> List[BadgeResponse]:
+        summary = await ctx.summary()
         topic_id = summary.metadata.get("topic_id") if isinstance(summary.metadata, dict) else None
         if not topic_id:
             performance = summary.metadata.get("performance") if isinstance(summary.metadata, dict) else None
             topic_id = (performance or {}).get("topic_id") if isinstance(performance, dict) else None
         if not topic_id:
             return []
-        success_count = await self._count_topic_successes(user_id, topic_id)
+        success_count = (await ctx.aggregates()).topic_successes.get(str(topic_id), 0)
         if success_count < 3:
             return []
-        definition = self._find_badge_definition(badge_defs, ["topic-mastery", "topic_mastery"])
+        definition = self._find_badge_definition(await ctx.catalogue(), ["topic-mastery", "topic_mastery"])
         if not definition:
             return []
-        badge = await self._award_single_badge(user_id, summary, definition, owned_ids)
+        badge = await self._award_single_badge(ctx, definition)
         return [badge] if badge else []
 
-    async def _award_speed_badge(
-        self,
-        user_id: str,
-        summary: AttemptSummary,
-        badge_defs: List[Dict[str, Any]],
-        owned_ids: set,
-    ) -> List[BadgeResponse]:
+    async def _award_speed_badge(self, ctx: _EvaluationContext) -> List[BadgeResponse]:
+        if not await ctx.speed_qualified():
+            return []
+        definition = self._find_badge_definition(await ctx.catalogue(), ["speed-demon", "speed_demon"])
+        if not definition:
+            return []
+        badge = await self._award_single_badge(ctx, definition)
+        return [badge] if badge else []
+
+    async def _speed_qualified(self, ctx: _EvaluationContext) -> bool:
+        summary = await ctx.summary()
         duration = summary.metadata.get("duration_seconds") if isinstance(summary.metadata, dict) else None
         if duration is None:
-            return []
+            return False
+        if getattr(get_settings(), "achievement_speed_sketch", True):
+            # Streaming sketch: O(1) per submission, threshold within the documented bucket bound
+            if summary.status == "submitted":
+                sketch = await self.duration_sketches.observe(summary.challenge_id, summary.attempt_id, duration)
+            else:
+                sketch = await self.duration_sketches.sketch(summary.challenge_id)
+            return sketch.within_quantile(_safe_int(duration), 0.1)
         attempts = await self.repo.list_attempts_for_challenge(summary.challenge_id)
         durations = [
             _safe_int(attempt.get("duration_seconds"), default=0)
@@ -827,30 +1034,19 @@ class AchievementsService:
             if _safe_int(attempt.get("duration_seconds"), default=0) > 0
         ]
         if not durations:
-            return []
+            return False
         durations.sort()
         threshold_index = max(0, int(math.ceil(len(durations) * 0.1)) - 1)
-        threshold_value = durations[threshold_index]
-        if duration > threshold_value:
-            return []
-        definition = self._find_badge_definition(badge_defs, ["speed-demon", "speed_demon"])
-        if not definition:
-            return []
-        badge = await self._award_single_badge(user_id, summary, definition, owned_ids)
-        return [badge] if badge else []
+        return duration <= durations[threshold_index]
 
-    async def _award_single_badge(
-        self,
-        user_id: str,
-        summary: AttemptSummary,
-        definition: Dict[str, Any],
-        owned_ids: set,
-    ) -> Optional[BadgeResponse]:
+    async def _award_single_badge(self, ctx: _EvaluationContext, definition: Dict[str, Any]) -> Optional[BadgeResponse]:
+        summary = await ctx.summary()
+        owned_ids = await ctx.owned_badge_ids()
         badge_id = definition.get("id")
         if badge_id is None or badge_id in owned_ids:
             return None
         row = await self.repo.add_badge_to_user(
-            user_id,
+            ctx.user_id,
             badge_id,
             challenge_id=summary.challenge_id,
             attempt_id=summary.attempt_id,
@@ -861,43 +1057,13 @@ class AchievementsService:
         owned_ids.add(badge_id)
         return self._serialise_badge_insert(row, definition)
 
-    def _find_badge_definition(self, definitions: List[Dict[str, Any]], slug_candidates: List[str]) -> Optional[Dict[str, Any]]:
-        normalised = [_normalise_slug(candidate) for candidate in slug_candidates]
-        for definition in definitions:
-            def_slug = _normalise_slug(definition.get("slug") or definition.get("code") or definition.get("name"))
-            if def_slug and def_slug in normalised:
-                return definition
-        return None
+    def _find_badge_definition(self, catalogue: CatalogueSnapshot, slug_candidates: List[str]) -> Optional[Dict[str, Any]]:
+        return catalogue.badge(*slug_candidates)
 
-    async def _count_topic_successes(self, user_id: str, topic_id: Any) -> int:
-        attempts = await self.repo.list_submitted_attempts(user_id)
-        count = 0
-        for attempt in attempts:
-            candidate_topic = attempt.get("topic_id")
-            if candidate_topic is None:
-                challenge_meta = attempt.get("challenge") or {}
-                candidate_topic = challenge_meta.get("topic_id")
-            if str(candidate_topic) != str(topic_id):
-                continue
-            total = _extract_snapshot_count(attempt.get("snapshot_questions"))
-            if total <= 0:
-                total = _safe_int(attempt.get("tests_total"), default=0)
-            if total <= 0:
-                total = _safe_int(attempt.get("total_questions"), default=0)
-            if total <= 0:
-                continue
-            tests_passed = _safe_int(attempt.get("tests_passed"), default=0)
-            correct = _safe_int(attempt.get("correct_count"), default=tests_passed)
-            ratio = _normalise_ratio(max(correct, tests_passed), total)
-            if ratio >= 0.85:
-                count += 1
-        return count
-
-    async def _evaluate_badges(self, user_id: str, submission_id: str) -> List[BadgeResponse]:
-        summary = await self._load_attempt_summary(submission_id, user_id)
-        badge_defs = await self.repo.list_badge_definitions()
-        owned_rows = await self.repo.get_badges_for_user(user_id)
-        owned_ids = {row.get("badge_id") or (row.get("badge") or {}).get("id") for row in owned_rows}
+    async def _evaluate_badges(self, ctx: _EvaluationContext) -> List[BadgeResponse]:
+        summary, catalogue, owned_ids = await asyncio.gather(ctx.summary(), ctx.catalogue(), ctx.owned_badge_ids())
+        badge_defs = catalogue.badges
+        user_id = ctx.user_id
         awarded: List[BadgeResponse] = []
         eligible = self._resolve_badges_to_award(summary, badge_defs)
         new_ids = [bd.get("id") for bd in eligible if bd.get("id") not in owned_ids]
@@ -927,6 +1093,7 @@ class AchievementsService:
         def_map = {bd.get("id"): bd for bd in badge_defs if bd.get("id")}
         for row in inserted_rows:
             badge_id = row.get("badge_id")
+            owned_ids.add(badge_id)
             definition = def_map.get(badge_id, {})
             awarded.append(self._serialise_badge_insert(row, definition))
         return awarded
@@ -987,11 +1154,9 @@ class AchievementsService:
         combined.update(row)
         return self._serialise_badge_row(combined)
 
-    def _default_title(self, titles: List[Dict[str, Any]]) -> Optional[TitleInfo]:
-        if not titles:
-            return None
-        sorted_titles = sorted(titles, key=lambda r: _safe_int(r.get("min_elo") or r.get("elo_threshold")))
-        return self._serialise_title(sorted_titles[0]) if sorted_titles else None
+    def _default_title(self, catalogue: CatalogueSnapshot) -> Optional[TitleInfo]:
+        row = catalogue.lowest_title()
+        return self._serialise_title(row) if row else None
 
     def _serialise_title(self, row: Dict[str, Any]) -> TitleInfo:
         title_id = row.get("id") or row.get("title_id")
@@ -1003,28 +1168,19 @@ class AchievementsService:
             icon_url=row.get("icon_url") or row.get("icon"),
         )
 
-    def _find_title_by_id(self, titles: List[Dict[str, Any]], title_id: Any) -> Optional[Dict[str, Any]]:
-        for row in titles:
-            rid = row.get("id") or row.get("title_id")
-            if str(rid) == str(title_id):
-                return row
-        return None
+    def _find_title_by_id(self, catalogue: CatalogueSnapshot, title_id: Any) -> Optional[Dict[str, Any]]:
+        return catalogue.title(title_id)
 
-    def _title_for_elo(self, titles: List[Dict[str, Any]], elo: int) -> Optional[TitleInfo]:
-        eligible = []
-        for row in titles:
-            threshold = _safe_int(row.get("min_elo") or row.get("elo_threshold"))
-            if elo >= threshold:
-                eligible.append((threshold, row))
-        if not eligible:
-            return self._default_title(titles)
-        _, best = max(eligible, key=lambda item: item[0])
-        return self._serialise_title(best)
+    def _title_for_elo(self, catalogue: CatalogueSnapshot, elo: int) -> Optional[TitleInfo]:
+        row = catalogue.title_for_elo(elo)
+        if row is None:
+            return self._default_title(catalogue)
+        return self._serialise_title(row)
 
 
 achievements_service = AchievementsService()
 
-__all__ = ["achievements_service", "AchievementsService", "BASE_ELO", "MAX_ELO"]
+__all__ = ["achievements_service", "AchievementsService", "AttemptAggregates", "BASE_ELO", "MAX_ELO"]
 
 
 
@@ -493,3 +493,18 @@ async def demo_clear_weeks(
         "weeks_offset": 0,
         "message": "Demo offset cleared successfully"
     }
+
+
+# Admin: reload the cached badge/title catalogue after editing the badges or titles tables
+@router.post(
+    "/achievements/catalogue/refresh",
+    summary="Refresh achievement catalogue cache (Admin)",
+    description="Drop the in-process badge/title catalogue and load it again. Other processes pick the change up within ACHIEVEMENT_CATALOGUE_TTL.",
+)
+async def refresh_achievement_catalogue(user: CurrentUser = Depends(require_admin())):
+    from app.features.achievements.catalogue import achievement_catalogue
+
+    achievement_catalogue.invalidate()
+    if not await achievement_catalogue.preload():
+        raise HTTPException(status_code=503, detail="Failed to reload achievement catalogue")
+    return achievement_catalogue.stats()
@@ -1183,6 +1183,11 @@ async def generate_and_save_tier(
             tests = question.get("tests") or []
             logger.info(f"  Question {idx}: Has {len(tests)} tests in generated data")
             stored.append(await _insert_question(client, challenge_id=challenge.get("id"), question=question, order_index=idx))
+        # Regenerated questions and tests replace whatever the submissions side has cached
+        # (imported lazily: the submissions package imports the challenges repository)
+        from app.features.submissions.bundle_cache import question_bundle_cache
+
+        question_bundle_cache.invalidate_challenge(str(challenge.get("id")))
     topics_joined = context.joined_topics()
     topics_count = len([item for item in topics_joined.split(",") if item.strip()])
     return {
@@ -1057,6 +1057,8 @@ class ChallengeRepository:
         if not targets and rows:
             targets = [str(r.get("id")) for r in rows if r.get("id")]
 
+        previous_status = {str(r.get("id")): r.get("status") for r in rows}
+        activated: List[str] = []
         for cid in targets:
             payload = {
                 "status": "active",
@@ -1069,10 +1071,30 @@ class ChallengeRepository:
                 update_resp = await client.table("challenges").update(payload).eq("id", cid).execute()
                 if update_resp.data:
                     updated += 1
+                    if previous_status.get(cid) != "active":
+                        activated.append(cid)
             except Exception:
                 # ignore and continue
                 continue
-        return {"updated": updated}
+        return {"updated": updated, "prewarmed": await self._prewarm_question_bundles(activated)}
+
+    @staticmethod
+    async def _prewarm_question_bundles(challenge_ids: List[str]) -> int:
+        """Load the question bundles of newly activated challenges ahead of the first submissions.
+
+        Only challenges that were not already active are warmed; the publisher loop calls
+        ``publish_for_week`` every minute and the bundles of running challenges are cached on use.
+        """
+        if not challenge_ids:
+            return 0
+        # Imported lazily: the submissions service depends on this module
+        from app.features.submissions.service import submissions_service
+
+        try:
+            return await submissions_service.prewarm_question_bundles(challenge_ids)
+        except Exception:
+            logger.warning("Question bundle prewarm failed for challenges %s", challenge_ids, exc_info=True)
+            return 0
 
     async def enforce_active_limit(self, *, module_code: Optional[str] = None, semester_id: Optional[str] = None, keep_count: int = 2) -> Dict[str, int]:
         """Ensure no more than `keep_count` active challenges exist per module+semester scope.
@@ -0,0 +1,275 @@
+"""Admission control and per-student fair queuing in front of Judge0.
+
+When a week's challenge opens every student submits at once, and each question fans out
+one Judge0 execution per test. Grading paths acquire execution units from the process-wide
+:data:`judge0_admission` before calling ``Judge0Service``:
+
+* a global budget caps the number of executions in flight;
+* waiters are queued per student and served round-robin, so one student's burst of
+  resubmits cannot starve everyone else;
+* the expected wait is estimated from recent service times, and a request that would not
+  be admitted before its deadline is rejected immediately with :class:`AdmissionRejected`
+  (the API maps it to ``429`` with ``Retry-After``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Hashable, List, Optional
+
+from app.Core.config import get_settings
+
+
+class AdmissionRejected(Exception):
+    """The Judge0 queue is too deep to start this request before its deadline."""
+
+    def __init__(self, retry_after: float, *, estimated_wait: float, reason: str = "judge0_busy") -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(0.0, float(retry_after))
+        self.estimated_wait = max(0.0, float(estimated_wait))
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, int(math.ceil(self.retry_after))))
+
+
+class _Waiter:
+    __slots__ = ("key", "cost", "future", "enqueued_at")
+
+    def __init__(self, key: Hashable, cost: int, future: asyncio.Future) -> None:
+        self.key = key
+        self.cost = cost
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    """Execution budget with round-robin queues keyed by student.
+
+    Costs are measured in Judge0 executions (one per test case). The wait estimate assumes
+    the budget drains at ``max_in_flight / unit_seconds`` executions per second, where
+    ``unit_seconds`` is an EWMA of how long an admitted request holds its units.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_in_flight: int = 32,
+        max_queue: int = 500,
+        default_deadline: float = 20.0,
+        initial_unit_seconds: float = 1.0,
+        ewma_alpha: float = 0.2,
+        enabled: bool = True,
+        sample_size: int = 1000,
+    ) -> None:
+        self.enabled = enabled
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_queue = max(0, int(max_queue))
+        self.default_deadline = max(0.0, float(default_deadline))
+        self.unit_seconds = max(0.001, float(initial_unit_seconds))
+        self.ewma_alpha = min(1.0, max(0.01, float(ewma_alpha)))
+        self.in_flight = 0
+        self._queues: "OrderedDict[Hashable, Deque[_Waiter]]" = OrderedDict()
+        self._queued_units = 0
+        self._queued_requests = 0
+        self.admitted = 0
+        self.admitted_immediately = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self._queue_samples: Deque[float] = deque(maxlen=max(1, int(sample_size)))
+
+    # ------------------------------------------------------------------ estimates
+    def estimate_wait(self, cost: int = 1) -> float:
+        """Seconds until ``cost`` more units would fit, given everything already queued."""
+        backlog = self.in_flight + self._queued_units + self._clamp(cost) - self.max_in_flight
+        if backlog <= 0:
+            return 0.0
+        return backlog * self.unit_seconds / self.max_in_flight
+
+    def _clamp(self, cost: int) -> int:
+        # A request larger than the whole budget would never fit; it runs alone instead.
+        return min(self.max_in_flight, max(1, int(cost)))
+
+    def _reject_if_late(self, units: int, deadline: float) -> None:
+        estimate = self.estimate_wait(units)
+        if self._queued_requests >= self.max_queue or estimate > deadline:
+            self.rejected += 1
+            raise AdmissionRejected(max(estimate - deadline, 1.0), estimated_wait=estimate)
+
+    def check(self, cost: int = 1, *, deadline: Optional[float] = None) -> None:
+        """Raise :class:`AdmissionRejected` if ``cost`` units would not start before the deadline.
+
+        Reserves nothing. Work admitted in several steps calls this first, so a busy Judge0
+        turns it away before any step has run, then admits each step with ``reject=False``.
+        """
+        if not self.enabled:
+            return
+        units = self._clamp(cost)
+        if not self._queued_requests and self.in_flight + units <= self.max_in_flight:
+            return
+        self._reject_if_late(units, self.default_deadline if deadline is None else deadline)
+
+    # ------------------------------------------------------------------ acquire / release
+    @asynccontextmanager
+    async def admit(
+        self,
+        key: Hashable,
+        cost: int = 1,
+        *,
+        deadline: Optional[float] = None,
+        reject: bool = True,
+    ) -> AsyncIterator[float]:
+        """Hold ``cost`` execution units for the duration of the block; yields the queue wait.
+
+        With ``reject=False`` the request waits its turn however deep the queue is, for work
+        that already passed :meth:`check`.
+        """
+        if not self.enabled:
+            yield 0.0
+            return
+        units = self._clamp(cost)
+        deadline = self.default_deadline if deadline is None else deadline
+        waited = await self._acquire(key, units, deadline if reject else None)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self._release(units, time.monotonic() - started)
+
+    async def _acquire(self, key: Hashable, units: int, deadline: Optional[float]) -> float:
+        """``deadline=None`` queues without rejecting or timing out."""
+        if not self._queued_requests and self.in_flight + units <= self.max_in_flight:
+            self.in_flight += units
+            self.admitted += 1
+            self.admitted_immediately += 1
+            self._record_queue_time(0.0)
+            return 0.0
+        if deadline is not None:
+            self._reject_if_late(units, deadline)
+
+        waiter = _Waiter(key, units, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(key, deque()).append(waiter)
+        self._queued_units += units
+        self._queued_requests += 1
+        try:
+            timeout = deadline if deadline is not None and deadline > 0 else None
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=timeout)
+        except asyncio.TimeoutError:
+            if self._abandon(waiter):
+                self.timed_out += 1
+                self.rejected += 1
+                estimate = self.estimate_wait(units)
+                raise AdmissionRejected(max(estimate, 1.0), estimated_wait=estimate, reason="judge0_queue_timeout")
+            # Granted just as the deadline expired: take the slot.
+        except BaseException:
+            if not self._abandon(waiter):
+                self._release(units, None)
+            raise
+        waited = time.monotonic() - waiter.enqueued_at
+        self._record_queue_time(waited)
+        return waited
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Remove a waiter that gave up; returns False if it had already been granted."""
+        if waiter.future.done():
+            return False
+        waiter.future.cancel()
+        queue = self._queues.get(waiter.key)
+        if queue is not None:
+            try:
+                queue.remove(waiter)
+            except ValueError:
+                pass
+            if not queue:
+                self._queues.pop(waiter.key, None)
+        self._queued_units -= waiter.cost
+        self._queued_requests -= 1
+        self._dispatch()
+        return True
+
+    def _release(self, units: int, held_for: Optional[float]) -> None:
+        self.in_flight = max(0, self.in_flight - units)
+        if held_for is not None:
+            # Each unit of the budget was occupied for ``held_for`` seconds.
+            self.unit_seconds += self.ewma_alpha * (max(0.001, held_for) - self.unit_seconds)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        # Round-robin over students: grant the head of the next student's queue if it fits,
+        # otherwise stop so a large request is not starved by a stream of small ones.
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if waiter.future.done():
+                queue.popleft()
+            else:
+                if self.in_flight + waiter.cost > self.max_in_flight:
+                    return
+                queue.popleft()
+                self.in_flight += waiter.cost
+                self.admitted += 1
+                self._queued_units -= waiter.cost
+                self._queued_requests -= 1
+                waiter.future.set_result(None)
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                self._queues.pop(key, None)
+
+    # ------------------------------------------------------------------ metrics
+    def _record_queue_time(self, waited: float) -> None:
+        self.queue_time_total += waited
+        if waited > self.queue_time_max:
+            self.queue_time_max = waited
+        self._queue_samples.append(waited)
+
+    @staticmethod
+    def _percentile(samples: List[float], pct: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        idx = min(len(ordered) - 1, max(0, int(math.ceil(pct * len(ordered))) - 1))
+        return ordered[idx]
+
+    def stats(self) -> Dict[str, Any]:
+        samples = list(self._queue_samples)
+        return {
+            "enabled": self.enabled,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queued_requests": self._queued_requests,
+            "queued_units": self._queued_units,
+            "queued_students": len(self._queues),
+            "admitted": self.admitted,
+            "admitted_immediately": self.admitted_immediately,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "estimated_wait_s": round(self.estimate_wait(1), 3),
+            "unit_seconds": round(self.unit_seconds, 4),
+            "queue_ms_avg": round((self.queue_time_total / self.admitted) * 1000.0, 3) if self.admitted else 0.0,
+            "queue_ms_p50": round(self._percentile(samples, 0.50) * 1000.0, 3),
+            "queue_ms_p95": round(self._percentile(samples, 0.95) * 1000.0, 3),
+            "queue_ms_max": round(self.queue_time_max * 1000.0, 3),
+        }
+
+
+def _build_admission_controller() -> AdmissionController:
+    settings = get_settings()
+    return AdmissionController(
+        max_in_flight=getattr(settings, "judge0_max_in_flight", 32),
+        max_queue=getattr(settings, "judge0_admission_max_queue", 500),
+        default_deadline=getattr(settings, "judge0_admission_deadline_s", 20.0),
+        enabled=bool(getattr(settings, "judge0_admission_enabled", True)),
+    )
+
+
+judge0_admission = _build_admission_controller()
+
+__all__ = ["AdmissionController", "AdmissionRejected", "judge0_admission"]
@@ -0,0 +1,207 @@
+"""Routing across several Judge0 instances.
+
+``Judge0Service`` used to talk to exactly one ``JUDGE0_URL``. With ``JUDGE0_URLS`` it now
+holds a :class:`Judge0BackendPool`: new submissions go to the healthy backend with the
+fewest outstanding requests, while reads for an existing token stay pinned to the backend
+that issued it (tokens are only known to the Judge0 instance that created them). Each
+backend has a circuit breaker fed by request outcomes and by periodic ``/about`` checks.
+"""
+
+from __future__ import annotations
+
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class Judge0BackendUnavailable(Exception):
+    """Raised when a backend (or every backend) is circuit-broken or failing health checks."""
+
+
+def normalize_base_url(raw: str) -> str:
+    """Add a scheme and the default Judge0 CE port (2358) when they are missing."""
+    base = (raw or "").strip()
+    if base and not base.startswith("http://") and not base.startswith("https://"):
+        base = "http://" + base
+    if base:
+        from urllib.parse import urlparse, urlunparse
+        parsed = urlparse(base)
+        if ':' not in parsed.netloc:
+            base = urlunparse(parsed._replace(netloc=f"{parsed.netloc}:2358"))
+    return base.rstrip("/")
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures; half-open after ``reset_timeout``."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, *, failure_threshold: int = 5, reset_timeout: float = 15.0) -> None:
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = max(0.0, float(reset_timeout))
+        self._state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        return self.state != self.OPEN
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.times_opened += 1
+            self._state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class Judge0Backend:
+    def __init__(self, url: str, breaker: CircuitBreaker) -> None:
+        self.url = url
+        self.breaker = breaker
+        self.healthy = True
+        self.outstanding = 0
+        self.requests_total = 0
+        self.failures_total = 0
+        self.last_picked = 0
+        self.last_health_check: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def available(self) -> bool:
+        return self.healthy and self.breaker.allow()
+
+    def record_success(self) -> None:
+        self.breaker.record_success()
+
+    def record_failure(self, error: Optional[str] = None) -> None:
+        self.failures_total += 1
+        self.last_error = error
+        self.breaker.record_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "circuit": self.breaker.state,
+            "outstanding": self.outstanding,
+            "requests_total": self.requests_total,
+            "failures_total": self.failures_total,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "times_opened": self.breaker.times_opened,
+            "last_error": self.last_error,
+        }
+
+
+class Judge0BackendPool:
+    """Least-outstanding-requests routing with sticky token -> backend affinity."""
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 15.0,
+        max_tracked_tokens: int = 50000,
+    ) -> None:
+        self.backends: List[Judge0Backend] = []
+        seen = set()
+        for raw in urls:
+            url = normalize_base_url(raw)
+            if url and url not in seen:
+                seen.add(url)
+                self.backends.append(
+                    Judge0Backend(url, CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout))
+                )
+        self._by_url: Dict[str, Judge0Backend] = {b.url: b for b in self.backends}
+        self._tokens: "OrderedDict[str, Judge0Backend]" = OrderedDict()
+        self.max_tracked_tokens = max(1, int(max_tracked_tokens))
+        self._picks = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self.backends)
+
+    @property
+    def primary(self) -> Optional[Judge0Backend]:
+        return self.backends[0] if self.backends else None
+
+    def get(self, url: Optional[str]) -> Optional[Judge0Backend]:
+        return self._by_url.get(url) if url else None
+
+    # ------------------------------------------------------------------ routing
+    def pick(self, exclude: Iterable[str] = ()) -> Judge0Backend:
+        """Choose a backend for a new submission, skipping ``exclude`` when any alternative exists."""
+        excluded = set(exclude)
+        candidates = [b for b in self.backends if b.url not in excluded and b.available()]
+        if not candidates:
+            # Health checks can lag behind recovery; fall back to anything whose breaker allows traffic.
+            candidates = [b for b in self.backends if b.url not in excluded and b.breaker.allow()]
+        if not candidates and excluded:
+            candidates = [b for b in self.backends if b.breaker.allow()]
+        if not candidates:
+            raise Judge0BackendUnavailable("Failed to connect to Judge0: all backends are unavailable")
+        backend = min(candidates, key=lambda b: (b.outstanding, b.last_picked))
+        backend.last_picked = next(self._picks)
+        return backend
+
+    def for_token(self, token: Optional[str]) -> Optional[Judge0Backend]:
+        """Backend that issued ``token``; unknown tokens (e.g. from before a restart) go to the primary."""
+        if token:
+            backend = self._tokens.get(token)
+            if backend is not None:
+                return backend
+        return self.primary
+
+    def remember(self, token: Optional[str], url: Optional[str]) -> None:
+        backend = self.get(url)
+        if not token or backend is None or len(self.backends) < 2:
+            return
+        self._tokens[token] = backend
+        self._tokens.move_to_end(token)
+        while len(self._tokens) > self.max_tracked_tokens:
+            self._tokens.popitem(last=False)
+
+    def group_tokens(self, tokens: Iterable[str]) -> Dict[str, List[str]]:
+        groups: Dict[str, List[str]] = {}
+        for tok in tokens:
+            backend = self.for_token(tok)
+            if backend is not None:
+                groups.setdefault(backend.url, []).append(tok)
+        return groups
+
+    def stranded(self, tokens: Iterable[str]) -> List[str]:
+        """Tokens whose issuing backend is down while another backend could take a resubmission."""
+        if len(self.backends) < 2 or not self.any_available():
+            return []
+        return [tok for tok in tokens if not self.for_token(tok).available()]
+
+    def any_available(self) -> bool:
+        return any(b.available() for b in self.backends)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backends": [b.stats() for b in self.backends],
+            "tracked_tokens": len(self._tokens),
+        }
+
+
+__all__ = [
+    "CircuitBreaker",
+    "Judge0Backend",
+    "Judge0BackendPool",
+    "Judge0BackendUnavailable",
+    "normalize_base_url",
+]
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 import asyncio
+import hmac
 import logging
 import ssl
 import time
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 
 from app.Core.config import get_settings
 from app.adapters.judge0_client import run_many
@@ -25,6 +26,7 @@ from app.features.judge0.schemas import (
     QuickCodeSubmission,
 )
 from app.features.judge0.service import judge0_service
+from app.features.judge0.admission import judge0_admission
 from app.features.submissions.code_results_repository import code_results_repository
 
 # ---------------------------------------------------------------------------
@@ -153,6 +155,21 @@ async def submit_code_wait(submission: CodeSubmissionCreate):
         raise HTTPException(status_code=500, detail="Failed waited submit") from exc
 
 
+@public_router.put("/callback", include_in_schema=False)
+async def judge0_completion_callback(
+    payload: Dict[str, Any] = Body(...),
+    secret: Optional[str] = Query(default=None),
+):
+    """Receive Judge0's completion PUT (callback mode) and wake the waiting grader."""
+    if not judge0_service._callback_url:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = get_settings().judge0_callback_secret or ""
+    if not expected or not hmac.compare_digest(secret or "", expected):
+        raise HTTPException(status_code=403, detail="Invalid callback secret")
+    resolved = judge0_service.handle_callback(payload)
+    return {"accepted": True, "resolved": resolved}
+
+
 @public_router.post("/submit/poll", summary="Submit to Judge0 then poll Supabase for result")
 async def submit_then_poll(submission: CodeSubmissionCreate):
     try:
@@ -306,6 +323,13 @@ async def submit_code_full(submission: CodeSubmissionCreate, current_user: Curre
         raise HTTPException(status_code=500, detail="Failed to submit code (full)") from exc
 
 
+@protected_router.get("/stats", summary="(Auth) Judge0 client pool statistics")
+async def get_judge0_stats(current_user: CurrentUser = Depends(get_current_user)):
+    stats = judge0_service.stats()
+    stats["admission"] = judge0_admission.stats()
+    return stats
+
+
 @protected_router.get("/result/{token}", response_model=CodeExecutionResult)
 async def get_execution_result(token: str, current_user: CurrentUser = Depends(get_current_user)):
     try:
@@ -0,0 +1,291 @@
+"""Local subprocess sandbox that stands in for Judge0.
+
+Selected with ``CODE_EXECUTOR=local`` for development, CI, quick tests and load tests of
+the grading path. ``LocalSandboxExecutor`` subclasses :class:`Judge0Service`, so the result
+cache, ``execute_batch``/``execute_code_sync``/``execute_quick_code`` and
+``_to_code_execution_result`` are shared; only the transport is replaced. Python programs
+run in a fresh interpreter per submission with rlimits mirroring Judge0's defaults (CPU
+time, address space, file size, process count) plus a wall-clock kill. Each child is
+reaped with ``os.wait4`` so ``time`` and ``memory`` are that run's CPU seconds and peak RSS.
+
+This is resource limiting, not isolation: there is no filesystem or network sandbox, so
+never point it at untrusted code in production.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from .schemas import (
+    CodeExecutionResult,
+    CodeSubmissionCreate,
+    Judge0ExecutionResult,
+    Judge0Status,
+    Judge0SubmissionResponse,
+    LanguageInfo,
+)
+from .service import Judge0Service
+from .statuses import STATUS_DESCRIPTIONS, status_for_process
+
+# Judge0 CE language ids that map onto the local Python 3 interpreter.
+PYTHON_LANGUAGE_IDS = frozenset({71, 92, 100})
+
+_MAX_STORED_RESULTS = 2000
+
+
+# Applies the rlimits and then execs the submission's interpreter. Limits are set in this
+# launcher rather than a Popen ``preexec_fn``, which is unsafe when Popen runs on worker
+# threads (the forked child can deadlock on a lock another thread held at fork time).
+_LIMITS_LAUNCHER = """\
+import os, resource, sys
+cpu, memory, file_size, processes = (int(value) for value in sys.argv[1:5])
+resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+resource.setrlimit(resource.RLIMIT_FSIZE, (file_size, file_size))
+resource.setrlimit(resource.RLIMIT_NPROC, (processes, processes))
+resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+os.execv(sys.argv[5], sys.argv[5:])
+"""
+
+
+def _limited_command(command: List[str], cpu_seconds: int, memory_bytes: int, file_bytes: int, max_processes: int) -> List[str]:
+    limits = [str(cpu_seconds), str(memory_bytes), str(file_bytes), str(max_processes)]
+    return [sys.executable, "-I", "-c", _LIMITS_LAUNCHER, *limits, *command]
+
+
+class LocalSandboxExecutor(Judge0Service):
+    def __init__(self) -> None:
+        super().__init__()
+        # Runs finish synchronously from the caller's point of view; nothing to poll.
+        self._poll_coordinator = None
+        settings = self.settings
+        try:
+            workers = int(getattr(settings, "local_executor_workers", 0) or 0)
+        except Exception:
+            workers = 0
+        self._workers = max(1, workers or (os.cpu_count() or 1))
+        self._default_cpu_limit = float(getattr(settings, "local_executor_cpu_time_limit_s", 5.0))
+        self._default_wall_limit = float(getattr(settings, "local_executor_wall_time_limit_s", 10.0))
+        self._default_memory_kb = int(getattr(settings, "local_executor_memory_limit_kb", 128000))
+        self._max_file_kb = int(getattr(settings, "local_executor_max_file_size_kb", 1024))
+        self._max_processes = int(getattr(settings, "local_executor_max_processes", 60))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._results: "OrderedDict[str, Judge0ExecutionResult]" = OrderedDict()
+        self._background: set = set()
+        self.runs_total = 0
+        self.runs_timed_out = 0
+        self.run_wall_s_total = 0.0
+
+    # ------------------------------------------------------------------ process runner
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="local-sandbox")
+        return self._executor
+
+    def _run_blocking(self, submission: CodeSubmissionCreate, language_id: int, token: str) -> Judge0ExecutionResult:
+        language = {"id": language_id, "name": "Python (local)"}
+        if language_id not in PYTHON_LANGUAGE_IDS:
+            return Judge0ExecutionResult(
+                token=token,
+                message=f"language {language_id} is not supported by the local executor",
+                status={"id": 13, "description": STATUS_DESCRIPTIONS[13]},
+                language=language,
+            )
+        cpu_limit = float(submission.cpu_time_limit or self._default_cpu_limit)
+        wall_limit = float(submission.wall_time_limit or self._default_wall_limit)
+        memory_kb = int(submission.memory_limit or self._default_memory_kb)
+        file_bytes = self._max_file_kb * 1024
+        env = {
+            "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+            "LANG": "C.UTF-8",
+        }
+        with tempfile.TemporaryDirectory(prefix="recode-sandbox-") as workdir:
+            script = os.path.join(workdir, "script.py")
+            with open(script, "w", encoding="utf-8") as fh:
+                fh.write(submission.source_code)
+            env["HOME"] = workdir
+            stdin_path = os.path.join(workdir, ".stdin")
+            with open(stdin_path, "wb") as fh:
+                fh.write((submission.stdin or "").encode("utf-8"))
+            out_path = os.path.join(workdir, ".stdout")
+            err_path = os.path.join(workdir, ".stderr")
+            killed = threading.Event()
+            with open(stdin_path, "rb") as fin, open(out_path, "wb") as fout, open(err_path, "wb") as ferr:
+                started = time.monotonic()
+                command = _limited_command(
+                    [sys.executable, "-I", "-X", "utf8", script],
+                    max(1, math.ceil(cpu_limit)),
+                    memory_kb * 1024,
+                    file_bytes,
+                    self._max_processes,
+                )
+                proc = subprocess.Popen(
+                    command,
+                    stdin=fin,
+                    stdout=fout,
+                    stderr=ferr,
+                    cwd=workdir,
+                    env=env,
+                    start_new_session=True,
+                )
+
+                def _kill() -> None:
+                    killed.set()
+                    try:
+                        os.killpg(proc.pid, signal.SIGKILL)
+                    except OSError:
+                        pass
+
+                timer = threading.Timer(wall_limit, _kill)
+                timer.start()
+                try:
+                    _, wait_status, usage = os.wait4(proc.pid, 0)
+                finally:
+                    timer.cancel()
+                proc.returncode = os.waitstatus_to_exitcode(wait_status)
+                wall = time.monotonic() - started
+            stdout = self._read_output(out_path, file_bytes)
+            stderr = self._read_output(err_path, file_bytes)
+
+        cpu = usage.ru_utime + usage.ru_stime
+        timed_out = killed.is_set() or cpu > cpu_limit
+        status_id, description = status_for_process(
+            proc.returncode,
+            timed_out=timed_out,
+            stdout=stdout,
+            expected_output=submission.expected_output or None,
+        )
+        self.runs_total += 1
+        self.run_wall_s_total += wall
+        if status_id == 5:
+            self.runs_timed_out += 1
+        return Judge0ExecutionResult(
+            token=token,
+            stdout=stdout,
+            stderr=stderr or None,
+            compile_output=None,
+            message=None,
+            time=f"{cpu:.3f}",
+            memory=int(usage.ru_maxrss),
+            status={"id": status_id, "description": description},
+            language=language,
+        )
+
+    @staticmethod
+    def _read_output(path: str, limit: int) -> str:
+        with open(path, "rb") as fh:
+            return fh.read(limit).decode("utf-8", errors="replace")
+
+    async def _run(self, submission: CodeSubmissionCreate, token: Optional[str] = None) -> Judge0ExecutionResult:
+        token = token or str(uuid4())
+        language_id = await self._normalize_language_id(submission.language_id)
+        loop = asyncio.get_running_loop()
+        raw = await loop.run_in_executor(self._get_executor(), self._run_blocking, submission, language_id, token)
+        self._store(token, raw)
+        return raw
+
+    def _store(self, token: str, raw: Judge0ExecutionResult) -> None:
+        self._results[token] = raw
+        self._results.move_to_end(token)
+        while len(self._results) > _MAX_STORED_RESULTS:
+            self._results.popitem(last=False)
+
+    # ------------------------------------------------------------------ Judge0Service overrides
+    async def startup(self) -> None:
+        self._get_executor()
+
+    async def aclose(self) -> None:
+        for task in list(self._background):
+            task.cancel()
+        executor = self._executor
+        self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executor": "local",
+            "workers": self._workers,
+            "runs_total": self.runs_total,
+            "runs_timed_out": self.runs_timed_out,
+            "run_ms_avg": round(self.run_wall_s_total / self.runs_total * 1000.0, 3) if self.runs_total else 0.0,
+            "result_cache": self._result_cache.stats(),
+            "singleflight": self._singleflight.stats(),
+        }
+
+    async def check_health(self) -> Dict[str, bool]:
+        return {"local": True}
+
+    async def get_languages(self) -> List[LanguageInfo]:
+        version = "%d.%d.%d" % sys.version_info[:3]
+        return [LanguageInfo(id=71, name=f"Python ({version})")]
+
+    async def get_statuses(self) -> List[Judge0Status]:
+        return [Judge0Status(id=sid, description=desc) for sid, desc in STATUS_DESCRIPTIONS.items()]
+
+    async def submit_code(self, submission: CodeSubmissionCreate) -> Judge0SubmissionResponse:
+        token = str(uuid4())
+        self._store(token, Judge0ExecutionResult(token=token, status={"id": 1, "description": STATUS_DESCRIPTIONS[1]}))
+        task = asyncio.get_running_loop().create_task(self._run(submission, token))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return Judge0SubmissionResponse(token=token)
+
+    async def submit_code_wait(self, submission: CodeSubmissionCreate, fields: str = "*") -> Judge0ExecutionResult:
+        return await self._run(submission)
+
+    async def submit_batch(self, submissions: List[CodeSubmissionCreate]) -> List[str]:
+        return [(await self.submit_code(sub)).token for sub in submissions]
+
+    async def get_submission_result(self, token: str) -> Judge0ExecutionResult:
+        raw = self._results.get(token)
+        if raw is None:
+            raise Exception(f"Failed to get result: 404 body=unknown local token {token}")
+        return raw
+
+    async def get_batch_results(self, tokens: List[str], *, fields: Optional[str] = "*") -> Dict[str, Judge0ExecutionResult]:
+        return {tok: self._results[tok] for tok in tokens if tok in self._results}
+
+    async def _execute_via_polling(
+        self,
+        submission: CodeSubmissionCreate,
+        *,
+        timeout_seconds: float | None = 25.0,
+        poll_interval: float = 0.35,
+        fields: Optional[str] = "*",
+    ) -> Tuple[str, Judge0ExecutionResult]:
+        raw = await self._run(submission)
+        return raw.token or "", raw
+
+    async def _execute_batch_uncached(
+        self,
+        submissions: List[CodeSubmissionCreate],
+        *,
+        timeout_seconds: Optional[float] = 60,
+        poll_interval: float = 1.0,
+    ) -> List[Tuple[str, CodeExecutionResult]]:
+        # The thread pool bounds concurrency to the worker count.
+        raws = await asyncio.gather(*(self._run(sub) for sub in submissions))
+        return [
+            (raw.token or "", self._to_code_execution_result(raw, sub.expected_output, sub.language_id))
+            for raw, sub in zip(raws, submissions)
+        ]
+
+    async def execute_code(self, submission: CodeSubmissionCreate, timeout_seconds: int = 45, poll_interval: float = 1.0) -> str:
+        raw = await self._run(submission)
+        return raw.stdout
+
+
+__all__ = ["LocalSandboxExecutor", "PYTHON_LANGUAGE_IDS"]
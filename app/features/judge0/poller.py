@@ -0,0 +1,301 @@
+"""Process-wide coordinator that coalesces Judge0 result polling.
+
+Every grading request used to poll its own tokens (one GET per token per tick, plus a
+per-token fallback fan-out in ``execute_batch``). Callers now register tokens here and
+await a future; a single background task issues one ``GET /submissions/batch`` per chunk
+of pending tokens per tick and resolves whichever submissions have finished.
+
+In callback mode Judge0 PUTs each finished submission to our callback endpoint, which
+hands it to :meth:`Judge0PollCoordinator.deliver`. Polling then only runs as a slow
+safety net for tokens whose callback never arrived.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from .backends import Judge0BackendUnavailable
+from .schemas import Judge0ExecutionResult
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle guard
+    from .service import Judge0Service
+
+# Judge0 CE rejects batch requests above MAX_SUBMISSION_BATCH_SIZE (20 by default).
+DEFAULT_BATCH_SIZE = 20
+POLL_FIELDS = "token,stdout,stderr,compile_output,message,status,time,memory,language"
+
+_PENDING_STATUS_IDS = (1, 2)
+
+
+def _status_id(raw: Judge0ExecutionResult) -> Optional[int]:
+    status = raw.status or {}
+    return status.get("id") if isinstance(status, dict) else None
+
+
+def is_finished(raw: Judge0ExecutionResult) -> bool:
+    status_id = _status_id(raw)
+    if status_id is None:
+        return raw.stdout not in (None, "")
+    return status_id not in _PENDING_STATUS_IDS
+
+
+class Judge0PollCoordinator:
+    """Owns the set of in-flight tokens and polls them in batches on an adaptive tick.
+
+    The tick interval grows with queue depth: when many tokens are pending the Judge0
+    workers are saturated, so polling faster only adds load without finishing anything
+    sooner. With a shallow queue we poll at ``min_interval`` to keep latency low.
+
+    With ``callback_mode`` enabled the tick is fixed at ``safety_interval`` and only
+    tokens that have been waiting at least that long are polled.
+    """
+
+    def __init__(
+        self,
+        service: "Judge0Service",
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        min_interval: float = 0.25,
+        max_interval: float = 1.5,
+        interval_per_token: float = 0.01,
+        fields: str = POLL_FIELDS,
+        callback_mode: bool = False,
+        safety_interval: float = 5.0,
+        early_ttl: float = 60.0,
+        max_early: int = 10000,
+    ) -> None:
+        self._service = service
+        self.batch_size = max(1, int(batch_size))
+        self.min_interval = max(0.01, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.interval_per_token = max(0.0, float(interval_per_token))
+        self.fields = fields
+        self.callback_mode = bool(callback_mode)
+        self.safety_interval = max(0.01, float(safety_interval))
+        self.early_ttl = max(0.0, float(early_ttl))
+        self.max_early = max(0, int(max_early))
+        self._logger = logging.getLogger(__name__)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._registered_at: Dict[str, float] = {}
+        # Callbacks that arrived before their token was registered (token -> (result, received_at))
+        self._early: Dict[str, Tuple[Judge0ExecutionResult, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.ticks = 0
+        self.batch_requests = 0
+        self.tokens_resolved = 0
+        self.poll_errors = 0
+        self.callbacks_received = 0
+        self.callbacks_early = 0
+        self.callbacks_unmatched = 0
+        self.safety_net_resolved = 0
+        self.last_interval = self.min_interval
+
+    # ------------------------------------------------------------------ registration
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A previous event loop (e.g. a finished asyncio.run) owned the old futures/task.
+            self._pending = {}
+            self._registered_at = {}
+            self._task = None
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+        return loop
+
+    def register(self, token: str) -> asyncio.Future:
+        loop = self._bind_loop()
+        fut = self._pending.get(token)
+        if fut is None or fut.done():
+            fut = loop.create_future()
+            early = self._take_early(token)
+            if early is not None:
+                fut.set_result(early)
+                self.tokens_resolved += 1
+                return fut
+            self._pending[token] = fut
+            self._registered_at[token] = time.monotonic()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run(), name="judge0-poll-coordinator")
+        assert self._wakeup is not None
+        self._wakeup.set()  # only consulted while the loop is idle
+        return fut
+
+    def resolve(self, token: str, raw: Judge0ExecutionResult) -> bool:
+        """Complete a waiting token (used by the poll loop and by completion callbacks)."""
+        fut = self._pending.pop(token, None)
+        self._registered_at.pop(token, None)
+        if fut is None or fut.done():
+            return False
+        if not raw.token:
+            raw = raw.model_copy(update={"token": token})
+        fut.set_result(raw)
+        self.tokens_resolved += 1
+        return True
+
+    def deliver(self, token: str, raw: Judge0ExecutionResult) -> bool:
+        """Accept a completion callback; buffers it briefly if nobody is waiting on the token yet."""
+        self.callbacks_received += 1
+        if not is_finished(raw):
+            return False
+        if self.resolve(token, raw):
+            return True
+        # Judge0 can finish before submit_code returns the token to the waiter.
+        self._prune_early()
+        if len(self._early) >= self.max_early:
+            self.callbacks_unmatched += 1
+            return False
+        self._early[token] = (raw, time.monotonic())
+        self.callbacks_early += 1
+        return False
+
+    def _take_early(self, token: str) -> Optional[Judge0ExecutionResult]:
+        entry = self._early.pop(token, None)
+        if entry is None:
+            return None
+        raw, received_at = entry
+        if time.monotonic() - received_at > self.early_ttl:
+            self.callbacks_unmatched += 1
+            return None
+        return raw if raw.token else raw.model_copy(update={"token": token})
+
+    def _prune_early(self) -> None:
+        cutoff = time.monotonic() - self.early_ttl
+        for tok, (_, received_at) in list(self._early.items()):
+            if received_at < cutoff:
+                self._early.pop(tok, None)
+                self.callbacks_unmatched += 1
+
+    def fail(self, token: str, exc: BaseException) -> bool:
+        self._registered_at.pop(token, None)
+        fut = self._pending.pop(token, None)
+        if fut is None or fut.done():
+            return False
+        fut.set_exception(exc)
+        return True
+
+    def _forget(self, token: str, fut: asyncio.Future) -> None:
+        if self._pending.get(token) is fut:
+            self._pending.pop(token, None)
+            self._registered_at.pop(token, None)
+
+    async def wait(self, token: str, timeout: Optional[float]) -> Judge0ExecutionResult:
+        fut = self.register(token)
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except asyncio.TimeoutError as exc:
+            self._forget(token, fut)
+            raise TimeoutError("Judge0 execution timed out") from exc
+
+    async def wait_many(self, tokens: Iterable[str], timeout: Optional[float]) -> Dict[str, Judge0ExecutionResult]:
+        token_list = list(tokens)
+        futures = {tok: self.register(tok) for tok in token_list}
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.gather(*futures.values())),
+                timeout,
+            )
+        except asyncio.TimeoutError as exc:
+            for tok, fut in futures.items():
+                self._forget(tok, fut)
+            raise TimeoutError("Batch execution timed out") from exc
+        return {tok: fut.result() for tok, fut in futures.items()}
+
+    # ------------------------------------------------------------------ polling loop
+    def interval_for(self, depth: int) -> float:
+        if self.callback_mode:
+            return self.safety_interval
+        return min(self.max_interval, self.min_interval + self.interval_per_token * max(0, depth))
+
+    def _chunks(self, tokens: List[str]) -> List[List[str]]:
+        return [tokens[i:i + self.batch_size] for i in range(0, len(tokens), self.batch_size)]
+
+    async def _poll_chunk(self, chunk: List[str]) -> None:
+        self.batch_requests += 1
+        try:
+            results = await self._service.get_batch_results(chunk, fields=self.fields)
+        except Exception as exc:
+            self.poll_errors += 1
+            self._logger.debug("Judge0 batch poll failed for %d tokens: %s", len(chunk), exc)
+            return
+        for tok, raw in (results or {}).items():
+            if is_finished(raw) and self.resolve(tok, raw) and self.callback_mode:
+                self.safety_net_resolved += 1
+
+    def _due_tokens(self) -> List[str]:
+        if not self.callback_mode:
+            return list(self._pending.keys())
+        # Callbacks normally resolve tokens well within the safety interval; only poll stragglers.
+        cutoff = time.monotonic() - self.safety_interval
+        return [tok for tok in self._pending if self._registered_at.get(tok, 0.0) <= cutoff]
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        wakeup = self._wakeup
+        try:
+            while True:
+                # Drop tokens nobody is waiting on any more (timed out / cancelled callers).
+                for tok, fut in list(self._pending.items()):
+                    if fut.done():
+                        self._pending.pop(tok, None)
+                        self._registered_at.pop(tok, None)
+                if not self._pending:
+                    wakeup.clear()
+                    await wakeup.wait()
+                    continue
+                interval = self.interval_for(len(self._pending))
+                self.last_interval = interval
+                await asyncio.sleep(interval)
+                # Waiters on a dead backend resubmit elsewhere instead of sitting out their timeout.
+                for tok in self._service.stranded_tokens(list(self._pending.keys())):
+                    self.fail(tok, Judge0BackendUnavailable(f"Judge0 backend holding {tok} is unavailable"))
+                tokens = self._due_tokens()
+                if not tokens:
+                    continue
+                self.ticks += 1
+                await self._service._bounded_gather(
+                    (self._poll_chunk(chunk) for chunk in self._chunks(tokens)),
+                    limit=getattr(self._service, "_batch_poll_concurrency", 8),
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception:  # pragma: no cover - defensive: never leave waiters hanging silently
+            self._logger.exception("Judge0 poll coordinator crashed")
+            for tok in list(self._pending.keys()):
+                self.fail(tok, RuntimeError("judge0_poll_coordinator_failed"))
+
+    async def aclose(self) -> None:
+        task = self._task
+        self._task = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        for tok in list(self._pending.keys()):
+            self.fail(tok, RuntimeError("judge0_poll_coordinator_closed"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "ticks": self.ticks,
+            "batch_requests": self.batch_requests,
+            "tokens_resolved": self.tokens_resolved,
+            "poll_errors": self.poll_errors,
+            "batch_size": self.batch_size,
+            "interval_s": round(self.last_interval, 3),
+            "mode": "callback" if self.callback_mode else "poll",
+            "callbacks_received": self.callbacks_received,
+            "callbacks_early": self.callbacks_early,
+            "callbacks_unmatched": self.callbacks_unmatched,
+            "callbacks_buffered": len(self._early),
+            "safety_net_resolved": self.safety_net_resolved,
+        }
+
+
+__all__ = ["Judge0PollCoordinator", "POLL_FIELDS", "DEFAULT_BATCH_SIZE", "is_finished"]
@@ -0,0 +1,132 @@
+"""Content-addressed cache of finished Judge0 executions.
+
+Students resubmit byte-identical code constantly (quick test, submit question, submit
+challenge). A finished run is fully determined by the source, language, stdin, expected
+output and resource limits, so we key on a SHA-256 of those and replay the stored
+``CodeExecutionResult`` instead of booting another sandbox.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .schemas import CodeExecutionResult, CodeSubmissionCreate
+
+# Only statuses that a re-run would reproduce are cached. Time limits (5) and
+# internal/sandbox errors (13, 14) depend on machine load, so they always re-run.
+CACHEABLE_STATUS_IDS = frozenset({3, 4, 6, 11})
+
+_ENTRY_OVERHEAD_BYTES = 512
+
+
+def execution_cache_key(submission: CodeSubmissionCreate, language_id: int) -> str:
+    material = [
+        submission.source_code,
+        int(language_id),
+        submission.stdin,
+        submission.expected_output,
+        submission.cpu_time_limit,
+        submission.wall_time_limit,
+        submission.memory_limit,
+    ]
+    encoded = json.dumps(material, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _estimate_size(key: str, result: CodeExecutionResult) -> int:
+    size = _ENTRY_OVERHEAD_BYTES + len(key)
+    for text in (result.stdout, result.stderr, result.compile_output, result.status_description):
+        if text:
+            size += len(text)
+    return size
+
+
+class ExecutionResultCache:
+    """LRU + TTL cache bounded by entry count and an approximate byte budget."""
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entries: int = 20000,
+        ttl_seconds: float = 600.0,
+        enabled: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self._entries: "OrderedDict[str, Tuple[str, CodeExecutionResult, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Tuple[str, CodeExecutionResult]]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        token, result, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return token, result.model_copy()
+
+    def put(self, key: str, token: str, result: CodeExecutionResult) -> bool:
+        if not self.enabled or result.status_id not in CACHEABLE_STATUS_IDS:
+            return False
+        size = _estimate_size(key, result)
+        if size > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (token, result.model_copy(), time.monotonic() + self.ttl_seconds, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[3]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+__all__ = ["ExecutionResultCache", "execution_cache_key", "CACHEABLE_STATUS_IDS"]
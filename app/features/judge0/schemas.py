@@ -8,6 +8,9 @@ class CodeSubmissionCreate(BaseModel):
     language_id: int
     stdin: Optional[str] = None
     expected_output: Optional[str] = None
+    cpu_time_limit: Optional[float] = None
+    wall_time_limit: Optional[float] = None
+    memory_limit: Optional[int] = None
 
 
 class QuickCodeSubmission(BaseModel):
@@ -1,11 +1,14 @@
 import httpx
 import asyncio
+import base64
+import binascii
 import time
 import hashlib
 import random
 import logging
 from typing import Optional, Dict, Any, List, Iterable, Awaitable, Tuple
 from datetime import datetime, timezone
+from urllib.parse import urlencode
 from uuid import uuid4
 
 from app.Core.config import get_settings
@@ -19,28 +22,49 @@ from .schemas import (
     Judge0Status,
     QuickCodeSubmission
 )
+from .result_cache import ExecutionResultCache, execution_cache_key
+from .poller import Judge0PollCoordinator
+from .backends import Judge0Backend, Judge0BackendPool, Judge0BackendUnavailable
+from .singleflight import SingleFlight
+
+
+class _PoolStats:
+    """Counters describing how requests use the shared Judge0 HTTP client."""
+
+    def __init__(self) -> None:
+        self.in_use = 0
+        self.waiting = 0
+        self.requests_total = 0
+        self.wait_s_total = 0.0
+        self.wait_s_max = 0.0
+
+    def record_wait(self, waited_s: float) -> None:
+        self.requests_total += 1
+        self.wait_s_total += waited_s
+        if waited_s > self.wait_s_max:
+            self.wait_s_max = waited_s
+
+    def snapshot(self) -> Dict[str, Any]:
+        avg = (self.wait_s_total / self.requests_total) if self.requests_total else 0.0
+        return {
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "requests_total": self.requests_total,
+            "wait_ms_avg": round(avg * 1000.0, 3),
+            "wait_ms_max": round(self.wait_s_max * 1000.0, 3),
+        }
 
 
 class Judge0Service:
     def __init__(self):
         self.settings = get_settings()
-        # Normalise base URL: prefer configured JUDGE0_URL / JUDGE0_BASE_URL
-        base = (self.settings.judge0_api_url or "").strip()
-        if base and not base.startswith("http://") and not base.startswith("https://"):
-            # assume http if scheme omitted
-            base = "http://" + base
-        # If no explicit port provided, default to 2358 (common Judge0 CE port)
-        if base:
-            from urllib.parse import urlparse, urlunparse
-            parsed = urlparse(base)
-            netloc = parsed.netloc
-            # If netloc does not include a port, append the default
-            if ':' not in netloc:
-                netloc = f"{netloc}:2358"
-                parsed = parsed._replace(netloc=netloc)
-                base = urlunparse(parsed)
-        # strip trailing slash to make joining paths predictable
-        self.base_url = base.rstrip("/")
+        # Judge0 backends: JUDGE0_URLS (or the single JUDGE0_URL / JUDGE0_BASE_URL); URLs are
+        # normalised with a default scheme and the Judge0 CE port 2358
+        urls = list(getattr(self.settings, "judge0_urls", None) or [])
+        if not urls and self.settings.judge0_api_url:
+            urls = [self.settings.judge0_api_url]
+        self._backends = self._build_backend_pool(urls)
+        self._health_task: Optional[asyncio.Task] = None
         self.headers = {"Content-Type": "application/json"}
         if self.settings.judge0_api_key and self.settings.judge0_host:
             self.headers.update({
@@ -64,19 +88,256 @@ class Judge0Service:
             self._batch_poll_concurrency = max(1, int(getattr(self.settings, "judge0_batch_poll_concurrency", 8)))
         except Exception:
             self._batch_poll_concurrency = 8
+        # Long-lived HTTP client shared by every Judge0 call (created lazily, closed on shutdown)
+        try:
+            self._max_connections = max(1, int(getattr(self.settings, "judge0_max_connections", 20)))
+        except Exception:
+            self._max_connections = 20
+        try:
+            self._max_keepalive = max(0, int(getattr(self.settings, "judge0_max_keepalive_connections", 10)))
+        except Exception:
+            self._max_keepalive = 10
+        try:
+            self._keepalive_expiry = float(getattr(self.settings, "judge0_keepalive_expiry_s", 30.0))
+        except Exception:
+            self._keepalive_expiry = 30.0
+        self._http2 = bool(getattr(self.settings, "judge0_http2", False))
+        self._transport: Optional[httpx.AsyncBaseTransport] = None  # override hook for tests/benchmarks
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pool_gate: Optional[asyncio.Semaphore] = None
+        self._pool_stats = _PoolStats()
+        self._retiring: set = set()  # close tasks for clients replaced after an event-loop change
+        self._result_cache = ExecutionResultCache(
+            max_bytes=getattr(self.settings, "judge0_result_cache_max_bytes", 64 * 1024 * 1024),
+            max_entries=getattr(self.settings, "judge0_result_cache_max_entries", 20000),
+            ttl_seconds=getattr(self.settings, "judge0_result_cache_ttl_s", 600.0),
+            enabled=bool(getattr(self.settings, "judge0_result_cache_enabled", True)),
+        )
+        # Concurrent identical executions share one submission (double-clicks, retries)
+        self._singleflight = SingleFlight(enabled=bool(getattr(self.settings, "judge0_singleflight_enabled", True)))
+        # Callback completion mode: Judge0 PUTs finished runs to our callback endpoint
+        self._callback_url = self._build_callback_url()
+        # One background poller per process batches GETs for every in-flight token
+        # (in callback mode it only polls as a safety net for lost callbacks)
+        self._poll_coordinator: Optional[Judge0PollCoordinator] = None
+        if getattr(self.settings, "judge0_poll_coalesce", True) or self._callback_url:
+            self._poll_coordinator = Judge0PollCoordinator(
+                self,
+                batch_size=getattr(self.settings, "judge0_poll_batch_size", 20),
+                min_interval=getattr(self.settings, "judge0_poll_min_interval_s", 0.25),
+                max_interval=getattr(self.settings, "judge0_poll_max_interval_s", 1.5),
+                callback_mode=bool(self._callback_url),
+                safety_interval=getattr(self.settings, "judge0_callback_safety_poll_interval_s", 5.0),
+            )
+
+    def _build_backend_pool(self, urls: List[str]) -> Judge0BackendPool:
+        return Judge0BackendPool(
+            urls,
+            failure_threshold=getattr(self.settings, "judge0_breaker_failure_threshold", 5),
+            reset_timeout=getattr(self.settings, "judge0_breaker_reset_timeout_s", 15.0),
+        )
+
+    @property
+    def base_url(self) -> str:
+        """URL of the primary backend (kept for callers that expect a single Judge0)."""
+        primary = self._backends.primary
+        return primary.url if primary is not None else ""
+
+    @base_url.setter
+    def base_url(self, value: str) -> None:
+        self._backends = self._build_backend_pool([value] if value else [])
+
+    @property
+    def backends(self) -> Judge0BackendPool:
+        return self._backends
+
+    def _build_callback_url(self) -> Optional[str]:
+        if (getattr(self.settings, "judge0_completion_mode", "poll") or "poll") != "callback":
+            return None
+        url = (getattr(self.settings, "judge0_callback_url", "") or "").strip()
+        if not url:
+            self._logger.warning("JUDGE0_COMPLETION_MODE=callback but JUDGE0_CALLBACK_URL is empty; polling instead")
+            return None
+        secret = getattr(self.settings, "judge0_callback_secret", "") or ""
+        if not secret:
+            # The callback endpoint is public; without a secret anyone could post results
+            self._logger.warning("JUDGE0_COMPLETION_MODE=callback but JUDGE0_CALLBACK_SECRET is empty; polling instead")
+            return None
+        return f"{url}{'&' if '?' in url else '?'}{urlencode({'secret': secret})}"
+
+    def _build_client(self) -> httpx.AsyncClient:
+        timeout = httpx.Timeout(connect=3.0, read=self.settings.judge0_timeout_s, write=5.0, pool=5.0)
+        limits = httpx.Limits(
+            max_connections=self._max_connections,
+            max_keepalive_connections=min(self._max_keepalive, self._max_connections),
+            keepalive_expiry=self._keepalive_expiry,
+        )
+        http2 = self._http2
+        if http2:
+            try:
+                import h2  # type: ignore  # noqa: F401
+            except ImportError:
+                self._logger.warning("JUDGE0_HTTP2 requested but the 'h2' package is not installed; using HTTP/1.1")
+                http2 = False
+        return httpx.AsyncClient(timeout=timeout, limits=limits, http2=http2, transport=self._transport)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, rebuilding it if it was closed or belongs to another event loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            stale, stale_loop = self._client, self._client_loop
+            self._client = self._build_client()
+            self._client_loop = loop
+            self._pool_gate = asyncio.Semaphore(self._max_connections)
+            # in_use/waiting are not reset: requests still running on the stale client hold their
+            # own gate and decrement the shared counters when they finish
+            if stale is not None and not stale.is_closed:
+                self._retire_client(stale, stale_loop, loop)
+        return self._client
+
+    def _retire_client(
+        self,
+        client: httpx.AsyncClient,
+        owner: Optional[asyncio.AbstractEventLoop],
+        loop: asyncio.AbstractEventLoop,
+    ) -> None:
+        """Close a client left behind by another event loop instead of leaking its pool."""
+        if owner is not None and owner is not loop and owner.is_running() and not owner.is_closed():
+            # Its connections belong to a loop that is still alive (another thread): close it there
+            asyncio.run_coroutine_threadsafe(self._close_client(client), owner)
+            return
+        task = loop.create_task(self._close_client(client), name="judge0-client-retire")
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+
+    async def _close_client(self, client: httpx.AsyncClient) -> None:
+        try:
+            await client.aclose()
+        except Exception:
+            # Connections opened on a loop that has since closed cannot shut down cleanly
+            self._logger.debug("Judge0 client close failed", exc_info=True)
+
+    async def startup(self) -> None:
+        """Create the pooled client up front so the first submission doesn't pay for it."""
+        self._get_client()
+        interval = float(getattr(self.settings, "judge0_health_check_interval_s", 10.0) or 0)
+        if len(self._backends) > 1 and interval > 0 and (self._health_task is None or self._health_task.done()):
+            self._health_task = asyncio.get_running_loop().create_task(
+                self._health_loop(interval), name="judge0-health-checks"
+            )
+
+    async def check_backend_health(self, backend: Judge0Backend) -> bool:
+        path = getattr(self.settings, "judge0_health_check_path", "/about") or "/about"
+        if not path.startswith("/"):
+            path = "/" + path
+        try:
+            resp = await self._get_client().get(backend.url + path, headers=self.headers, timeout=3.0)
+            ok = resp.status_code == 200
+            error = None if ok else f"health check returned {resp.status_code}"
+        except Exception as exc:
+            ok, error = False, f"health check failed: {exc}"
+        backend.last_health_check = time.monotonic()
+        if ok != backend.healthy:
+            self._logger.warning("Judge0 backend %s is now %s", backend.url, "healthy" if ok else "unhealthy")
+        backend.healthy = ok
+        if ok:
+            backend.record_success()
+        else:
+            backend.record_failure(error)
+        return ok
+
+    async def check_health(self) -> Dict[str, bool]:
+        backends = list(self._backends.backends)
+        results = await asyncio.gather(*(self.check_backend_health(b) for b in backends))
+        return {b.url: ok for b, ok in zip(backends, results)}
+
+    async def _health_loop(self, interval: float) -> None:
+        while True:
+            try:
+                await self.check_health()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._logger.debug("Judge0 health check round failed", exc_info=True)
+            await asyncio.sleep(interval)
+
+    async def aclose(self) -> None:
+        """Close the pooled client and its keep-alive connections (FastAPI shutdown hook)."""
+        task = self._health_task
+        self._health_task = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._poll_coordinator is not None:
+            await self._poll_coordinator.aclose()
+        client = self._client
+        self._client = None
+        self._client_loop = None
+        self._pool_gate = None
+        if client is not None and not client.is_closed:
+            await self._close_client(client)
+        retiring = list(self._retiring)
+        if retiring:
+            await asyncio.gather(*retiring, return_exceptions=True)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        stats = self._pool_stats.snapshot()
+        stats.update({
+            "max_connections": self._max_connections,
+            "max_keepalive_connections": self._max_keepalive,
+            "http2": self._http2,
+            "connections_open": 0,
+            "connections_idle": 0,
+        })
+        client = self._client
+        pool = getattr(getattr(client, "_transport", None), "_pool", None) if client is not None else None
+        connections = getattr(pool, "connections", None) or []
+        try:
+            stats["connections_open"] = len(connections)
+            stats["connections_idle"] = sum(1 for conn in connections if conn.is_idle())
+        except Exception:
+            pass
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool": self.pool_stats(),
+            "result_cache": self._result_cache.stats(),
+            "singleflight": self._singleflight.stats(),
+            "poller": self._poll_coordinator.stats() if self._poll_coordinator is not None else None,
+            "completion_mode": "callback" if self._callback_url else "poll",
+            "backends": self._backends.stats(),
+        }
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        token: Optional[str] = None,
+        backend: Optional[str] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """Internal helper to perform an HTTP request against a Judge0 backend.
 
-    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
-        """Internal helper to perform an HTTP request against the configured Judge0 base URL.
+        Requests about an existing ``token`` (or for an explicit ``backend`` URL) are pinned to
+        the backend that issued it; everything else is routed to the least busy healthy backend
+        and fails over to another one on connection errors or 5xx responses. The backend that
+        answered is recorded in ``response.extensions["judge0_backend"]``.
 
         Catches connection/timeouts and raises a descriptive Exception so callers can surface
         meaningful 5xx errors instead of ambiguous timeouts.
         """
-        if not self.base_url:
+        if not len(self._backends):
             raise Exception("Judge0 base URL is not configured (JUDGE0_URL / JUDGE0_BASE_URL).")
         # Ensure path begins with /
         if not path.startswith("/"):
             path = "/" + path
-        url = self.base_url.rstrip("/") + path
+        pinned = self._backends.get(backend) if backend else (self._backends.for_token(token) if token else None)
         # Mask sensitive header values for logging
         def _mask_headers(h: dict) -> dict:
             masked = {}
@@ -86,29 +347,69 @@ class Judge0Service:
                 else:
                     masked[k] = v
             return masked
-        try:
-            self._logger.debug("Judge0 request: %s %s headers=%s", method, url, _mask_headers(self.headers))
-        except Exception:
-            # ensure logging never interferes with normal operation
-            pass
-        timeout = httpx.Timeout(connect=3.0, read=self.settings.judge0_timeout_s, write=5.0, pool=5.0)
-        limits = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        client = self._get_client()
+        gate = self._pool_gate
+        stats = self._pool_stats
         max_retries = 3
+        tried: set = set()
         for attempt in range(max_retries):
+            if pinned is not None:
+                target = pinned
+                if not target.breaker.allow():
+                    raise Judge0BackendUnavailable(f"Failed to connect to Judge0 at {target.url}: circuit open")
+            else:
+                target = self._backends.pick(exclude=tried)
+                if target.url in tried:
+                    # No untried backend left: back off before hitting the same one again
+                    await asyncio.sleep(0.5 * attempt)
+            url = target.url + path
             try:
-                async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+                self._logger.debug("Judge0 request: %s %s headers=%s", method, url, _mask_headers(self.headers))
+            except Exception:
+                # ensure logging never interferes with normal operation
+                pass
+            target.outstanding += 1
+            target.requests_total += 1
+            try:
+                queued_at = time.perf_counter()
+                stats.waiting += 1
+                try:
+                    await gate.acquire()
+                finally:
+                    stats.waiting -= 1
+                stats.record_wait(time.perf_counter() - queued_at)
+                stats.in_use += 1
+                try:
                     resp = await client.request(method, url, headers=self.headers, **kwargs)
-                return resp
+                finally:
+                    stats.in_use -= 1
+                    gate.release()
             except (httpx.ConnectTimeout, httpx.ConnectError) as e:
-                # Connection-level issues: retry a few times with backoff then raise a descriptive error
+                # Connection-level issues: fail over (or retry with backoff) then raise a descriptive error
+                target.record_failure(str(e))
+                tried.add(target.url)
                 if attempt < max_retries - 1:
-                    backoff = 0.5 * (attempt + 1)
-                    await asyncio.sleep(backoff)
+                    if pinned is not None:
+                        await asyncio.sleep(0.5 * (attempt + 1))
                     continue
-                raise Exception(f"Failed to connect to Judge0 at {self.base_url}: {e}") from e
+                raise Exception(f"Failed to connect to Judge0 at {target.url}: {e}") from e
             except Exception:
                 # Re-raise any other errors (including parsing) for higher-level handling
                 raise
+            finally:
+                target.outstanding -= 1
+            if resp.status_code >= 500:
+                target.record_failure(f"HTTP {resp.status_code}")
+                tried.add(target.url)
+                alternatives = pinned is None and any(
+                    b.url not in tried and b.available() for b in self._backends.backends
+                )
+                if alternatives and attempt < max_retries - 1:
+                    continue
+            else:
+                target.record_success()
+            resp.extensions["judge0_backend"] = target.url
+            return resp
 
     async def _resolve_python3_id(self) -> int:
         if self._python3_cache is not None:
@@ -136,6 +437,21 @@ class Judge0Service:
             return await self._resolve_python3_id()
         return lid
 
+    def _build_submission_request(self, submission: CodeSubmissionCreate, language_id: int) -> Judge0SubmissionRequest:
+        return Judge0SubmissionRequest(
+            source_code=submission.source_code,
+            language_id=language_id,
+            stdin=submission.stdin,
+            expected_output=submission.expected_output if submission.expected_output else None,
+            cpu_time_limit=submission.cpu_time_limit,
+            wall_time_limit=submission.wall_time_limit,
+            memory_limit=submission.memory_limit,
+            callback_url=self._callback_url,
+        )
+
+    async def _result_cache_key(self, submission: CodeSubmissionCreate) -> str:
+        return execution_cache_key(submission, await self._normalize_language_id(submission.language_id))
+
     @staticmethod
     def _ensure_status(payload: Dict[str, Any]) -> Dict[str, Any]:
         if not isinstance(payload, dict):
@@ -160,6 +476,48 @@ class Judge0Service:
                 return payload
         return payload
 
+    def _remember_token(self, response: Any, token: Optional[str]) -> None:
+        extensions = getattr(response, "extensions", None) or {}
+        self._backends.remember(token, extensions.get("judge0_backend"))
+
+    def stranded_tokens(self, tokens: Iterable[str]) -> List[str]:
+        """Tokens held by a backend that went down while a healthy backend could rerun them."""
+        return self._backends.stranded(tokens)
+
+    @staticmethod
+    def _decode_callback_text(value: Any) -> Any:
+        if not isinstance(value, str) or not value:
+            return value
+        try:
+            # Judge0 wraps base64 at 60 columns; strip the newlines before strict decoding.
+            decoded = base64.b64decode("".join(value.split()), validate=True)
+        except (binascii.Error, ValueError):
+            return value
+        return decoded.decode("utf-8", errors="replace")
+
+    def handle_callback(self, payload: Dict[str, Any]) -> bool:
+        """Resolve the waiter for a Judge0 completion callback.
+
+        Judge0 always sends callbacks base64 encoded, regardless of how the submission
+        was created. Returns True when a waiting request was resolved.
+        """
+        if not isinstance(payload, dict):
+            return False
+        token = payload.get("token")
+        if not token or not self._callback_url or self._poll_coordinator is None:
+            return False
+        data = dict(payload)
+        for field in ("stdout", "stderr", "compile_output", "message"):
+            if field in data:
+                data[field] = self._decode_callback_text(data[field])
+        data = self._ensure_status(data)
+        try:
+            raw = Judge0ExecutionResult(**data)
+        except Exception:
+            self._logger.debug("Ignoring malformed Judge0 callback for token %s", token, exc_info=True)
+            return False
+        return self._poll_coordinator.deliver(token, raw)
+
     @staticmethod
     def _compute_success(status_id: int | None, stdout: str | None, expected_output: str | None) -> bool:
         # Accepted status required
@@ -254,12 +612,7 @@ class Judge0Service:
     
     async def submit_code(self, submission: CodeSubmissionCreate) -> Judge0SubmissionResponse:
         norm_lang = await self._normalize_language_id(submission.language_id)
-        judge0_request = Judge0SubmissionRequest(
-            source_code=submission.source_code,
-            language_id=norm_lang,
-            stdin=submission.stdin,
-            expected_output=submission.expected_output if submission.expected_output else None,
-        )
+        judge0_request = self._build_submission_request(submission, norm_lang)
         response = await self._request(
             "POST",
             "/submissions?base64_encoded=false&wait=false",
@@ -268,6 +621,7 @@ class Judge0Service:
         if response.status_code == 201:
             result = response.json()
             judge0_response = Judge0SubmissionResponse(token=result["token"])
+            self._remember_token(response, judge0_response.token)
             return judge0_response
         else:
             raise Exception(f"Failed to submit code: {response.status_code} - {response.text}")
@@ -282,12 +636,7 @@ class Judge0Service:
         This is used for per-question instant submits to avoid polling overhead.
         """
         norm_lang = await self._normalize_language_id(submission.language_id)
-        judge0_request = Judge0SubmissionRequest(
-            source_code=submission.source_code,
-            language_id=norm_lang,
-            stdin=submission.stdin,
-            expected_output=submission.expected_output if submission.expected_output else None,
-        )
+        judge0_request = self._build_submission_request(submission, norm_lang)
         response = await self._request(
             "POST",
             f"/submissions?base64_encoded=false&wait=true&fields={fields}",
@@ -301,30 +650,58 @@ class Judge0Service:
         if "token" not in data:
             # Fallback: issue secondary GET by location header? For simplicity raise.
             raise Exception("Waited submit missing token in response")
+        self._remember_token(response, data["token"])
         data = self._ensure_status(data)
         return Judge0ExecutionResult(**data)
 
     async def execute_code_sync(
         self,
         submission: CodeSubmissionCreate,
-        fields: str = "*"
+        fields: str = "*",
+        *,
+        cache_key: Optional[str] = None,
     ) -> tuple[str, CodeExecutionResult]:
         """Execute code and return (token, CodeExecutionResult) without persisting to storage.
 
         Uses the poll-based flow for fast, reliable stdout retrieval; callers may override the
-        Judge0 fields fetched on each poll via the ``fields`` parameter.
+        Judge0 fields fetched on each poll via the ``fields`` parameter. Identical finished runs
+        are served from the result cache; ``cache_key`` replaces the content key for callers
+        whose source differs per run in ways that do not change the result (harness nonces).
         """
-        timeout_override = getattr(self.settings, "judge0_timeout_s", None)
-        token, raw = await self._execute_via_polling(
-            submission,
-            timeout_seconds=timeout_override if timeout_override else 25.0,
-            poll_interval=0.35,
-            fields=fields,
-        )
-        exec_result = self._to_code_execution_result(raw, submission.expected_output, submission.language_id)
-        if exec_result.status_description == "unknown" and exec_result.status_id == 4:
-            exec_result.status_description = "wrong_answer"
-        return token, exec_result
+        cache_key = cache_key or await self._result_cache_key(submission)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        return await self._execute_shared(submission, cache_key, fields)
+
+    @staticmethod
+    def _flight_key(cache_key: str, fields: Optional[str]) -> str:
+        return cache_key if fields in (None, "*") else f"{cache_key}|{fields}"
+
+    async def _execute_shared(
+        self,
+        submission: CodeSubmissionCreate,
+        cache_key: str,
+        fields: Optional[str] = "*",
+    ) -> tuple[str, CodeExecutionResult]:
+        """Execute once for every concurrent caller with the same cache key, then cache it."""
+
+        async def _run() -> tuple[str, CodeExecutionResult]:
+            timeout_override = getattr(self.settings, "judge0_timeout_s", None)
+            token, raw = await self._execute_via_polling(
+                submission,
+                timeout_seconds=timeout_override if timeout_override else 25.0,
+                poll_interval=0.35,
+                fields=fields,
+            )
+            exec_result = self._to_code_execution_result(raw, submission.expected_output, submission.language_id)
+            if exec_result.status_description == "unknown" and exec_result.status_id == 4:
+                exec_result.status_description = "wrong_answer"
+            self._result_cache.put(cache_key, token, exec_result)
+            return token, exec_result
+
+        (token, exec_result), shared = await self._singleflight.do(self._flight_key(cache_key, fields), _run)
+        return token, (exec_result.model_copy() if shared else exec_result)
 
     async def _execute_via_polling(
         self,
@@ -339,43 +716,24 @@ class Judge0Service:
         if not token:
             raise Exception("Judge0 returned an empty token")
 
-        start = time.monotonic()
-        attempt = 0
         last_raw: Optional[Judge0ExecutionResult] = None
-
-        while True:
-            path = f"/submissions/{token}?base64_encoded=false"
-            if fields:
-                path = f"{path}&fields={fields}"
-            response = await self._request("GET", path)
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch submission result: {response.status_code} - {response.text[:200]}")
-
-            payload = response.json()
-            payload = self._ensure_status(payload)
-            raw = Judge0ExecutionResult(**payload)
-            if not raw.token:
-                raw = raw.model_copy(update={"token": token})
-            status_dict = raw.status or {}
-            status_id = status_dict.get("id") if isinstance(status_dict, dict) else None
-
-            if status_id not in (1, 2) and status_id is not None:
-                final_raw = raw
-                break
-
-            if status_id is None and raw.stdout not in (None, ""):
-                final_raw = raw
-                break
-
-            last_raw = raw
-            attempt += 1
-
-            if timeout_seconds is not None and (time.monotonic() - start) >= timeout_seconds:
-                raise TimeoutError("Judge0 execution timed out")
-
-            jitter = random.uniform(0.0, 0.05)
-            sleep_for = min(poll_interval + (attempt * 0.05), 1.0) + jitter
-            await asyncio.sleep(sleep_for)
+        if self._poll_coordinator is not None:
+            try:
+                final_raw = await self._poll_coordinator.wait(token, timeout_seconds)
+            except Judge0BackendUnavailable:
+                # The backend holding the token died mid-run; rerun once on a healthy one.
+                if not self._backends.any_available():
+                    raise
+                self._logger.warning("Judge0 backend for token %s became unavailable; resubmitting", token)
+                token = (await self.submit_code(submission)).token
+                final_raw = await self._poll_coordinator.wait(token, timeout_seconds)
+        else:
+            final_raw, last_raw = await self._poll_single_token(
+                token,
+                timeout_seconds=timeout_seconds,
+                poll_interval=poll_interval,
+                fields=fields,
+            )
 
         needs_refresh = False
         if final_raw.stdout in (None, ""):
@@ -415,6 +773,55 @@ class Judge0Service:
 
         return token, final_raw
 
+    async def _poll_single_token(
+        self,
+        token: str,
+        *,
+        timeout_seconds: float | None,
+        poll_interval: float,
+        fields: Optional[str],
+    ) -> tuple[Judge0ExecutionResult, Optional[Judge0ExecutionResult]]:
+        """Legacy per-token polling loop, used when poll coalescing is disabled."""
+        start = time.monotonic()
+        attempt = 0
+        last_raw: Optional[Judge0ExecutionResult] = None
+
+        while True:
+            path = f"/submissions/{token}?base64_encoded=false"
+            if fields:
+                path = f"{path}&fields={fields}"
+            response = await self._request("GET", path, token=token)
+            if response.status_code != 200:
+                raise Exception(f"Failed to fetch submission result: {response.status_code} - {response.text[:200]}")
+
+            payload = response.json()
+            payload = self._ensure_status(payload)
+            raw = Judge0ExecutionResult(**payload)
+            if not raw.token:
+                raw = raw.model_copy(update={"token": token})
+            status_dict = raw.status or {}
+            status_id = status_dict.get("id") if isinstance(status_dict, dict) else None
+
+            if status_id not in (1, 2) and status_id is not None:
+                final_raw = raw
+                break
+
+            if status_id is None and raw.stdout not in (None, ""):
+                final_raw = raw
+                break
+
+            last_raw = raw
+            attempt += 1
+
+            if timeout_seconds is not None and (time.monotonic() - start) >= timeout_seconds:
+                raise TimeoutError("Judge0 execution timed out")
+
+            jitter = random.uniform(0.0, 0.05)
+            sleep_for = min(poll_interval + (attempt * 0.05), 1.0) + jitter
+            await asyncio.sleep(sleep_for)
+
+        return final_raw, last_raw
+
     async def _bounded_gather(
         self,
         coroutines: Iterable[Awaitable[Any]],
@@ -465,8 +872,6 @@ class Judge0Service:
         status_desc = status_dict.get("description") if isinstance(status_dict, dict) else None
         if not status_desc:
             needs_refresh = True
-        if raw.compile_output in (None, ""):
-            needs_refresh = True
 
         if not needs_refresh:
             return raw
@@ -507,20 +912,14 @@ class Judge0Service:
 
         Returns (judge0_token, CodeExecutionResult).
         """
-        timeout_override = getattr(self.settings, "judge0_timeout_s", None)
-        token, raw = await self._execute_via_polling(
-            submission,
-            timeout_seconds=timeout_override if timeout_override else 25.0,
-            poll_interval=0.35,
-            fields=fields,
-        )
-        exec_result = self._to_code_execution_result(raw, submission.expected_output, submission.language_id)
-        if exec_result.status_description == "unknown" and exec_result.status_id == 4:
-            exec_result.status_description = "wrong_answer"
-        return token, exec_result
+        cache_key = await self._result_cache_key(submission)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        return await self._execute_shared(submission, cache_key, fields)
     
     async def get_submission_result(self, token: str) -> Judge0ExecutionResult:
-        resp = await self._request("GET", f"/submissions/{token}?base64_encoded=false")
+        resp = await self._request("GET", f"/submissions/{token}?base64_encoded=false", token=token)
         if resp.status_code == 200:
             result = self._ensure_status(resp.json())
             return Judge0ExecutionResult(**result)
@@ -598,7 +997,7 @@ class Judge0Service:
         token = (await self.submit_code(submission)).token
         start = time.time()
         while True:
-            response = await self._request("GET", f"/submissions/{token}?base64_encoded=false")
+            response = await self._request("GET", f"/submissions/{token}?base64_encoded=false", token=token)
             if response.status_code == 200:
                 result = response.json()
                 if result["status"]["id"] in [1, 2]:  # In Queue or Processing
@@ -635,12 +1034,7 @@ class Judge0Service:
         reqs: List[Dict[str, Any]] = []
         for s in submissions:
             norm_lang = await self._normalize_language_id(s.language_id)
-            reqs.append(Judge0SubmissionRequest(
-                source_code=s.source_code,
-                language_id=norm_lang,
-                stdin=s.stdin,
-                expected_output=s.expected_output,
-            ).model_dump(exclude_none=True))
+            reqs.append(self._build_submission_request(s, norm_lang).model_dump(exclude_none=True))
         payload = {"submissions": reqs}
         resp = await self._request(
             "POST",
@@ -664,6 +1058,8 @@ class Judge0Service:
         if len(tokens) != len(submissions):
             # Still return what we have but flag mismatch
             raise Exception("Token count mismatch in batch response")
+        for tok in tokens:
+            self._remember_token(resp, tok)
         return tokens
 
     async def get_batch_results(
@@ -672,9 +1068,36 @@ class Judge0Service:
         *,
         fields: Optional[str] = "*",
     ) -> Dict[str, Judge0ExecutionResult]:
-        """Fetch multiple submissions by tokens (returns mapping token -> result)."""
+        """Fetch multiple submissions by tokens (returns mapping token -> result).
+
+        Tokens are grouped by the backend that issued them; a failing backend only drops its
+        own tokens from the result unless every group failed.
+        """
         if not tokens:
             return {}
+        groups = self._backends.group_tokens(tokens)
+        if len(groups) <= 1:
+            return await self._get_batch_results_from(next(iter(groups), None), list(tokens), fields=fields)
+        outcomes = await asyncio.gather(
+            *(self._get_batch_results_from(url, toks, fields=fields) for url, toks in groups.items()),
+            return_exceptions=True,
+        )
+        results: Dict[str, Judge0ExecutionResult] = {}
+        errors = [out for out in outcomes if isinstance(out, BaseException)]
+        if errors and len(errors) == len(outcomes):
+            raise errors[0]
+        for out in outcomes:
+            if not isinstance(out, BaseException):
+                results.update(out)
+        return results
+
+    async def _get_batch_results_from(
+        self,
+        backend_url: Optional[str],
+        tokens: List[str],
+        *,
+        fields: Optional[str] = "*",
+    ) -> Dict[str, Judge0ExecutionResult]:
         token_param = ",".join(tokens)
         query = f"/submissions/batch?tokens={token_param}&base64_encoded=false"
         if fields:
@@ -682,6 +1105,7 @@ class Judge0Service:
         resp = await self._request(
             "GET",
             query,
+            backend=backend_url,
         )
         if resp.status_code != 200:
             raise Exception(f"Batch get failed: {resp.status_code} {resp.text[:200]}")
@@ -705,11 +1129,88 @@ class Judge0Service:
         timeout_seconds: Optional[float] = 60,
         poll_interval: float = 1.0,
     ) -> List[tuple[str, CodeExecutionResult]]:
-        """Submit a batch then poll until all finished; returns list aligned to original order."""
+        """Submit a batch then poll until all finished; returns list aligned to original order.
+
+        Small batches fan out through ``execute_code_sync`` (which consults the result cache
+        itself); larger batches only submit the entries the result cache cannot answer and
+        that no concurrent request is already running.
+        """
         if len(submissions) <= 8:
             return await self._execute_small_batch_concurrent(submissions)
 
+        cache_keys = [await self._result_cache_key(sub) for sub in submissions]
+        ordered: List[Optional[tuple[str, CodeExecutionResult]]] = [self._result_cache.get(key) for key in cache_keys]
+        missing = [idx for idx, hit in enumerate(ordered) if hit is None]
+        if not missing:
+            return [pair for pair in ordered if pair is not None]
+
+        # Entries another request already has in flight wait for that run instead of
+        # submitting again. Duplicates within this batch still run separately so every
+        # test keeps its own token.
+        shared: Dict[int, asyncio.Future] = {}
+        led: Dict[str, asyncio.Future] = {}
+        leaders: List[int] = []
+        for idx in missing:
+            key = cache_keys[idx]
+            fut = None if key in led else self._singleflight.join(key)
+            if fut is not None:
+                shared[idx] = fut
+                continue
+            leaders.append(idx)
+            if key not in led:
+                led[key] = self._singleflight.lead(key)
+        if leaders:
+            try:
+                fresh = await self._execute_batch_uncached(
+                    [submissions[idx] for idx in leaders],
+                    timeout_seconds=timeout_seconds,
+                    poll_interval=poll_interval,
+                )
+            except BaseException as exc:
+                for key, fut in led.items():
+                    self._singleflight.fail(key, fut, exc)
+                raise
+            for idx, (tok, res) in zip(leaders, fresh):
+                self._result_cache.put(cache_keys[idx], tok, res)
+                self._singleflight.resolve(cache_keys[idx], led[cache_keys[idx]], (tok, res))
+                ordered[idx] = (tok, res)
+        for idx, fut in shared.items():
+            tok, res = await asyncio.shield(fut)
+            ordered[idx] = (tok, res.model_copy())
+        return [pair for pair in ordered if pair is not None]
+
+    async def _execute_batch_uncached(
+        self,
+        submissions: List[CodeSubmissionCreate],
+        *,
+        timeout_seconds: Optional[float] = 60,
+        poll_interval: float = 1.0,
+    ) -> List[tuple[str, CodeExecutionResult]]:
         tokens = await self.submit_batch(submissions)
+        if self._poll_coordinator is not None:
+            try:
+                finished = await self._poll_coordinator.wait_many(tokens, timeout_seconds)
+            except Judge0BackendUnavailable:
+                # Drain the stranded part of the batch to the healthy backends instead of failing it.
+                stranded = set(self.stranded_tokens(tokens))
+                if not stranded:
+                    raise
+                retry_idx = [idx for idx, tok in enumerate(tokens) if tok in stranded]
+                self._logger.warning("Resubmitting %d Judge0 runs from an unavailable backend", len(retry_idx))
+                replacements = await self.submit_batch([submissions[idx] for idx in retry_idx])
+                tokens = list(tokens)
+                for idx, tok in zip(retry_idx, replacements):
+                    tokens[idx] = tok
+                finished = await self._poll_coordinator.wait_many(tokens, timeout_seconds)
+            hydrated = await self._bounded_gather(
+                (self._hydrate_result(tok, finished[tok]) for tok in tokens),
+                limit=getattr(self, "_batch_poll_concurrency", 8),
+            )
+            return [
+                (tok, self._to_code_execution_result(raw, sub.expected_output, sub.language_id))
+                for tok, raw, sub in zip(tokens, hydrated, submissions)
+            ]
+
         pending = set(tokens)
         start = time.time()
         latest: Dict[str, CodeExecutionResult] = {}
@@ -783,14 +1284,29 @@ class Judge0Service:
             stdin=submission.stdin,
             expected_output=None,
         )
-        token, raw = await self._execute_via_polling(
-            code_submission,
-            timeout_seconds=timeout_seconds,
-            poll_interval=poll_interval,
-        )
-        result = self._to_code_execution_result(raw, None, submission.language_id)
-        if result.status_description == "unknown" and result.status_id == 4:
-            result.status_description = "wrong_answer"
-        return result
 
-judge0_service = Judge0Service()
+        async def _run() -> CodeExecutionResult:
+            token, raw = await self._execute_via_polling(
+                code_submission,
+                timeout_seconds=timeout_seconds,
+                poll_interval=poll_interval,
+            )
+            result = self._to_code_execution_result(raw, None, submission.language_id)
+            if result.status_description == "unknown" and result.status_id == 4:
+                result.status_description = "wrong_answer"
+            return result
+
+        flight_key = "quick:" + await self._result_cache_key(code_submission)
+        result, shared = await self._singleflight.do(flight_key, _run)
+        return result.model_copy() if shared else result
+
+
+def _build_executor() -> Judge0Service:
+    if get_settings().code_executor == "local":
+        from .local_executor import LocalSandboxExecutor
+
+        return LocalSandboxExecutor()
+    return Judge0Service()
+
+
+judge0_service = _build_executor()
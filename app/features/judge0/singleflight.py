@@ -0,0 +1,97 @@
+"""Collapse identical executions that are in flight at the same time.
+
+Double-clicks and frontend retries put the same (source, stdin, language, limits) in
+flight several times at once. The result cache only helps once a run has finished; this
+layer makes concurrent identical requests share one Judge0 submission and await the same
+outcome, including on the very first run.
+
+The shared work runs in its own task and callers await it through ``asyncio.shield``, so
+a caller that disconnects does not cancel the run for the others. Errors are shared too:
+every caller of a failed run sees the same exception.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    def __init__(self, *, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.collapsed = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def join(self, key: str) -> Optional[asyncio.Future]:
+        """Return the in-flight future for ``key`` on this loop, counting the caller as collapsed."""
+        if not self.enabled:
+            return None
+        fut = self._calls.get(key)
+        if fut is None or fut.done():
+            return None
+        if fut.get_loop() is not asyncio.get_running_loop():
+            # Left behind by a loop that no longer runs (tests use one loop per case)
+            self._calls.pop(key, None)
+            return None
+        self.collapsed += 1
+        return fut
+
+    def lead(self, key: str) -> asyncio.Future:
+        """Register the caller as the one doing the work for ``key``; settle with ``resolve``/``fail``."""
+        fut = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        if self.enabled:
+            self._calls[key] = fut
+        return fut
+
+    def resolve(self, key: str, fut: asyncio.Future, value: Any) -> None:
+        if self._calls.get(key) is fut:
+            del self._calls[key]
+        if not fut.done():
+            fut.set_result(value)
+
+    def fail(self, key: str, fut: asyncio.Future, exc: BaseException) -> None:
+        if self._calls.get(key) is fut:
+            del self._calls[key]
+        if fut.done():
+            return
+        if isinstance(exc, asyncio.CancelledError):
+            fut.cancel()
+        else:
+            fut.set_exception(exc)
+            # Mark the exception retrieved in case every waiter has already gone away
+            fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run ``fn`` once per key among concurrent callers; returns ``(value, shared)``."""
+        fut = self.join(key)
+        if fut is not None:
+            return await asyncio.shield(fut), True
+        fut = self.lead(key)
+        task = asyncio.ensure_future(fn())
+
+        def _settle(done: asyncio.Future) -> None:
+            if done.cancelled():
+                self.fail(key, fut, asyncio.CancelledError())
+            elif done.exception() is not None:
+                self.fail(key, fut, done.exception())
+            else:
+                self.resolve(key, fut, done.result())
+
+        task.add_done_callback(_settle)
+        return await asyncio.shield(fut), False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+        }
+
+
+__all__ = ["SingleFlight"]
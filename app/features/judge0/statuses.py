@@ -0,0 +1,63 @@
+"""Judge0 CE status ids, and how to derive them for runs we execute ourselves.
+
+The multi-test harness and the local sandbox executor observe raw process outcomes (exit
+code, signal, timeout); these helpers translate them into the status ids Judge0 would
+report so ``_to_code_execution_result`` and the comparison pipeline treat them the same.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+STATUS_DESCRIPTIONS = {
+    1: "In Queue",
+    2: "Processing",
+    3: "Accepted",
+    4: "Wrong Answer",
+    5: "Time Limit Exceeded",
+    6: "Compilation Error",
+    7: "Runtime Error (SIGSEGV)",
+    8: "Runtime Error (SIGXFSZ)",
+    9: "Runtime Error (SIGFPE)",
+    10: "Runtime Error (SIGABRT)",
+    11: "Runtime Error (NZEC)",
+    12: "Runtime Error (Other)",
+    13: "Internal Error",
+    14: "Exec Format Error",
+}
+
+# signal number -> Judge0 status id
+_SIGNAL_STATUS = {11: 7, 25: 8, 8: 9, 6: 10}
+_SIGXCPU = 24
+
+
+def judge0_strip(text: Optional[str]) -> str:
+    """Normalisation Judge0 applies to stdout and expected_output before comparing them."""
+    return "\n".join(line.rstrip() for line in (text or "").split("\n")).rstrip()
+
+
+def status_for_process(
+    returncode: Optional[int],
+    *,
+    timed_out: bool = False,
+    stdout: Optional[str] = None,
+    expected_output: Optional[str] = None,
+) -> Tuple[int, str]:
+    """Map a finished process to ``(status_id, description)``.
+
+    ``returncode`` follows ``subprocess`` conventions: negative values are signals.
+    """
+    if timed_out or returncode == -_SIGXCPU:
+        status_id = 5
+    elif returncode is not None and returncode < 0:
+        status_id = _SIGNAL_STATUS.get(-returncode, 12)
+    elif returncode:
+        status_id = 11
+    elif expected_output is not None and judge0_strip(expected_output) != judge0_strip(stdout):
+        status_id = 4
+    else:
+        status_id = 3
+    return status_id, STATUS_DESCRIPTIONS[status_id]
+
+
+__all__ = ["STATUS_DESCRIPTIONS", "judge0_strip", "status_for_process"]
@@ -0,0 +1,169 @@
+"""In-process cache of question bundles (question row + tests).
+
+Every quick test and submission needs the ``questions`` row and its tests, and published
+questions almost never change, so bundles are kept in an LRU bounded by entry count and
+an approximate byte budget. Entries are keyed by question id and tagged with the content
+version (cache generation) they were loaded under:
+
+* ``invalidate(question_ids)`` drops questions whose row or tests changed;
+* ``invalidate_challenge(challenge_id)`` drops every question of a challenge (regeneration,
+  publishing).
+
+Every invalidation bumps the generation. A fetch records the generation it started under and
+``put`` drops the result if it moved in the meantime, so a slow read can never reinstate
+content that was invalidated while it was in flight. The TTL is only a safety net for edits
+made outside the app.
+Callers mutate bundles (``points`` overrides), so ``get`` and ``put`` copy.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.Core.config import get_settings
+
+from .schemas import QuestionBundleSchema
+
+_ENTRY_OVERHEAD_BYTES = 1024
+_TEST_OVERHEAD_BYTES = 256
+
+def _estimate_size(bundle: QuestionBundleSchema) -> int:
+    size = _ENTRY_OVERHEAD_BYTES
+    for text in (bundle.title, bundle.prompt, bundle.starter_code, bundle.reference_solution, bundle.expected_output):
+        if text:
+            size += len(text)
+    for test in bundle.tests:
+        size += _TEST_OVERHEAD_BYTES + len(test.input or "") + len(test.expected or "")
+    return size
+
+
+class QuestionBundleCache:
+    """LRU + TTL cache of ``QuestionBundleSchema`` with versioned invalidation."""
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int = 32 * 1024 * 1024,
+        max_entries: int = 5000,
+        ttl_seconds: float = 900.0,
+        enabled: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self._entries: "OrderedDict[str, Tuple[QuestionBundleSchema, int, float, int]]" = OrderedDict()
+        self._generation = 0
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def version(self) -> int:
+        """Current generation; take it before fetching and pass it back to ``put``."""
+        return self._generation
+
+    def get(self, question_id: str) -> Optional[QuestionBundleSchema]:
+        if not self.enabled:
+            return None
+        key = str(question_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        bundle, _, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return bundle.model_copy(deep=True)
+
+    def put(self, bundle: QuestionBundleSchema, version: int) -> bool:
+        if not self.enabled:
+            return False
+        key = str(bundle.question_id)
+        if version != self._generation:
+            self.stale_puts += 1
+            return False
+        size = _estimate_size(bundle)
+        if size > self.max_bytes:
+            return False
+        self._drop(key)
+        self._entries[key] = (bundle.model_copy(deep=True), version, time.monotonic() + self.ttl_seconds, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+        return True
+
+    def invalidate(self, question_ids: Iterable[str]) -> int:
+        """Drop the given questions; returns how many were cached."""
+        self._generation += 1
+        self.invalidations += 1
+        dropped = 0
+        for question_id in question_ids:
+            dropped += self._drop(str(question_id))
+        return dropped
+
+    def invalidate_challenge(self, challenge_id: str) -> int:
+        """Drop every cached question of ``challenge_id``; returns how many were cached."""
+        self._generation += 1
+        self.invalidations += 1
+        doomed = [key for key, entry in self._entries.items() if entry[0].challenge_id == str(challenge_id)]
+        for key in doomed:
+            self._drop(key)
+        return len(doomed)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._bytes = 0
+
+    def _drop(self, key: str) -> int:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return 0
+        self._bytes -= entry[3]
+        return 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "generation": self._generation,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+        }
+
+
+def _build_cache() -> QuestionBundleCache:
+    settings = get_settings()
+    return QuestionBundleCache(
+        max_bytes=getattr(settings, "question_bundle_cache_max_bytes", 32 * 1024 * 1024),
+        max_entries=getattr(settings, "question_bundle_cache_max_entries", 5000),
+        ttl_seconds=getattr(settings, "question_bundle_cache_ttl_s", 900.0),
+        enabled=bool(getattr(settings, "question_bundle_cache_enabled", True)),
+    )
+
+
+question_bundle_cache = _build_cache()
+
+__all__ = ["QuestionBundleCache", "question_bundle_cache"]
@@ -4,9 +4,11 @@ from __future__ import annotations
 import json
 import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set
 
+from app.Core.config import get_settings
 from app.DB.supabase import get_supabase
+from app.features.submissions.result_writer import result_writer
 
 _SUMMARY_COLUMNS = {
     "status_id",
@@ -69,10 +71,100 @@ def _serialise_summary_value(key: str, value: Any) -> Any:
     return value
 
 
+def _submission_payload(
+    *,
+    user_id: int,
+    language_id: int,
+    source_code: str,
+    token: Optional[str],
+    stdin: Optional[str],
+    expected_output: Optional[str],
+    challenge_id: Optional[str],
+    question_id: Optional[str],
+    summary: Optional[Dict[str, Any]],
+    results_id: Optional[str],
+) -> Dict[str, Any]:
+    """The ``code_submissions`` row for a run, with ``summary`` mapped onto its columns."""
+    summary = dict(summary or {})
+    now_iso = datetime.now(timezone.utc).isoformat()
+
+    finished_at = summary.get("finished_at")
+    if finished_at is not None:
+        summary["finished_at"] = _iso_timestamp(finished_at)
+
+    additional_meta = summary.get("additional_files")
+    if question_id:
+        payload_meta = dict(additional_meta or {})
+        payload_meta.setdefault("question_id", question_id)
+        summary["additional_files"] = payload_meta
+
+    payload: Dict[str, Any] = {
+        "user_id": user_id,
+        "challenge_id": challenge_id,
+        "question_id": question_id,  # NEW: Add question_id to code_submissions
+        "source_code": source_code,
+        "language_id": language_id,
+        "stdin": stdin,
+        "expected_output": expected_output,
+        "token": token,
+        "created_at": now_iso,
+    }
+    
+    # NEW: Add results_id if provided
+    if results_id:
+        payload["results_id"] = results_id
+        
+    if "finished_at" not in summary:
+        payload["finished_at"] = now_iso
+
+    for key, value in summary.items():
+        if key in _SUMMARY_COLUMNS:
+            coerced = _serialise_summary_value(key, value)
+            if coerced is not None:
+                payload[key] = coerced
+
+    return {k: v for k, v in payload.items() if v is not None}
+
+
+def _returned_id(data: Any) -> Optional[str]:
+    if isinstance(data, list) and data:
+        data = data[0]
+    if isinstance(data, dict):
+        data = data.get("id") or data.get("log_test_batch")
+    return str(data) if data else None
+
+
+def _is_function_missing(exc: Exception, name: str) -> bool:
+    """True when PostgREST/Postgres reports that the function ``name`` is not deployed."""
+    parts = [str(getattr(exc, attr, None) or "") for attr in ("code", "message", "details", "hint")]
+    parts.append(str(exc))
+    text = " ".join(parts).lower()
+    if "pgrst202" in text or "42883" in text:
+        return True
+    return name in text and any(token in text for token in ("schema cache", "does not exist", "could not find"))
+
+
 class CodeResultsRepository:
+    # Functions that turned out not to be deployed, so later batches go straight to the
+    # fallback instead of failing the RPC every time
+    _missing_functions: Set[str] = set()
+
     async def _client(self):
         return await get_supabase()
 
+    def _rpc_available(self, name: str) -> bool:
+        if name in self._missing_functions:
+            return False
+        return bool(getattr(get_settings(), "code_results_batch_rpc", True))
+
+    def _note_missing_function(self, exc: Exception, name: str) -> bool:
+        if not _is_function_missing(exc, name):
+            return False
+        import logging
+        logging.getLogger(__name__).warning(f"{name} function not deployed; using the fallback")
+        CodeResultsRepository._missing_functions = self._missing_functions | {name}
+        return True
+
     async def create_submission(
         self,
         *,
@@ -91,59 +183,25 @@ class CodeResultsRepository:
         logger = logging.getLogger(__name__)
         
         client = await self._client()
-        summary = dict(summary or {})
-        now_iso = datetime.now(timezone.utc).isoformat()
-
-        finished_at = summary.get("finished_at")
-        if finished_at is not None:
-            summary["finished_at"] = _iso_timestamp(finished_at)
-
-        additional_meta = summary.get("additional_files")
-        if question_id:
-            payload_meta = dict(additional_meta or {})
-            payload_meta.setdefault("question_id", question_id)
-            summary["additional_files"] = payload_meta
-
-        payload: Dict[str, Any] = {
-            "user_id": user_id,
-            "challenge_id": challenge_id,
-            "question_id": question_id,  # NEW: Add question_id to code_submissions
-            "source_code": source_code,
-            "language_id": language_id,
-            "stdin": stdin,
-            "expected_output": expected_output,
-            "token": token,
-            "created_at": now_iso,
-        }
-        
-        # NEW: Add results_id if provided
-        if results_id:
-            payload["results_id"] = results_id
-            
-        if "finished_at" not in summary:
-            payload["finished_at"] = now_iso
-
-        for key, value in summary.items():
-            if key in _SUMMARY_COLUMNS:
-                coerced = _serialise_summary_value(key, value)
-                if coerced is not None:
-                    payload[key] = coerced
-
-        payload = {k: v for k, v in payload.items() if v is not None}
+        payload = _submission_payload(
+            user_id=user_id,
+            language_id=language_id,
+            source_code=source_code,
+            token=token,
+            stdin=stdin,
+            expected_output=expected_output,
+            challenge_id=challenge_id,
+            question_id=question_id,
+            summary=summary,
+            results_id=results_id,
+        )
 
         try:
             resp = await client.table("code_submissions").insert(payload).execute()
         except Exception:
             return None
 
-        data = getattr(resp, "data", None)
-        if isinstance(data, list) and data:
-            submission_id = data[0].get("id")
-        elif isinstance(data, dict):
-            submission_id = data.get("id")
-        else:
-            submission_id = None
-        return str(submission_id) if submission_id is not None else None
+        return _returned_id(getattr(resp, "data", None))
 
     async def insert_results(
         self,
@@ -199,7 +257,7 @@ class CodeResultsRepository:
         except Exception:
             return None
 
-    async def log_test_batch(
+    def build_test_batch(
         self,
         *,
         user_id: int,
@@ -212,27 +270,21 @@ class CodeResultsRepository:
         expected_output: Optional[str] = None,
         challenge_id: Optional[str] = None,
         question_id: Optional[str] = None,
-    ) -> Optional[str]:
+    ) -> Dict[str, Any]:
+        """The rows one graded question writes: ``{"p_submission": row, "p_results": rows}``.
+
+        Every id is assigned here, so the submission id is known before anything is written
+        (which is what lets the write-behind writer answer before the rows exist).
+        """
         import logging
         logger = logging.getLogger(__name__)
-        logger.info(f"🔍 log_test_batch called: user={user_id}, question={question_id}, challenge={challenge_id}")
-        """
-        NEW: Fixed to handle circular foreign key relationship properly.
-        Steps:
-        1. Generate results_id upfront
-        2. Insert code_results with that ID (submission_id will be NULL initially)
-        3. Insert code_submissions with the results_id
-        4. Update code_results to link back to submission_id
-        """
+
         records_list = list(test_records)
         effective_summary = dict(summary or {})
         effective_summary.setdefault("number_of_runs", len(records_list) or None)
         
-        # Step 1: Generate result_id upfront
+        # Generate result_id upfront
         result_id = str(uuid.uuid4())
-        
-        # Step 2: Insert code_results FIRST (without submission_id)
-        client = await self._client()
         results_to_insert = []
         
         logger.info(f"📝 Processing {len(records_list)} test records")
@@ -269,17 +321,8 @@ class CodeResultsRepository:
             
             results_to_insert.append(cleaned_record)
             logger.debug(f"   Test {idx}: status={cleaned_record.get('status_id')}, correct={cleaned_record.get('is_correct')}")
-        
-        try:
-            await client.table("code_results").insert(results_to_insert).execute()
-            logger.info(f"✅ Inserted {len(results_to_insert)} code_results records")
-        except Exception as e:
-            logger.error(f"❌ Failed to insert code_results: {e}")
-            print(f"Failed to insert code_results: {e}")
-            return None
-        
-        # Step 3: Create code_submission with results_id
-        submission_id = await self.create_submission(
+
+        submission = _submission_payload(
             user_id=user_id,
             language_id=language_id,
             source_code=source_code,
@@ -289,8 +332,91 @@ class CodeResultsRepository:
             challenge_id=challenge_id,
             question_id=question_id,
             summary=effective_summary,
-            results_id=result_id,  # Link to the code_results we just created
+            results_id=result_id,  # Link to the first code_results row
         )
+        submission["id"] = str(uuid.uuid4())
+        return {"p_submission": submission, "p_results": results_to_insert}
+
+    async def write_test_batches(self, batches: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Write prepared batches; the submission id per batch, ``None`` where one failed.
+
+        Several batches go in one ``log_test_batches`` call and a single batch in one
+        ``log_test_batch`` call (alembic/versions/log_test_batch.sql), each in one
+        transaction. Without the functions, or with CODE_RESULTS_BATCH_RPC=false, every batch
+        takes three separate calls. Raises only when nothing was written.
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+
+        if not batches:
+            return []
+        client = await self._client()
+        if len(batches) > 1 and self._rpc_available("log_test_batches"):
+            try:
+                resp = await client.rpc("log_test_batches", {"p_batches": batches}).execute()
+            except Exception as e:
+                if not self._note_missing_function(e, "log_test_batches"):
+                    raise
+            else:
+                logger.info(f"🎉 log_test_batches stored {len(batches)} graded batches")
+                data = getattr(resp, "data", None)
+                if isinstance(data, list) and len(data) == len(batches):
+                    return [_returned_id(item) for item in data]
+                return [str(batch["p_submission"]["id"]) for batch in batches]
+
+        submission_ids: List[Optional[str]] = []
+        for batch in batches:
+            try:
+                submission_ids.append(await self._write_one(client, batch))
+            except Exception as e:
+                if not submission_ids:
+                    raise
+                logger.error(f"❌ Failed to write graded batch {batch['p_submission']['id']}: {e}")
+                submission_ids.append(None)
+        return submission_ids
+
+    async def _write_one(self, client: Any, batch: Dict[str, Any]) -> Optional[str]:
+        import logging
+        logger = logging.getLogger(__name__)
+
+        if self._rpc_available("log_test_batch"):
+            try:
+                resp = await client.rpc("log_test_batch", batch).execute()
+            except Exception as e:
+                if not self._note_missing_function(e, "log_test_batch"):
+                    raise
+            else:
+                submission_id = _returned_id(getattr(resp, "data", None))
+                logger.info(f"🎉 log_test_batch stored {len(batch['p_results'])} results: submission_id={submission_id}")
+                return submission_id
+        return await self._write_separately(client, batch)
+
+    async def _write_separately(self, client: Any, batch: Dict[str, Any]) -> Optional[str]:
+        """
+        NEW: Fixed to handle circular foreign key relationship properly.
+        Steps:
+        1. Insert code_results (submission_id will be NULL initially)
+        2. Insert code_submissions with the results_id
+        3. Update code_results to link back to submission_id
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+
+        results_to_insert = batch["p_results"]
+        try:
+            await client.table("code_results").insert(results_to_insert).execute()
+            logger.info(f"✅ Inserted {len(results_to_insert)} code_results records")
+        except Exception as e:
+            logger.error(f"❌ Failed to insert code_results: {e}")
+            print(f"Failed to insert code_results: {e}")
+            return None
+        
+        try:
+            resp = await client.table("code_submissions").insert(batch["p_submission"]).execute()
+            submission_id = _returned_id(getattr(resp, "data", None))
+        except Exception as e:
+            logger.error(f"❌ Failed to insert code_submissions: {e}")
+            submission_id = None
         
         if not submission_id:
             logger.error(f"❌ Failed to create code_submission")
@@ -298,7 +424,7 @@ class CodeResultsRepository:
         
         logger.info(f"✅ Created code_submission: {submission_id}")
         
-        # Step 4: Update code_results to link back to submission
+        # Update code_results to link back to submission
         try:
             result_ids = [r["id"] for r in results_to_insert]
             await client.table("code_results").update({
@@ -309,9 +435,53 @@ class CodeResultsRepository:
             logger.error(f"❌ Failed to update code_results with submission_id: {e}")
             print(f"Failed to update code_results with submission_id: {e}")
         
-        logger.info(f"🎉 log_test_batch completed successfully: submission_id={submission_id}")
         return submission_id
 
+    async def log_test_batch(
+        self,
+        *,
+        user_id: int,
+        language_id: int,
+        source_code: str,
+        token: Optional[str],
+        test_records: Iterable[Dict[str, Any]],
+        summary: Optional[Dict[str, Any]] = None,
+        stdin: Optional[str] = None,
+        expected_output: Optional[str] = None,
+        challenge_id: Optional[str] = None,
+        question_id: Optional[str] = None,
+    ) -> Optional[str]:
+        """Store one graded question's submission and result rows; returns the submission id.
+
+        With CODE_RESULTS_WRITE_BEHIND the rows are queued on ``result_writer`` and the id is
+        returned before they are written. No caller reads the rows back by id straight away
+        (grading keeps the results in memory; analytics reads by user later), so none waits;
+        a caller that does must use ``result_writer.wait_written`` as the barrier.
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.info(f"🔍 log_test_batch called: user={user_id}, question={question_id}, challenge={challenge_id}")
+
+        batch = self.build_test_batch(
+            user_id=user_id,
+            language_id=language_id,
+            source_code=source_code,
+            token=token,
+            test_records=test_records,
+            summary=summary,
+            stdin=stdin,
+            expected_output=expected_output,
+            challenge_id=challenge_id,
+            question_id=question_id,
+        )
+        if result_writer.enabled:
+            return await result_writer.submit(batch)
+        try:
+            [submission_id] = await self.write_test_batches([batch])
+        except Exception as e:
+            logger.error(f"❌ log_test_batch failed: {e}")
+            return None
+        return submission_id
 
 code_results_repository = CodeResultsRepository()
 
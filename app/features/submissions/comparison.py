@@ -1,10 +1,24 @@
-"""Comparison and normalisation pipeline with asynchronous strategy fan-out."""
+"""Comparison and normalisation pipeline.
+
+The expected side of a comparison is an ``ExpectedProfile``: its canonical forms (trimmed,
+whitespace-collapsed, parsed literal, token set, line counter, digest) are computed on first
+use and kept, so a profile stored with the test is normalised once rather than on every
+submission. Strategies run in priority order and evaluation stops at the first one that
+passes, which is the one AUTO would report anyway.
+
+``compare_many`` evaluates all of a question's tests in one pass. Pairs run inline on the
+event loop; a pair goes to the thread pool only when a strategy marked ``expensive`` would see
+more than ``INLINE_COMPARE_MAX_CHARS`` of output. Actual outputs of ``streaming_threshold``
+characters or more are never normalised as a whole: STRICT, TRIM_EOL, whitespace and the
+large-output hash walk them line by line (see ``streaming``).
+"""
 
 from __future__ import annotations
 
 import asyncio
 import ast
 import hashlib
+import json
 import math
 import os
 import time
@@ -13,11 +27,15 @@ from collections import Counter
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from functools import partial
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.features.submissions import streaming
 
 DEFAULT_FLOAT_EPS = 1e-6
 LARGE_OUTPUT_THRESHOLD = 2 * 1024 * 1024  # 2MB
 MAX_COMPARATOR_THREADS = max(1, min(16, int(os.getenv("COMPARE_MAX_WORKERS", "4"))))
+INLINE_COMPARE_MAX_CHARS = max(0, int(os.getenv("COMPARE_INLINE_MAX_CHARS", "65536")))
+STREAMING_COMPARE_MIN_CHARS = max(0, int(os.getenv("COMPARE_STREAMING_MIN_CHARS", "262144")))
 
 
 _COMPARATOR_EXECUTOR = ThreadPoolExecutor(
@@ -47,6 +65,7 @@ class CompareConfig:
     token_set_size_limit: int = 512
     case_insensitive: bool = False
     line_set_size_limit: int = 256
+    streaming_threshold: int = STREAMING_COMPARE_MIN_CHARS
 
     def clone(self) -> CompareConfig:
         return CompareConfig(
@@ -56,6 +75,7 @@ class CompareConfig:
             token_set_size_limit=self.token_set_size_limit,
             case_insensitive=self.case_insensitive,
             line_set_size_limit=self.line_set_size_limit,
+            streaming_threshold=self.streaming_threshold,
         )
 
 
@@ -78,7 +98,7 @@ class CompareResult:
     attempts: List[CompareAttempt] = field(default_factory=list)
 
 
-StrategyHandler = Callable[[str, str, CompareConfig, Dict[str, Any]], Tuple[Optional[bool], List[str], Optional[str]]]
+_UNSET = object()
 
 
 def _unicode_normalise(s: str, form: str = "NFC") -> str:
@@ -152,6 +172,76 @@ def _token_set(s: str) -> set[str]:
     return {tok for tok in s.split() if tok}
 
 
+def _stripped_lines(s: str) -> List[str]:
+    return [ln.strip() for ln in s.splitlines() if ln.strip()]
+
+
+class ExpectedProfile:
+    """An expected output with its canonical forms computed once, on first use.
+
+    ``text`` is the output after ``unicode_nf`` normalisation and CRLF folding; every other
+    form derives from it. Profiles are never mutated after a form is computed, so copies of
+    a cached question bundle share one instance.
+    """
+
+    __slots__ = ("raw", "unicode_nf", "text", "_forms")
+
+    def __init__(self, expected: Optional[str], unicode_nf: str = "NFC") -> None:
+        self.raw = expected or ""
+        self.unicode_nf = unicode_nf
+        self.text = _unicode_normalise(self.raw, unicode_nf).replace("\r\n", "\n")
+        self._forms: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> ExpectedProfile:
+        return self
+
+    def _form(self, name: str, build: Callable[[str], Any]) -> Any:
+        value = self._forms.get(name, _UNSET)
+        if value is _UNSET:
+            value = build(self.text)
+            self._forms[name] = value
+        return value
+
+    def trimmed_eol(self) -> str:
+        return self._form("trim_eol", _strip_eol)
+
+    def collapsed_whitespace(self) -> str:
+        return self._form("ws_conservative", _collapse_whitespace)
+
+    def without_whitespace(self) -> str:
+        return self._form("ws_aggressive", _remove_all_whitespace)
+
+    def casefolded(self) -> str:
+        return self._form("casefold", str.casefold)
+
+    def literal(self) -> Any:
+        """``ast.literal_eval`` of the text, or ``None`` when it is not a literal."""
+        return self._form("py_literal", _literal_parse)
+
+    def token_set(self) -> set[str]:
+        return self._form("token_set", _token_set)
+
+    def lines(self) -> List[str]:
+        return self._form("lines", _stripped_lines)
+
+    def line_counter(self) -> Counter:
+        return self._form("line_counter", lambda _text: Counter(self.lines()))
+
+    def sha256(self) -> str:
+        return self._form("sha256", lambda text: hashlib.sha256(text.encode()).hexdigest())
+
+
+StrategyHandler = Callable[[ExpectedProfile, str, CompareConfig, Dict[str, Any]], Tuple[Optional[bool], List[str], Optional[str]]]
+# Same, but given the raw actual output and a callable that returns its full normalised copy
+StreamingHandler = Callable[
+    [ExpectedProfile, str, CompareConfig, Dict[str, Any], Callable[[], str]],
+    Tuple[Optional[bool], List[str], Optional[str]],
+]
+
+
 class ComparatorStrategy:
     def __init__(
         self,
@@ -160,25 +250,46 @@ class ComparatorStrategy:
         *,
         priority: int = 100,
         include_in_auto: bool = True,
+        expensive: bool = False,
+        streaming_handler: Optional[StreamingHandler] = None,
     ) -> None:
         self.mode = mode
         self._handler = handler
+        self._streaming_handler = streaming_handler
         self.priority = priority
         self.include_in_auto = include_in_auto
+        self.expensive = expensive
+
+    def should_offload(self, expected: ExpectedProfile, actual: str) -> bool:
+        return self.expensive and len(expected) + len(actual) > INLINE_COMPARE_MAX_CHARS
 
-    async def evaluate(
+    def evaluate(
         self,
-        expected: str,
+        expected: ExpectedProfile,
         actual: str,
         cfg: CompareConfig,
         overrides: Dict[str, Any],
     ) -> CompareAttempt:
         start = time.perf_counter()
-        loop = asyncio.get_running_loop()
-        outcome, normalisations, reason = await loop.run_in_executor(
-            _COMPARATOR_EXECUTOR,
-            partial(self._handler, expected, actual, cfg, overrides),
-        )
+        outcome, normalisations, reason = self._handler(expected, actual, cfg, overrides)
+        return self._attempt(outcome, normalisations, reason, start)
+
+    def evaluate_streaming(
+        self,
+        expected: ExpectedProfile,
+        actual_raw: str,
+        cfg: CompareConfig,
+        overrides: Dict[str, Any],
+        materialise: Callable[[], str],
+    ) -> CompareAttempt:
+        """Evaluate against the raw actual output; ``materialise`` returns the full normalised copy."""
+        if self._streaming_handler is None:
+            return self.evaluate(expected, materialise(), cfg, overrides)
+        start = time.perf_counter()
+        outcome, normalisations, reason = self._streaming_handler(expected, actual_raw, cfg, overrides, materialise)
+        return self._attempt(outcome, normalisations, reason, start)
+
+    def _attempt(self, outcome: Optional[bool], normalisations: List[str], reason: Optional[str], start: float) -> CompareAttempt:
         duration_ms = (time.perf_counter() - start) * 1000.0
         return CompareAttempt(
             mode=self.mode,
@@ -204,7 +315,7 @@ class ComparatorRegistry:
         if not mode or mode == ComparisonMode.AUTO:
             return sorted(
                 (self._strategies[name] for name in self._auto_order),
-                key=lambda strat: strat.priority,
+                key=lambda strat: (strat.priority, strat.mode),
             )
         strat = self._strategies.get(mode)
         return [strat] if strat else []
@@ -219,24 +330,21 @@ class ComparatorRegistry:
 registry = ComparatorRegistry()
 
 
-def _handle_strict(exp: str, act: str, cfg: CompareConfig, overrides: Dict[str, Any]) -> Tuple[Optional[bool], List[str], Optional[str]]:
-    outcome = exp == act
+def _handle_strict(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any]) -> Tuple[Optional[bool], List[str], Optional[str]]:
+    outcome = exp.text == act
     return (outcome, [], None if outcome else "Mismatch under STRICT")
 
 
-def _handle_trim_eol(exp: str, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
-    exp2, act2 = _strip_eol(exp), _strip_eol(act)
-    if exp2 == act2:
+def _handle_trim_eol(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
+    if exp.trimmed_eol() == _strip_eol(act):
         return True, ["trim_eol"], None
     return None, ["trim_eol"], None
 
 
-def _handle_whitespace(exp: str, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
-    exp2, act2 = _collapse_whitespace(exp), _collapse_whitespace(act)
-    if exp2 == act2:
+def _handle_whitespace(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
+    if exp.collapsed_whitespace() == _collapse_whitespace(act):
         return True, ["ws_conservative"], None
-    exp3, act3 = _remove_all_whitespace(exp), _remove_all_whitespace(act)
-    if exp3 == act3:
+    if exp.without_whitespace() == _remove_all_whitespace(act):
         return True, ["ws_aggressive"], None
     return None, ["ws_checked"], None
 
@@ -252,17 +360,17 @@ def _should_casefold(cfg: CompareConfig, overrides: Dict[str, Any]) -> bool:
     return cfg.case_insensitive
 
 
-def _handle_casefold(exp: str, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
+def _handle_casefold(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
     if not _should_casefold(cfg, overrides):
         return None, [], None
-    exp_cf, act_cf = exp.casefold(), act.casefold()
-    if exp_cf == act_cf:
+    if exp.casefolded() == act.casefold():
         return True, ["casefold"], None
     return False, ["casefold"], "Case-insensitive comparison failed"
 
 
-def _handle_literal(exp: str, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
-    pe, pa = _literal_parse(exp), _literal_parse(act)
+def _handle_literal(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
+    pe = exp.literal()
+    pa = _literal_parse(act) if pe is not None else None
     if pe is None or pa is None:
         return None, ["py_literal"], None
     if _deep_equal(pe, pa, cfg):
@@ -284,9 +392,12 @@ def _resolve_eps(cfg: CompareConfig, overrides: Dict[str, Any]) -> float:
     return cfg.float_eps
 
 
-def _handle_float_eps(exp: str, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
-    pe, pa = _literal_parse(exp), _literal_parse(act)
-    if pe is None or pa is None or not (_is_numeric(pe) and _is_numeric(pa)):
+def _handle_float_eps(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
+    pe = exp.literal()
+    if not _is_numeric(pe):
+        return None, [], None
+    pa = _literal_parse(act)
+    if pa is None or not _is_numeric(pa):
         return None, [], None
     eps = _resolve_eps(cfg, overrides)
     ok = _float_equal(float(pe), float(pa), eps)
@@ -310,11 +421,11 @@ def _resolve_token_limit(cfg: CompareConfig, overrides: Dict[str, Any]) -> int:
     return cfg.token_set_size_limit
 
 
-def _handle_token_set(exp: str, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
+def _handle_token_set(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
     limit = max(0, _resolve_token_limit(cfg, overrides))
     if limit and (len(exp) > limit or len(act) > limit):
         return None, [f"token_limit={limit}"], None
-    if _token_set(exp) == _token_set(act):
+    if exp.token_set() == _token_set(act):
         return True, ["token_set"], None
     return False, ["token_set"], "Token sets differ"
 
@@ -333,33 +444,147 @@ def _resolve_line_limit(cfg: CompareConfig, overrides: Dict[str, Any]) -> int:
     return cfg.line_set_size_limit
 
 
-def _handle_line_set(exp: str, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
+def _handle_line_set(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any]):
     limit = max(0, _resolve_line_limit(cfg, overrides))
     if limit == 0:
         return None, [], None
 
-    expected_lines = [ln.strip() for ln in exp.splitlines() if ln.strip()]
-    actual_lines = [ln.strip() for ln in act.splitlines() if ln.strip()]
+    expected_lines = exp.lines()
+    if not expected_lines:
+        return None, [], None
+    actual_lines = _stripped_lines(act)
+    if not actual_lines:
+        return None, [], None
+
+    if len(expected_lines) > limit or len(actual_lines) > limit:
+        return None, [f"line_limit={limit}"], None
+
+    if exp.line_counter() == Counter(actual_lines):
+        return True, ["line_set"], None
+    return False, ["line_set"], "Line sets differ"
 
-    if not expected_lines or not actual_lines:
+
+def _stream_strict(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any], materialise: Callable[[], str]):
+    outcome = streaming.strict_equal(exp.text, act, cfg.unicode_nf)
+    return (outcome, [], None if outcome else "Mismatch under STRICT")
+
+
+def _stream_trim_eol(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any], materialise: Callable[[], str]):
+    if streaming.trim_eol_equal(exp.trimmed_eol(), act, cfg.unicode_nf):
+        return True, ["trim_eol"], None
+    return None, ["trim_eol"], None
+
+
+def _stream_whitespace(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any], materialise: Callable[[], str]):
+    if streaming.collapsed_whitespace_equal(exp.collapsed_whitespace(), act, cfg.unicode_nf):
+        return True, ["ws_conservative"], None
+    if streaming.no_whitespace_equal(exp.without_whitespace(), act, cfg.unicode_nf):
+        return True, ["ws_aggressive"], None
+    return None, ["ws_checked"], None
+
+
+def _stream_line_set(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any], materialise: Callable[[], str]):
+    limit = max(0, _resolve_line_limit(cfg, overrides))
+    if limit == 0:
+        return None, [], None
+
+    expected_lines = exp.lines()
+    if not expected_lines:
+        return None, [], None
+
+    # Collect at most limit + 1 lines: past the limit the outcome no longer depends on them
+    actual_lines: List[str] = []
+    for segment in streaming.iter_lines(act, cfg.unicode_nf):
+        for ln in segment.splitlines():
+            stripped = ln.strip()
+            if stripped:
+                actual_lines.append(stripped)
+        if len(actual_lines) > limit:
+            break
+    if not actual_lines:
         return None, [], None
 
     if len(expected_lines) > limit or len(actual_lines) > limit:
         return None, [f"line_limit={limit}"], None
 
-    if Counter(expected_lines) == Counter(actual_lines):
+    if exp.line_counter() == Counter(actual_lines):
         return True, ["line_set"], None
     return False, ["line_set"], "Line sets differ"
 
 
-registry.register(ComparatorStrategy(ComparisonMode.STRICT, _handle_strict, priority=0))
-registry.register(ComparatorStrategy(ComparisonMode.TRIM_EOL, _handle_trim_eol, priority=10))
-registry.register(ComparatorStrategy(ComparisonMode.NORMALISE_WHITESPACE, _handle_whitespace, priority=20))
-registry.register(ComparatorStrategy(ComparisonMode.CASE_INSENSITIVE, _handle_casefold, priority=25))
-registry.register(ComparatorStrategy(ComparisonMode.CANONICAL_PY_LITERAL, _handle_literal, priority=30))
-registry.register(ComparatorStrategy(ComparisonMode.FLOAT_EPS, _handle_float_eps, priority=40))
-registry.register(ComparatorStrategy(ComparisonMode.TOKEN_SET, _handle_token_set, priority=50))
-registry.register(ComparatorStrategy(ComparisonMode.LINE_SET, _handle_line_set, priority=45))
+def _stream_casefold(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any], materialise: Callable[[], str]):
+    if not _should_casefold(cfg, overrides):
+        return None, [], None
+    return _handle_casefold(exp, materialise(), cfg, overrides)
+
+
+def _stream_literal(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any], materialise: Callable[[], str]):
+    if exp.literal() is None:
+        return None, ["py_literal"], None
+    return _handle_literal(exp, materialise(), cfg, overrides)
+
+
+def _stream_float_eps(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any], materialise: Callable[[], str]):
+    if not _is_numeric(exp.literal()):
+        return None, [], None
+    return _handle_float_eps(exp, materialise(), cfg, overrides)
+
+
+def _stream_token_set(exp: ExpectedProfile, act: str, cfg: CompareConfig, overrides: Dict[str, Any], materialise: Callable[[], str]):
+    limit = max(0, _resolve_token_limit(cfg, overrides))
+    if limit and (len(exp) > limit or streaming.normalised_length(act, cfg.unicode_nf) > limit):
+        return None, [f"token_limit={limit}"], None
+    return _handle_token_set(exp, materialise(), cfg, overrides)
+
+
+registry.register(ComparatorStrategy(ComparisonMode.STRICT, _handle_strict, priority=0, streaming_handler=_stream_strict))
+registry.register(ComparatorStrategy(ComparisonMode.TRIM_EOL, _handle_trim_eol, priority=10, streaming_handler=_stream_trim_eol))
+registry.register(
+    ComparatorStrategy(
+        ComparisonMode.NORMALISE_WHITESPACE,
+        _handle_whitespace,
+        priority=20,
+        expensive=True,
+        streaming_handler=_stream_whitespace,
+    )
+)
+registry.register(ComparatorStrategy(ComparisonMode.CASE_INSENSITIVE, _handle_casefold, priority=25, streaming_handler=_stream_casefold))
+registry.register(
+    ComparatorStrategy(
+        ComparisonMode.CANONICAL_PY_LITERAL,
+        _handle_literal,
+        priority=30,
+        expensive=True,
+        streaming_handler=_stream_literal,
+    )
+)
+registry.register(
+    ComparatorStrategy(
+        ComparisonMode.FLOAT_EPS,
+        _handle_float_eps,
+        priority=40,
+        expensive=True,
+        streaming_handler=_stream_float_eps,
+    )
+)
+registry.register(
+    ComparatorStrategy(
+        ComparisonMode.TOKEN_SET,
+        _handle_token_set,
+        priority=50,
+        expensive=True,
+        streaming_handler=_stream_token_set,
+    )
+)
+registry.register(
+    ComparatorStrategy(
+        ComparisonMode.LINE_SET,
+        _handle_line_set,
+        priority=45,
+        expensive=True,
+        streaming_handler=_stream_line_set,
+    )
+)
 
 
 def _apply_overrides(base_cfg: CompareConfig, overrides: Optional[Dict[str, Any]]) -> CompareConfig:
@@ -396,29 +621,38 @@ def _apply_overrides(base_cfg: CompareConfig, overrides: Optional[Dict[str, Any]
             cfg.line_set_size_limit = int(overrides["line_set_limit"])
         except Exception:
             pass
+    if "streaming_threshold" in overrides:
+        try:
+            cfg.streaming_threshold = int(overrides["streaming_threshold"])
+        except Exception:
+            pass
     return cfg
 
 
-async def compare(
-    expected: str,
+def _normalise_actual(actual: str, nf: str) -> str:
+    return _unicode_normalise(actual, nf).replace("\r\n", "\n")
+
+
+def _compare_prepared(
+    profile: ExpectedProfile,
     actual: str,
-    cfg: Optional[CompareConfig] = None,
+    effective_cfg: CompareConfig,
+    strategies: List[ComparatorStrategy],
+    overrides: Dict[str, Any],
     *,
-    mode: Optional[str] = None,
-    compare_config: Optional[Dict[str, Any]] = None,
+    streamed: bool = False,
 ) -> CompareResult:
-    base_cfg = cfg or CompareConfig()
-    effective_cfg = _apply_overrides(base_cfg, compare_config)
-    base_norms: List[str] = []
-
-    expected_norm = _unicode_normalise(expected or "", effective_cfg.unicode_nf).replace("\r\n", "\n")
-    actual_norm = _unicode_normalise(actual or "", effective_cfg.unicode_nf).replace("\r\n", "\n")
-    base_norms.append(f"unicode_{effective_cfg.unicode_nf.lower()}")
+    """Compare one pair. ``actual`` is already normalised, or raw when ``streamed``."""
+    nf = effective_cfg.unicode_nf
+    base_norms = [f"unicode_{nf.lower()}"]
 
     threshold = max(0, effective_cfg.large_output_threshold)
-    if threshold and (len(expected_norm) >= threshold or len(actual_norm) >= threshold):
-        exp_hash = hashlib.sha256(expected_norm.encode()).hexdigest()
-        act_hash = hashlib.sha256(actual_norm.encode()).hexdigest()
+    if threshold and (
+        len(profile) >= threshold
+        or (streaming.normalised_length(actual, nf) if streamed else len(actual)) >= threshold
+    ):
+        exp_hash = profile.sha256()
+        act_hash = streaming.sha256_hexdigest(actual, nf) if streamed else hashlib.sha256(actual.encode()).hexdigest()
         base_norms.append(f"hash_threshold={threshold}")
         if exp_hash == act_hash:
             return CompareResult(True, ComparisonMode.HASH_SHA256, base_norms, None)
@@ -429,34 +663,35 @@ async def compare(
             "Hash mismatch for large output",
         )
 
-    if expected_norm == actual_norm:
+    if streaming.strict_equal(profile.text, actual, nf) if streamed else profile.text == actual:
         return CompareResult(True, ComparisonMode.STRICT, base_norms, None)
 
-    strategies = registry.for_mode(mode)
     if not strategies:
         return CompareResult(False, None, base_norms, "No comparator strategies available")
 
-    overrides = compare_config or {}
-    tasks: List[tuple[ComparatorStrategy, asyncio.Task[CompareAttempt]]] = []
     attempts: List[CompareAttempt] = []
-
-    async with asyncio.TaskGroup() as tg:
-        for strat in strategies:
-            task = tg.create_task(strat.evaluate(expected_norm, actual_norm, effective_cfg, overrides))
-            tasks.append((strat, task))
-
-    for strat, task in tasks:
-        attempt = task.result()
+    failure_attempt: Optional[CompareAttempt] = None
+    materialised: List[str] = []
+
+    def _materialise() -> str:
+        # Only strategies without a streaming form pay for the full normalised copy, once
+        if not materialised:
+            materialised.append(_normalise_actual(actual, nf))
+        return materialised[0]
+
+    # The highest-priority pass wins, so nothing after it can change the result; a failure
+    # only counts when no later strategy passes, so keep going after one.
+    for strat in strategies:
+        if streamed:
+            attempt = strat.evaluate_streaming(profile, actual, effective_cfg, overrides, _materialise)
+        else:
+            attempt = strat.evaluate(profile, actual, effective_cfg, overrides)
         attempts.append(attempt)
-
-    attempts.sort(key=lambda att: (att.priority, att.mode))
-
-    success_attempt = next((att for att in attempts if att.passed is True), None)
-    failure_attempt = next((att for att in attempts if att.passed is False), None)
-
-    if success_attempt:
-        norms = base_norms + success_attempt.normalisations
-        return CompareResult(True, success_attempt.mode, norms, None, attempts=attempts)
+        if attempt.passed is True:
+            norms = base_norms + attempt.normalisations
+            return CompareResult(True, attempt.mode, norms, None, attempts=attempts)
+        if attempt.passed is False and failure_attempt is None:
+            failure_attempt = attempt
 
     if failure_attempt:
         norms = base_norms + failure_attempt.normalisations
@@ -466,6 +701,88 @@ async def compare(
     return CompareResult(False, None, base_norms, "No comparator matched", attempts=attempts)
 
 
+def _config_key(compare_config: Optional[Dict[str, Any]]) -> str:
+    if not compare_config:
+        return ""
+    try:
+        return json.dumps(compare_config, sort_keys=True, default=str)
+    except Exception:
+        return repr(sorted(compare_config.items(), key=lambda item: str(item[0])))
+
+
+async def compare_many(
+    pairs: Sequence[Tuple[Union[str, ExpectedProfile], Optional[str]]],
+    configs: Optional[Sequence[Tuple[Optional[str], Optional[Dict[str, Any]]]]] = None,
+    cfg: Optional[CompareConfig] = None,
+) -> List[CompareResult]:
+    """Compare every ``(expected, actual)`` pair in one pass; results come back in order.
+
+    ``configs`` holds a ``(mode, compare_config)`` per pair (AUTO with no overrides when
+    omitted). Effective configs, strategy lists and normalised actual outputs are shared by
+    pairs that use the same ones. Pairs run inline unless an expensive strategy would see
+    more than ``INLINE_COMPARE_MAX_CHARS``; those run concurrently on the comparator pool.
+    """
+    base_cfg = cfg or CompareConfig()
+    effective_cfgs: Dict[str, CompareConfig] = {}
+    strategies_by_mode: Dict[Optional[str], List[ComparatorStrategy]] = {}
+    actual_norms: Dict[Tuple[str, str], str] = {}
+    results: List[Optional[CompareResult]] = [None] * len(pairs)
+    offloaded: List[Tuple[int, Any]] = []
+
+    for index, (expected, actual) in enumerate(pairs):
+        mode, compare_config = configs[index] if configs is not None else (None, None)
+
+        key = _config_key(compare_config)
+        effective_cfg = effective_cfgs.get(key)
+        if effective_cfg is None:
+            effective_cfg = effective_cfgs[key] = _apply_overrides(base_cfg, compare_config)
+        nf = effective_cfg.unicode_nf
+
+        if isinstance(expected, ExpectedProfile):
+            profile = expected if expected.unicode_nf == nf else ExpectedProfile(expected.raw, nf)
+        else:
+            profile = ExpectedProfile(expected, nf)
+
+        strategies = strategies_by_mode.get(mode)
+        if strategies is None:
+            strategies = strategies_by_mode[mode] = registry.for_mode(mode)
+
+        actual = actual or ""
+        streamed = bool(effective_cfg.streaming_threshold) and len(actual) >= effective_cfg.streaming_threshold
+        if not streamed:
+            actual_key = (nf, actual)
+            normalised = actual_norms.get(actual_key)
+            if normalised is None:
+                normalised = actual_norms[actual_key] = _normalise_actual(actual, nf)
+            actual = normalised
+
+        job = partial(_compare_prepared, profile, actual, effective_cfg, strategies, compare_config or {}, streamed=streamed)
+        if any(strat.should_offload(profile, actual) for strat in strategies):
+            offloaded.append((index, job))
+        else:
+            results[index] = job()
+
+    if offloaded:
+        loop = asyncio.get_running_loop()
+        outcomes = await asyncio.gather(*(loop.run_in_executor(_COMPARATOR_EXECUTOR, job) for _, job in offloaded))
+        for (index, _), outcome in zip(offloaded, outcomes):
+            results[index] = outcome
+
+    return [result for result in results if result is not None]
+
+
+async def compare(
+    expected: Union[str, ExpectedProfile],
+    actual: str,
+    cfg: Optional[CompareConfig] = None,
+    *,
+    mode: Optional[str] = None,
+    compare_config: Optional[Dict[str, Any]] = None,
+) -> CompareResult:
+    results = await compare_many([(expected, actual)], [(mode, compare_config)], cfg)
+    return results[0]
+
+
 def maybe_hash_large(expected: str) -> Optional[str]:
     if expected is None:
         return None
@@ -497,7 +814,9 @@ __all__ = [
     "CompareConfig",
     "CompareAttempt",
     "CompareResult",
+    "ExpectedProfile",
     "compare",
+    "compare_many",
     "maybe_hash_large",
     "supported_modes",
     "resolve_mode",
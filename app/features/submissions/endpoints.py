@@ -2,10 +2,12 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timezone
-from typing import Dict, Optional, Any
+from datetime import datetime
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Header, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, model_validator
 
 from app.common.deps import CurrentUser, get_current_user, require_role
@@ -15,15 +17,15 @@ from app.features.submissions.schemas import (
     QuestionSubmissionRequest,
     QuestionBundleSchema,
     BatchSubmissionEntry,
+    ChallengeQuestionResultSchema,
 )
 from app.features.submissions.service import submissions_service
 from app.features.submissions.repository import submissions_repository
 from app.features.challenges.repository import challenge_repository
-from app.features.achievements.service import achievements_service
-from app.features.achievements.schemas import CheckAchievementsRequest
-
-# New imports for persistence
-from app.DB.supabase import get_supabase
+from app.features.judge0.admission import AdmissionRejected
+from app.features.submissions.jobs import JobManagerClosed, JobQueueFull, SubmissionJob, submission_jobs
+from app.features.submissions.rewards import ChallengeFinalised, apply_challenge_rewards, reward_pipeline
+from app.Core.config import get_settings
 
 logger = logging.getLogger("submissions")
 
@@ -33,6 +35,15 @@ router = APIRouter(
 router_mixed = APIRouter(prefix="/submissions", tags=["submissions"])
 
 
+def _busy(exc: AdmissionRejected) -> HTTPException:
+    """Judge0 is saturated: tell the client when to retry instead of queueing past its deadline."""
+    return HTTPException(
+        status_code=429,
+        detail=exc.reason,
+        headers={"Retry-After": exc.retry_after_header},
+    )
+
+
 class BatchSubmissionsPayload(BaseModel):
     submissions: Dict[str, BatchSubmissionEntry]
     duration_seconds: Optional[int] = None
@@ -108,6 +119,8 @@ async def quick_test_question_by_qid(
             perform_award=False,
             record_result=False,
         )
+    except AdmissionRejected as exc:
+        raise _busy(exc)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
@@ -159,6 +172,8 @@ async def submit_question(
             language_id=payload.language_id,
             include_private=payload.include_private,
         )
+    except AdmissionRejected as exc:
+        raise _busy(exc)
     except ValueError as exc:
         message = str(exc)
         status_map = {
@@ -178,12 +193,18 @@ async def submit_question(
     summary="Submit source code for an active challenge snapshot",
     description=(
         "Runs each snapshot submission through Judge0 (up to five base questions), persists the attempt, "
-        "and triggers ELO/GPA/badge updates for the student."
+        "and queues ELO/GPA/badge updates for the student. With the reward pipeline on (REWARD_PIPELINE, "
+        "the default) the response has `achievement_summary: null`; fetch the summary from "
+        "/submissions/rewards/{attempt_id}."
     ),
 )
 async def submit_challenge(
     challenge_id: str,
     payload: BatchSubmissionsPayload = Body(...),
+    mode: Literal["sync", "job"] = Query(
+        "sync",
+        description="`job` returns 202 with a job id; follow progress at /submissions/jobs/{job_id}[/events]",
+    ),
     current_user: CurrentUser = Depends(get_current_user),
 ):
     """Full snapshot submit flow using expected-output grading for each question."""
@@ -196,345 +217,233 @@ async def submit_challenge(
         logger.error(f"   ❌ Failed to convert user_id to int: {e}")
         raise HTTPException(status_code=400, detail="invalid_student_number")
 
-    try:
-        attempt = await challenge_repository.create_or_get_open_attempt(challenge_id, student_number)
-        attempt_id = attempt.get("id")
-        snapshot = attempt.get("snapshot_questions") or []
-
-        started_at_raw = attempt.get("started_at")
-        started_at_dt: Optional[datetime] = None
-        if started_at_raw:
+    if mode == "job":
+        async def _run_job(job: SubmissionJob) -> Dict[str, Any]:
             try:
-                started_at_dt = datetime.fromisoformat(str(started_at_raw).replace("Z", "+00:00"))
-            except Exception:
-                started_at_dt = None
-
-        # Build language_overrides map and question_weights from snapshot
-        language_overrides = {str(q.get("question_id")): q.get("language_id") for q in snapshot}
-        question_weights = {str(q.get("question_id")): q.get("points", 1) for q in snapshot}
-        attempt_counts = {str(q.get("question_id")): int(q.get("attempts_used", 0)) for q in snapshot}
-        subs_map = payload.submissions
+                return await _process_challenge_submission(challenge_id, payload, student_number, progress=job.publish)
+            except AdmissionRejected as exc:
+                raise _busy(exc)
 
-        breakdown = await submissions_service.submit_challenge(
-            challenge_id=challenge_id,
-            attempt_id=attempt_id,
-            submissions=subs_map,
-            language_overrides=language_overrides,
-            question_weights=question_weights,
-            user_id=student_number,
-            tier=attempt.get("tier") or "base",
-            attempt_counts=attempt_counts,
-            max_attempts=3,
-            started_at=started_at_dt,
-            duration_seconds=payload.duration_seconds,
-            perform_award=False,
+        try:
+            job = submission_jobs.submit(user_id=student_number, challenge_id=challenge_id, runner=_run_job)
+        except JobQueueFull as exc:
+            raise HTTPException(
+                status_code=429,
+                detail="submission_queue_full",
+                headers={"Retry-After": str(max(1, int(exc.retry_after + 0.999)))},
+            )
+        except JobManagerClosed:
+            # Shutting down; the replacement instance takes the retry
+            raise HTTPException(status_code=503, detail="server_shutting_down", headers={"Retry-After": "5"})
+        status_url = f"/submissions/jobs/{job.id}"
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job.id,
+                "status": job.status,
+                "status_url": status_url,
+                "events_url": f"{status_url}/events",
+            },
+            headers={"Location": status_url},
         )
 
-        # Post-process awarding: batch the passed public tests and call RPCs in a tight loop
-        awards: Dict[str, list] = {}
-
-        # Finalize attempt using service results
-        await challenge_repository.finalize_attempt(
-            attempt_id=attempt_id,
-            score=int(breakdown.gpa_score),
-            correct_count=len(breakdown.passed_questions),
-            duration_seconds=breakdown.time_used_seconds,
-            tests_total=breakdown.tests_total,
-            tests_passed=breakdown.tests_passed_total,
-            elo_delta=breakdown.elo_delta,
-            efficiency_bonus=breakdown.efficiency_bonus_total,
-        )
+    try:
+        return await _process_challenge_submission(challenge_id, payload, student_number)
+    except HTTPException:
+        raise
+    except AdmissionRejected as exc:
+        raise _busy(exc)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
 
-        # Trigger achievements engine to update ELO/GPA/badges based on the finalised attempt
-        performance_payload = {
-            "tests_total": breakdown.tests_total,
-            "tests_passed_total": breakdown.tests_passed_total,
-            "average_execution_time_ms": breakdown.average_execution_time_ms,
-            "average_memory_used_kb": breakdown.average_memory_used_kb,
-            "base_elo_total": breakdown.base_elo_total,
-            "efficiency_bonus_total": breakdown.efficiency_bonus_total,
-            "challenge_id": challenge_id,
-            "tier": attempt.get("tier") or "base",
-            "time_used_seconds": breakdown.time_used_seconds,
-            "time_limit_seconds": breakdown.time_limit_seconds,
+
+async def _process_challenge_submission(
+    challenge_id: str,
+    payload: BatchSubmissionsPayload,
+    student_number: int,
+    *,
+    progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Grade and finalise one snapshot submission and queue its rewards; ``progress`` receives job events."""
+
+    def _emit(event: str, data: Dict[str, Any]) -> None:
+        if progress is not None:
+            progress(event, data)
+
+    attempt = await challenge_repository.create_or_get_open_attempt(challenge_id, student_number)
+    attempt_id = attempt.get("id")
+    snapshot = attempt.get("snapshot_questions") or []
+
+    started_at_raw = attempt.get("started_at")
+    started_at_dt: Optional[datetime] = None
+    if started_at_raw:
+        try:
+            started_at_dt = datetime.fromisoformat(str(started_at_raw).replace("Z", "+00:00"))
+        except Exception:
+            started_at_dt = None
+
+    # Build language_overrides map and question_weights from snapshot
+    language_overrides = {str(q.get("question_id")): q.get("language_id") for q in snapshot}
+    question_weights = {str(q.get("question_id")): q.get("points", 1) for q in snapshot}
+    attempt_counts = {str(q.get("question_id")): int(q.get("attempts_used", 0)) for q in snapshot}
+    subs_map = payload.submissions
+
+    def _question_done(result: ChallengeQuestionResultSchema) -> None:
+        _emit("question", {
+            "question_id": str(result.question_id),
+            "tests_passed": result.tests_passed,
+            "tests_total": result.tests_total,
+            "public_passed": result.public_passed,
+            "elo_awarded": result.elo_awarded,
+            "gpa_awarded": result.gpa_awarded,
+        })
+
+    _emit("stage", {"stage": "grading", "questions": len(subs_map)})
+    breakdown = await submissions_service.submit_challenge(
+        challenge_id=challenge_id,
+        attempt_id=attempt_id,
+        submissions=subs_map,
+        language_overrides=language_overrides,
+        question_weights=question_weights,
+        user_id=student_number,
+        tier=attempt.get("tier") or "base",
+        attempt_counts=attempt_counts,
+        max_attempts=3,
+        started_at=started_at_dt,
+        duration_seconds=payload.duration_seconds,
+        perform_award=False,
+        on_question_result=_question_done if progress is not None else None,
+    )
+
+    # Finalize attempt using service results
+    _emit("stage", {"stage": "finalizing"})
+    await challenge_repository.finalize_attempt(
+        attempt_id=attempt_id,
+        score=int(breakdown.gpa_score),
+        correct_count=len(breakdown.passed_questions),
+        duration_seconds=breakdown.time_used_seconds,
+        tests_total=breakdown.tests_total,
+        tests_passed=breakdown.tests_passed_total,
+        elo_delta=breakdown.elo_delta,
+        efficiency_bonus=breakdown.efficiency_bonus_total,
+    )
+
+    # ELO/GPA/badges/titles are applied by the reward pipeline once the attempt is finalised
+    performance_payload = {
+        "tests_total": breakdown.tests_total,
+        "tests_passed_total": breakdown.tests_passed_total,
+        "average_execution_time_ms": breakdown.average_execution_time_ms,
+        "average_memory_used_kb": breakdown.average_memory_used_kb,
+        "base_elo_total": breakdown.base_elo_total,
+        "efficiency_bonus_total": breakdown.efficiency_bonus_total,
+        "challenge_id": challenge_id,
+        "tier": attempt.get("tier") or "base",
+        "time_used_seconds": breakdown.time_used_seconds,
+        "time_limit_seconds": breakdown.time_limit_seconds,
+    }
+    performance_payload = {k: v for k, v in performance_payload.items() if v is not None}
+
+    event = ChallengeFinalised(
+        attempt_id=str(attempt_id),
+        student_number=student_number,
+        challenge_id=challenge_id,
+        tier=attempt.get("tier") or "base",
+        breakdown=breakdown,
+        performance=performance_payload,
+    )
+    rewards_url = f"/submissions/rewards/{attempt_id}"
+
+    if not getattr(get_settings(), "reward_pipeline", True):
+        # Pipeline disabled: apply ELO/GPA/badges before responding, as before
+        _emit("stage", {"stage": "achievements"})
+        try:
+            rewards = await apply_challenge_rewards(event)
+        except Exception as achievement_err:
+            logger.error(f"❌ Achievement processing failed: {achievement_err}")
+            rewards = {}
+        return {
+            "result": breakdown.model_dump(),
+            "achievement_summary": rewards.get("achievement_summary"),
+            "rewards": {"attempt_id": str(attempt_id), "status": "completed" if rewards else "failed"},
         }
-        performance_payload = {k: v for k, v in performance_payload.items() if v is not None}
 
-        logger.info(f"🚀 REACHED ACHIEVEMENT BLOCK! student_number={student_number}, type={type(student_number)}")
-        logger.info(f"📋 Performance payload: {performance_payload}")
-        logger.info(f"📊 Breakdown ELO: {breakdown.elo_delta}, Badges: {breakdown.badge_tiers_awarded}")
+    record = await reward_pipeline.publish(event)
+    _emit("stage", {"stage": "rewards_queued", "status_url": rewards_url})
+    return {
+        "result": breakdown.model_dump(),
+        "achievement_summary": None,
+        "rewards": {"attempt_id": record.attempt_id, "status": record.status, "status_url": rewards_url},
+    }
 
-        achievement_summary = None
-        try:
-            logger.info(f"🎯 STARTING ACHIEVEMENT PROCESSING for student {student_number}")
-            logger.info(f"   ELO Delta: {breakdown.elo_delta}, Badge Tiers: {breakdown.badge_tiers_awarded}")
-
-            achievement_summary = await achievements_service.check_achievements(
-                str(student_number),
-                CheckAchievementsRequest(
-                    submission_id=str(attempt_id),
-                    elo_delta_override=int(breakdown.elo_delta),
-                    badge_tiers=breakdown.badge_tiers_awarded,
-                    performance=performance_payload if performance_payload else None,
-                ),
-            )
 
-            logger.info(
-                f"✅ Achievement summary created: ELO={achievement_summary.updated_elo if achievement_summary else 'None'}"
-            )
+def _owned_job(job_id: str, current_user: CurrentUser) -> SubmissionJob:
+    job = submission_jobs.get(job_id)
+    if job is None or str(job.user_id) != str(current_user.id):
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return job
 
-            # Update user_question_progress for each question
-            from app.features.achievements.repository import AchievementsRepository
-
-            achievements_repo = AchievementsRepository()
-
-            for question_result in breakdown.question_results:
-                try:
-                    logger.info(f"📝 Updating question_progress for Q:{question_result.question_id[:8]}")
-                    await achievements_repo.update_question_progress(
-                        user_id=str(student_number),
-                        question_id=str(question_result.question_id),
-                        challenge_id=str(breakdown.challenge_id),
-                        attempt_id=str(attempt_id),
-                        tests_passed=question_result.tests_passed or 0,
-                        tests_total=question_result.tests_total or 0,
-                        elo_earned=question_result.elo_awarded or 0,
-                        gpa_contribution=question_result.gpa_awarded or 0,
-                    )
-                    logger.info(f"   ✅ Question progress updated")
-                except Exception as qp_err:
-                    logger.warning(f"   ❌ Failed to update question_progress: {qp_err}")
-                    pass  # Silently ignore if table doesn't exist
-
-            # Update user_scores table with overall stats
-            if achievement_summary:
-                try:
-                    questions_attempted = len(breakdown.question_results)
-                    questions_passed = len(breakdown.passed_questions)
-                    challenges_completed = 1 if questions_passed >= (questions_attempted * 0.5) else 0
-                    total_badges = len(achievement_summary.unlocked_badges) if achievement_summary.unlocked_badges else 0
-
-                    logger.info(
-                        f"📊 Updating user_scores: attempted={questions_attempted}, passed={questions_passed}, badges={total_badges}"
-                    )
-
-                    await achievements_repo.update_user_scores(
-                        user_id=str(student_number),
-                        elo=achievement_summary.updated_elo,
-                        gpa=achievement_summary.gpa,
-                        questions_attempted=questions_attempted,
-                        questions_passed=questions_passed,
-                        challenges_completed=challenges_completed,
-                        badges=total_badges,
-                    )
-
-                    logger.info(f"   ✅ user_scores updated successfully")
-                except Exception as scores_err:
-                    logger.warning(f"   ❌ Failed to update user_scores: {scores_err}")
-            else:
-                logger.warning(f"⚠️ No achievement_summary - skipping user_scores update")
-
-            # ----------------------------
-            # NEW: Persist rewards to DB
-            # ----------------------------
-            try:
-                client = await get_supabase()
-
-                # Helper to extract properties from achievement_summary safely
-                def _extract(summary_obj: Any, key: str) -> Any:
-                    try:
-                        return getattr(summary_obj, key)
-                    except Exception:
-                        pass
-                    try:
-                        return summary_obj.get(key)
-                    except Exception:
-                        pass
-                    try:
-                        return summary_obj.model_dump().get(key)
-                    except Exception:
-                        return None
-
-                # Collect common values
-                updated_elo = _extract(achievement_summary, "updated_elo")
-                previous_elo = _extract(achievement_summary, "previous_elo") or _extract(
-                    achievement_summary, "previousElo"
-                ) or None
-                unlocked_badges = _extract(achievement_summary, "unlocked_badges") or _extract(
-                    achievement_summary, "unlockedBadges"
-                ) or []
-                new_title_id = (
-                    _extract(achievement_summary, "new_title_id")
-                    or _extract(achievement_summary, "newTitleId")
-                    or _extract(achievement_summary, "title_id")
-                    or None
-                )
-
-                # If updated_elo is missing, compute from DB current value + breakdown.elo_delta
-                if updated_elo is None and breakdown and isinstance(breakdown.elo_delta, int):
-                    try:
-                        resp = await client.table("user_elo").select("*").eq("student_id", student_number).limit(1).execute()
-                        rows = getattr(resp, "data", None) or []
-                        existing = rows[0] if rows else None
-                        current_before = existing.get("current_elo") if existing else None
-                        if current_before is not None:
-                            previous_elo = int(current_before)
-                            updated_elo = int(current_before) + int(breakdown.elo_delta)
-                        else:
-                            previous_elo = 0
-                            updated_elo = int(breakdown.elo_delta)
-                    except Exception:
-                        previous_elo = None
-                        updated_elo = None
-
-                # Fetch profile to get supabase_id uuid for user_id field in elo_events
-                profile_supabase_id = None
-                try:
-                    resp = await client.table("profiles").select("supabase_id").eq("id", student_number).limit(1).execute()
-                    rows = getattr(resp, "data", None) or []
-                    if rows:
-                        profile_supabase_id = rows[0].get("supabase_id")
-                except Exception:
-                    profile_supabase_id = None
-
-                # Persist user_elo (upsert)
-                if updated_elo is not None:
-                    try:
-                        # fetch existing row to compute total_awarded_elo
-                        try:
-                            resp = await client.table("user_elo").select("*").eq("student_id", student_number).limit(1).execute()
-                            rows = getattr(resp, "data", None) or []
-                            existing = rows[0] if rows else None
-                        except Exception:
-                            existing = None
-
-                        # Determine previous_elo fallback
-                        if previous_elo is None:
-                            try:
-                                if existing and existing.get("current_elo") is not None:
-                                    previous_elo = int(existing.get("current_elo"))
-                                else:
-                                    previous_elo = 0
-                            except Exception:
-                                previous_elo = 0
-
-                        # Compute elo_delta_val (prefer breakdown.elo_delta)
-                        try:
-                            elo_delta_val = int(breakdown.elo_delta) if breakdown and hasattr(breakdown, "elo_delta") and breakdown.elo_delta is not None else (int(updated_elo) - int(previous_elo) if (previous_elo is not None and updated_elo is not None) else 0)
-                        except Exception:
-                            try:
-                                elo_delta_val = int(updated_elo) - int(previous_elo)
-                            except Exception:
-                                elo_delta_val = 0
-
-                        total_awarded = (existing.get("total_awarded_elo") if existing and existing.get("total_awarded_elo") is not None else 0)
-                        try:
-                            total_awarded = int(total_awarded) + int(elo_delta_val)
-                        except Exception:
-                            total_awarded = int(elo_delta_val)
-
-                        upsert_payload = {
-                            "student_id": student_number,
-                            "current_elo": int(updated_elo),
-                            "total_awarded_elo": total_awarded,
-                            "last_awarded_at": datetime.now(timezone.utc).isoformat(),
-                            "updated_at": datetime.now(timezone.utc).isoformat(),
-                        }
-                        # Keep profile_id if present in existing row (defensive)
-                        if existing and existing.get("profile_id") is not None:
-                            upsert_payload["profile_id"] = existing.get("profile_id")
-
-                        await client.table("user_elo").upsert(upsert_payload).execute()
-                        logger.info(f"   ✅ user_elo upserted for student={student_number} current_elo={updated_elo}")
-                    except Exception as ue:
-                        logger.warning(f"   ❌ Failed to upsert user_elo for student {student_number}: {ue}")
-
-                    # Insert a single elo_events audit record
-                    try:
-                        event_payload = {
-                            "user_id": profile_supabase_id,
-                            "student_id": student_number,
-                            "event_type": "challenge_submission",
-                            "elo_change": int(elo_delta_val) if 'elo_delta_val' in locals() else (int(updated_elo) - int(previous_elo) if (previous_elo is not None and updated_elo is not None) else 0),
-                            "elo_before": int(previous_elo) if previous_elo is not None else None,
-                            "elo_after": int(updated_elo) if updated_elo is not None else None,
-                            "challenge_id": challenge_id,
-                            "attempt_id": str(attempt_id),
-                            "submission_id": str(attempt_id),
-                            "question_id": None,
-                            "metadata": {
-                                "gpa_score": getattr(breakdown, "gpa_score", None) if breakdown else None,
-                                "tests_total": getattr(breakdown, "tests_total", None) if breakdown else None,
-                                "tests_passed": getattr(breakdown, "tests_passed_total", None) if breakdown else None,
-                            },
-                            "created_at": datetime.now(timezone.utc).isoformat(),
-                        }
-                        # Clean None values (Supabase client tolerates missing keys but this keeps payload tidy)
-                        event_payload = {k: v for k, v in event_payload.items() if v is not None}
-                        await client.table("elo_events").insert(event_payload).execute()
-                        logger.info(f"   ✅ elo_events inserted for student={student_number}")
-                    except Exception as ee:
-                        logger.warning(f"   ❌ Failed to insert elo_events for student {student_number}: {ee}")
-
-                # Persist badges (if any)
-                try:
-                    if unlocked_badges:
-                        # unlocked_badges may be list of dicts or strings - normalize to list of ids
-                        badge_ids: list = []
-                        if isinstance(unlocked_badges, (list, tuple)):
-                            for item in unlocked_badges:
-                                if isinstance(item, dict):
-                                    bid = item.get("id") or item.get("badge_id") or item.get("badgeId")
-                                    if bid:
-                                        badge_ids.append(bid)
-                                else:
-                                    badge_ids.append(item)
-                        elif isinstance(unlocked_badges, str):
-                            badge_ids = [unlocked_badges]
-                        else:
-                            badge_ids = []
-
-                        for bid in badge_ids:
-                            try:
-                                badge_payload = {
-                                    "profile_id": student_number,
-                                    "badge_id": str(bid),
-                                    "date_earned": datetime.now(timezone.utc).isoformat(),
-                                    "question_id": None,
-                                }
-                                await client.table("user_badge").insert(badge_payload).execute()
-                                logger.info(f"   ✅ user_badge inserted for student={student_number} badge={bid}")
-                            except Exception as ub_err:
-                                logger.warning(f"   ❌ Failed to insert user_badge for student {student_number} badge {bid}: {ub_err}")
-                except Exception as badges_err:
-                    logger.warning(f"   ❌ Badges persistence failed: {badges_err}")
-
-                # Persist title change if present
-                if new_title_id:
-                    try:
-                        await client.table("profiles").update({"title_id": new_title_id}).eq("id", student_number).execute()
-                        logger.info(f"   ✅ profiles.title_id updated for student={student_number} -> title={new_title_id}")
-                    except Exception as title_err:
-                        logger.warning(f"   ❌ Failed to update profiles.title_id for student {student_number}: {title_err}")
-
-            except Exception as persist_err:
-                logger.warning(f"⚠️ Reward persistence failed (non-fatal): {persist_err}")
 
-        except Exception as achievement_err:
-            logger.error(f"❌ Achievement processing failed: {achievement_err}")
-            achievement_summary = None
+@router.get(
+    "/jobs/{job_id}",
+    response_model=dict,
+    summary="Poll a challenge submission job",
+)
+async def get_submission_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Current status, per-question progress and (once completed) the submit-challenge result."""
+    return _owned_job(job_id, current_user).snapshot()
+
+
+@router.get(
+    "/rewards/{attempt_id}",
+    response_model=dict,
+    summary="Fetch the reward summary of a submitted challenge attempt",
+)
+async def get_attempt_rewards(
+    attempt_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """``queued``/``running`` until ELO, GPA, badges and titles are applied, then the achievement summary."""
+    record = reward_pipeline.get(attempt_id)
+    if record is None or str(record.user_id) != str(current_user.id):
+        raise HTTPException(status_code=404, detail="rewards_not_found")
+    return record.snapshot()
 
-        result_payload = {
-            "result": breakdown.model_dump(),
-            "awards": awards,
-            "achievement_summary": achievement_summary.model_dump() if achievement_summary else None,
-        }
-    except HTTPException:
-        raise
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc))
 
-    return result_payload
+def _sse_frame(event: Optional[Dict[str, Any]]) -> str:
+    if event is None:
+        return ": keep-alive\n\n"
+    data = json.dumps(event["data"], default=str)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+
+@router.get(
+    "/jobs/{job_id}/events",
+    summary="Stream challenge submission progress (Server-Sent Events)",
+)
+async def stream_submission_job(
+    job_id: str,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Replays the job's events after ``Last-Event-ID`` and streams new ones until it finishes."""
+    job = _owned_job(job_id, current_user)
+    try:
+        cursor = int(last_event_id or 0)
+    except ValueError:
+        cursor = 0
+
+    async def _frames() -> AsyncIterator[str]:
+        async for event in submission_jobs.stream(job, last_event_id=cursor):
+            yield _sse_frame(event)
+
+    return StreamingResponse(
+        _frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 __all__ = ["router"]
@@ -0,0 +1,286 @@
+"""Single-submission multi-test harness for Python questions.
+
+``evaluate_question`` normally creates one Judge0 submission per test case, so a question
+with six tests boots six sandboxes. For Python (language 71) we can instead submit one
+generated driver that runs the student's program once per stdin inside the same sandbox
+(each case in its own interpreter process) and prints one delimited JSON record per case
+with its stdout, stderr, exit status and CPU time. The records are split back into the
+per-test ``CodeExecutionResult`` pairs that ``execute_batch`` would have returned.
+
+The harness returns ``None`` (and the caller falls back to per-test execution) whenever
+the driver itself did not finish cleanly, its output cannot be parsed, or a case changed
+the working directories - later cases could then observe state an isolated run would not.
+Note that Judge0's ``max_file_size`` also caps the combined stdout of all cases.
+
+The driver carries every test's stdin (hidden tests included) and the record nonce, and the
+student's program runs as the same user. Before the first case the driver therefore deletes
+its own file and makes itself non-dumpable (``PR_SET_DUMPABLE``), so the student's process
+can open neither the driver source nor ``/proc/<driver>/fd``, ``mem`` or ``environ``; if
+either step fails no records are printed and the caller falls back. Cases run in a private
+temporary directory. The nonce is random; the result cache is keyed on the driver without
+it, and the nonce a cache key was first run with is remembered so a cached run still parses.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import secrets
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.Core.config import get_settings
+from app.features.judge0.result_cache import execution_cache_key
+from app.features.judge0.schemas import CodeExecutionResult, CodeSubmissionCreate
+from app.features.judge0.statuses import status_for_process
+
+HARNESS_LANGUAGE_IDS = frozenset({71})
+
+logger = logging.getLogger(__name__)
+
+_NONCE_PLACEHOLDER = "@@recode-harness@@"
+_MAX_REMEMBERED_NONCES = 4096
+_nonces: "OrderedDict[str, str]" = OrderedDict()
+
+_DRIVER_TEMPLATE = r'''import base64, json, os, resource, subprocess, sys, tempfile, time
+
+NONCE = __NONCE__
+CODE = base64.b64decode(__CODE__).decode("utf-8")
+INPUTS = json.loads(base64.b64decode(__INPUTS__).decode("utf-8"))
+CASE_TIMEOUT = __TIMEOUT__
+
+
+def snapshot(root):
+    state = {}
+    for base, _dirs, files in os.walk(root):
+        for name in files:
+            path = os.path.join(base, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            state[path] = (st.st_size, st.st_mtime_ns)
+    return state
+
+
+def emit(record):
+    sys.stdout.write(NONCE + json.dumps(record, ensure_ascii=True) + "\n")
+    sys.stdout.flush()
+
+
+def seal():
+    # Nothing the student's process can open may reveal INPUTS or NONCE
+    os.unlink(os.path.abspath(sys.argv[0]))
+    import ctypes
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.prctl(4, 0, 0, 0, 0) != 0:  # PR_SET_DUMPABLE, 0
+        raise OSError(ctypes.get_errno(), "prctl(PR_SET_DUMPABLE) failed")
+
+
+def main():
+    try:
+        seal()
+    except Exception:
+        return
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="recode-harness-")
+    script = os.path.join(workdir, "script.py")
+    with open(script, "w", encoding="utf-8") as fh:
+        fh.write(CODE)
+    baseline = (snapshot(cwd), snapshot(workdir))
+    for idx, stdin in enumerate(INPUTS):
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        started = time.monotonic()
+        timed_out = False
+        try:
+            proc = subprocess.run(
+                [sys.executable, script],
+                input=(stdin or "").encode("utf-8"),
+                capture_output=True,
+                timeout=CASE_TIMEOUT,
+                cwd=workdir,
+            )
+            out, err, code = proc.stdout, proc.stderr, proc.returncode
+        except subprocess.TimeoutExpired as exc:
+            out, err, code, timed_out = exc.stdout or b"", exc.stderr or b"", None, True
+        wall = time.monotonic() - started
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+        interference = (snapshot(cwd), snapshot(workdir)) != baseline
+        emit({
+            "case": idx,
+            "stdout": out.decode("utf-8", "replace"),
+            "stderr": err.decode("utf-8", "replace"),
+            "exit": code,
+            "timed_out": timed_out,
+            "cpu": round(cpu, 4),
+            "wall": round(wall, 4),
+            "max_rss_kb": None,  # RUSAGE_CHILDREN only has a high-water mark over all cases
+            "interference": interference,
+        })
+        if interference:
+            break
+    emit({"done": True, "cases": len(INPUTS)})
+
+
+main()
+'''
+
+
+def harness_enabled(language_id: Optional[int], test_count: int) -> bool:
+    settings = get_settings()
+    if not getattr(settings, "python_multi_test_harness", False):
+        return False
+    return language_id in HARNESS_LANGUAGE_IDS and test_count >= 2
+
+
+def _new_nonce() -> str:
+    return f"@@recode-harness-{secrets.token_hex(16)}@@"
+
+
+def _nonce_for(cache_key: str) -> str:
+    """The nonce runs under ``cache_key`` use (a cached result was printed with it)."""
+    nonce = _nonces.get(cache_key)
+    if nonce is None:
+        nonce = _nonces[cache_key] = _new_nonce()
+        while len(_nonces) > _MAX_REMEMBERED_NONCES:
+            _nonces.popitem(last=False)
+    else:
+        _nonces.move_to_end(cache_key)
+    return nonce
+
+
+def build_driver(
+    source_code: str,
+    stdins: Sequence[Optional[str]],
+    *,
+    case_timeout: float,
+    nonce: Optional[str] = None,
+) -> Tuple[str, str]:
+    """Return ``(driver_source, nonce)``; a random nonce is drawn unless one is given."""
+    inputs = [s or "" for s in stdins]
+    nonce = nonce or _new_nonce()
+    encoded_code = base64.b64encode(source_code.encode("utf-8")).decode("ascii")
+    encoded_inputs = base64.b64encode(json.dumps(inputs).encode("utf-8")).decode("ascii")
+    driver = (
+        _DRIVER_TEMPLATE
+        .replace("__NONCE__", repr(nonce))
+        .replace("__CODE__", repr(encoded_code))
+        .replace("__INPUTS__", repr(encoded_inputs))
+        .replace("__TIMEOUT__", repr(float(case_timeout)))
+    )
+    return driver, nonce
+
+
+def parse_driver_output(stdout: Optional[str], nonce: str, case_count: int) -> Optional[List[Dict[str, Any]]]:
+    """Extract per-case records; ``None`` if the run was incomplete or a case interfered."""
+    records: Dict[int, Dict[str, Any]] = {}
+    done = False
+    for line in (stdout or "").splitlines():
+        if not line.startswith(nonce):
+            continue
+        try:
+            record = json.loads(line[len(nonce):])
+        except ValueError:
+            return None
+        if record.get("done"):
+            done = True
+            continue
+        if record.get("interference"):
+            return None
+        idx = record.get("case")
+        if isinstance(idx, int) and 0 <= idx < case_count:
+            records[idx] = record
+    if not done or len(records) != case_count:
+        return None
+    return [records[idx] for idx in range(case_count)]
+
+
+def _case_status(record: Dict[str, Any], expected: Optional[str]) -> Tuple[int, str]:
+    code = record.get("exit")
+    return status_for_process(
+        code if isinstance(code, int) else None,
+        timed_out=bool(record.get("timed_out")),
+        stdout=record.get("stdout"),
+        expected_output=expected,
+    )
+
+
+def _to_results(
+    token: str,
+    records: List[Dict[str, Any]],
+    expected_values: Sequence[Optional[str]],
+    language_id: int,
+) -> List[Tuple[str, CodeExecutionResult]]:
+    created_at = datetime.now(timezone.utc)
+    pairs: List[Tuple[str, CodeExecutionResult]] = []
+    for idx, record in enumerate(records):
+        status_id, description = _case_status(record, expected_values[idx])
+        pairs.append((
+            token,
+            CodeExecutionResult(
+                submission_id=hashlib.sha256(f"{token}:{idx}".encode()).hexdigest()[:16],
+                stdout=record.get("stdout"),
+                stderr=record.get("stderr") or None,
+                compile_output=None,
+                execution_time=f"{float(record.get('cpu') or 0.0):.3f}",
+                memory_used=record.get("max_rss_kb"),
+                status_id=status_id,
+                status_description=description,
+                language_id=language_id,
+                success=status_id == 3,
+                created_at=created_at,
+            ),
+        ))
+    return pairs
+
+
+async def run_python_harness(
+    judge0_service: Any,
+    *,
+    source_code: str,
+    language_id: int,
+    stdins: Sequence[Optional[str]],
+    expected_values: Sequence[Optional[str]],
+) -> Optional[List[Tuple[str, CodeExecutionResult]]]:
+    """Run every case in one Judge0 submission; ``None`` means fall back to per-test runs."""
+    settings = get_settings()
+    case_timeout = getattr(settings, "python_harness_case_timeout_s", 5.0)
+    template, _ = build_driver(source_code, stdins, case_timeout=case_timeout, nonce=_NONCE_PLACEHOLDER)
+    submission = CodeSubmissionCreate(
+        source_code=template,
+        language_id=language_id,
+        stdin="",
+        cpu_time_limit=getattr(settings, "python_harness_cpu_time_limit_s", 15.0),
+        wall_time_limit=getattr(settings, "python_harness_wall_time_limit_s", 20.0),
+    )
+    # Keyed on the driver without its nonce, so identical harness runs still share the cache
+    cache_key = "harness:" + execution_cache_key(submission, language_id)
+    nonce = _nonce_for(cache_key)
+    submission.source_code, _ = build_driver(source_code, stdins, case_timeout=case_timeout, nonce=nonce)
+    try:
+        token, result = await judge0_service.execute_code_sync(submission, cache_key=cache_key)
+    except Exception as exc:
+        logger.info("Python harness run failed (%s); falling back to per-test execution", exc)
+        return None
+    if result.status_id != 3:
+        logger.info("Python harness finished with status %s; falling back", result.status_id)
+        return None
+    records = parse_driver_output(result.stdout, nonce, len(stdins))
+    if records is None:
+        logger.info("Python harness output incomplete or cases interfered; falling back")
+        return None
+    return _to_results(token, records, expected_values, language_id)
+
+
+__all__ = [
+    "HARNESS_LANGUAGE_IDS",
+    "build_driver",
+    "harness_enabled",
+    "parse_driver_output",
+    "run_python_harness",
+]
@@ -0,0 +1,321 @@
+"""Background jobs for challenge submissions.
+
+A full challenge submit grades every question on Judge0, finalises the attempt, runs the
+achievements engine and persists rewards, which can outlive proxy timeouts when done inside
+one HTTP request. In job mode the endpoint enqueues the work here and returns 202 with a job
+id; a fixed pool of worker tasks drains the queue, so at most ``workers`` submissions are
+graded at once no matter how many are waiting.
+
+Each job keeps an ordered event log (``queued``, ``started``, ``stage``, ``question``,
+``completed``/``failed``). Server-Sent Events replay it from any sequence number (so a
+reconnecting client resumes with ``Last-Event-ID``), and polling clients read the same state
+from ``snapshot()``. Finished jobs stay retrievable for ``retention_seconds``.
+
+On shutdown ``aclose`` stops taking jobs and gives queued and running ones
+``drain_timeout`` seconds to finish, like a sync request drained by the server. A job cut
+off mid-grading may already have used scoring attempts without finalising the attempt, so
+the timeout should cover a typical run. Jobs still queued after it fail with 503
+``submission_job_not_started`` (nothing was graded, so resubmitting is safe); jobs still
+running are cancelled and fail with ``submission_job_cancelled``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from app.Core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = frozenset({"completed", "failed"})
+
+
+class JobQueueFull(Exception):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__("submission_queue_full")
+        self.retry_after = retry_after
+
+
+class JobManagerClosed(Exception):
+    def __init__(self) -> None:
+        super().__init__("submission_jobs_closed")
+
+
+@dataclass
+class SubmissionJob:
+    id: str
+    user_id: int
+    challenge_id: str
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[Dict[str, Any]] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    _wakeup: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def publish(self, event: str, data: Optional[Dict[str, Any]] = None) -> None:
+        self.events.append({"id": len(self.events) + 1, "event": event, "data": data or {}})
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    def events_after(self, last_id: int) -> List[Dict[str, Any]]:
+        return self.events[max(0, last_id):]
+
+    async def wait_for_event(self, last_id: int, timeout: float) -> bool:
+        """Wait until an event newer than ``last_id`` exists; ``False`` on timeout."""
+        if len(self.events) > last_id:
+            return True
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        questions = [evt["data"] for evt in self.events if evt["event"] == "question"]
+        stage = next((evt["data"].get("stage") for evt in reversed(self.events) if evt["event"] == "stage"), None)
+        return {
+            "job_id": self.id,
+            "challenge_id": self.challenge_id,
+            "status": self.status,
+            "stage": stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "questions": questions,
+            "last_event_id": len(self.events),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+JobRunner = Callable[[SubmissionJob], Awaitable[Dict[str, Any]]]
+
+
+class SubmissionJobManager:
+    def __init__(
+        self,
+        *,
+        workers: int = 4,
+        max_pending: int = 200,
+        retention_seconds: float = 900.0,
+        max_jobs: int = 5000,
+        drain_timeout: float = 20.0,
+    ) -> None:
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.retention_seconds = max(0.0, float(retention_seconds))
+        self.max_jobs = max(1, int(max_jobs))
+        self.drain_timeout = max(0.0, float(drain_timeout))
+        self._jobs: "OrderedDict[str, SubmissionJob]" = OrderedDict()
+        self._runners: Dict[str, JobRunner] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing = False
+        self.submitted_total = 0
+        self.completed_total = 0
+        self.failed_total = 0
+        self.rejected_total = 0
+        self._avg_run_s = 5.0
+
+    # ------------------------------------------------------------------ workers
+    def _ensure_workers(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            # First use, or the previous loop is gone (tests run one loop per case); jobs
+            # queued on a dead loop will never run
+            for job in self._jobs.values():
+                if not job.done:
+                    self._fail(job, 503, "submission_job_lost")
+            self._runners.clear()
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        return self._queue
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        assert queue is not None
+        while True:
+            job_id = await queue.get()
+            try:
+                job = self._jobs.get(job_id)
+                runner = self._runners.pop(job_id, None)
+                if job is not None and runner is not None:
+                    await self._run(job, runner)
+            finally:
+                queue.task_done()
+
+    async def _run(self, job: SubmissionJob, runner: JobRunner) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        job.publish("started", {"queued_ms": round((job.started_at - job.created_at) * 1000.0, 1)})
+        try:
+            result = await runner(job)
+        except asyncio.CancelledError:
+            self._fail(job, 503, "submission_job_cancelled")
+            raise
+        except Exception as exc:
+            status_code = getattr(exc, "status_code", None)
+            detail = getattr(exc, "detail", None)
+            if not isinstance(status_code, int):
+                logger.exception("Submission job %s failed", job.id)
+                status_code, detail = 500, str(exc)
+            headers = getattr(exc, "headers", None) or {}
+            self._fail(job, status_code, detail, retry_after=headers.get("Retry-After"))
+            return
+        job.result = result
+        job.status = "completed"
+        job.finished_at = time.time()
+        self.completed_total += 1
+        self._avg_run_s = 0.8 * self._avg_run_s + 0.2 * (job.finished_at - job.started_at)
+        job.publish("completed", {
+            "duration_ms": round((job.finished_at - job.started_at) * 1000.0, 1),
+            "result": result,
+        })
+
+    def _fail(self, job: SubmissionJob, status_code: int, detail: Any, *, retry_after: Optional[str] = None) -> None:
+        job.error = {"status_code": status_code, "detail": detail}
+        if retry_after is not None:
+            job.error["retry_after"] = retry_after
+        job.status = "failed"
+        job.finished_at = time.time()
+        self.failed_total += 1
+        job.publish("failed", dict(job.error))
+
+    # ------------------------------------------------------------------ public API
+    def submit(self, *, user_id: int, challenge_id: str, runner: JobRunner) -> SubmissionJob:
+        """Enqueue a submission, or return the caller's unfinished job for the same challenge."""
+        self._prune()
+        for job in self._jobs.values():
+            if job.user_id == user_id and job.challenge_id == challenge_id and not job.done:
+                return job
+        if self._closing:
+            raise JobManagerClosed()
+        queue = self._ensure_workers()
+        if queue.qsize() >= self.max_pending:
+            self.rejected_total += 1
+            raise JobQueueFull(retry_after=max(1.0, self._avg_run_s * queue.qsize() / self.workers))
+        job = SubmissionJob(id=uuid4().hex, user_id=user_id, challenge_id=challenge_id)
+        self._jobs[job.id] = job
+        self._runners[job.id] = runner
+        self.submitted_total += 1
+        job.publish("queued", {"position": queue.qsize() + 1})
+        queue.put_nowait(job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[SubmissionJob]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    async def stream(
+        self,
+        job: SubmissionJob,
+        *,
+        last_event_id: int = 0,
+        heartbeat_seconds: float = 15.0,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield events after ``last_event_id`` until the job finishes; ``None`` is a heartbeat."""
+        cursor = max(0, int(last_event_id))
+        while True:
+            for event in job.events_after(cursor):
+                cursor = event["id"]
+                yield event
+            if job.done:
+                return
+            if not await job.wait_for_event(cursor, heartbeat_seconds):
+                yield None
+
+    def _prune(self) -> None:
+        now = time.time()
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.done and job.finished_at is not None and now - job.finished_at > self.retention_seconds
+        ]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+        # Hard cap: forget the oldest finished jobs first
+        if len(self._jobs) > self.max_jobs:
+            for job_id in [jid for jid, job in self._jobs.items() if job.done]:
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                self._jobs.pop(job_id, None)
+
+    async def aclose(self, timeout: Optional[float] = None) -> None:
+        """Stop taking jobs, give queued and running ones ``timeout`` seconds, then stop the workers.
+
+        ``timeout`` defaults to ``drain_timeout``.
+        """
+        self._closing = True
+        queue = self._queue
+        if queue is not None and self._loop is asyncio.get_running_loop():
+            try:
+                await asyncio.wait_for(queue.join(), self.drain_timeout if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Stopping submission job workers with %d jobs unfinished",
+                    sum(1 for job in self._jobs.values() if not job.done),
+                )
+        # Jobs that never started: nothing was graded, so they can simply be submitted again
+        for job_id in list(self._runners):
+            self._runners.pop(job_id, None)
+            job = self._jobs.get(job_id)
+            if job is not None and not job.done:
+                self._fail(job, 503, "submission_job_not_started")
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except BaseException:
+                pass
+        self._queue = None
+        self._loop = None
+        self._closing = False
+
+    def stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self.max_pending,
+            "retained": len(self._jobs),
+            "by_status": statuses,
+            "submitted_total": self.submitted_total,
+            "completed_total": self.completed_total,
+            "failed_total": self.failed_total,
+            "rejected_total": self.rejected_total,
+            "run_ms_avg": round(self._avg_run_s * 1000.0, 1),
+        }
+
+
+def _build_manager() -> SubmissionJobManager:
+    settings = get_settings()
+    return SubmissionJobManager(
+        workers=getattr(settings, "submission_job_workers", 4),
+        max_pending=getattr(settings, "submission_job_max_pending", 200),
+        retention_seconds=getattr(settings, "submission_job_retention_s", 900.0),
+        drain_timeout=getattr(settings, "submission_job_drain_timeout_s", 20.0),
+    )
+
+
+submission_jobs = _build_manager()
+
+__all__ = ["JobManagerClosed", "JobQueueFull", "SubmissionJob", "SubmissionJobManager", "submission_jobs"]
@@ -20,20 +20,48 @@ class SubmissionsRepository:
         rows = resp.data or []
         return rows[0] if rows else None
 
+    async def get_questions(self, question_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch several questions in one round trip, keyed by id."""
+        if not question_ids:
+            return {}
+        client = await get_supabase()
+        resp = await client.table(self._QUESTION_TABLE).select("*").in_("id", list(question_ids)).execute()
+        return {str(row.get("id")): row for row in resp.data or []}
+
+    async def get_questions_for_challenges(self, challenge_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Every question of the given challenges in one round trip, keyed by id."""
+        if not challenge_ids:
+            return {}
+        client = await get_supabase()
+        resp = await client.table(self._QUESTION_TABLE).select("*").in_("challenge_id", list(challenge_ids)).execute()
+        return {str(row.get("id")): row for row in resp.data or []}
+
     async def list_tests(self, question_id: str) -> List[Dict[str, Any]]:
+        mapping = await self.list_tests_for_questions([question_id])
+        return mapping.get(str(question_id), [])
+
+    async def list_tests_for_questions(self, question_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Tests for several questions with one query per test table, keyed by question id."""
         client = await get_supabase()
-        tests: List[Dict[str, Any]] = []
+        raw: Dict[str, List[Dict[str, Any]]] = {str(qid): [] for qid in question_ids}
+        if not raw:
+            return {}
         # Gather tests from all known tables (legacy compatibility). Do not stop at the
         # first non-empty table — some questions may have rows in both `question_tests`
         # and `tests` and we want to include them all.
         for table in self._TEST_TABLES:
             try:
-                resp = await client.table(table).select("*").eq("question_id", question_id).execute()
+                resp = await client.table(table).select("*").in_("question_id", list(raw)).execute()
             except Exception:  # pragma: no cover - tolerate legacy naming issues
                 continue
-            if resp.data:
-                tests.extend(resp.data)
+            for row in resp.data or []:
+                qid = str(row.get("question_id"))
+                if qid in raw:
+                    raw[qid].append(row)
+        return {qid: self._normalise_tests(qid, rows) for qid, rows in raw.items()}
 
+    @staticmethod
+    def _normalise_tests(question_id: str, tests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         normalised: List[Dict[str, Any]] = []
         for index, test in enumerate(tests or []):
             raw_order = test.get("order_index")
@@ -0,0 +1,486 @@
+"""Write-behind persistence for graded test batches (``code_submissions`` + ``code_results``).
+
+By default every graded question writes its rows before the student gets a response. With
+``CODE_RESULTS_WRITE_BEHIND=true`` ``code_results_repository.log_test_batch`` hands the
+prepared rows to this writer instead and returns the submission id straight away (ids are
+assigned client-side). A background task writes everything queued in one bulk call every
+``flush_interval`` seconds, or as soon as ``flush_rows`` result rows are waiting.
+
+With a spool path every batch is appended to a local JSON-lines file before ``submit``
+returns and a ``done`` record follows once it is written, so ``start`` can replay batches a
+crash left unwritten. Appends are flushed to the OS at once (a process crash loses nothing)
+and fsynced before each bulk write. The spool is truncated whenever it holds nothing unwritten.
+
+A batch the database rejects (the bulk writer returns ``None`` for it) is queued again with
+the same backoff as a failed bulk write. After ``max_batch_attempts`` rejections it is moved
+to the dead-letter file ``<spool>.dead`` (fsynced) so it stops holding up the queue; without
+a spool it keeps being retried. Only batches that were written or dead-lettered get a
+``done`` record. A bulk write that raises is retried batch by batch, so one bad batch (a
+constraint violation, say) is rejected on its own instead of failing every group it is in.
+
+At most ``max_pending`` batches wait in memory; beyond that ``submit`` waits for a flush,
+so a slow database degrades requests to synchronous latency instead of growing the queue
+(up to ``backpressure_timeout``, after which the batch is queued anyway and counted).
+``wait_written`` and ``flush`` are the barrier for callers that need the rows to exist.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TextIO
+
+from app.Core.config import get_settings
+
+try:  # POSIX only; without it two processes could share a spool file
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Writes prepared batches; returns the submission id per batch (None where one failed) or
+# raises when nothing was written, in which case the batches are retried one by one
+BatchWriter = Callable[[List[Dict[str, Any]]], Awaitable[List[Optional[str]]]]
+
+
+def _submission_id(batch: Dict[str, Any]) -> str:
+    return str(batch["p_submission"]["id"])
+
+
+class ResultWriter:
+    def __init__(
+        self,
+        *,
+        enabled: bool = False,
+        flush_interval: float = 0.2,
+        flush_rows: int = 500,
+        max_pending: int = 2000,
+        backpressure_timeout: float = 10.0,
+        spool_path: str = "",
+        retry_max_interval: float = 5.0,
+        max_batch_attempts: int = 5,
+        writer: Optional[BatchWriter] = None,
+    ) -> None:
+        self.enabled = enabled
+        self.flush_interval = max(0.001, float(flush_interval))
+        self.flush_rows = max(1, int(flush_rows))
+        self.max_pending = max(1, int(max_pending))
+        self.backpressure_timeout = max(0.0, float(backpressure_timeout))
+        self.spool_path = spool_path or ""
+        self.retry_max_interval = max(self.flush_interval, float(retry_max_interval))
+        self.max_batch_attempts = max(1, int(max_batch_attempts))
+        self._writer = writer
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._enqueued_at: Dict[str, float] = {}
+        self._in_flight: Dict[str, Dict[str, Any]] = {}
+        self._attempts: Dict[str, int] = {}
+        self._dead_ids: "OrderedDict[str, None]" = OrderedDict()
+        self._pending_rows = 0
+        self._retry_delay = 0.0
+        self._retry_at = 0.0
+        self._spool: Optional[TextIO] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flushed: Optional[asyncio.Event] = None
+        self.enqueued_total = 0
+        self.flushes = 0
+        self.flushed_batches = 0
+        self.flushed_rows = 0
+        self.flush_failures = 0
+        self.failed_batches = 0
+        self.split_flushes = 0
+        self.dead_lettered = 0
+        self.recovered_total = 0
+        self.backpressure_waits = 0
+        self.backpressure_wait_s = 0.0
+        self.overflowed_total = 0
+        self.high_watermark = 0
+        self.last_flush_ms = 0.0
+
+    # ------------------------------------------------------------------ loop binding
+    def _ensure_task(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or the previous loop is gone (tests run one loop per case); queued
+            # batches are plain data and are flushed by the new loop's task
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._flushed = asyncio.Event()
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    def _publish_flushed(self) -> None:
+        flushed, self._flushed = self._flushed, asyncio.Event()
+        if flushed is not None:
+            flushed.set()
+
+    async def _wait_flushed(self, timeout: Optional[float] = None) -> bool:
+        assert self._wakeup is not None and self._flushed is not None
+        flushed = self._flushed
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(flushed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    # ------------------------------------------------------------------ spool
+    def _open_spool(self) -> None:
+        if not self.spool_path or self._spool is not None:
+            return
+        try:
+            spool = open(self.spool_path, "a+", encoding="utf-8")
+        except OSError as exc:
+            logger.warning("Cannot open result spool %s (%s); write-behind is not crash safe", self.spool_path, exc)
+            return
+        if fcntl is not None:
+            try:
+                fcntl.flock(spool.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                logger.warning("Result spool %s is used by another process; write-behind is not crash safe", self.spool_path)
+                spool.close()
+                return
+        self._spool = spool
+
+    def _spool_append(self, record: Dict[str, Any]) -> None:
+        if self._spool is None:
+            return
+        self._spool.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+        self._spool.flush()
+
+    def _spool_sync(self) -> None:
+        if self._spool is not None:
+            os.fsync(self._spool.fileno())
+
+    def _dead_letter(self, batches: Dict[str, Dict[str, Any]]) -> bool:
+        """Append rejected batches to ``<spool>.dead`` and fsync; ``False`` if there is no spool."""
+        if self._spool is None or not batches:
+            return False
+        try:
+            with open(f"{self.spool_path}.dead", "a", encoding="utf-8") as dead:
+                for batch in batches.values():
+                    dead.write(json.dumps({"op": "batch", "batch": batch}, separators=(",", ":"), default=str) + "\n")
+                dead.flush()
+                os.fsync(dead.fileno())
+        except OSError as exc:
+            logger.error("Cannot write dead-letter file %s.dead (%s); retrying the batches", self.spool_path, exc)
+            return False
+        return True
+
+    def _spool_compact(self) -> None:
+        if self._spool is not None and not self._pending and not self._in_flight:
+            self._spool.seek(0)
+            self._spool.truncate(0)
+            self._spool.flush()
+
+    def _recover(self) -> int:
+        """Queue the batches the spool holds without a ``done`` record; returns how many."""
+        if self._spool is None:
+            return 0
+        self._spool.seek(0)
+        content = self._spool.read()
+        if content and not content.endswith("\n"):
+            self._spool_append({})  # start the next record on a fresh line after a torn one
+        unwritten: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for line in content.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn final line from a crash mid-append
+            if record.get("op") == "batch":
+                batch = record.get("batch") or {}
+                unwritten[_submission_id(batch)] = batch
+            elif record.get("op") == "done":
+                for submission_id in record.get("ids") or []:
+                    unwritten.pop(str(submission_id), None)
+        for submission_id, batch in unwritten.items():
+            if submission_id not in self._pending and submission_id not in self._in_flight:
+                self._enqueue(submission_id, batch)
+        self.recovered_total += len(unwritten)
+        if unwritten:
+            logger.warning("Replaying %d graded batches from result spool %s", len(unwritten), self.spool_path)
+        self._spool_compact()
+        return len(unwritten)
+
+    # ------------------------------------------------------------------ flushing
+    def _enqueue(self, submission_id: str, batch: Dict[str, Any]) -> None:
+        self._pending[submission_id] = batch
+        self._enqueued_at[submission_id] = time.monotonic()
+        self._pending_rows += len(batch.get("p_results") or [])
+        self.high_watermark = max(self.high_watermark, len(self._pending))
+
+    def _back_off(self) -> None:
+        self._retry_delay = min(self.retry_max_interval, max(self.flush_interval, self._retry_delay * 2))
+        self._retry_at = time.monotonic() + self._retry_delay
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            backoff = self._retry_at - time.monotonic()
+            if backoff > 0:
+                # After a failed write, barrier waiters and full queues do not hurry the retry
+                await asyncio.sleep(backoff)
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            if self._pending:
+                await self._flush_once()
+            else:
+                self._publish_flushed()
+
+    async def _write(self, batches: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Bulk write; the submission id per batch, ``None`` where one was rejected.
+
+        A group that raises is written batch by batch and the batches that still raise are
+        rejected. If every batch raises the database is taken to be down and this raises,
+        so nothing is counted against them, unless all of them were rejected before (a bad
+        batch left alone at the front of the queue).
+        """
+        assert self._writer is not None
+        try:
+            return list(await self._writer(batches) or [])
+        except Exception as exc:
+            error = exc
+        results: List[Optional[str]] = [None] * len(batches)
+        raised = len(batches)
+        if len(batches) > 1:
+            self.split_flushes += 1
+            logger.warning("Bulk write of %d graded batches failed (%s); writing them one by one", len(batches), error)
+            raised = 0
+            for idx, batch in enumerate(batches):
+                try:
+                    written = list(await self._writer([batch]) or [])
+                except Exception:
+                    raised += 1
+                    continue
+                results[idx] = written[0] if written else None
+        if raised == len(batches) and not all(self._attempts.get(_submission_id(batch)) for batch in batches):
+            raise error
+        return results
+
+    async def _flush_once(self) -> None:
+        # Everything queued goes in one bulk write, at least one batch and about flush_rows rows
+        group: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        rows = 0
+        while self._pending and (not group or rows < self.flush_rows):
+            submission_id, batch = self._pending.popitem(last=False)
+            group[submission_id] = batch
+            rows += len(batch.get("p_results") or [])
+        self._pending_rows -= rows
+        self._in_flight.update(group)
+
+        started = time.perf_counter()
+        try:
+            if self._writer is None:
+                raise RuntimeError("result writer has no batch writer")
+            await asyncio.to_thread(self._spool_sync)
+            written = await self._write(list(group.values()))
+        except Exception as exc:
+            # Nothing was written: put the group back in front, in order, and back off
+            self.flush_failures += 1
+            self._back_off()
+            logger.warning("Flushing %d graded batches failed (%s); retrying in %.1fs", len(group), exc, self._retry_delay)
+            for submission_id in group:
+                self._in_flight.pop(submission_id, None)
+            group.update(self._pending)
+            self._pending = group
+            self._pending_rows += rows
+            self._publish_flushed()
+            return
+
+        self.flushes += 1
+        self.last_flush_ms = (time.perf_counter() - started) * 1000.0
+        results = list(written or [])
+        results += [None] * (len(group) - len(results))
+        rejected: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for (submission_id, batch), result in zip(group.items(), results):
+            if result is None:
+                rejected[submission_id] = batch
+        done = [submission_id for submission_id in group if submission_id not in rejected]
+        self.flushed_batches += len(done)
+        self.flushed_rows += sum(len(group[submission_id].get("p_results") or []) for submission_id in done)
+
+        retry: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        exhausted: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for submission_id, batch in rejected.items():
+            self.failed_batches += 1
+            attempts = self._attempts.get(submission_id, 0) + 1
+            self._attempts[submission_id] = attempts
+            logger.error(
+                "Graded batch %s for question %s could not be written (attempt %d)",
+                submission_id, batch["p_submission"].get("question_id"), attempts,
+            )
+            (exhausted if attempts >= self.max_batch_attempts else retry)[submission_id] = batch
+        if exhausted and await asyncio.to_thread(self._dead_letter, exhausted):
+            self.dead_lettered += len(exhausted)
+            for submission_id in exhausted:
+                self._dead_ids[submission_id] = None
+            while len(self._dead_ids) > self.max_pending:
+                self._dead_ids.popitem(last=False)
+            done.extend(exhausted)
+        else:
+            retry.update(exhausted)
+
+        for submission_id in group:
+            self._in_flight.pop(submission_id, None)
+        for submission_id in done:
+            self._enqueued_at.pop(submission_id, None)
+            self._attempts.pop(submission_id, None)
+        if retry:
+            # Rejected batches go back in front, in order, after a backoff; never marked done
+            self._back_off()
+            retry_rows = sum(len(batch.get("p_results") or []) for batch in retry.values())
+            retry.update(self._pending)
+            self._pending = retry
+            self._pending_rows += retry_rows
+        else:
+            self._retry_delay = 0.0
+            self._retry_at = 0.0
+        if done:
+            self._spool_append({"op": "done", "ids": done})
+        self._spool_compact()
+        self._publish_flushed()
+
+    # ------------------------------------------------------------------ public API
+    async def start(self) -> None:
+        """Open the spool, replay what a previous process left unwritten and start flushing."""
+        if not self.enabled:
+            return
+        self._open_spool()
+        self._ensure_task()
+        if self._recover():
+            assert self._wakeup is not None
+            self._wakeup.set()
+
+    async def submit(self, batch: Dict[str, Any]) -> str:
+        """Queue a prepared batch (see ``build_test_batch``); returns its submission id."""
+        submission_id = _submission_id(batch)
+        self._ensure_task()
+        if len(self._pending) >= self.max_pending:
+            self.backpressure_waits += 1
+            started = time.monotonic()
+            deadline = started + self.backpressure_timeout
+            while len(self._pending) >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.overflowed_total += 1
+                    logger.warning("Result writer is %d batches behind; queueing past max_pending", len(self._pending))
+                    break
+                await self._wait_flushed(remaining)
+            self.backpressure_wait_s += time.monotonic() - started
+        self._spool_append({"op": "batch", "batch": batch})
+        self._enqueue(submission_id, batch)
+        self.enqueued_total += 1
+        if self._pending_rows >= self.flush_rows:
+            assert self._wakeup is not None
+            self._wakeup.set()
+        return submission_id
+
+    def is_pending(self, submission_id: str) -> bool:
+        return submission_id in self._pending or submission_id in self._in_flight
+
+    async def wait_written(self, submission_id: str, timeout: Optional[float] = None) -> bool:
+        """Flush now and wait until ``submission_id`` is written; ``False`` on timeout.
+
+        Also ``False`` once the batch has been moved to the dead-letter file.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.is_pending(str(submission_id)):
+            self._ensure_task()
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            await self._wait_flushed(remaining)
+        return str(submission_id) not in self._dead_ids
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far; ``False`` if it did not finish within ``timeout``."""
+        targets = list(self._pending) + list(self._in_flight)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for submission_id in targets:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not await self.wait_written(submission_id, remaining):
+                return False
+        return True
+
+    async def aclose(self, timeout: float = 10.0) -> None:
+        """Drain the queue (batches left after ``timeout`` stay in the spool) and stop."""
+        if self._pending or self._in_flight:
+            if not await self.flush(timeout):
+                logger.warning(
+                    "Result writer stopped with %d graded batches unwritten%s",
+                    len(self._pending) + len(self._in_flight),
+                    "; they will be replayed from the spool" if self._spool is not None else "",
+                )
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+        self._loop = None
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        oldest = min(self._enqueued_at.values(), default=None)
+        return {
+            "enabled": self.enabled,
+            "pending_batches": len(self._pending),
+            "pending_rows": self._pending_rows,
+            "in_flight_batches": len(self._in_flight),
+            "max_pending": self.max_pending,
+            "high_watermark": self.high_watermark,
+            "oldest_pending_ms": round((now - oldest) * 1000.0, 1) if oldest is not None else 0.0,
+            "enqueued_total": self.enqueued_total,
+            "flushes": self.flushes,
+            "flushed_batches": self.flushed_batches,
+            "flushed_rows": self.flushed_rows,
+            "flush_failures": self.flush_failures,
+            "failed_batches": self.failed_batches,
+            "split_flushes": self.split_flushes,
+            "dead_lettered": self.dead_lettered,
+            "recovered_total": self.recovered_total,
+            "backpressure_waits": self.backpressure_waits,
+            "backpressure_wait_ms_total": round(self.backpressure_wait_s * 1000.0, 1),
+            "overflowed_total": self.overflowed_total,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "spool": self.spool_path if self._spool is not None else None,
+        }
+
+
+async def _write_with_repository(batches: List[Dict[str, Any]]) -> List[Optional[str]]:
+    # Imported lazily: the repository hands batches to this module
+    from app.features.submissions.code_results_repository import code_results_repository
+
+    return await code_results_repository.write_test_batches(batches)
+
+
+def _build_writer() -> ResultWriter:
+    settings = get_settings()
+    return ResultWriter(
+        enabled=bool(getattr(settings, "code_results_write_behind", False)),
+        flush_interval=getattr(settings, "code_results_flush_interval_s", 0.2),
+        flush_rows=getattr(settings, "code_results_flush_rows", 500),
+        max_pending=getattr(settings, "code_results_max_pending", 2000),
+        spool_path=getattr(settings, "code_results_spool_path", ""),
+        writer=_write_with_repository,
+    )
+
+
+result_writer = _build_writer()
+
+__all__ = ["BatchWriter", "ResultWriter", "result_writer"]
@@ -0,0 +1,802 @@
+"""Reward processing for finalised challenge attempts, off the request path.
+
+Once an attempt is graded and finalised, the submit-challenge endpoint publishes a
+``ChallengeFinalised`` event here and returns the grading breakdown straight away. A fixed
+pool of worker tasks then runs the achievements engine (ELO, GPA, badges, titles), the
+per-question progress and ``user_scores`` updates and the ``user_elo``/``elo_events``
+bookkeeping that used to keep the student waiting.
+
+Work is keyed by attempt id: publishing an attempt that is queued, running or done returns
+the existing record. Before applying anything a worker claims the attempt with
+``claim_challenge_rewards`` (alembic/versions/challenge_reward_claims.sql), an atomic
+conditional update of ``challenge_attempts.rewards_claimed_at``, so retries, restarts and
+other replicas never award the same attempt twice; rewards are applied at most once, and an
+attempt whose claimant failed mid-way is left for an operator. Until that function is
+deployed the worker falls back to checking ``elo_events`` for the attempt. The UI polls
+``/submissions/rewards/{attempt_id}`` for the summary, which is kept for
+``retention_seconds`` after it is ready. The synchronous submit-challenge response
+therefore carries ``achievement_summary: None`` while the pipeline is on.
+
+The queue lives in memory, so events still queued when the process stops (a crash, or a
+redeploy whose drain timed out) are lost. ``start`` schedules a sweep ``recovery_delay``
+seconds after startup (once a previous instance has had time to drain) that republishes
+attempts submitted in the last ``recovery_lookback_seconds`` that were never claimed; it
+finds nothing until the claim column is deployed. Their events are rebuilt from the ``challenge_attempts`` row and the latest graded
+``code_submissions`` row of each snapshot question; the per-question ELO/GPA split is not
+stored, so question progress from a recovered event records tests but no ELO or GPA.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.Core.config import get_settings
+from app.DB.supabase import get_supabase
+from app.features.submissions.schemas import ChallengeQuestionResultSchema, ChallengeSubmissionBreakdown
+
+logger = logging.getLogger("submissions.rewards")
+
+TERMINAL_STATUSES = frozenset({"completed", "failed"})
+
+
+@dataclass
+class ChallengeFinalised:
+    attempt_id: str
+    student_number: int
+    challenge_id: str
+    tier: str
+    breakdown: ChallengeSubmissionBreakdown
+    performance: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class RewardRecord:
+    attempt_id: str
+    user_id: int
+    challenge_id: str
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    _done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the rewards are applied (or failed); ``False`` on timeout."""
+        if self.done:
+            return True
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "attempt_id": self.attempt_id,
+            "challenge_id": self.challenge_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "achievement_summary": (self.result or {}).get("achievement_summary"),
+            "already_applied": bool((self.result or {}).get("already_applied")),
+            "error": self.error,
+        }
+
+
+RewardApplier = Callable[[ChallengeFinalised], Awaitable[Dict[str, Any]]]
+# Finds finalised attempts that were never rewarded: (lookback_seconds, limit) -> events
+AttemptRecoverer = Callable[[float, int], Awaitable[List[ChallengeFinalised]]]
+
+
+class RewardPipeline:
+    def __init__(
+        self,
+        *,
+        workers: int = 2,
+        max_pending: int = 500,
+        retention_seconds: float = 900.0,
+        max_records: int = 5000,
+        recovery_delay: float = 30.0,
+        recovery_lookback_seconds: float = 86400.0,
+        recovery_limit: int = 500,
+        applier: Optional[RewardApplier] = None,
+        recoverer: Optional[AttemptRecoverer] = None,
+    ) -> None:
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.retention_seconds = max(0.0, float(retention_seconds))
+        self.max_records = max(1, int(max_records))
+        self.recovery_delay = max(0.0, float(recovery_delay))
+        self.recovery_lookback_seconds = max(0.0, float(recovery_lookback_seconds))
+        self.recovery_limit = max(1, int(recovery_limit))
+        self._applier = applier
+        self._recoverer = recoverer
+        self._recovery_task: Optional[asyncio.Task] = None
+        self._records: "OrderedDict[str, RewardRecord]" = OrderedDict()
+        self._events: Dict[str, ChallengeFinalised] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published_total = 0
+        self.deduplicated_total = 0
+        self.completed_total = 0
+        self.failed_total = 0
+        self.backpressure_waits = 0
+        self.recovered_total = 0
+
+    # ------------------------------------------------------------------ workers
+    def _ensure_workers(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            # First use, or the previous loop is gone (tests run one loop per case); events
+            # queued on a dead loop will never run, so they may be published again
+            for record in self._records.values():
+                if not record.done:
+                    self._finish(record, error="reward_processing_lost")
+            self._events.clear()
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        return self._queue
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        assert queue is not None
+        while True:
+            attempt_id = await queue.get()
+            try:
+                record = self._records.get(attempt_id)
+                event = self._events.pop(attempt_id, None)
+                if record is not None and event is not None:
+                    await self._run(record, event)
+            finally:
+                queue.task_done()
+
+    async def _run(self, record: RewardRecord, event: ChallengeFinalised) -> None:
+        record.status = "running"
+        record.started_at = time.time()
+        applier = self._applier or apply_challenge_rewards
+        try:
+            result = await applier(event)
+        except asyncio.CancelledError:
+            self._finish(record, error="reward_processing_cancelled")
+            raise
+        except Exception as exc:
+            logger.exception("Reward processing failed for attempt %s", record.attempt_id)
+            self._finish(record, error=str(exc) or type(exc).__name__)
+            return
+        self._finish(record, result=result)
+
+    def _finish(
+        self,
+        record: RewardRecord,
+        *,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        record.result = result
+        record.error = error
+        record.status = "failed" if error is not None else "completed"
+        record.finished_at = time.time()
+        if error is not None:
+            self.failed_total += 1
+        else:
+            self.completed_total += 1
+        record._done.set()
+
+    # ------------------------------------------------------------------ recovery
+    async def _recover_later(self) -> None:
+        await asyncio.sleep(self.recovery_delay)
+        await self.recover()
+
+    async def recover(self) -> int:
+        """Republish finalised attempts whose rewards were never applied; returns how many."""
+        recoverer = self._recoverer or find_unrewarded_attempts
+        try:
+            events = await recoverer(self.recovery_lookback_seconds, self.recovery_limit)
+        except Exception:
+            logger.exception("Reward recovery sweep failed")
+            return 0
+        published = 0
+        for event in events:
+            if self.get(event.attempt_id) is not None:
+                continue  # published by this process since it started
+            await self.publish(event)
+            published += 1
+        self.recovered_total += published
+        if published:
+            logger.warning("Republished rewards for %d finalised attempts left unrewarded", published)
+        return published
+
+    # ------------------------------------------------------------------ public API
+    async def start(self) -> None:
+        """Schedule the recovery sweep for rewards a previous process did not apply."""
+        if self._recovery_task is None or self._recovery_task.done():
+            self._recovery_task = asyncio.get_running_loop().create_task(self._recover_later())
+
+    async def publish(self, event: ChallengeFinalised) -> RewardRecord:
+        """Queue rewards for a finalised attempt; an attempt already queued or applied is not redone.
+
+        A failed attempt is queued again. When ``max_pending`` events are waiting the caller
+        waits for a free slot rather than dropping rewards.
+        """
+        self._prune()
+        attempt_id = str(event.attempt_id)
+        existing = self._records.get(attempt_id)
+        if existing is not None and existing.status != "failed":
+            self.deduplicated_total += 1
+            return existing
+        queue = self._ensure_workers()
+        record = RewardRecord(attempt_id=attempt_id, user_id=event.student_number, challenge_id=event.challenge_id)
+        self._records[attempt_id] = record
+        self._records.move_to_end(attempt_id)
+        self._events[attempt_id] = event
+        self.published_total += 1
+        if queue.full():
+            self.backpressure_waits += 1
+        await queue.put(attempt_id)
+        return record
+
+    def get(self, attempt_id: str) -> Optional[RewardRecord]:
+        self._prune()
+        return self._records.get(str(attempt_id))
+
+    def _prune(self) -> None:
+        now = time.time()
+        expired = [
+            attempt_id
+            for attempt_id, record in self._records.items()
+            if record.done and record.finished_at is not None and now - record.finished_at > self.retention_seconds
+        ]
+        for attempt_id in expired:
+            self._records.pop(attempt_id, None)
+        if len(self._records) > self.max_records:
+            for attempt_id in [aid for aid, record in self._records.items() if record.done]:
+                if len(self._records) <= self.max_records:
+                    break
+                self._records.pop(attempt_id, None)
+
+    async def aclose(self, timeout: float = 10.0) -> None:
+        """Give queued rewards ``timeout`` seconds to finish, then stop the workers."""
+        recovery, self._recovery_task = self._recovery_task, None
+        if recovery is not None and not recovery.done():
+            recovery.cancel()
+            try:
+                await recovery
+            except BaseException:
+                pass
+        queue = self._queue
+        if queue is not None and self._loop is asyncio.get_running_loop():
+            try:
+                await asyncio.wait_for(queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Stopping reward workers with %d events unprocessed", len(self._events))
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except BaseException:
+                pass
+        self._queue = None
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for record in self._records.values():
+            statuses[record.status] = statuses.get(record.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self.max_pending,
+            "retained": len(self._records),
+            "by_status": statuses,
+            "published_total": self.published_total,
+            "deduplicated_total": self.deduplicated_total,
+            "completed_total": self.completed_total,
+            "failed_total": self.failed_total,
+            "backpressure_waits": self.backpressure_waits,
+            "recovered_total": self.recovered_total,
+        }
+
+
+# ---------------------------------------------------------------------- applying rewards
+async def _already_rewarded(client: Any, attempt_id: str) -> bool:
+    """True when ``elo_events`` already records this attempt (either writer's column)."""
+    for column in ("challenge_attempt_id", "attempt_id"):
+        try:
+            resp = await client.table("elo_events").select("id").eq(column, attempt_id).limit(1).execute()
+        except Exception:
+            continue
+        if getattr(resp, "data", None):
+            return True
+    return False
+
+
+async def _claim_rewards(client: Any, attempt_id: str) -> Optional[bool]:
+    """Claim the attempt's rewards for this call; ``None`` when the claim function is not deployed."""
+    from app.features.achievements.repository import _is_missing_object
+
+    try:
+        resp = await client.rpc("claim_challenge_rewards", {"p_attempt_id": attempt_id}).execute()
+    except Exception as exc:
+        if _is_missing_object(exc):
+            return None
+        raise
+    data = getattr(resp, "data", None)
+    if isinstance(data, list):
+        data = data[0] if data else None
+    return bool(data)
+
+
+async def _mark_rewards_applied(client: Any, attempt_id: str) -> None:
+    try:
+        await (
+            client.table("challenge_attempts")
+            .update({"rewards_applied_at": datetime.now(timezone.utc).isoformat()})
+            .eq("id", attempt_id)
+            .execute()
+        )
+    except Exception as exc:
+        logger.warning("Could not mark rewards of attempt %s as applied: %s", attempt_id, exc)
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def _as_dict(value: Any) -> Dict[str, Any]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+async def _rebuild_event(client: Any, attempt: Dict[str, Any]) -> ChallengeFinalised:
+    """The ``ChallengeFinalised`` event of a submitted attempt, from what the database kept."""
+    attempt_id = str(attempt["id"])
+    student_number = int(attempt["user_id"])
+    challenge_id = str(attempt["challenge_id"])
+    tier = str(attempt.get("tier") or "base")
+    snapshot = [entry for entry in attempt.get("snapshot_questions") or [] if entry.get("question_id")]
+    submitted_at = _parse_time(attempt.get("submitted_at"))
+
+    # Latest graded run of each snapshot question up to the submission
+    latest: Dict[str, Dict[str, Any]] = {}
+    try:
+        resp = await (
+            client.table("code_submissions")
+            .select("*")
+            .eq("user_id", student_number)
+            .eq("challenge_id", challenge_id)
+            .order("created_at", desc=True)
+            .limit(max(50, 10 * len(snapshot)))
+            .execute()
+        )
+        rows = getattr(resp, "data", None) or []
+    except Exception:
+        rows = []
+    for row in rows:
+        question_id = str(row.get("question_id") or "")
+        created_at = _parse_time(row.get("created_at"))
+        if question_id in latest or (submitted_at and created_at and created_at > submitted_at):
+            continue
+        latest[question_id] = row
+
+    question_results: List[ChallengeQuestionResultSchema] = []
+    passed: List[str] = []
+    failed: List[str] = []
+    missing: List[str] = []
+    badge_tiers: List[str] = []
+    gpa_max = 0
+    for entry in snapshot:
+        question_id = str(entry["question_id"])
+        points = int(entry.get("points") or 1)
+        gpa_max += points
+        row = latest.get(question_id)
+        if row is None:
+            missing.append(question_id)
+            continue
+        meta = _as_dict(row.get("additional_files"))
+        question_tier = str(meta.get("tier") or tier)
+        question_passed = int(row.get("status_id") or 0) == 3
+        (passed if question_passed else failed).append(question_id)
+        if question_passed and question_tier not in badge_tiers:
+            badge_tiers.append(question_tier)
+        question_results.append(ChallengeQuestionResultSchema(
+            challenge_id=challenge_id,
+            question_id=question_id,
+            tier=question_tier,
+            language_id=int(row.get("language_id") or entry.get("language_id") or 71),
+            gpa_weight=points,
+            gpa_awarded=0,
+            elo_awarded=0,
+            elo_base=0,
+            elo_efficiency_bonus=0,
+            public_passed=question_passed,
+            tests_passed=int(meta.get("tests_passed") or 0),
+            tests_total=int(meta.get("tests_total") or 0),
+            badge_tier_awarded=question_tier if question_passed else None,
+            submission_id=str(row["id"]) if row.get("id") else None,
+            attempt_id=attempt_id,
+            attempt_number=meta.get("attempt_number"),
+            tests=[],
+        ))
+
+    elo_delta = int(attempt.get("elo_delta") or 0)
+    efficiency_bonus = int(attempt.get("efficiency_bonus") or 0)
+    breakdown = ChallengeSubmissionBreakdown(
+        challenge_id=challenge_id,
+        attempt_id=attempt_id,
+        gpa_score=int(attempt.get("score") or 0),
+        gpa_max_score=gpa_max,
+        elo_delta=elo_delta,
+        base_elo_total=elo_delta - efficiency_bonus,
+        efficiency_bonus_total=efficiency_bonus,
+        tests_total=int(attempt.get("tests_total") or 0),
+        tests_passed_total=int(attempt.get("tests_passed") or 0),
+        time_used_seconds=attempt.get("duration_seconds"),
+        passed_questions=passed,
+        failed_questions=failed,
+        missing_questions=missing,
+        badge_tiers_awarded=badge_tiers,
+        question_results=question_results,
+    )
+    performance = {
+        "tests_total": breakdown.tests_total,
+        "tests_passed_total": breakdown.tests_passed_total,
+        "base_elo_total": breakdown.base_elo_total,
+        "efficiency_bonus_total": breakdown.efficiency_bonus_total,
+        "challenge_id": challenge_id,
+        "tier": tier,
+        "time_used_seconds": breakdown.time_used_seconds,
+    }
+    return ChallengeFinalised(
+        attempt_id=attempt_id,
+        student_number=student_number,
+        challenge_id=challenge_id,
+        tier=tier,
+        breakdown=breakdown,
+        performance={k: v for k, v in performance.items() if v is not None},
+    )
+
+
+async def find_unrewarded_attempts(lookback_seconds: float, limit: int) -> List[ChallengeFinalised]:
+    """Events for attempts submitted in the last ``lookback_seconds`` whose rewards were never claimed."""
+    from app.features.achievements.repository import _is_missing_object
+
+    client = await get_supabase()
+    try:
+        resp = await (
+            client.table("challenge_attempts")
+            .select("*")
+            .eq("status", "submitted")
+            .is_("rewards_claimed_at", "null")
+            .order("submitted_at", desc=True)
+            .limit(limit)
+            .execute()
+        )
+    except Exception as exc:
+        if _is_missing_object(exc):
+            # Without a durable claim a recovered attempt could be rewarded twice
+            logger.info("Reward claims are not deployed; skipping reward recovery")
+            return []
+        raise
+    cutoff = datetime.now(timezone.utc).timestamp() - lookback_seconds
+    events: List[ChallengeFinalised] = []
+    for attempt in getattr(resp, "data", None) or []:
+        submitted_at = _parse_time(attempt.get("submitted_at"))
+        if submitted_at is None or submitted_at.timestamp() < cutoff:
+            continue
+        if not attempt.get("id") or attempt.get("user_id") is None or not attempt.get("challenge_id"):
+            continue
+        try:
+            events.append(await _rebuild_event(client, attempt))
+        except Exception:
+            logger.exception("Could not rebuild the reward event of attempt %s", attempt.get("id"))
+    return events
+
+
+def _extract(summary_obj: Any, key: str) -> Any:
+    """Read ``key`` from an achievements summary model, dict or dumped model."""
+    try:
+        return getattr(summary_obj, key)
+    except Exception:
+        pass
+    try:
+        return summary_obj.get(key)
+    except Exception:
+        pass
+    try:
+        return summary_obj.model_dump().get(key)
+    except Exception:
+        return None
+
+
+async def apply_challenge_rewards(event: ChallengeFinalised) -> Dict[str, Any]:
+    """Run the achievements engine for a finalised attempt and persist its rewards."""
+    from app.features.achievements.repository import AchievementsRepository
+    from app.features.achievements.schemas import CheckAchievementsRequest
+    from app.features.achievements.service import achievements_service
+
+    breakdown = event.breakdown
+    attempt_id = event.attempt_id
+    student_number = event.student_number
+
+    client = await get_supabase()
+    claimed = await _claim_rewards(client, str(attempt_id))
+    if claimed is None:
+        # Claim function not deployed yet; elo_events is only a best-effort marker
+        already_applied = await _already_rewarded(client, str(attempt_id))
+    else:
+        already_applied = not claimed
+    if already_applied:
+        logger.info("Rewards for attempt %s were already claimed; skipping", attempt_id)
+        return {"achievement_summary": None, "already_applied": True}
+
+    logger.info(f"🎯 STARTING ACHIEVEMENT PROCESSING for student {student_number}")
+    logger.info(f"   ELO Delta: {breakdown.elo_delta}, Badge Tiers: {breakdown.badge_tiers_awarded}")
+
+    achievement_summary = await achievements_service.check_achievements(
+        str(student_number),
+        CheckAchievementsRequest(
+            submission_id=str(attempt_id),
+            elo_delta_override=int(breakdown.elo_delta),
+            badge_tiers=breakdown.badge_tiers_awarded,
+            performance=event.performance or None,
+        ),
+    )
+
+    logger.info(
+        f"✅ Achievement summary created: ELO={achievement_summary.updated_elo if achievement_summary else 'None'}"
+    )
+
+    # Update user_question_progress for each question
+    achievements_repo = AchievementsRepository()
+
+    for question_result in breakdown.question_results:
+        try:
+            await achievements_repo.update_question_progress(
+                user_id=str(student_number),
+                question_id=str(question_result.question_id),
+                challenge_id=str(breakdown.challenge_id),
+                attempt_id=str(attempt_id),
+                tests_passed=question_result.tests_passed or 0,
+                tests_total=question_result.tests_total or 0,
+                elo_earned=question_result.elo_awarded or 0,
+                gpa_contribution=question_result.gpa_awarded or 0,
+            )
+        except Exception as qp_err:
+            logger.warning(f"   ❌ Failed to update question_progress: {qp_err}")
+
+    # Update user_scores table with overall stats
+    if achievement_summary:
+        try:
+            questions_attempted = len(breakdown.question_results)
+            questions_passed = len(breakdown.passed_questions)
+            challenges_completed = 1 if questions_passed >= (questions_attempted * 0.5) else 0
+            total_badges = len(achievement_summary.unlocked_badges) if achievement_summary.unlocked_badges else 0
+
+            await achievements_repo.update_user_scores(
+                user_id=str(student_number),
+                elo=achievement_summary.updated_elo,
+                gpa=achievement_summary.gpa,
+                questions_attempted=questions_attempted,
+                questions_passed=questions_passed,
+                challenges_completed=challenges_completed,
+                badges=total_badges,
+            )
+            logger.info("   ✅ user_scores updated successfully")
+        except Exception as scores_err:
+            logger.warning(f"   ❌ Failed to update user_scores: {scores_err}")
+    else:
+        logger.warning("⚠️ No achievement_summary - skipping user_scores update")
+
+    try:
+        await _persist_rewards(client, event, achievement_summary)
+    except Exception as persist_err:
+        logger.warning(f"⚠️ Reward persistence failed (non-fatal): {persist_err}")
+
+    if claimed:
+        await _mark_rewards_applied(client, str(attempt_id))
+
+    return {
+        "achievement_summary": achievement_summary.model_dump() if achievement_summary else None,
+        "already_applied": False,
+    }
+
+
+async def _persist_rewards(client: Any, event: ChallengeFinalised, achievement_summary: Any) -> None:
+    """Mirror the summary into ``user_elo``, ``elo_events``, ``user_badge`` and ``profiles``."""
+    breakdown = event.breakdown
+    attempt_id = event.attempt_id
+    student_number = event.student_number
+
+    updated_elo = _extract(achievement_summary, "updated_elo")
+    previous_elo = _extract(achievement_summary, "previous_elo") or _extract(
+        achievement_summary, "previousElo"
+    ) or None
+    unlocked_badges = _extract(achievement_summary, "unlocked_badges") or _extract(
+        achievement_summary, "unlockedBadges"
+    ) or []
+    new_title_id = (
+        _extract(achievement_summary, "new_title_id")
+        or _extract(achievement_summary, "newTitleId")
+        or _extract(achievement_summary, "title_id")
+        or None
+    )
+
+    # One read of the current user_elo row serves both the fallback ELO and the running total
+    try:
+        resp = await client.table("user_elo").select("*").eq("student_id", student_number).limit(1).execute()
+        rows = getattr(resp, "data", None) or []
+        existing = rows[0] if rows else None
+    except Exception:
+        existing = None
+
+    # If updated_elo is missing, compute from DB current value + breakdown.elo_delta
+    if updated_elo is None and isinstance(breakdown.elo_delta, int):
+        current_before = existing.get("current_elo") if existing else None
+        if current_before is not None:
+            previous_elo = int(current_before)
+            updated_elo = int(current_before) + int(breakdown.elo_delta)
+        else:
+            previous_elo = 0
+            updated_elo = int(breakdown.elo_delta)
+
+    # Fetch profile to get supabase_id uuid for user_id field in elo_events
+    profile_supabase_id = None
+    try:
+        resp = await client.table("profiles").select("supabase_id").eq("id", student_number).limit(1).execute()
+        rows = getattr(resp, "data", None) or []
+        if rows:
+            profile_supabase_id = rows[0].get("supabase_id")
+    except Exception:
+        profile_supabase_id = None
+
+    if updated_elo is not None:
+        if previous_elo is None:
+            try:
+                if existing and existing.get("current_elo") is not None:
+                    previous_elo = int(existing.get("current_elo"))
+                else:
+                    previous_elo = 0
+            except Exception:
+                previous_elo = 0
+
+        # Prefer the graded delta; fall back to the difference of the two ELO values
+        try:
+            elo_delta_val = int(breakdown.elo_delta) if breakdown.elo_delta is not None else int(updated_elo) - int(previous_elo)
+        except Exception:
+            elo_delta_val = 0
+
+        try:
+            total_awarded = (existing.get("total_awarded_elo") if existing and existing.get("total_awarded_elo") is not None else 0)
+            try:
+                total_awarded = int(total_awarded) + int(elo_delta_val)
+            except Exception:
+                total_awarded = int(elo_delta_val)
+
+            upsert_payload = {
+                "student_id": student_number,
+                "current_elo": int(updated_elo),
+                "total_awarded_elo": total_awarded,
+                "last_awarded_at": datetime.now(timezone.utc).isoformat(),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+            # Keep profile_id if present in existing row (defensive)
+            if existing and existing.get("profile_id") is not None:
+                upsert_payload["profile_id"] = existing.get("profile_id")
+
+            await client.table("user_elo").upsert(upsert_payload).execute()
+            logger.info(f"   ✅ user_elo upserted for student={student_number} current_elo={updated_elo}")
+        except Exception as ue:
+            logger.warning(f"   ❌ Failed to upsert user_elo for student {student_number}: {ue}")
+
+        # Insert a single elo_events audit record
+        try:
+            event_payload = {
+                "user_id": profile_supabase_id,
+                "student_id": student_number,
+                "event_type": "challenge_submission",
+                "elo_change": int(elo_delta_val),
+                "elo_before": int(previous_elo) if previous_elo is not None else None,
+                "elo_after": int(updated_elo),
+                "challenge_id": event.challenge_id,
+                "attempt_id": str(attempt_id),
+                "submission_id": str(attempt_id),
+                "question_id": None,
+                "metadata": {
+                    "gpa_score": breakdown.gpa_score,
+                    "tests_total": breakdown.tests_total,
+                    "tests_passed": breakdown.tests_passed_total,
+                },
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+            # Clean None values (Supabase client tolerates missing keys but this keeps payload tidy)
+            event_payload = {k: v for k, v in event_payload.items() if v is not None}
+            await client.table("elo_events").insert(event_payload).execute()
+            logger.info(f"   ✅ elo_events inserted for student={student_number}")
+        except Exception as ee:
+            logger.warning(f"   ❌ Failed to insert elo_events for student {student_number}: {ee}")
+
+    # Persist badges (if any); unlocked_badges may be list of dicts or strings - normalize to list of ids
+    badge_ids: list = []
+    if isinstance(unlocked_badges, (list, tuple)):
+        for item in unlocked_badges:
+            if isinstance(item, dict):
+                bid = item.get("id") or item.get("badge_id") or item.get("badgeId")
+                if bid:
+                    badge_ids.append(bid)
+            else:
+                badge_ids.append(item)
+    elif isinstance(unlocked_badges, str):
+        badge_ids = [unlocked_badges]
+
+    for bid in badge_ids:
+        try:
+            badge_payload = {
+                "profile_id": student_number,
+                "badge_id": str(bid),
+                "date_earned": datetime.now(timezone.utc).isoformat(),
+                "question_id": None,
+            }
+            await client.table("user_badge").insert(badge_payload).execute()
+            logger.info(f"   ✅ user_badge inserted for student={student_number} badge={bid}")
+        except Exception as ub_err:
+            logger.warning(f"   ❌ Failed to insert user_badge for student {student_number} badge {bid}: {ub_err}")
+
+    # Persist title change if present
+    if new_title_id:
+        try:
+            await client.table("profiles").update({"title_id": new_title_id}).eq("id", student_number).execute()
+            logger.info(f"   ✅ profiles.title_id updated for student={student_number} -> title={new_title_id}")
+        except Exception as title_err:
+            logger.warning(f"   ❌ Failed to update profiles.title_id for student {student_number}: {title_err}")
+
+
+def _build_pipeline() -> RewardPipeline:
+    settings = get_settings()
+    return RewardPipeline(
+        workers=getattr(settings, "reward_workers", 2),
+        max_pending=getattr(settings, "reward_max_pending", 500),
+        retention_seconds=getattr(settings, "reward_retention_s", 900.0),
+        recovery_delay=getattr(settings, "reward_recovery_delay_s", 30.0),
+        recovery_lookback_seconds=getattr(settings, "reward_recovery_lookback_s", 86400.0),
+        recovery_limit=getattr(settings, "reward_recovery_limit", 500),
+    )
+
+
+reward_pipeline = _build_pipeline()
+
+__all__ = [
+    "ChallengeFinalised",
+    "RewardPipeline",
+    "RewardRecord",
+    "apply_challenge_rewards",
+    "find_unrewarded_attempts",
+    "reward_pipeline",
+]
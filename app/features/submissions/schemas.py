@@ -2,9 +2,9 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
 
-from app.features.submissions.comparison import ComparisonMode
+from app.features.submissions.comparison import ComparisonMode, ExpectedProfile
 
 
 class QuestionTestSchema(BaseModel):
@@ -17,6 +17,16 @@ class QuestionTestSchema(BaseModel):
 	expected_hash: Optional[str] = None
 	compare_mode: str = ComparisonMode.AUTO
 	compare_config: Dict[str, Any] = Field(default_factory=dict)
+	_expected_profile: Optional[ExpectedProfile] = PrivateAttr(default=None)
+
+	def expected_profile(self) -> ExpectedProfile:
+		"""Canonical forms of ``expected``, built once and shared by copies of this test."""
+		unicode_nf = str(self.compare_config.get("unicode_nf") or "NFC")
+		profile = self._expected_profile
+		if profile is None or profile.raw != self.expected or profile.unicode_nf != unicode_nf:
+			profile = ExpectedProfile(self.expected, unicode_nf)
+			self._expected_profile = profile
+		return profile
 
 
 class QuestionBundleSchema(BaseModel):
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 import math
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from statistics import mean
 import logging
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
+from app.Core.config import get_settings
 from app.features.challenges.repository import challenge_repository
 from app.features.challenges.tier_utils import normalise_challenge_tier
+from app.features.submissions.bundle_cache import question_bundle_cache
 from app.features.submissions.code_results_repository import code_results_repository
-from app.features.submissions.comparison import CompareConfig, compare, resolve_mode
+from app.features.submissions.comparison import CompareConfig, compare_many, resolve_mode
+from app.features.submissions.harness import harness_enabled, run_python_harness
 from app.features.submissions.repository import submissions_repository
 from app.features.submissions.schemas import (
     BatchSubmissionEntry,
@@ -23,6 +27,7 @@ from app.features.submissions.schemas import (
 )
 from app.features.judge0.schemas import CodeSubmissionCreate, CodeExecutionResult
 from app.features.judge0.service import judge0_service
+from app.features.judge0.admission import judge0_admission
 
 DEFAULT_LANGUAGE_ID = 71
 MAX_QUESTION_SCORE = 100
@@ -112,6 +117,11 @@ def _select_tests(tests: Iterable[QuestionTestSchema], include_private: bool) ->
     return cleaned
 
 
+def _judge0_admission(user_id: int, cost: int, checked: bool = False):
+    """Hold ``cost`` Judge0 execution units; ``checked`` work queues instead of being rejected."""
+    return judge0_admission.admit(user_id, cost=cost, reject=not checked)
+
+
 def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
     if not value:
         return None
@@ -132,11 +142,78 @@ def _late_multiplier(started_at: Optional[datetime], *, limit_seconds: Optional[
 
 class SubmissionsService:
     async def get_question_bundle(self, challenge_id: str, question_id: str) -> QuestionBundleSchema:
+        cached = question_bundle_cache.get(question_id)
+        if cached is not None:
+            return cached
+        version = question_bundle_cache.version()
         question = await submissions_repository.get_question(question_id)
         if not question:
             raise ValueError("question_not_found")
         tests_rows = await submissions_repository.list_tests(question_id)
+        bundle = self._build_bundle(challenge_id, question_id, question, tests_rows)
+        question_bundle_cache.put(bundle, version)
+        return bundle
+
+    async def get_question_bundles(self, challenge_id: str, question_ids: List[str]) -> Dict[str, QuestionBundleSchema]:
+        """Bundles for several questions from one questions query and one query per test table.
+
+        Cached bundles are served without a query. Questions that do not exist are left out;
+        ``get_question_bundle`` raises for them.
+        """
+        bundles: Dict[str, QuestionBundleSchema] = {}
+        missing: List[str] = []
+        for question_id in question_ids:
+            cached = question_bundle_cache.get(question_id)
+            if cached is not None:
+                bundles[str(question_id)] = cached
+            else:
+                missing.append(str(question_id))
+        if missing:
+            version = question_bundle_cache.version()
+            questions = await submissions_repository.get_questions(missing)
+            bundles.update(await self._build_and_cache(challenge_id, questions, version))
+        return bundles
+
+    async def prewarm_question_bundles(self, challenge_ids: List[str]) -> int:
+        """Load every question bundle of ``challenge_ids`` into the cache; returns how many.
+
+        Called when challenges are published so the first submissions do not all miss at once.
+        """
+        challenge_ids = [str(cid) for cid in challenge_ids if cid]
+        if not challenge_ids or not question_bundle_cache.enabled:
+            return 0
+        for challenge_id in challenge_ids:
+            question_bundle_cache.invalidate_challenge(challenge_id)
+        version = question_bundle_cache.version()
+        questions = await submissions_repository.get_questions_for_challenges(challenge_ids)
+        bundles = await self._build_and_cache("", questions, version)
+        return len(bundles)
+
+    async def _build_and_cache(
+        self,
+        challenge_id: str,
+        questions: Dict[str, Dict[str, Any]],
+        version: int,
+    ) -> Dict[str, QuestionBundleSchema]:
+        tests_by_question = await submissions_repository.list_tests_for_questions(list(questions))
+        bundles: Dict[str, QuestionBundleSchema] = {}
+        for question_id, question in questions.items():
+            bundle = self._build_bundle(challenge_id, question_id, question, tests_by_question.get(question_id, []))
+            question_bundle_cache.put(bundle, version)
+            bundles[question_id] = bundle
+        return bundles
+
+    @staticmethod
+    def _build_bundle(
+        challenge_id: str,
+        question_id: str,
+        question: Dict[str, Any],
+        tests_rows: List[Dict[str, Any]],
+    ) -> QuestionBundleSchema:
         tests = [QuestionTestSchema(**row) for row in tests_rows]
+        # Built before the bundle is cached so every cached copy shares the same profiles
+        for test in tests:
+            test.expected_profile()
 
         tier = _resolve_tier(question.get("tier"))
         points = int(question.get("points") or MAX_QUESTION_SCORE)
@@ -177,7 +254,10 @@ class SubmissionsService:
         attempt_id: Optional[str] = None,
         perform_award: bool = False,
         record_result: bool = True,
+        admission_checked: bool = False,
     ) -> QuestionEvaluationResponse:
+        """Grade one question; ``admission_checked=True`` when the caller already passed
+        ``judge0_admission.check``, so Judge0 capacity is waited for rather than rejected."""
         del perform_award
 
         if source_code is None and submitted_output is None:
@@ -210,7 +290,21 @@ class SubmissionsService:
         judge0_pairs: List[tuple[str, CodeExecutionResult]] = []
         judge0_failed = False
         judge0_error_message: Optional[str] = None
-        if use_judge0 and tests:
+        harness_used = False
+        if use_judge0 and tests and harness_enabled(lang, len(tests)):
+            # One sandbox for every case; None means the harness asked for per-test execution.
+            async with _judge0_admission(user_id, 1, admission_checked):
+                harness_pairs = await run_python_harness(
+                    judge0_service,
+                    source_code=source_code or "",
+                    language_id=lang,
+                    stdins=[test.input for test in tests],
+                    expected_values=expected_values,
+                )
+            if harness_pairs is not None:
+                judge0_pairs = harness_pairs
+                harness_used = True
+        if use_judge0 and tests and not harness_used:
             submissions_payload = [
                 CodeSubmissionCreate(
                     source_code=source_code or "",
@@ -221,25 +315,25 @@ class SubmissionsService:
                 for idx in range(len(tests))
             ]
             if submissions_payload:
-                try:
-                    judge0_pairs = await judge0_service.execute_batch(submissions_payload)
-                    if len(judge0_pairs) != len(submissions_payload):
-                        # unexpected mismatch; treat as failure
-                        raise ValueError("judge0_batch_result_mismatch")
-                except Exception as e:
-                    # Log with context and avoid bubbling a raw connection error to API consumers.
-                    logger = logging.getLogger(__name__)
-                    logger.exception("Judge0 execute_batch failed for challenge=%s question=%s: %s", challenge_id, question_id, e)
-                    judge0_pairs = []
-                    judge0_failed = True
-                    judge0_error_message = str(e)
-
+                # AdmissionRejected propagates so the API can answer 429 + Retry-After.
+                async with _judge0_admission(user_id, len(submissions_payload), admission_checked):
+                    try:
+                        judge0_pairs = await judge0_service.execute_batch(submissions_payload)
+                        if len(judge0_pairs) != len(submissions_payload):
+                            # unexpected mismatch; treat as failure
+                            raise ValueError("judge0_batch_result_mismatch")
+                    except Exception as e:
+                        # Log with context and avoid bubbling a raw connection error to API consumers.
+                        logger = logging.getLogger(__name__)
+                        logger.exception("Judge0 execute_batch failed for challenge=%s question=%s: %s", challenge_id, question_id, e)
+                        judge0_pairs = []
+                        judge0_failed = True
+                        judge0_error_message = str(e)
+
+        executions: List[Dict[str, Any]] = []
         for idx, test in enumerate(tests):
             expected_val = expected_values[idx]
 
-            mode_override = resolve_mode(test.compare_mode)
-            config_overrides = test.compare_config or {}
-
             # Initialize defaults - will be overridden by Judge0 results if using code execution
             stdout_val = ""
             stderr_val = None
@@ -281,7 +375,7 @@ class SubmissionsService:
                         exec_seconds = None
                     memory_used = exec_result.memory_used
 
-                    if not stdout_val:
+                    if not stdout_val and not harness_used:
                         try:
                             raw = await judge0_service.get_submission_result(token_val)
                             hydrated = judge0_service._to_code_execution_result(raw, expected_val, lang)
@@ -299,14 +393,34 @@ class SubmissionsService:
                         except Exception:
                             pass
 
-            comparison = await compare(
-                expected_val,
-                stdout_val,
-                compare_cfg,
-                mode=mode_override,
-                compare_config=config_overrides,
+            executions.append(
+                {
+                    "stdout": stdout_val,
+                    "stderr": stderr_val,
+                    "compile_output": compile_output_val,
+                    "status_id": status_id,
+                    "status_description": status_description,
+                    "token": token_val,
+                    "execution_time": exec_time,
+                    "execution_time_seconds": exec_seconds,
+                    "memory_used": memory_used,
+                }
             )
 
+        # All of the question's comparisons in one pass, sharing config resolution and normalisation
+        comparisons = await compare_many(
+            [(test.expected_profile(), execution["stdout"]) for test, execution in zip(tests, executions)],
+            [(resolve_mode(test.compare_mode), test.compare_config or {}) for test in tests],
+            compare_cfg,
+        )
+
+        for idx, (test, execution, comparison) in enumerate(zip(tests, executions, comparisons)):
+            expected_val = expected_values[idx]
+            stdout_val = execution["stdout"]
+            status_id = execution["status_id"]
+            status_description = execution["status_description"]
+            exec_seconds = execution["execution_time_seconds"]
+
             passed_local = bool(comparison.passed)
             if use_judge0 and status_id != 3:
                 passed_local = False
@@ -326,19 +440,19 @@ class SubmissionsService:
                 passed=passed_local,
                 stdout=stdout_val,
                 expected_output=expected_val,
-                stderr=stderr_val,
-                compile_output=compile_output_val,
+                stderr=execution["stderr"],
+                compile_output=execution["compile_output"],
                 status_id=status_id,
                 status_description=status_description,
                 detail=detail_reason,
                 score_awarded=score_awarded,
                 gpa_contribution=score_awarded,
-                token=token_val,
-                execution_time=exec_time,
+                token=execution["token"],
+                execution_time=execution["execution_time"],
                 execution_time_seconds=exec_seconds,
                 execution_time_ms=(exec_seconds * 1000.0) if exec_seconds is not None else None,
-                memory_used=memory_used,
-                memory_used_kb=memory_used,
+                memory_used=execution["memory_used"],
+                memory_used_kb=execution["memory_used"],
                 compare_mode_applied=comparison.mode_applied,
                 normalisations_applied=comparison.normalisations_applied,
                 why_failed=None if passed_local else (detail_reason or comparison.reason),
@@ -533,7 +647,9 @@ class SubmissionsService:
         time_limit_seconds: Optional[int] = DEFAULT_TIME_LIMIT_SECONDS,
         duration_seconds: Optional[int] = None,
         perform_award: bool = False,
+        on_question_result: Optional[Callable[[ChallengeQuestionResultSchema], None]] = None,
     ) -> ChallengeSubmissionBreakdown:
+        """Grade every snapshot question; ``on_question_result`` is called as each one finishes."""
         del perform_award
 
         question_ids = list(language_overrides.keys())
@@ -572,96 +688,149 @@ class SubmissionsService:
             except Exception:
                 effective_duration = None
 
-        for question_id in question_ids:
-            bundle = await self.get_question_bundle(challenge_id, question_id)
-            if question_weights.get(question_id):
-                try:
-                    bundle.points = int(question_weights[question_id])  # type: ignore[misc]
-                except Exception:
-                    pass
-
-            entry = submissions.get(question_id)
-            current_attempts = int(attempt_counts.get(question_id, 0))
-            gpa_max += bundle.points or MAX_QUESTION_SCORE
-
-            if entry is None:
-                missing_questions.append(question_id)
-                continue
+        # One batched fetch for every bundle; anything it misses is loaded per question
+        try:
+            bundles = await self.get_question_bundles(challenge_id, question_ids)
+        except Exception as exc:
+            logging.getLogger(__name__).warning(
+                "Batched question prefetch failed (%s); loading bundles one by one", exc
+            )
+            bundles = {}
 
-            if current_attempts >= max_attempts:
-                fail_penalty = _fail_penalty(bundle.tier)
-                fail_result = ChallengeQuestionResultSchema(
+        try:
+            concurrency = max(1, int(getattr(get_settings(), "submission_grading_concurrency", 3)))
+        except Exception:
+            concurrency = 3
+        gate = asyncio.Semaphore(concurrency)
+
+        async def _grade(question_id: str) -> Tuple[QuestionBundleSchema, Optional[ChallengeQuestionResultSchema], bool]:
+            """Returns (bundle, result, graded); result is None for unanswered questions."""
+            async with gate:
+                bundle = bundles.get(question_id) or await self.get_question_bundle(challenge_id, question_id)
+                if question_weights.get(question_id):
+                    try:
+                        bundle.points = int(question_weights[question_id])  # type: ignore[misc]
+                    except Exception:
+                        pass
+
+                entry = submissions.get(question_id)
+                current_attempts = int(attempt_counts.get(question_id, 0))
+                if entry is None:
+                    return bundle, None, False
+
+                if current_attempts >= max_attempts:
+                    fail_penalty = _fail_penalty(bundle.tier)
+                    fail_result = ChallengeQuestionResultSchema(
+                        challenge_id=challenge_id,
+                        question_id=question_id,
+                        tier=bundle.tier,
+                        language_id=language_overrides.get(question_id) or bundle.language_id,
+                        gpa_weight=bundle.points or MAX_QUESTION_SCORE,
+                        gpa_awarded=0,
+                        elo_awarded=fail_penalty,
+                        elo_base=0,
+                        elo_efficiency_bonus=fail_penalty,
+                        public_passed=False,
+                        tests_passed=0,
+                        tests_total=0,
+                        average_execution_time_ms=None,
+                        average_memory_used_kb=None,
+                        badge_tier_awarded=None,
+                        submission_id=None,
+                        attempt_id=attempt_id,
+                        attempt_number=current_attempts,
+                        tests=[
+                            TestRunResultSchema(
+                                test_id="attempt_limit",
+                                visibility="public",
+                                passed=False,
+                                stdout="",
+                                expected_output=None,
+                                status_id=4,
+                                status_description="attempt_limit_reached",
+                                detail="attempt_limit_reached",
+                                score_awarded=0,
+                                gpa_contribution=0,
+                            )
+                        ],
+                    )
+                    if on_question_result is not None:
+                        on_question_result(fail_result)
+                    return bundle, fail_result, False
+
+                eval_result = await self.evaluate_question(
                     challenge_id=challenge_id,
                     question_id=question_id,
-                    tier=bundle.tier,
-                    language_id=language_overrides.get(question_id) or bundle.language_id,
-                    gpa_weight=bundle.points or MAX_QUESTION_SCORE,
-                    gpa_awarded=0,
-                    elo_awarded=fail_penalty,
-                    elo_base=0,
-                    elo_efficiency_bonus=fail_penalty,
-                    public_passed=False,
-                    tests_passed=0,
-                    tests_total=0,
-                    average_execution_time_ms=None,
-                    average_memory_used_kb=None,
-                    badge_tier_awarded=None,
-                    submission_id=None,
+                    submitted_output=None,
+                    source_code=entry.source_code,
+                    language_id=language_overrides.get(question_id) or entry.language_id,
+                    include_private=True,
+                    bundle=bundle,
+                    user_id=user_id,
+                    attempt_number=current_attempts + 1,
+                    late_multiplier=effective_late_multiplier,
                     attempt_id=attempt_id,
-                    attempt_number=current_attempts,
-                    tests=[
-                        TestRunResultSchema(
-                            test_id="attempt_limit",
-                            visibility="public",
-                            passed=False,
-                            stdout=None,
-                            expected_output=None,
-                            status_id=4,
-                            status_description="attempt_limit_reached",
-                            detail="attempt_limit_reached",
-                            score_awarded=0,
-                            gpa_contribution=0,
-                        )
-                    ],
+                    record_result=True,
+                    admission_checked=True,
                 )
-                results.append(fail_result)
-                failed_questions.append(question_id)
-                efficiency_total += fail_penalty
+                question_result = ChallengeQuestionResultSchema(**eval_result.model_dump())
+                if on_question_result is not None:
+                    on_question_result(question_result)
+                return bundle, question_result, True
+
+        # Turn a busy Judge0 away (AdmissionRejected -> 429) before any question is graded and
+        # recorded, without reserving anything: each question then admits its own tests after
+        # taking the concurrency gate and queues rather than being rejected part-way through.
+        # The check covers what can run at once: the `concurrency` largest questions.
+        question_costs = sorted(
+            (
+                len(bundles[qid].tests) if qid in bundles else 1
+                for qid in question_ids
+                if qid in submissions and int(attempt_counts.get(qid, 0)) < max_attempts
+            ),
+            reverse=True,
+        )
+        if question_costs:
+            judge0_admission.check(sum(question_costs[:concurrency]))
+
+        # Grade concurrently, but let every question finish before surfacing the first
+        # failure so one bad question never leaves the others half-recorded
+        outcomes = await asyncio.gather(*(_grade(qid) for qid in question_ids), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+
+        # Aggregate in snapshot order so totals and lists are deterministic
+        for question_id, (bundle, question_result, graded) in zip(question_ids, outcomes):
+            gpa_max += bundle.points or MAX_QUESTION_SCORE
+
+            if question_result is None:
+                missing_questions.append(question_id)
                 continue
 
-            eval_result = await self.evaluate_question(
-                challenge_id=challenge_id,
-                question_id=question_id,
-                submitted_output=None,
-                source_code=entry.source_code,
-                language_id=language_overrides.get(question_id) or entry.language_id,
-                include_private=True,
-                bundle=bundle,
-                user_id=user_id,
-                attempt_number=current_attempts + 1,
-                late_multiplier=effective_late_multiplier,
-                attempt_id=attempt_id,
-                record_result=True,
-            )
+            results.append(question_result)
+            if not graded:
+                failed_questions.append(question_id)
+                efficiency_total += int(question_result.elo_efficiency_bonus)
+                continue
 
             attempt_updates[question_id] = attempt_updates.get(question_id, 0) + 1
-            results.append(ChallengeQuestionResultSchema(**eval_result.model_dump()))
 
-            gpa_total += int(eval_result.gpa_awarded)
-            base_elo_total += int(eval_result.elo_base)
-            efficiency_total += int(eval_result.elo_efficiency_bonus)
-            tests_total += int(eval_result.tests_total)
-            tests_passed_total += int(eval_result.tests_passed)
+            gpa_total += int(question_result.gpa_awarded)
+            base_elo_total += int(question_result.elo_base)
+            efficiency_total += int(question_result.elo_efficiency_bonus)
+            tests_total += int(question_result.tests_total)
+            tests_passed_total += int(question_result.tests_passed)
 
-            if eval_result.average_execution_time_ms is not None:
-                avg_time_samples.append(eval_result.average_execution_time_ms)
-            if eval_result.average_memory_used_kb is not None:
-                avg_memory_samples.append(eval_result.average_memory_used_kb)
+            if question_result.average_execution_time_ms is not None:
+                avg_time_samples.append(question_result.average_execution_time_ms)
+            if question_result.average_memory_used_kb is not None:
+                avg_memory_samples.append(question_result.average_memory_used_kb)
 
-            if eval_result.public_passed:
+            if question_result.public_passed:
                 passed_questions.append(question_id)
-                if eval_result.badge_tier_awarded:
-                    badge_tiers.append(eval_result.badge_tier_awarded)
+                if question_result.badge_tier_awarded:
+                    badge_tiers.append(question_result.badge_tier_awarded)
             else:
                 failed_questions.append(question_id)
 
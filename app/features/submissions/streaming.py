@@ -0,0 +1,157 @@
+"""Line-at-a-time comparison helpers for large program outputs.
+
+The regular pipeline normalises the whole actual output (Unicode form, CRLF folding) and then
+builds more full-size copies per strategy (collapsed whitespace, stripped lines). For outputs
+of a few megabytes that is several copies per test. These helpers walk the text one ``\\n``
+separated line at a time instead, so extra memory is bounded by the longest line, and the
+equality checks return at the first differing line.
+
+Lines are normalised independently. That is equivalent to normalising the whole text: ``\\n``
+and ``\\r`` never compose with a neighbouring character, so NFC/NFD of a text equals the
+concatenation of the forms of its lines, and folding ``\\r\\n`` only touches line ends.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import unicodedata
+from itertools import zip_longest
+from typing import Iterable, Iterator, Optional
+
+_EOL_CHARS = "\r\n"
+
+
+def _normalise(segment: str, form: str) -> str:
+    try:
+        return unicodedata.normalize(form, segment)
+    except Exception:
+        return segment
+
+
+def is_clean(text: str, form: str) -> bool:
+    """True when ``text`` is already in ``form`` and has no CR, so normalising it is a no-op."""
+    if "\r" in text:
+        return False
+    try:
+        return unicodedata.is_normalized(form, text)
+    except Exception:
+        return True
+
+
+def eol_trimmed_end(text: str) -> int:
+    """Length of ``text`` without its trailing run of CR/LF (``rstrip`` without the copy)."""
+    end = len(text)
+    while end and text[end - 1] in _EOL_CHARS:
+        end -= 1
+    return end
+
+
+def iter_lines(text: str, form: str, end: Optional[int] = None) -> Iterator[str]:
+    """Normalised lines of ``text[:end]``: split on ``\\n``, one CR before it dropped, ``form`` applied."""
+    end = len(text) if end is None else end
+    pos = 0
+    while True:
+        newline = text.find("\n", pos, end)
+        if newline < 0:
+            yield _normalise(text[pos:end], form)
+            return
+        stop = newline - 1 if newline > pos and text[newline - 1] == "\r" else newline
+        yield _normalise(text[pos:stop], form)
+        pos = newline + 1
+
+
+def split_lines(text: str) -> Iterator[str]:
+    """Lines of already-normalised text, split on ``\\n`` only."""
+    pos = 0
+    while True:
+        newline = text.find("\n", pos)
+        if newline < 0:
+            yield text[pos:]
+            return
+        yield text[pos:newline]
+        pos = newline + 1
+
+
+def normalised_length(text: str, form: str) -> int:
+    if is_clean(text, form):
+        return len(text)
+    lines = 0
+    total = 0
+    for line in iter_lines(text, form):
+        total += len(line)
+        lines += 1
+    return total + lines - 1
+
+
+def sha256_hexdigest(text: str, form: str) -> str:
+    """SHA-256 of the normalised text, hashed line by line."""
+    digest = hashlib.sha256()
+    if is_clean(text, form):
+        digest.update(text.encode())
+        return digest.hexdigest()
+    first = True
+    for line in iter_lines(text, form):
+        if not first:
+            digest.update(b"\n")
+        digest.update(line.encode())
+        first = False
+    return digest.hexdigest()
+
+
+def _lines_equal(expected: Iterable[str], actual: Iterable[str]) -> bool:
+    for exp_line, act_line in zip_longest(expected, actual):
+        if exp_line is None or act_line is None or exp_line != act_line:
+            return False
+    return True
+
+
+def strict_equal(expected_norm: str, actual: str, form: str) -> bool:
+    """``expected_norm == normalise(actual)``; ``expected_norm`` is already normalised."""
+    if is_clean(actual, form):
+        return expected_norm == actual
+    return _lines_equal(split_lines(expected_norm), iter_lines(actual, form))
+
+
+def trim_eol_equal(expected_trimmed: str, actual: str, form: str) -> bool:
+    """Equality after stripping trailing CR/LF; ``expected_trimmed`` is normalised and stripped."""
+    end = eol_trimmed_end(actual)
+    if is_clean(actual, form):
+        return end == len(expected_trimmed) and actual.startswith(expected_trimmed)
+    return _lines_equal(split_lines(expected_trimmed), iter_lines(actual, form, end))
+
+
+def collapsed_whitespace_equal(expected_collapsed: str, actual: str, form: str) -> bool:
+    """Line-wise equality with runs of whitespace collapsed and edges trimmed."""
+    return _lines_equal(
+        split_lines(expected_collapsed),
+        (" ".join(line.split()) for line in iter_lines(actual, form)),
+    )
+
+
+def _chunks_equal(expected: str, actual: Iterable[str]) -> bool:
+    """``expected == "".join(actual)`` without joining; stops at the first differing chunk."""
+    pos = 0
+    for chunk in actual:
+        if not expected.startswith(chunk, pos):
+            return False
+        pos += len(chunk)
+    return pos == len(expected)
+
+
+def no_whitespace_equal(expected_stripped: str, actual: str, form: str) -> bool:
+    """Equality with every whitespace character removed, across line boundaries."""
+    return _chunks_equal(expected_stripped, ("".join(line.split()) for line in iter_lines(actual, form)))
+
+
+__all__ = [
+    "collapsed_whitespace_equal",
+    "eol_trimmed_end",
+    "is_clean",
+    "iter_lines",
+    "no_whitespace_equal",
+    "normalised_length",
+    "sha256_hexdigest",
+    "split_lines",
+    "strict_equal",
+    "trim_eol_equal",
+]
@@ -0,0 +1,58 @@
+# app/jobs/attempt_aggregates_verifier.py
+from __future__ import annotations
+import asyncio
+import logging
+from typing import Any, Dict
+
+from app.Core.config import get_settings
+from app.features.achievements.service import achievements_service
+
+logger = logging.getLogger("attempt_aggregates_verifier")
+
+
+async def verify_all_attempt_aggregates(*, repair: bool = True) -> Dict[str, Any]:
+    """
+    Recompute every stored student's attempt totals from history and repair any drift.
+    """
+    students = await achievements_service.repo.list_attempt_aggregate_students()
+    checked = drifted = repaired = 0
+    for student_id in students:
+        try:
+            report = await achievements_service.verify_attempt_aggregates(str(student_id), repair=repair)
+        except Exception as e:
+            logger.warning(f"Attempt aggregates check failed for student {student_id}: {e}")
+            continue
+        checked += 1
+        if report["drift"]:
+            drifted += 1
+            logger.warning(f"Attempt aggregates drifted for student {student_id}: {report['stored']} -> {report['rebuilt']}")
+        if report["repaired"]:
+            repaired += 1
+    return {"students": len(students), "checked": checked, "drifted": drifted, "repaired": repaired}
+
+
+async def start_attempt_aggregates_verifier():
+    """
+    Background job that verifies the incremental attempt totals against history periodically.
+    """
+    interval = float(getattr(get_settings(), "achievement_aggregates_verify_interval_s", 3600.0))
+    if interval <= 0:
+        logger.info("Attempt aggregates verifier disabled")
+        return
+    logger.info("Attempt aggregates verifier started")
+    while True:
+        try:
+            await asyncio.sleep(interval)
+            summary = await verify_all_attempt_aggregates()
+            logger.info(f"Attempt aggregates verified: {summary}")
+        except asyncio.CancelledError:
+            logger.info("Attempt aggregates verifier cancelled")
+            break
+        except Exception as e:
+            logger.exception(f"Attempt aggregates verifier error: {e}, retrying in {interval}s")
+
+
+# Optional: run one verification pass standalone (e.g. after a bulk import)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(verify_all_attempt_aggregates()))
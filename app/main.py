@@ -37,6 +37,7 @@ from app.features.semester.endpoints import router as semester_router
 from routes.debug import router as debug_router
 from app.api.notifications_schedule import router as notifications_schedule_router
 from app.jobs.notification_scheduler import start_notification_scheduler
+from app.jobs.attempt_aggregates_verifier import start_attempt_aggregates_verifier
 
 app = FastAPI(title="Recode Backend")
 _settings = get_settings()
@@ -193,7 +194,11 @@ async def healthz() -> Dict[str, Any]:
     except Exception as e:
         db_status = f"error:{type(e).__name__}"
 
-    judge0_ready = bool(getattr(_settings, "judge0_api_url", None))
+    judge0_ready = bool(
+        getattr(_settings, "code_executor", "judge0") == "local"
+        or getattr(_settings, "judge0_urls", None)
+        or getattr(_settings, "judge0_api_url", None)
+    )
     route_count = len(app.routes)
     tags = sorted({t for r in app.routes for t in getattr(r, "tags", [])})
 
@@ -305,3 +310,101 @@ async def _start_background_tasks():
         logging.getLogger("notification_scheduler").exception(
             "Failed to start background notification scheduler"
         )
+
+    try:
+        asyncio.create_task(start_attempt_aggregates_verifier())
+    except Exception:
+        logging.getLogger("attempt_aggregates_verifier").exception(
+            "Failed to start background attempt aggregates verifier"
+        )
+
+    try:
+        from app.features.achievements.catalogue import achievement_catalogue
+
+        asyncio.create_task(achievement_catalogue.preload())
+    except Exception:
+        logging.getLogger("achievements.catalogue").exception("Failed to start achievement catalogue preload")
+
+
+@app.on_event("startup")
+async def _start_judge0_client():
+    from app.features.judge0.service import judge0_service
+
+    try:
+        await judge0_service.startup()
+    except Exception:
+        logging.getLogger("judge0").exception("Failed to start Judge0 client pool")
+
+
+@app.on_event("startup")
+async def _start_result_writer():
+    from app.features.submissions.result_writer import result_writer
+
+    try:
+        await result_writer.start()
+    except Exception:
+        logging.getLogger("submissions").exception("Failed to start the code results writer")
+
+
+@app.on_event("startup")
+async def _recover_rewards():
+    from app.features.submissions.rewards import reward_pipeline
+
+    settings = get_settings()
+    if not getattr(settings, "reward_pipeline", True) or not getattr(settings, "reward_recovery", True):
+        return
+    try:
+        await reward_pipeline.start()
+    except Exception:
+        logging.getLogger("submissions").exception("Failed to schedule reward recovery")
+
+
+@app.on_event("shutdown")
+async def _drain_submission_jobs():
+    # Runs before the reward pipeline drains, so rewards of jobs finished here still get applied
+    from app.features.submissions.jobs import submission_jobs
+
+    try:
+        await submission_jobs.aclose()
+    except Exception:
+        logging.getLogger("submissions").exception("Failed to drain submission jobs")
+
+
+@app.on_event("shutdown")
+async def _drain_reward_pipeline():
+    from app.features.submissions.rewards import reward_pipeline
+
+    try:
+        await reward_pipeline.aclose()
+    except Exception:
+        logging.getLogger("submissions").exception("Failed to drain the reward pipeline")
+
+
+@app.on_event("shutdown")
+async def _flush_duration_sketches():
+    from app.features.achievements.duration_sketch import challenge_duration_sketches
+
+    try:
+        await challenge_duration_sketches.flush()
+    except Exception:
+        logging.getLogger("achievements").exception("Failed to flush challenge duration sketches")
+
+
+@app.on_event("shutdown")
+async def _drain_result_writer():
+    from app.features.submissions.result_writer import result_writer
+
+    try:
+        await result_writer.aclose()
+    except Exception:
+        logging.getLogger("submissions").exception("Failed to drain the code results writer")
+
+
+@app.on_event("shutdown")
+async def _stop_judge0_client():
+    from app.features.judge0.service import judge0_service
+
+    try:
+        await judge0_service.aclose()
+    except Exception:
+        logging.getLogger("judge0").exception("Failed to close Judge0 client pool")
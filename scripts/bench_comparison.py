@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Benchmark for the output comparison pipeline (app/features/submissions/comparison.py).
+
+Runs a generated, seeded corpus of expected/actual pairs through ``compare`` for AUTO and
+every mode in the ComparatorRegistry and reports ops/sec, p50/p99 latency and peak memory.
+Results can be written as a baseline and later checked against it, so adding or changing a
+strategy shows up as a regression instead of as slower grading in production.
+
+Usage examples:
+
+  # Run and print a table
+  #    > python scripts/bench_comparison.py
+
+  # Record a new baseline (commit it together with the strategy change)
+  #    > python scripts/bench_comparison.py --write-baseline
+
+  # Check against the committed baseline; exits 1 on a regression
+  #    > python scripts/bench_comparison.py --check --tolerance 0.3
+
+Timings are machine dependent: compare against a baseline recorded on the same kind of host.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.features.submissions.comparison import ComparisonMode, ExpectedProfile, compare, supported_modes  # noqa: E402
+
+DEFAULT_BASELINE = ROOT / "scripts" / "bench_comparison_baseline.json"
+
+Pair = Tuple[str, str, str]  # (category, expected, actual)
+
+
+def _lines(rng: random.Random, count: int) -> List[str]:
+    words = ["alpha", "beta", "gamma", "delta", "sum", "total", "result", "value", "Alice", "Bob"]
+    return [f"{rng.choice(words)} {rng.randint(0, 10_000)} {rng.choice(words)}" for _ in range(count)]
+
+
+def build_corpus(seed: int = 1234, size: int = 40, large_chars: int = 1_000_000) -> List[Pair]:
+    """Output pairs shaped like real submissions; the same seed always gives the same corpus."""
+    rng = random.Random(seed)
+    corpus: List[Pair] = []
+    for _ in range(size):
+        lines = _lines(rng, rng.randint(1, 30))
+        text = "\n".join(lines)
+        numbers = [rng.uniform(-1000, 1000) for _ in range(rng.randint(1, 5))]
+        literal = {"name": rng.choice(["Alice", "Bob"]), "scores": [rng.randint(0, 100) for _ in range(4)]}
+        near = list(text)
+        pos = rng.randrange(len(near))
+        near[pos] = "#" if near[pos] != "#" else "$"
+        corpus.extend(
+            [
+                ("match", text, text),
+                ("trailing_newline", text, text + "\n"),
+                ("crlf", text, text.replace("\n", "\r\n") + "\r\n"),
+                ("whitespace", text, "\n".join("  ".join(line.split()) + " " for line in lines)),
+                ("case", text, text.upper()),
+                ("near_miss", text, "".join(near)),
+                ("float_noise", repr(numbers[0]), f"{numbers[0] * (1 + 1e-9):.12f}"),
+                ("literal_format", repr(literal), json.dumps(literal).replace('"', "'")),
+                ("reordered_lines", text, "\n".join(rng.sample(lines, len(lines)))),
+                ("token_shuffle", " ".join(lines[0].split()), " ".join(reversed(lines[0].split()))),
+            ]
+        )
+    if large_chars:
+        big_lines = _lines(rng, max(1, large_chars // 24))
+        big = "\n".join(big_lines)
+        corpus.extend(
+            [
+                ("large_match", big, big + "\n"),
+                ("large_whitespace", big, big.replace(" ", "  ")),
+                ("large_near_miss", big, big[:-1] + "#"),
+            ]
+        )
+    return corpus
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round((p / 100.0) * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+async def _run_mode(mode: str, corpus: List[Pair], iterations: int, use_profiles: bool) -> Dict[str, Any]:
+    profiles = [ExpectedProfile(expected) if use_profiles else expected for _, expected, _ in corpus]
+    # Warm-up: also fills the profiles' cached forms, as a cached question bundle would be
+    for expected, (_, _, actual) in zip(profiles, corpus):
+        await compare(expected, actual, mode=mode)
+
+    latencies: List[float] = []
+    by_category: Dict[str, List[float]] = {}
+    passed = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for expected, (category, _, actual) in zip(profiles, corpus):
+            t0 = time.perf_counter()
+            result = await compare(expected, actual, mode=mode)
+            elapsed_ms = (time.perf_counter() - t0) * 1000.0
+            latencies.append(elapsed_ms)
+            by_category.setdefault(category, []).append(elapsed_ms)
+            passed += bool(result.passed)
+    total_s = time.perf_counter() - started
+
+    # Peak memory in a separate pass: tracing distorts timings
+    peak = 0
+    for expected, (_, _, actual) in zip(profiles, corpus):
+        tracemalloc.start()
+        await compare(expected, actual, mode=mode)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    row: Dict[str, Any] = {
+        "ops_per_sec": round(len(latencies) / total_s, 1) if total_s > 0 else 0.0,
+        "mean_ms": round(statistics.mean(latencies), 4) if latencies else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 4),
+        "p99_ms": round(_percentile(latencies, 99), 4),
+        "peak_kb": round(peak / 1024.0, 1),
+        "pass_rate": round(passed / len(latencies), 4) if latencies else 0.0,
+    }
+    if mode == ComparisonMode.AUTO:
+        # The few large pairs dominate the mean but barely move p99; show them separately
+        row["categories"] = {
+            category: {"mean_ms": round(statistics.mean(values), 4), "p99_ms": round(_percentile(values, 99), 4)}
+            for category, values in by_category.items()
+        }
+    return row
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    corpus = build_corpus(seed=args.seed, size=args.size, large_chars=args.large_chars)
+    modes = args.mode or supported_modes(include_auto=True)
+    results: Dict[str, Any] = {}
+    for mode in modes:
+        results[mode] = await _run_mode(mode, corpus, args.iterations, not args.raw_expected)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "size": args.size,
+            "large_chars": args.large_chars,
+            "iterations": args.iterations,
+            "pairs": len(corpus),
+            "modes": list(modes),
+            "filtered": bool(args.mode),
+        },
+        "results": results,
+    }
+
+
+def check(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Human-readable regressions of ``report`` against ``baseline``; empty when none."""
+    problems: List[str] = []
+    base_results = baseline.get("results", {})
+    for mode, base in base_results.items():
+        current = report["results"].get(mode)
+        if current is None:
+            if not report["meta"]["filtered"]:
+                problems.append(f"{mode}: no longer registered")
+            continue
+        if current["ops_per_sec"] < base["ops_per_sec"] * (1.0 - tolerance):
+            problems.append(f"{mode}: ops/sec {current['ops_per_sec']} < baseline {base['ops_per_sec']}")
+        if current["p99_ms"] > base["p99_ms"] * (1.0 + tolerance):
+            problems.append(f"{mode}: p99 {current['p99_ms']}ms > baseline {base['p99_ms']}ms")
+        if current["peak_kb"] > base["peak_kb"] * (1.0 + tolerance) + 64:
+            problems.append(f"{mode}: peak memory {current['peak_kb']}KB > baseline {base['peak_kb']}KB")
+        if current["pass_rate"] != base["pass_rate"]:
+            problems.append(f"{mode}: pass rate {current['pass_rate']} != baseline {base['pass_rate']} (verdicts changed)")
+    for mode in report["results"]:
+        if mode not in base_results:
+            problems.append(f"{mode}: not in baseline (new strategy?) - record a new baseline")
+    return problems
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    meta = report["meta"]
+    print(f"Corpus: {meta['pairs']} pairs x {meta['iterations']} iterations (seed {meta['seed']})  Python {meta['python']}")
+    print(f"{'mode':<22}{'ops/sec':>12}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'peak KB':>10}{'pass':>8}")
+    for mode, row in report["results"].items():
+        print(
+            f"{mode:<22}{row['ops_per_sec']:>12.1f}{row['mean_ms']:>10.3f}{row['p50_ms']:>10.3f}"
+            f"{row['p99_ms']:>10.3f}{row['peak_kb']:>10.1f}{row['pass_rate']:>8.2f}"
+        )
+    categories = report["results"].get(ComparisonMode.AUTO, {}).get("categories") or {}
+    if categories:
+        print(f"\nAUTO by category{'mean ms':>22}{'p99 ms':>10}")
+        for category, row in categories.items():
+            print(f"  {category:<30}{row['mean_ms']:>10.3f}{row['p99_ms']:>10.3f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the output comparison pipeline")
+    ap.add_argument("--iterations", type=int, default=5, help="Timed passes over the corpus per mode")
+    ap.add_argument("--size", type=int, default=40, help="Generated groups of small pairs (10 pairs each)")
+    ap.add_argument("--large-chars", type=int, default=1_000_000, help="Size of the large-output pairs (0 disables)")
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--mode", action="append", help=f"Only this mode (repeatable), e.g. {ComparisonMode.AUTO}")
+    ap.add_argument("--raw-expected", action="store_true", help="Pass expected outputs as strings instead of cached profiles")
+    ap.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    ap.add_argument("--write-baseline", action="store_true", help="Write this run to --baseline")
+    ap.add_argument("--check", action="store_true", help="Compare against --baseline and exit 1 on regressions")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown/growth for --check")
+    ap.add_argument("--json", action="store_true", help="Print the report as JSON instead of a table")
+    args = ap.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_table(report)
+
+    if args.write_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {args.baseline}")
+    if args.check:
+        if not args.baseline.exists():
+            raise SystemExit(f"No baseline at {args.baseline}; run with --write-baseline first")
+        problems = check(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            raise SystemExit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark for the grading path without a live Judge0 or database.
+
+Drives ``SubmissionsService.evaluate_question`` and ``submit_challenge`` against the in-process
+stand-ins from ``tests/``: ``FakeJudge0`` (plugged into ``judge0_service._transport``, with a
+seeded latency distribution) and ``FakeSupabase`` (patched into the submissions, code results
+and challenge repositories). Reports throughput, op latency, a per-stage time breakdown
+(bundle load, Judge0 admission wait, execution, compare, persistence) and allocation figures
+from a traced pass.
+
+Usage examples:
+
+  # Both scenarios with production polling and a 40 ms lognormal Judge0
+  #    > python scripts/bench_grading.py
+
+  # Only per-question grading, cold bundle cache, no sandbox latency
+  #    > python scripts/bench_grading.py --scenario evaluate --cold-bundles --latency-ms 0
+
+  # Machine-readable output
+  #    > python scripts/bench_grading.py --json
+
+Stage times are summed per task, so with --concurrency above 1 (and inside submit_challenge,
+which grades questions concurrently) they can add up to more than the op latency. The
+stand-ins' own work is included in the stage that calls them. The Judge0 result cache and
+single-flight are off unless --judge0-cache is given, so every op really executes.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List
+
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT, ROOT / "tests"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import httpx  # noqa: E402
+from fake_judge0 import FakeJudge0  # noqa: E402
+from fake_supabase import FakeSupabase, log_test_batch, log_test_batches  # noqa: E402
+
+import app.features.challenges.repository as challenge_repository_module  # noqa: E402
+import app.features.submissions.code_results_repository as code_results_module  # noqa: E402
+import app.features.submissions.repository as submissions_repository_module  # noqa: E402
+import app.features.submissions.service as service_module  # noqa: E402
+from app.features.challenges.repository import challenge_repository  # noqa: E402
+from app.features.judge0.admission import judge0_admission  # noqa: E402
+from app.features.judge0.service import judge0_service  # noqa: E402
+from app.features.submissions.bundle_cache import question_bundle_cache  # noqa: E402
+from app.features.submissions.code_results_repository import code_results_repository  # noqa: E402
+from app.features.submissions.comparison import ComparisonMode  # noqa: E402
+from app.features.submissions.result_writer import result_writer  # noqa: E402
+from app.features.submissions.schemas import BatchSubmissionEntry  # noqa: E402
+from app.features.submissions.service import submissions_service  # noqa: E402
+
+STAGES = ("bundle_load", "admission_wait", "execution", "compare", "persistence")
+CHALLENGE_ID = "bench-challenge"
+ATTEMPT_ID = "bench-attempt"
+
+
+def _lines(rng: random.Random, count: int) -> str:
+    words = ["alpha", "beta", "gamma", "sum", "total", "result", "Alice", "Bob"]
+    return "\n".join(f"{rng.choice(words)} {rng.randint(0, 10_000)}" for _ in range(count))
+
+
+def build_tables(seed: int, questions: int, tests: int, output_lines: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Rows for the questions, tests and attempts tables; the same seed gives the same data."""
+    rng = random.Random(seed)
+    tiers = ["bronze", "silver", "gold"]
+    question_rows = []
+    test_rows = []
+    for q in range(questions):
+        qid = f"bench-q{q}"
+        question_rows.append(
+            {"id": qid, "challenge_id": CHALLENGE_ID, "tier": tiers[q % len(tiers)], "points": 10, "language_id": 71}
+        )
+        for t in range(tests):
+            test_rows.append(
+                {
+                    "id": f"{qid}-t{t}",
+                    "question_id": qid,
+                    "input": str(rng.randint(0, 1000)),
+                    "expected_output": _lines(rng, rng.randint(1, output_lines)),
+                    "visibility": "public" if t == 0 else "private",
+                    "order_index": t,
+                    "compare_mode": ComparisonMode.AUTO,
+                }
+            )
+    attempt = {
+        "id": ATTEMPT_ID,
+        "snapshot_questions": [{"question_id": row["id"], "attempts_used": 0} for row in question_rows],
+    }
+    return {"questions": question_rows, "question_tests": test_rows, "tests": [], "challenge_attempts": [attempt]}
+
+
+def latency_sampler(rng: random.Random, dist: str, mean_ms: float, sigma: float) -> Callable[[], float]:
+    """Seconds per Judge0 run: ``fixed``, ``uniform`` (mean +/- sigma*mean) or ``lognormal`` (median mean_ms)."""
+    mean_s = max(0.0, mean_ms) / 1000.0
+    if dist == "uniform":
+        return lambda: max(0.0, rng.uniform(mean_s * (1 - sigma), mean_s * (1 + sigma)))
+    if dist == "lognormal" and mean_s > 0:
+        return lambda: rng.lognormvariate(0.0, sigma) * mean_s
+    return lambda: mean_s
+
+
+def fake_runner(rng: random.Random, fail_rate: float) -> Callable[[Dict[str, Any]], str]:
+    """Echo the expected output (as a program would, newline-terminated), failing ``fail_rate`` of runs."""
+
+    def run(request: Dict[str, Any]) -> str:
+        if rng.random() < fail_rate:
+            return "wrong answer\n"
+        return (request.get("expected_output") or "") + "\n"
+
+    return run
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Counter = Counter()
+
+    def wrap(self, stage: str, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        async def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - started
+                self.calls[stage] += 1
+
+        return timed
+
+    def reset(self) -> None:
+        self.seconds.clear()
+        self.calls.clear()
+
+
+@contextlib.contextmanager
+def installed(args: argparse.Namespace, timer: StageTimer) -> Iterator[tuple[FakeJudge0, FakeSupabase]]:
+    """Patch the fakes and the stage timers in, and restore everything afterwards."""
+    rng = random.Random(args.seed)
+    fake_db = FakeSupabase(
+        build_tables(args.seed, args.questions, args.tests, args.output_lines),
+        latency=args.db_latency_ms / 1000.0,
+        sink_tables=("code_results", "code_submissions"),
+        functions={"log_test_batch": log_test_batch, "log_test_batches": log_test_batches},
+    )
+    fake_judge0 = FakeJudge0(
+        latency=latency_sampler(rng, args.latency_dist, args.latency_ms, args.latency_sigma),
+        runner=fake_runner(rng, args.fail_rate),
+        prefix="bench",
+    )
+    patches = [
+        (submissions_repository_module, "get_supabase", fake_db.get_supabase),
+        (code_results_module, "get_supabase", fake_db.get_supabase),
+        (challenge_repository_module, "get_supabase", fake_db.get_supabase),
+        (judge0_service, "_transport", httpx.MockTransport(fake_judge0.handler)),
+        (judge0_service, "_backends", judge0_service._build_backend_pool(["http://judge0.bench"])),
+        (judge0_service._result_cache, "enabled", args.judge0_cache),
+        (judge0_service._singleflight, "enabled", args.judge0_cache),
+        (result_writer, "enabled", args.write_behind),
+        (question_bundle_cache, "enabled", not args.cold_bundles),
+        (submissions_service, "get_question_bundle", timer.wrap("bundle_load", submissions_service.get_question_bundle)),
+        (submissions_service, "get_question_bundles", timer.wrap("bundle_load", submissions_service.get_question_bundles)),
+        # Time spent queued for Judge0 execution units (admission control), not running
+        (judge0_admission, "_acquire", timer.wrap("admission_wait", judge0_admission._acquire)),
+        (judge0_service, "execute_batch", timer.wrap("execution", judge0_service.execute_batch)),
+        (service_module, "run_python_harness", timer.wrap("execution", service_module.run_python_harness)),
+        (service_module, "compare_many", timer.wrap("compare", service_module.compare_many)),
+        (code_results_repository, "log_test_batch", timer.wrap("persistence", code_results_repository.log_test_batch)),
+        (challenge_repository, "record_question_attempts", timer.wrap("persistence", challenge_repository.record_question_attempts)),
+    ]
+    coordinator = judge0_service._poll_coordinator
+    if args.poll_interval_ms is not None and coordinator is not None:
+        patches.append((coordinator, "min_interval", max(0.01, args.poll_interval_ms / 1000.0)))
+
+    saved = []
+    for target, name, value in patches:
+        # Instance attributes shadowing methods are deleted again rather than reassigned
+        saved.append((target, name, name in vars(target), getattr(target, name)))
+        setattr(target, name, value)
+    question_bundle_cache.clear()
+    try:
+        yield fake_judge0, fake_db
+    finally:
+        for target, name, had_own, value in reversed(saved):
+            if had_own:
+                setattr(target, name, value)
+            else:
+                delattr(target, name)
+        question_bundle_cache.clear()
+
+
+def _op_factory(scenario: str, args: argparse.Namespace) -> Callable[[int], Awaitable[Any]]:
+    question_ids = [f"bench-q{q}" for q in range(args.questions)]
+
+    async def evaluate(i: int) -> Any:
+        return await submissions_service.evaluate_question(
+            challenge_id=CHALLENGE_ID,
+            question_id=question_ids[i % len(question_ids)],
+            submitted_output=None,
+            source_code=f"print(input())  # run {i}",
+            language_id=71,
+            user_id=10_000 + i,
+            attempt_number=1,
+            record_result=True,
+        )
+
+    async def challenge(i: int) -> Any:
+        return await submissions_service.submit_challenge(
+            challenge_id=CHALLENGE_ID,
+            attempt_id=ATTEMPT_ID,
+            submissions={qid: BatchSubmissionEntry(source_code=f"print(input())  # run {i} {qid}") for qid in question_ids},
+            language_overrides={qid: 71 for qid in question_ids},
+            question_weights={},
+            user_id=10_000 + i,
+            tier="bronze",
+            attempt_counts={},
+            max_attempts=1_000_000,
+            late_multiplier=1.0,
+        )
+
+    return evaluate if scenario == "evaluate" else challenge
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round((p / 100.0) * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+async def _timed_ops(op: Callable[[int], Awaitable[Any]], start: int, count: int, concurrency: int) -> List[float]:
+    gate = asyncio.Semaphore(max(1, concurrency))
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        async with gate:
+            t0 = time.perf_counter()
+            await op(i)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    await asyncio.gather(*(one(start + i) for i in range(count)))
+    return latencies
+
+
+async def _run_scenario(scenario: str, args: argparse.Namespace) -> Dict[str, Any]:
+    timer = StageTimer()
+    ops = args.ops if scenario == "evaluate" else max(1, args.ops // max(1, args.questions))
+    with installed(args, timer) as (fake_judge0, fake_db):
+        op = _op_factory(scenario, args)
+        await _timed_ops(op, 0, args.warmup, args.concurrency)
+        timer.reset()
+        fake_db.calls.clear()
+        runs_before = len(fake_judge0.submissions)
+
+        started = time.perf_counter()
+        latencies = await _timed_ops(op, args.warmup, ops, args.concurrency)
+        total_s = time.perf_counter() - started
+        judge0_runs = len(fake_judge0.submissions) - runs_before
+        db_calls = sum(fake_db.calls.values())
+        stage_seconds = dict(timer.seconds)
+        stage_calls = dict(timer.calls)
+
+        # Allocations in a separate, sequential pass: tracing distorts timings
+        gc.collect()
+        gen0_before = gc.get_stats()[0]["collections"]
+        traced = max(1, min(ops, args.traced_ops))
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        peak = 0
+        for i in range(traced):
+            tracemalloc.reset_peak()
+            await op(args.warmup + ops + i)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        gen0_collections = gc.get_stats()[0]["collections"] - gen0_before
+        growth = after.compare_to(before, "filename")
+        await fake_judge0.drain()
+        await result_writer.aclose()
+    await judge0_service.aclose()
+
+    op_total_ms = sum(latencies)
+    stages: Dict[str, Any] = {}
+    for stage in STAGES:
+        ms = stage_seconds.get(stage, 0.0) * 1000.0
+        stages[stage] = {
+            "ms_per_op": round(ms / len(latencies), 3) if latencies else 0.0,
+            "share": round(ms / op_total_ms, 4) if op_total_ms else 0.0,
+            "calls": stage_calls.get(stage, 0),
+        }
+    # Scoring and building the response schemas
+    other_ms = op_total_ms - sum(stage_seconds.get(stage, 0.0) * 1000.0 for stage in STAGES)
+    stages["other"] = {
+        "ms_per_op": round(max(0.0, other_ms) / len(latencies), 3) if latencies else 0.0,
+        "share": round(max(0.0, other_ms) / op_total_ms, 4) if op_total_ms else 0.0,
+        "calls": 0,
+    }
+    return {
+        "ops": len(latencies),
+        "ops_per_sec": round(len(latencies) / total_s, 2) if total_s > 0 else 0.0,
+        "mean_ms": round(statistics.mean(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "judge0_runs_per_op": round(judge0_runs / len(latencies), 2) if latencies else 0.0,
+        "db_calls_per_op": round(db_calls / len(latencies), 2) if latencies else 0.0,
+        "stages": stages,
+        "allocations": {
+            "traced_ops": traced,
+            "peak_kb_per_op": round(peak / 1024.0, 1),
+            "retained_blocks_per_op": round(sum(stat.count_diff for stat in growth) / traced, 1),
+            "retained_kb_per_op": round(sum(stat.size_diff for stat in growth) / 1024.0 / traced, 1),
+            "gc_gen0_collections_per_op": round(gen0_collections / traced, 2),
+        },
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    scenarios = ["evaluate", "challenge"] if args.scenario == "all" else [args.scenario]
+    results = {scenario: await _run_scenario(scenario, args) for scenario in scenarios}
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "questions": args.questions,
+            "tests_per_question": args.tests,
+            "concurrency": args.concurrency,
+            "latency": f"{args.latency_dist} {args.latency_ms}ms sigma={args.latency_sigma}",
+            "db_latency_ms": args.db_latency_ms,
+            "poll_interval_ms": args.poll_interval_ms,
+            "fail_rate": args.fail_rate,
+            "cold_bundles": args.cold_bundles,
+            "judge0_cache": args.judge0_cache,
+            "write_behind": args.write_behind,
+        },
+        "results": results,
+    }
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    meta = report["meta"]
+    print(
+        f"{meta['questions']} questions x {meta['tests_per_question']} tests, concurrency {meta['concurrency']}, "
+        f"Judge0 {meta['latency']}, DB {meta['db_latency_ms']}ms  Python {meta['python']}"
+    )
+    for scenario, row in report["results"].items():
+        print(
+            f"\n{scenario}: {row['ops']} ops  {row['ops_per_sec']:.2f} ops/sec  mean {row['mean_ms']:.1f}ms  "
+            f"p50 {row['p50_ms']:.1f}ms  p99 {row['p99_ms']:.1f}ms  "
+            f"({row['judge0_runs_per_op']} Judge0 runs, {row['db_calls_per_op']} DB calls per op)"
+        )
+        print(f"  {'stage':<16}{'ms/op':>10}{'share':>9}{'calls':>8}")
+        for stage, stage_row in row["stages"].items():
+            print(f"  {stage:<16}{stage_row['ms_per_op']:>10.3f}{stage_row['share'] * 100:>8.1f}%{stage_row['calls']:>8}")
+        alloc = row["allocations"]
+        print(
+            f"  allocations ({alloc['traced_ops']} traced ops): peak {alloc['peak_kb_per_op']}KB/op, "
+            f"retained {alloc['retained_blocks_per_op']} blocks ({alloc['retained_kb_per_op']}KB)/op, "
+            f"{alloc['gc_gen0_collections_per_op']} gen0 GCs/op"
+        )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the grading path against in-process Judge0 and Supabase fakes")
+    ap.add_argument("--scenario", choices=["all", "evaluate", "challenge"], default="all")
+    ap.add_argument("--ops", type=int, default=64, help="Graded questions per scenario (challenge runs ops/questions submissions)")
+    ap.add_argument("--warmup", type=int, default=4, help="Untimed ops before measuring")
+    ap.add_argument("--traced-ops", type=int, default=4, help="Ops in the tracemalloc pass")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--questions", type=int, default=4)
+    ap.add_argument("--tests", type=int, default=5, help="Tests per question")
+    ap.add_argument("--output-lines", type=int, default=20, help="Maximum lines per expected output")
+    ap.add_argument("--latency-dist", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    ap.add_argument("--latency-ms", type=float, default=40.0, help="Judge0 run time (median for lognormal)")
+    ap.add_argument("--latency-sigma", type=float, default=0.5, help="Spread of the latency distribution")
+    ap.add_argument("--db-latency-ms", type=float, default=2.0, help="Delay of every fake Supabase call")
+    ap.add_argument("--poll-interval-ms", type=float, default=None, help="Override the poll coordinator's minimum tick")
+    ap.add_argument("--fail-rate", type=float, default=0.1, help="Share of Judge0 runs that print a wrong answer")
+    ap.add_argument("--cold-bundles", action="store_true", help="Disable the question bundle cache")
+    ap.add_argument("--judge0-cache", action="store_true", help="Keep the Judge0 result cache and single-flight on")
+    ap.add_argument("--write-behind", action="store_true", help="Queue graded batches on the result writer")
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--json", action="store_true", help="Print the report as JSON instead of a table")
+    args = ap.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_table(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,19 @@
 import sys
 import os
 
+import pytest
+
 # Ensure repo root on sys.path for imports like `app...`
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_question_bundle_cache():
+    """Tests fake the repository per case and reuse question ids; never serve a previous case's bundle."""
+    from app.features.submissions.bundle_cache import question_bundle_cache
+
+    question_bundle_cache.clear()
+    yield
+    question_bundle_cache.clear()
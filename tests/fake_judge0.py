@@ -0,0 +1,114 @@
+"""In-process fake of the Judge0 CE HTTP API for service tests.
+
+Plug it into ``Judge0Service._transport`` via ``httpx.MockTransport(fake.handler)``.
+Submissions "finish" after ``latency`` seconds (a float, or a zero-argument callable drawn
+per submission) with ``runner(request_json)`` as stdout.
+When a submission carries ``callback_url`` the fake PUTs the finished result there
+(base64 encoded, like Judge0) through ``callback_client``.
+"""
+
+import asyncio
+import base64
+import itertools
+import json
+from typing import Any, Callable, Dict, Optional, Union
+
+import httpx
+
+
+def _b64(text: Optional[str]) -> Optional[str]:
+    if text is None:
+        return None
+    return base64.b64encode(text.encode("utf-8")).decode("ascii")
+
+
+class FakeJudge0:
+    def __init__(
+        self,
+        *,
+        latency: Union[float, Callable[[], float]] = 0.02,
+        runner: Optional[Callable[[Dict[str, Any]], str]] = None,
+        callback_client: Optional[httpx.AsyncClient] = None,
+        drop_callbacks: bool = False,
+        prefix: str = "fake",
+    ) -> None:
+        self.latency = latency
+        self.runner = runner or (lambda req: req.get("expected_output") or "")
+        self.callback_client = callback_client
+        self.drop_callbacks = drop_callbacks
+        self.prefix = prefix
+        self.submissions: Dict[str, Dict[str, Any]] = {}
+        self.requests: list[tuple[str, str]] = []
+        self.callbacks_sent = 0
+        self._ids = itertools.count(1)
+        self._tasks: set[asyncio.Task] = set()
+
+    # ------------------------------------------------------------------ counters
+    def count(self, method: str, prefix: str = "/submissions") -> int:
+        return sum(1 for m, path in self.requests if m == method and path.startswith(prefix))
+
+    # ------------------------------------------------------------------ lifecycle
+    def _create(self, req: Dict[str, Any]) -> str:
+        token = f"{self.prefix}-{next(self._ids)}"
+        self.submissions[token] = {"request": req, "result": None}
+        task = asyncio.get_running_loop().create_task(self._finish(token))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return token
+
+    async def _finish(self, token: str) -> None:
+        await asyncio.sleep(self.latency() if callable(self.latency) else self.latency)
+        entry = self.submissions[token]
+        req = entry["request"]
+        stdout = self.runner(req)
+        expected = req.get("expected_output")
+        status = {"id": 3, "description": "Accepted"}
+        if expected is not None and stdout.strip() != expected.strip():
+            status = {"id": 4, "description": "Wrong Answer"}
+        entry["result"] = {
+            "token": token,
+            "stdout": stdout,
+            "stderr": None,
+            "compile_output": None,
+            "message": None,
+            "time": "0.01",
+            "memory": 1024,
+            "status": status,
+            "language": {"id": req.get("language_id")},
+        }
+        callback_url = req.get("callback_url")
+        if callback_url and self.callback_client is not None and not self.drop_callbacks:
+            body = dict(entry["result"])
+            for field in ("stdout", "stderr", "compile_output", "message"):
+                body[field] = _b64(body[field])
+            self.callbacks_sent += 1
+            await self.callback_client.put(callback_url, json=body)
+
+    def _view(self, token: str) -> Dict[str, Any]:
+        entry = self.submissions.get(token)
+        if entry is None:
+            return {"token": token, "status": {"id": 14, "description": "Not Found"}}
+        if entry["result"] is None:
+            return {"token": token, "stdout": None, "status": {"id": 1, "description": "In Queue"}}
+        return entry["result"]
+
+    async def drain(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    # ------------------------------------------------------------------ HTTP
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append((request.method, path))
+        if request.method == "POST" and path == "/submissions":
+            token = self._create(json.loads(request.content))
+            return httpx.Response(201, json={"token": token})
+        if request.method == "POST" and path == "/submissions/batch":
+            reqs = json.loads(request.content).get("submissions", [])
+            return httpx.Response(201, json=[{"token": self._create(req)} for req in reqs])
+        if request.method == "GET" and path == "/submissions/batch":
+            tokens = [t for t in request.url.params.get("tokens", "").split(",") if t]
+            return httpx.Response(200, json={"submissions": [self._view(t) for t in tokens]})
+        if request.method == "GET" and path.startswith("/submissions/"):
+            return httpx.Response(200, json=self._view(path.rsplit("/", 1)[-1]))
+        return httpx.Response(404, json={"error": "not found"})
@@ -0,0 +1,208 @@
+"""In-process fake of the Supabase table API for service tests and benchmarks.
+
+Covers the query-builder calls the repositories use (``select``/``eq``/``in_``/``is_``/``order``/
+``limit``/``single``/``insert``/``update``/``upsert``/``delete`` then ``await execute()``)
+over plain lists of dict rows. Plug it in by patching a repository module's
+``get_supabase``, e.g. ``monkeypatch.setattr(repo_module, "get_supabase", fake.get_supabase)``.
+Every ``execute`` sleeps ``latency`` seconds (a float or a zero-argument callable) and is
+counted per ``(table, operation)``. Rows written to ``sink_tables`` are acknowledged but
+not kept, so long benchmark runs do not slow down scanning an ever-growing table.
+``rpc(name, params)`` calls ``functions[name](fake, params)``; unknown functions fail like
+PostgREST does when a function is not deployed (PGRST202).
+"""
+
+import asyncio
+import copy
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+
+class FakeResponse:
+    def __init__(self, data: Any) -> None:
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeSupabase", table: str) -> None:
+        self.client = client
+        self.table_name = table
+        self._op = "select"
+        self._payload: Any = None
+        self._filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._order: Optional[tuple[str, bool]] = None
+        self._limit: Optional[int] = None
+        self._single = False
+
+    # ------------------------------------------------------------------ builders
+    def select(self, *args: Any, **kwargs: Any) -> "FakeQuery":
+        return self
+
+    def eq(self, field: str, value: Any) -> "FakeQuery":
+        self._filters.append(lambda row: str(row.get(field)) == str(value))
+        return self
+
+    def neq(self, field: str, value: Any) -> "FakeQuery":
+        self._filters.append(lambda row: str(row.get(field)) != str(value))
+        return self
+
+    def in_(self, field: str, values: Iterable[Any]) -> "FakeQuery":
+        wanted = {str(v) for v in values}
+        self._filters.append(lambda row: str(row.get(field)) in wanted)
+        return self
+
+    def is_(self, field: str, value: Any) -> "FakeQuery":
+        if value in (None, "null"):
+            self._filters.append(lambda row: row.get(field) is None)
+        else:
+            self._filters.append(lambda row: str(row.get(field)).lower() == str(value).lower())
+        return self
+
+    def order(self, field: str, desc: bool = False, **kwargs: Any) -> "FakeQuery":
+        self._order = (field, desc)
+        return self
+
+    def limit(self, n: int) -> "FakeQuery":
+        self._limit = n
+        return self
+
+    def single(self) -> "FakeQuery":
+        self._single = True
+        return self
+
+    maybe_single = single
+
+    def insert(self, payload: Any) -> "FakeQuery":
+        self._op, self._payload = "insert", payload
+        return self
+
+    def upsert(self, payload: Any, **kwargs: Any) -> "FakeQuery":
+        self._op, self._payload = "upsert", payload
+        return self
+
+    def update(self, payload: Dict[str, Any]) -> "FakeQuery":
+        self._op, self._payload = "update", payload
+        return self
+
+    def delete(self) -> "FakeQuery":
+        self._op = "delete"
+        return self
+
+    # ------------------------------------------------------------------ execution
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(check(row) for check in self._filters)
+
+    def _run(self) -> Any:
+        rows = self.client.tables.setdefault(self.table_name, [])
+        if self._op in ("insert", "upsert"):
+            payload = self._payload if isinstance(self._payload, list) else [self._payload]
+            stored = []
+            for item in payload:
+                row = dict(item)
+                row.setdefault("id", f"{self.table_name}-{next(self.client._ids)}")
+                if self.table_name in self.client.sink_tables:
+                    stored.append(row)
+                    continue
+                if self._op == "upsert":
+                    rows[:] = [r for r in rows if str(r.get("id")) != str(row["id"])]
+                rows.append(row)
+                stored.append(copy.deepcopy(row))
+            return stored
+        matched = [row for row in rows if self._matches(row)]
+        if self._op == "update":
+            for row in matched:
+                row.update(copy.deepcopy(self._payload))
+        elif self._op == "delete":
+            rows[:] = [row for row in rows if not self._matches(row)]
+        if self._order is not None:
+            field, desc = self._order
+            matched.sort(key=lambda row: (row.get(field) is None, row.get(field)), reverse=desc)
+        if self._limit is not None:
+            matched = matched[: self._limit]
+        data = [copy.deepcopy(row) for row in matched]
+        if self._single:
+            return data[0] if data else None
+        return data
+
+    async def execute(self) -> FakeResponse:
+        self.client.calls[(self.table_name, self._op)] += 1
+        delay = self.client.latency() if callable(self.client.latency) else self.client.latency
+        if delay:
+            await asyncio.sleep(delay)
+        return FakeResponse(self._run())
+
+
+class FakeRpc:
+    def __init__(self, client: "FakeSupabase", name: str, params: Dict[str, Any]) -> None:
+        self.client = client
+        self.name = name
+        self.params = params
+
+    async def execute(self) -> FakeResponse:
+        self.client.calls[(self.name, "rpc")] += 1
+        delay = self.client.latency() if callable(self.client.latency) else self.client.latency
+        if delay:
+            await asyncio.sleep(delay)
+        function = self.client.functions.get(self.name)
+        if function is None:
+            raise Exception(f"PGRST202: Could not find the function public.{self.name} in the schema cache")
+        return FakeResponse(function(self.client, copy.deepcopy(self.params)))
+
+
+def log_test_batches(db: "FakeSupabase", params: Dict[str, Any]) -> List[str]:
+    """Stand-in for the log_test_batches Postgres function (alembic/versions/log_test_batch.sql)."""
+    submission_ids = []
+    for batch in params["p_batches"]:
+        submission = dict(batch["p_submission"])
+        submission.setdefault("id", f"code_submissions-{next(db._ids)}")
+        submission_ids.append(submission["id"])
+        if "code_results" not in db.sink_tables:
+            results = db.tables.setdefault("code_results", [])
+            results.extend({**row, "submission_id": submission["id"]} for row in batch["p_results"])
+        if "code_submissions" not in db.sink_tables:
+            db.tables.setdefault("code_submissions", []).append(submission)
+    return submission_ids
+
+
+def log_test_batch(db: "FakeSupabase", params: Dict[str, Any]) -> str:
+    """Stand-in for the log_test_batch Postgres function."""
+    return log_test_batches(db, {"p_batches": [params]})[0]
+
+
+def claim_challenge_rewards(db: "FakeSupabase", params: Dict[str, Any]) -> bool:
+    """Stand-in for the claim_challenge_rewards Postgres function (alembic/versions/challenge_reward_claims.sql)."""
+    for row in db.tables.get("challenge_attempts", []):
+        if str(row.get("id")) == str(params["p_attempt_id"]) and row.get("rewards_claimed_at") is None:
+            row["rewards_claimed_at"] = datetime.now(timezone.utc).isoformat()
+            return True
+    return False
+
+
+class FakeSupabase:
+    def __init__(
+        self,
+        tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        *,
+        latency: Union[float, Callable[[], float]] = 0.0,
+        sink_tables: Iterable[str] = (),
+        functions: Optional[Dict[str, Callable[["FakeSupabase", Dict[str, Any]], Any]]] = None,
+    ) -> None:
+        self.tables: Dict[str, List[Dict[str, Any]]] = {name: list(rows) for name, rows in (tables or {}).items()}
+        self.latency = latency
+        self.sink_tables = set(sink_tables)
+        self.functions = dict(functions or {})
+        self.calls: Counter = Counter()
+        self._ids = itertools.count(1)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> FakeRpc:
+        return FakeRpc(self, name, dict(params or {}))
+
+    async def get_supabase(self) -> "FakeSupabase":
+        return self
+
+    def count(self, table: str, op: Optional[str] = None) -> int:
+        return sum(n for (name, kind), n in self.calls.items() if name == table and (op is None or kind == op))
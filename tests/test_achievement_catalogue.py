@@ -0,0 +1,71 @@
+import asyncio
+
+from app.features.achievements.catalogue import AchievementCatalogue, CatalogueSnapshot
+
+TITLES = [
+    {"id": "t3", "name": "Expert", "min_elo": 1800},
+    {"id": "t1", "name": "Novice", "min_elo": 0},
+    {"id": "t2", "name": "Adept", "min_elo": "1200"},
+    {"id": "t2b", "name": "Adept (duplicate)", "min_elo": 1200},
+]
+
+
+class CatalogueRepo:
+    def __init__(self):
+        self.badges = [{"id": "b1", "slug": "Speed Demon"}, {"id": "b2", "code": "topic_mastery"}]
+        self.titles = list(TITLES)
+        self.reads = 0
+        self.fail = False
+
+    async def list_badge_definitions(self):
+        self.reads += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("db down")
+        return list(self.badges)
+
+    async def list_titles(self):
+        return list(self.titles)
+
+
+def test_snapshot_indexes_badges_by_slug_and_titles_by_threshold():
+    snapshot = CatalogueSnapshot([{"id": "b1", "slug": "Speed Demon"}, {"id": "b2", "code": "topic_mastery"}], TITLES)
+
+    assert snapshot.badge("speed-demon", "speeddemon")["id"] == "b1"
+    assert snapshot.badge("topic-mastery", "topic_mastery")["id"] == "b2"
+    assert snapshot.badge("gold") is None
+    assert [snapshot.title_for_elo(elo)["id"] for elo in (0, 1199, 1200, 1799, 5000)] == ["t1", "t1", "t2", "t2", "t3"]
+    assert snapshot.title_for_elo(-5) is None
+    assert snapshot.lowest_title()["id"] == "t1" and snapshot.title("t3")["name"] == "Expert"
+
+
+def test_concurrent_misses_share_one_load_and_invalidate_forces_a_reload():
+    repo = CatalogueRepo()
+    catalogue = AchievementCatalogue(repo, ttl_seconds=3600)
+
+    async def run():
+        first = await asyncio.gather(*(catalogue.snapshot() for _ in range(5)))
+        catalogue.invalidate()
+        repo.badges.append({"id": "b3", "slug": "gold"})
+        second = await catalogue.snapshot()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert repo.reads == 2
+    assert all(snapshot is first[0] for snapshot in first)
+    assert second.badge("gold")["id"] == "b3" and catalogue.stats()["invalidations"] == 1
+
+
+def test_expired_catalogue_keeps_serving_the_last_snapshot_when_reload_fails():
+    repo = CatalogueRepo()
+    catalogue = AchievementCatalogue(repo, ttl_seconds=0)
+
+    async def run():
+        loaded = await catalogue.snapshot()
+        repo.fail = True
+        return loaded, await catalogue.snapshot()
+
+    loaded, served = asyncio.run(run())
+
+    assert served is loaded and catalogue.stats()["load_failures"] == 1
@@ -0,0 +1,214 @@
+import asyncio
+from collections import Counter
+from datetime import date
+
+from app.features.achievements.catalogue import AchievementCatalogue
+from app.features.achievements.duration_sketch import ChallengeDurationSketches
+from app.features.achievements.schemas import CheckAchievementsRequest
+from app.features.achievements.service import AchievementsService, AttemptAggregates
+
+BRONZE = "00000000-0000-0000-0000-000000000001"
+TOPIC = "00000000-0000-0000-0000-000000000002"
+SPEED = "00000000-0000-0000-0000-000000000003"
+
+
+class CountingRepo:
+    """Achievements repository stand-in that counts calls and in-flight reads."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.in_flight = 0
+        self.peak = 0
+        self.elo = {"user_id": "1001", "elo_points": 1000, "running_gpa": 3.0, "title_id": "t1"}
+        self.aggregate = None
+        self.counted = set()
+        self.aggregates_available = True
+        self.sketch = None
+        self.sketches_available = True
+
+    async def _read(self, name, value):
+        self.calls[name] += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return value
+
+    async def fetch_challenge_attempt(self, attempt_id):
+        return await self._read("fetch_challenge_attempt", {
+            "id": attempt_id, "user_id": "1001", "challenge_id": "ch-1", "status": "submitted",
+            "tier": "bronze", "topic_id": "topic-1", "correct_count": 4, "total_questions": 4, "duration_seconds": 90,
+        })
+
+    async def fetch_challenge(self, challenge_id):
+        return await self._read("fetch_challenge", {"id": challenge_id, "tier": "bronze", "topic_id": "topic-1"})
+
+    async def list_submitted_attempts(self, user_id):
+        attempts = [
+            {"id": f"att-{n}", "tier": "bronze", "topic_id": "topic-1", "correct_count": 4, "total_questions": 4}
+            for n in range(1, 4)
+        ]
+        return await self._read("list_submitted_attempts", attempts)
+
+    async def list_badge_definitions(self):
+        return await self._read("list_badge_definitions", [
+            {"id": BRONZE, "slug": "bronze", "name": "Bronze"},
+            {"id": TOPIC, "slug": "topic-mastery", "name": "Topic Mastery"},
+            {"id": SPEED, "slug": "speed-demon", "name": "Speed Demon"},
+        ])
+
+    async def get_badges_for_user(self, user_id):
+        return await self._read("get_badges_for_user", [])
+
+    async def list_titles(self):
+        return await self._read("list_titles", [{"id": "t1", "name": "Novice", "min_elo": 0}])
+
+    async def list_attempts_for_challenge(self, challenge_id):
+        return await self._read("list_attempts_for_challenge", [
+            {"id": "att-1", "duration_seconds": 90},
+            {"id": "att-0", "duration_seconds": 300},
+        ])
+
+    async def get_duration_sketch(self, challenge_id):
+        return await self._read("get_duration_sketch", self.sketch)
+
+    async def merge_duration_sketch(self, challenge_id, sketch, *, replace=False):
+        self.calls["merge_duration_sketch"] += 1
+        self.sketch = dict(sketch)
+        return dict(self.sketch)
+
+    async def get_user_elo(self, user_id, **kwargs):
+        return await self._read("get_user_elo", dict(self.elo))
+
+    async def update_user_elo(self, user_id, **kwargs):
+        self.calls["update_user_elo"] += 1
+        self.elo["elo_points"] = kwargs["elo_points"]
+
+    async def log_elo_event(self, payload):
+        self.calls["log_elo_event"] += 1
+
+    async def add_badge_to_user(self, user_id, badge_id, **kwargs):
+        self.calls["add_badge_to_user"] += 1
+        return {"badge_id": badge_id, "date_earned": "2025-09-01T00:00:00+00:00"}
+
+    async def add_badges_batch(self, user_id, badge_ids, **kwargs):
+        self.calls["add_badges_batch"] += 1
+        return [{"badge_id": badge_id} for badge_id in badge_ids]
+
+    async def update_profile_title(self, user_id, title_id):
+        self.calls["update_profile_title"] += 1
+
+    async def get_attempt_aggregate(self, student_id):
+        return await self._read("get_attempt_aggregate", self.aggregate)
+
+    async def record_attempt_aggregate(self, student_id, attempt_id, *, ratio, tier, topic):
+        # Same contract as the record_attempt_aggregate SQL function
+        self.calls["record_attempt_aggregate"] += 1
+        if self.aggregate is None:
+            return None
+        if attempt_id not in self.counted:
+            self.counted.add(attempt_id)
+            totals = AttemptAggregates.from_row(self.aggregate)
+            totals.ratio_sum += ratio
+            totals.attempt_count += 1
+            if tier:
+                totals.tier_successes[tier] = totals.tier_successes.get(tier, 0) + 1
+            if topic:
+                totals.topic_successes[topic] = totals.topic_successes.get(topic, 0) + 1
+            self.aggregate = totals.to_row()
+        return dict(self.aggregate)
+
+    async def replace_attempt_aggregate(self, student_id, aggregate, attempt_ids):
+        self.calls["replace_attempt_aggregate"] += 1
+        self.aggregate = dict(aggregate)
+        self.counted = set(attempt_ids)
+        return dict(self.aggregate)
+
+
+def _service(monkeypatch, repo):
+    service = AchievementsService()
+    service.repo = repo
+    service.duration_sketches = ChallengeDurationSketches(repo)
+    service.catalogue = AchievementCatalogue(repo)
+
+    async def semester_context(module_code):
+        return None, date(2025, 8, 31), date(2025, 11, 22)
+
+    monkeypatch.setattr(service, "_resolve_semester_context", semester_context)
+    return service
+
+
+def test_check_achievements_loads_each_dataset_once_and_concurrently(monkeypatch):
+    repo = CountingRepo()
+    service = _service(monkeypatch, repo)
+
+    response = asyncio.run(
+        service.check_achievements("1001", CheckAchievementsRequest(submission_id="att-1", badge_tiers=["bronze"]))
+    )
+
+    for read in (
+        "fetch_challenge_attempt",
+        "fetch_challenge",
+        "list_submitted_attempts",
+        "list_badge_definitions",
+        "get_badges_for_user",
+        "list_titles",
+        "list_attempts_for_challenge",
+    ):
+        assert repo.calls[read] == 1, read
+    assert repo.peak >= 4
+    # The tier, topic and speed rules award through the shared owned set, so nothing is awarded twice
+    assert sorted(str(badge.badge_id) for badge in response.unlocked_badges) == [BRONZE, TOPIC, SPEED]
+    assert repo.calls["add_badge_to_user"] == 3 and repo.calls["add_badges_batch"] == 0
+    # Nothing stored yet: the totals were rebuilt from the history read above and seeded
+    assert repo.calls["replace_attempt_aggregate"] == 1
+    assert repo.aggregate["attempt_count"] == 3 and repo.counted == {"att-1", "att-2", "att-3"}
+
+
+def test_check_achievements_adds_the_attempt_to_stored_totals_without_rescanning(monkeypatch):
+    repo = CountingRepo()
+    repo.aggregate = {"ratio_sum": 2.0, "attempt_count": 2, "tier_successes": {"bronze": 2}, "topic_successes": {"topic-1": 2}}
+    repo.counted = {"att-1", "att-2"}
+    service = _service(monkeypatch, repo)
+    request = CheckAchievementsRequest(submission_id="att-3", badge_tiers=["bronze"])
+
+    first = asyncio.run(service.check_achievements("1001", request))
+    again = asyncio.run(service.check_achievements("1001", request))
+
+    assert repo.calls["list_submitted_attempts"] == 0
+    assert repo.aggregate == {"ratio_sum": 3.0, "attempt_count": 3, "tier_successes": {"bronze": 3}, "topic_successes": {"topic-1": 3}}
+    assert first.gpa == again.gpa == 4.0
+    assert str(BRONZE) in {str(badge.badge_id) for badge in first.unlocked_badges}
+
+
+def test_verify_attempt_aggregates_repairs_drift(monkeypatch):
+    repo = CountingRepo()
+    repo.aggregate = {"ratio_sum": 1.0, "attempt_count": 1, "tier_successes": {}, "topic_successes": {}}
+    service = _service(monkeypatch, repo)
+
+    report = asyncio.run(service.verify_attempt_aggregates("1001"))
+    clean = asyncio.run(service.verify_attempt_aggregates("1001"))
+
+    assert report["drift"] and report["repaired"]
+    assert repo.aggregate == AttemptAggregates.from_attempts(asyncio.run(repo.list_submitted_attempts("1001"))).to_row()
+    assert repo.aggregate["tier_successes"] == {"bronze": 3}
+    assert not clean["drift"] and not clean["repaired"]
+
+
+def test_catalogue_is_read_once_across_evaluations_until_invalidated(monkeypatch):
+    repo = CountingRepo()
+    service = _service(monkeypatch, repo)
+    request = CheckAchievementsRequest(submission_id="att-1", badge_tiers=["bronze"])
+
+    async def run():
+        await asyncio.gather(*(service.check_achievements("1001", request) for _ in range(3)))
+        title = await service.get_title("1001")
+        service.catalogue.invalidate()
+        await service.check_achievements("1001", request)
+        return title
+
+    title = asyncio.run(run())
+
+    assert title.id == "t1"
+    assert repo.calls["list_badge_definitions"] == repo.calls["list_titles"] == 2
+
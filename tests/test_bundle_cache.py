@@ -0,0 +1,75 @@
+import asyncio
+
+from app.features.submissions.bundle_cache import QuestionBundleCache, question_bundle_cache
+from app.features.submissions.repository import submissions_repository
+from app.features.submissions.service import submissions_service
+
+
+def _bundle(qid, challenge_id="ch-1", prompt="p"):
+    return submissions_service._build_bundle(challenge_id, qid, {"challenge_id": challenge_id, "prompt": prompt}, [])
+
+
+def test_cache_copies_bounds_and_rejects_puts_that_raced_an_invalidation():
+    cache = QuestionBundleCache(max_entries=2)
+
+    assert cache.put(_bundle("q1"), cache.version())
+    copy = cache.get("q1")
+    copy.points = 1
+    assert cache.get("q1").points != 1
+
+    version = cache.version()
+    cache.invalidate(["q1"])
+    assert cache.get("q1") is None
+    assert not cache.put(_bundle("q1"), version)
+
+    cache.put(_bundle("q1"), cache.version())
+    cache.put(_bundle("q2", challenge_id="ch-2"), cache.version())
+    cache.put(_bundle("q3"), cache.version())
+    assert cache.get("q1") is None
+    assert cache.invalidate_challenge("ch-1") == 1
+    assert cache.get("q2") is not None and cache.get("q3") is None
+
+    small = QuestionBundleCache(max_bytes=3000)
+    small.put(_bundle("a", prompt="x" * 1200), small.version())
+    small.put(_bundle("b", prompt="x" * 1200), small.version())
+    assert len(small) == 1 and small.get("b") is not None
+    stats = cache.stats()
+    assert stats["stale_puts"] == 1 and stats["evictions"] == 1
+
+
+def test_service_serves_cached_bundles_and_prewarms_challenges(monkeypatch):
+    fetched = []
+
+    async def fake_get_questions(ids):
+        fetched.append(("questions", list(ids)))
+        return {qid: {"id": qid, "challenge_id": "ch-1"} for qid in ids}
+
+    async def fake_get_questions_for_challenges(challenge_ids):
+        fetched.append(("challenges", list(challenge_ids)))
+        return {qid: {"id": qid, "challenge_id": "ch-1"} for qid in ("q1", "q2")}
+
+    async def fake_list_tests_for_questions(ids):
+        fetched.append(("tests", list(ids)))
+        return {qid: [] for qid in ids}
+
+    monkeypatch.setattr(submissions_repository, "get_questions", fake_get_questions)
+    monkeypatch.setattr(submissions_repository, "get_questions_for_challenges", fake_get_questions_for_challenges)
+    monkeypatch.setattr(submissions_repository, "list_tests_for_questions", fake_list_tests_for_questions)
+
+    async def _run():
+        warmed = await submissions_service.prewarm_question_bundles(["ch-1"])
+        first = await submissions_service.get_question_bundles("ch-1", ["q1", "q2", "q3"])
+        second = await submissions_service.get_question_bundles("ch-1", ["q1", "q2", "q3"])
+        return warmed, first, second
+
+    warmed, first, second = asyncio.run(_run())
+
+    assert warmed == 2
+    assert sorted(first) == sorted(second) == ["q1", "q2", "q3"]
+    assert fetched == [
+        ("challenges", ["ch-1"]),
+        ("tests", ["q1", "q2"]),
+        ("questions", ["q3"]),
+        ("tests", ["q3"]),
+    ]
+    assert question_bundle_cache.stats()["hits"] == 5
@@ -0,0 +1,61 @@
+import asyncio
+
+import app.features.submissions.code_results_repository as code_results_module
+from app.features.submissions.code_results_repository import CodeResultsRepository
+from fake_supabase import FakeSupabase, log_test_batch
+
+
+def _records():
+    return [
+        {"stdout": "1\n", "status_id": 3, "status_description": "Accepted", "passed": True, "execution_time": "0.01"},
+        {"stdout": "2\n", "status_id": 4, "status_description": "Wrong Answer", "passed": False},
+    ]
+
+
+def _log(repo):
+    return asyncio.run(
+        repo.log_test_batch(
+            user_id=7,
+            language_id=71,
+            source_code="print(1)",
+            token=None,
+            test_records=_records(),
+            summary={"status_id": 4, "additional_files": {"tests_total": 2}},
+            challenge_id="ch-1",
+            question_id="q-1",
+        )
+    )
+
+
+def test_log_test_batch_writes_submission_and_results_in_one_rpc(monkeypatch):
+    fake = FakeSupabase(functions={"log_test_batch": log_test_batch})
+    monkeypatch.setattr(code_results_module, "get_supabase", fake.get_supabase)
+    monkeypatch.setattr(CodeResultsRepository, "_missing_functions", set())
+
+    submission_id = _log(CodeResultsRepository())
+
+    assert fake.calls == {("log_test_batch", "rpc"): 1}
+    [submission] = fake.tables["code_submissions"]
+    results = fake.tables["code_results"]
+    assert submission["id"] == submission_id
+    assert submission["results_id"] == results[0]["id"]
+    assert submission["additional_files"] == {"tests_total": 2, "question_id": "q-1"}
+    assert [row["is_correct"] for row in results] == [True, False]
+    assert all(row["submission_id"] == submission_id for row in results)
+
+
+def test_log_test_batch_falls_back_to_separate_calls_without_the_function(monkeypatch):
+    fake = FakeSupabase()
+    monkeypatch.setattr(code_results_module, "get_supabase", fake.get_supabase)
+    monkeypatch.setattr(CodeResultsRepository, "_missing_functions", set())
+    repo = CodeResultsRepository()
+
+    first = _log(repo)
+    second = _log(repo)
+
+    # The missing function is only tried once; both batches are stored and linked
+    assert fake.calls[("log_test_batch", "rpc")] == 1
+    assert fake.count("code_results", "insert") == 2 and fake.count("code_results", "update") == 2
+    assert fake.count("code_submissions", "insert") == 2
+    linked = {row["submission_id"] for row in fake.tables["code_results"]}
+    assert linked == {first, second}
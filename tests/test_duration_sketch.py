@@ -0,0 +1,96 @@
+import asyncio
+import math
+import random
+
+from app.features.achievements.duration_sketch import ChallengeDurationSketches, DurationSketch
+
+
+class SketchRepo:
+    def __init__(self, attempts):
+        self.attempts = attempts
+        self.stored = None
+        self.merges = []
+        self.seed_reads = 0
+        self.sketches_available = True
+
+    async def get_duration_sketch(self, challenge_id):
+        return self.stored
+
+    async def list_attempts_for_challenge(self, challenge_id):
+        self.seed_reads += 1
+        return list(self.attempts)
+
+    async def merge_duration_sketch(self, challenge_id, sketch, *, replace=False):
+        # Same contract as merge_challenge_duration_sketch: add bucket counts unless replacing
+        self.merges.append((dict(sketch["bins"]), replace))
+        if self.stored is None or replace:
+            self.stored = {"alpha": sketch["alpha"], "bins": dict(sketch["bins"])}
+        else:
+            bins = dict(self.stored["bins"])
+            for key, count in sketch["bins"].items():
+                bins[key] = bins.get(key, 0) + count
+            self.stored = {"alpha": sketch["alpha"], "bins": bins}
+        return dict(self.stored)
+
+
+def test_speed_threshold_stays_within_the_documented_bound():
+    rng = random.Random(7)
+    for _ in range(20):
+        durations = [rng.randint(5, 5000) for _ in range(rng.randint(1, 400))]
+        sketch = DurationSketch.from_durations(durations, alpha=0.01)
+        ordered = sorted(durations)
+        exact = ordered[max(0, math.ceil(len(ordered) * 0.1) - 1)]
+
+        assert all(sketch.within_quantile(d, 0.1) for d in durations if d <= exact)
+        assert all(d <= sketch.gamma * exact for d in range(1, 5001) if sketch.within_quantile(d, 0.1))
+        assert abs(sketch.quantile(0.1) - exact) <= 0.01 * exact
+
+
+def test_merged_sketches_match_one_sketch_of_all_durations():
+    left = DurationSketch.from_durations([12, 40, 41, 900])
+    right = DurationSketch.from_durations([13, 40, 7000])
+    left.merge(right)
+
+    combined = DurationSketch.from_durations([12, 40, 41, 900, 13, 40, 7000])
+    assert left.bins == combined.bins and left.count == combined.count == 7
+    assert DurationSketch.from_dict(left.to_dict()).bins == combined.bins
+
+
+def test_store_seeds_once_counts_each_attempt_once_and_flushes_deltas():
+    repo = SketchRepo([{"id": "a1", "duration_seconds": 60}, {"id": "a2", "duration_seconds": 600}])
+    store = ChallengeDurationSketches(repo, flush_interval=3600)
+
+    async def run():
+        await store.observe("ch-1", "a1", 60)  # already counted by the seed
+        await store.observe("ch-1", "a3", 30)
+        await store.observe("ch-1", "a3", 30)
+        sketch = await store.observe("ch-1", "a4", 45)
+        saved = await store.flush()
+        return sketch, saved
+
+    sketch, saved = asyncio.run(run())
+
+    assert repo.seed_reads == 1
+    assert sketch.count == 4 and saved == 1
+    assert [replace for _, replace in repo.merges] == [True, False]
+    assert sum(repo.merges[1][0].values()) == 2
+    assert DurationSketch.from_dict(repo.stored).count == 4
+
+
+def test_store_keeps_deltas_when_a_flush_fails():
+    repo = SketchRepo([])
+    store = ChallengeDurationSketches(repo, flush_interval=3600)
+
+    async def failing_merge(challenge_id, sketch, *, replace=False):
+        if not replace:
+            raise RuntimeError("db down")
+        return dict(sketch)
+
+    async def run():
+        await store.observe("ch-1", "a1", 20)
+        repo.merge_duration_sketch = failing_merge
+        assert await store.flush() == 0
+        return store.stats()
+
+    stats = asyncio.run(run())
+    assert stats["pending_challenges"] == 1 and stats["flush_failures"] == 1
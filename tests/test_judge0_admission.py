@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from app.features.judge0.admission import AdmissionController, AdmissionRejected
+
+
+def test_admission_serves_students_round_robin():
+    controller = AdmissionController(max_in_flight=1, default_deadline=5)
+    order: list[str] = []
+
+    async def run(student: str, label: str, hold: asyncio.Event):
+        async with controller.admit(student, cost=1):
+            order.append(label)
+            await hold.wait()
+
+    async def _run():
+        gate = asyncio.Event()
+        first = asyncio.create_task(run("alice", "alice-0", gate))
+        await asyncio.sleep(0)
+        # Alice queues a burst of resubmits before Bob submits once
+        tasks = [asyncio.create_task(run("alice", f"alice-{i}", gate)) for i in range(1, 4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(run("bob", "bob-0", gate)))
+        await asyncio.sleep(0)
+        assert controller.stats()["queued_requests"] == 4
+        gate.set()
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(_run())
+
+    assert order == ["alice-0", "alice-1", "bob-0", "alice-2", "alice-3"]
+    stats = controller.stats()
+    assert stats["admitted"] == 5
+    assert stats["in_flight"] == 0
+    assert stats["queue_ms_max"] >= 0.0
+
+
+def test_admission_rejects_when_estimated_wait_exceeds_deadline():
+    controller = AdmissionController(max_in_flight=2, default_deadline=1.0, initial_unit_seconds=10.0)
+
+    async def _run():
+        hold = asyncio.Event()
+
+        async def occupy(student):
+            async with controller.admit(student, cost=2):
+                await hold.wait()
+
+        busy = asyncio.create_task(occupy("alice"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with controller.admit("bob", cost=2):
+                pass
+        hold.set()
+        await busy
+        return excinfo.value
+
+    rejected = asyncio.run(_run())
+
+    # Two units of backlog at 10s per unit over a budget of 2 -> 10s estimated wait
+    assert rejected.estimated_wait == pytest.approx(10.0)
+    assert rejected.retry_after_header == "9"
+    assert controller.stats()["rejected"] == 1
+
+
+def test_admission_times_out_queued_request_at_deadline():
+    controller = AdmissionController(max_in_flight=1, default_deadline=0.05, initial_unit_seconds=0.01)
+
+    async def _run():
+        hold = asyncio.Event()
+
+        async def occupy():
+            async with controller.admit("alice"):
+                await hold.wait()
+
+        busy = asyncio.create_task(occupy())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with controller.admit("bob"):
+                pass
+        hold.set()
+        await busy
+        return excinfo.value
+
+    rejected = asyncio.run(_run())
+
+    assert rejected.reason == "judge0_queue_timeout"
+    stats = controller.stats()
+    assert stats["timed_out"] == 1
+    assert stats["queued_requests"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_admission_check_reserves_nothing_and_checked_work_queues():
+    controller = AdmissionController(max_in_flight=2, default_deadline=1.0, initial_unit_seconds=10.0)
+
+    async def _run():
+        hold = asyncio.Event()
+
+        async def occupy():
+            async with controller.admit("alice", cost=2):
+                await hold.wait()
+
+        busy = asyncio.create_task(occupy())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            controller.check(2)
+        assert controller.stats()["in_flight"] == 2
+
+        # Work that already passed the check waits past the deadline instead of being rejected
+        async def checked():
+            async with controller.admit("bob", cost=2, reject=False):
+                return controller.stats()["in_flight"]
+
+        waiting = asyncio.create_task(checked())
+        await asyncio.sleep(0)
+        assert controller.stats()["queued_requests"] == 1
+        hold.set()
+        await busy
+        return await waiting
+
+    in_flight = asyncio.run(_run())
+
+    assert in_flight == 2
+    stats = controller.stats()
+    assert stats["rejected"] == 1
+    assert stats["admitted"] == 2
+    assert stats["in_flight"] == 0
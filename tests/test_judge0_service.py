@@ -26,6 +26,8 @@ def test_execute_code_sync_backfills_stdout(monkeypatch):
     service = Judge0Service()
     service.base_url = "http://example.test"
     service.settings.judge0_timeout_s = 2
+    # Exercise the per-token polling loop rather than the batch poll coordinator
+    service._poll_coordinator = None
 
     async def fake_submit_code(submission):
         return Judge0SubmissionResponse(token="tok")
@@ -209,3 +211,414 @@ def test_execute_batch_hydrates_stdout(monkeypatch):
         assert tok == f"tok-{idx}"
         assert res.stdout == f"actual-tok-{idx}"
         assert res.status_id == 4
+
+
+def test_request_reuses_pooled_client(monkeypatch):
+    import httpx
+
+    service = Judge0Service()
+    service.base_url = "http://example.test"
+    seen: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        return httpx.Response(
+            200,
+            json={"token": "tok", "stdout": "ok", "status": {"id": 3, "description": "Accepted"}},
+        )
+
+    service._transport = httpx.MockTransport(handler)
+
+    async def _run():
+        await service.startup()
+        client = service._client
+        await service.get_submission_result("tok")
+        await service.get_submission_result("tok")
+        assert service._client is client
+        stats = service.pool_stats()
+        await service.aclose()
+        return client, stats
+
+    client, stats = asyncio.run(_run())
+
+    assert seen == ["/submissions/tok", "/submissions/tok"]
+    assert stats["requests_total"] == 2
+    assert stats["in_use"] == 0
+    assert client.is_closed
+    assert service._client is None
+
+
+def test_client_from_previous_loop_is_closed_and_counters_kept(monkeypatch):
+    import httpx
+
+    service = Judge0Service()
+    service.base_url = "http://example.test"
+    service._transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+
+    async def _first():
+        service._get_client()
+        # A request still counted against the old client when the loop goes away
+        service._pool_stats.in_use = 1
+        return service._client
+
+    stale = asyncio.run(_first())
+
+    async def _second():
+        client = service._get_client()
+        assert client is not stale
+        in_use = service.pool_stats()["in_use"]
+        await service.aclose()
+        return in_use
+
+    in_use = asyncio.run(_second())
+
+    assert in_use == 1
+    assert stale.is_closed
+    assert not service._retiring
+
+
+def test_execute_code_sync_serves_identical_runs_from_cache(monkeypatch):
+    service = Judge0Service()
+    service.base_url = "http://example.test"
+    calls = {"count": 0}
+
+    async def fake_execute_via_polling(submission, **kwargs):
+        calls["count"] += 1
+        status = {"id": 3, "description": "Accepted"} if submission.stdin != "slow" else {"id": 5, "description": "Time Limit Exceeded"}
+        return f"tok-{calls['count']}", Judge0ExecutionResult(
+            token=f"tok-{calls['count']}",
+            stdout="4",
+            status=status,
+            language={"id": 71},
+        )
+
+    monkeypatch.setattr(service, "_execute_via_polling", fake_execute_via_polling)
+
+    same = CodeSubmissionCreate(source_code="print(2 + 2)", language_id=71, stdin="", expected_output="4")
+    other_stdin = CodeSubmissionCreate(source_code="print(2 + 2)", language_id=71, stdin="x", expected_output="4")
+    timed_out = CodeSubmissionCreate(source_code="print(2 + 2)", language_id=71, stdin="slow")
+
+    async def _run():
+        first = await service.execute_code_sync(same)
+        second = await service.execute_code_sync(same)
+        third = await service.execute_code_sync(other_stdin)
+        await service.execute_code_sync(timed_out)
+        await service.execute_code_sync(timed_out)
+        return first, second, third
+
+    first, second, third = asyncio.run(_run())
+
+    assert first[0] == second[0] == "tok-1"
+    assert second[1].stdout == "4"
+    assert third[0] == "tok-2"
+    # Time limit results are load dependent, so both runs hit Judge0
+    assert calls["count"] == 4
+    stats = service.stats()["result_cache"]
+    assert stats["hits"] == 1
+    assert stats["entries"] == 2
+
+
+def test_poll_coordinator_coalesces_concurrent_polls(monkeypatch):
+    service = Judge0Service()
+    service.base_url = "http://example.test"
+    service._poll_coordinator.min_interval = 0.01
+    service._poll_coordinator.interval_per_token = 0.0
+    service._poll_coordinator.batch_size = 3
+    polls: list[list[str]] = []
+    counter = {"n": 0}
+
+    async def fake_submit_code(submission):
+        counter["n"] += 1
+        return Judge0SubmissionResponse(token=f"tok-{counter['n']}")
+
+    async def fake_get_batch_results(tokens, *, fields=None):
+        polls.append(list(tokens))
+        # Everything is still queued on the first tick and finished on the second
+        status = {"id": 1, "description": "In Queue"} if len(polls) <= 2 else {"id": 3, "description": "Accepted"}
+        return {
+            tok: Judge0ExecutionResult(token=tok, stdout=f"out-{tok}", status=status, language={"id": 71})
+            for tok in tokens
+        }
+
+    monkeypatch.setattr(service, "submit_code", fake_submit_code)
+    monkeypatch.setattr(service, "get_batch_results", fake_get_batch_results)
+
+    async def _run():
+        subs = [CodeSubmissionCreate(source_code="print(1)", language_id=71, stdin=str(i)) for i in range(5)]
+        results = await asyncio.gather(*(service._execute_via_polling(sub, timeout_seconds=2) for sub in subs))
+        await service.aclose()
+        return results
+
+    results = asyncio.run(_run())
+
+    assert sorted(tok for tok, _ in results) == [f"tok-{i}" for i in range(1, 6)]
+    assert all(raw.stdout == f"out-{tok}" for tok, raw in results)
+    # Five waiters, chunked three per request: two batch GETs per tick instead of five single GETs
+    assert [len(chunk) for chunk in polls] == [3, 2, 3, 2]
+
+
+def _callback_mode_service(monkeypatch, *, safety_interval=5.0):
+    from app.Core.config import get_settings
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "judge0_completion_mode", "callback")
+    monkeypatch.setattr(settings, "judge0_callback_url", "http://backend.test/judge0/callback")
+    monkeypatch.setattr(settings, "judge0_callback_secret", "s3cret")
+    monkeypatch.setattr(settings, "judge0_callback_safety_poll_interval_s", safety_interval)
+    service = Judge0Service()
+    service.base_url = "http://judge0.test"
+    return service
+
+
+def _callback_app(monkeypatch, service):
+    from fastapi import FastAPI
+
+    from app.features.judge0 import endpoints
+
+    monkeypatch.setattr(endpoints, "judge0_service", service)
+    app = FastAPI()
+    app.include_router(endpoints.public_router)
+    return app
+
+
+def test_callback_mode_resolves_without_polling(monkeypatch):
+    import httpx
+    from fake_judge0 import FakeJudge0
+
+    service = _callback_mode_service(monkeypatch)
+    app = _callback_app(monkeypatch, service)
+
+    async def _run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://backend.test") as backend:
+            fake = FakeJudge0(callback_client=backend, runner=lambda req: f"out-{req.get('stdin')}\n")
+            service._transport = httpx.MockTransport(fake.handler)
+            subs = [CodeSubmissionCreate(source_code="print(input())", language_id=71, stdin=str(i)) for i in range(3)]
+            results = await asyncio.gather(*(service.execute_code_sync(sub) for sub in subs))
+            forged = await backend.put("/judge0/callback?secret=nope", json={"token": "fake-1"})
+            await fake.drain()
+            await service.aclose()
+            return fake, results, forged
+
+    fake, results, forged = asyncio.run(_run())
+
+    assert [res.stdout for _, res in results] == ["out-0\n", "out-1\n", "out-2\n"]
+    assert all(res.status_id == 3 for _, res in results)
+    assert fake.callbacks_sent == 3
+    # Every result arrived through the callback: no GET traffic against Judge0 at all
+    assert fake.count("GET") == 0
+    assert all(req["request"]["callback_url"].endswith("?secret=s3cret") for req in fake.submissions.values())
+    assert forged.status_code == 403
+    assert service.stats()["poller"]["callbacks_received"] == 3
+
+
+def test_callback_endpoint_rejects_callbacks_outside_callback_mode(monkeypatch):
+    import httpx
+    from app.Core.config import get_settings
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "judge0_completion_mode", "callback")
+    monkeypatch.setattr(settings, "judge0_callback_url", "http://backend.test/judge0/callback")
+    monkeypatch.setattr(settings, "judge0_callback_secret", "")
+    # No secret configured: callback mode is refused and the service polls instead
+    service = Judge0Service()
+    app = _callback_app(monkeypatch, service)
+
+    async def _run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://backend.test") as backend:
+            forged = await backend.put("/judge0/callback", json={"token": "tok-1", "status": {"id": 3}})
+        await service.aclose()
+        return forged
+
+    forged = asyncio.run(_run())
+
+    assert service._callback_url is None
+    assert forged.status_code == 404
+    assert service.handle_callback({"token": "tok-1", "status": {"id": 3}}) is False
+    assert service._poll_coordinator.stats()["callbacks_early"] == 0
+
+
+def test_callback_mode_polls_when_callbacks_are_lost(monkeypatch):
+    import httpx
+    from fake_judge0 import FakeJudge0
+
+    service = _callback_mode_service(monkeypatch, safety_interval=0.05)
+    fake = FakeJudge0(drop_callbacks=True, runner=lambda req: "done")
+    service._transport = httpx.MockTransport(fake.handler)
+
+    async def _run():
+        sub = CodeSubmissionCreate(source_code="print('done')", language_id=71, stdin="")
+        result = await service.execute_code_sync(sub)
+        await service.aclose()
+        return result
+
+    _, result = asyncio.run(_run())
+
+    assert result.stdout == "done"
+    assert fake.count("GET", "/submissions/batch") >= 1
+    assert service.stats()["poller"]["safety_net_resolved"] == 1
+
+
+def test_poll_coordinator_buffers_callbacks_that_beat_registration():
+    service = Judge0Service()
+    coordinator = service._poll_coordinator
+    coordinator.callback_mode = True
+
+    async def _run():
+        early = Judge0ExecutionResult(token="tok-early", stdout="hi", status={"id": 3, "description": "Accepted"})
+        assert coordinator.deliver("tok-early", early) is False
+        raw = await coordinator.wait("tok-early", timeout=1)
+        await coordinator.aclose()
+        return raw
+
+    raw = asyncio.run(_run())
+
+    assert raw.stdout == "hi"
+    assert coordinator.stats()["callbacks_early"] == 1
+    assert coordinator.stats()["callbacks_buffered"] == 0
+
+
+def _multi_backend_service(monkeypatch, fakes, *, down=None, threshold=5):
+    import httpx
+    from app.Core.config import get_settings
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "judge0_urls", [f"http://{host}:2358" for host in fakes])
+    monkeypatch.setattr(settings, "judge0_breaker_failure_threshold", threshold)
+    down = down if down is not None else set()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host in down:
+            raise httpx.ConnectError("connection refused", request=request)
+        return await fakes[request.url.host].handler(request)
+
+    service = Judge0Service()
+    service._transport = httpx.MockTransport(handler)
+    service._poll_coordinator.min_interval = 0.01
+    service._poll_coordinator.interval_per_token = 0.0
+    return service
+
+
+def test_multi_backend_routing_keeps_tokens_sticky(monkeypatch):
+    from fake_judge0 import FakeJudge0
+
+    fakes = {"j0-a": FakeJudge0(prefix="a"), "j0-b": FakeJudge0(prefix="b")}
+    service = _multi_backend_service(monkeypatch, fakes)
+
+    async def _run():
+        subs = [CodeSubmissionCreate(source_code="print(1)", language_id=71, stdin=str(i), expected_output=str(i)) for i in range(6)]
+        results = await asyncio.gather(*(service.execute_code_sync(sub) for sub in subs))
+        await service.aclose()
+        return results
+
+    results = asyncio.run(_run())
+
+    assert [res.status_id for _, res in results] == [3] * 6
+    assert fakes["j0-a"].count("POST") > 0 and fakes["j0-b"].count("POST") > 0
+    # A token is only ever looked up on the Judge0 instance that issued it
+    for fake in fakes.values():
+        assert all(sub["result"] is not None for sub in fake.submissions.values())
+        assert fake.count("GET", "/submissions/batch") > 0
+    assert {tok[0] for tok, _ in results} == {"a", "b"}
+
+
+def test_multi_backend_fails_over_when_a_node_is_down(monkeypatch):
+    from fake_judge0 import FakeJudge0
+
+    fakes = {"j0-a": FakeJudge0(prefix="a"), "j0-b": FakeJudge0(prefix="b")}
+    service = _multi_backend_service(monkeypatch, fakes, down={"j0-a"}, threshold=2)
+
+    async def _run():
+        subs = [CodeSubmissionCreate(source_code="print(1)", language_id=71, stdin=str(i), expected_output=str(i)) for i in range(10)]
+        results = await service.execute_batch(subs)
+        await service.aclose()
+        return results
+
+    results = asyncio.run(_run())
+
+    assert len(results) == 10
+    assert all(tok.startswith("b-") and res.status_id == 3 for tok, res in results)
+    backend_a = service.stats()["backends"]["backends"][0]
+    assert backend_a["failures_total"] >= 1
+
+
+def test_multi_backend_resubmits_runs_stranded_on_a_dead_node(monkeypatch):
+    from fake_judge0 import FakeJudge0
+
+    fakes = {"j0-a": FakeJudge0(prefix="a", latency=0.2), "j0-b": FakeJudge0(prefix="b")}
+    down: set = set()
+    service = _multi_backend_service(monkeypatch, fakes, down=down, threshold=1)
+    original_submit_batch = service.submit_batch
+
+    async def submit_then_kill_a(submissions):
+        tokens = await original_submit_batch(submissions)
+        if tokens[0].startswith("a-"):
+            down.add("j0-a")  # node a accepts the batch, then disappears
+        return tokens
+
+    monkeypatch.setattr(service, "submit_batch", submit_then_kill_a)
+
+    async def _run():
+        subs = [CodeSubmissionCreate(source_code="print(1)", language_id=71, stdin=str(i), expected_output=str(i)) for i in range(10)]
+        results = await service.execute_batch(subs, timeout_seconds=5)
+        await service.aclose()
+        return results
+
+    results = asyncio.run(_run())
+
+    assert fakes["j0-a"].count("POST") == 1
+    assert all(tok.startswith("b-") and res.status_id == 3 for tok, res in results)
+    assert service.stats()["backends"]["backends"][0]["circuit"] == "open"
+
+
+def test_singleflight_collapses_identical_concurrent_runs(monkeypatch):
+    service = Judge0Service()
+    service.base_url = "http://example.test"
+    calls = {"sync": 0, "batch": []}
+
+    async def fake_execute_via_polling(submission, **kwargs):
+        calls["sync"] += 1
+        await asyncio.sleep(0.05)
+        # TLE is never cached, so only singleflight can collapse these
+        return "tok-sync", Judge0ExecutionResult(
+            token="tok-sync", stdout="", status={"id": 5, "description": "Time Limit Exceeded"}, language={"id": 71}
+        )
+
+    async def fake_execute_batch_uncached(submissions, **kwargs):
+        calls["batch"].append([sub.stdin for sub in submissions])
+        await asyncio.sleep(0.05)
+        return [
+            (f"tok-{sub.stdin}", CodeExecutionResult(
+                stdout=sub.stdin,
+                status_id=3,
+                status_description="Accepted",
+                language_id=71,
+                success=True,
+                created_at=datetime.now(timezone.utc),
+            ))
+            for sub in submissions
+        ]
+
+    monkeypatch.setattr(service, "_execute_via_polling", fake_execute_via_polling)
+    monkeypatch.setattr(service, "_execute_batch_uncached", fake_execute_batch_uncached)
+
+    looping = CodeSubmissionCreate(source_code="while True: pass", language_id=71, stdin="")
+    batch = [CodeSubmissionCreate(source_code="print(input())", language_id=71, stdin=str(i % 5)) for i in range(10)]
+
+    async def _run():
+        sync_results = await asyncio.gather(*(service.execute_code_sync(looping) for _ in range(4)))
+        batch_results = await asyncio.gather(service.execute_batch(batch), service.execute_batch(batch[:9]))
+        return sync_results, batch_results
+
+    sync_results, (first, second) = asyncio.run(_run())
+
+    assert calls["sync"] == 1
+    assert all(tok == "tok-sync" and res.status_id == 5 for tok, res in sync_results)
+    assert sync_results[0][1] is not sync_results[1][1]
+    # Duplicates inside a batch keep their own runs; the overlapping second batch waits for the first
+    assert calls["batch"] == [[str(i % 5) for i in range(10)]]
+    assert [res.stdout for _, res in first] == [str(i % 5) for i in range(10)]
+    assert [res.stdout for _, res in second] == [str(i % 5) for i in range(9)]
+    stats = service.stats()["singleflight"]
+    assert stats["leaders"] == 6
+    assert stats["collapsed"] == 3 + 9
+    assert stats["in_flight"] == 0
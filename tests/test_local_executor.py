@@ -0,0 +1,64 @@
+import asyncio
+
+from app.features.judge0.local_executor import LocalSandboxExecutor
+from app.features.judge0.schemas import CodeSubmissionCreate
+
+
+def _run(coro_factory):
+    async def _main():
+        executor = LocalSandboxExecutor()
+        try:
+            return await coro_factory(executor)
+        finally:
+            await executor.aclose()
+
+    return asyncio.run(_main())
+
+
+def _submission(code, stdin="", expected=None, **limits):
+    return CodeSubmissionCreate(source_code=code, language_id=71, stdin=stdin, expected_output=expected, **limits)
+
+
+def test_local_executor_maps_outcomes_to_judge0_statuses():
+    cases = [
+        _submission("print(int(input()) * 2)", "21", "42"),
+        _submission("print(int(input()) * 2)", "20", "42"),
+        _submission("raise ValueError('boom')"),
+        _submission("while True:\n    pass", cpu_time_limit=1, wall_time_limit=5),
+    ]
+
+    results = _run(lambda ex: asyncio.gather(*(ex.execute_code_sync(sub) for sub in cases)))
+
+    assert [res.status_id for _, res in results] == [3, 4, 11, 5]
+    assert results[0][1].stdout == "42\n"
+    assert results[0][1].success is True
+    assert "ValueError" in results[2][1].stderr
+
+
+def test_local_executor_batch_and_wall_clock_kill():
+    async def scenario(ex):
+        batch = await ex.execute_batch([
+            _submission("print(input()[::-1])", "abc", "cba"),
+            _submission("import time\ntime.sleep(30)", wall_time_limit=1),
+        ])
+        token = (await ex.submit_code(_submission("print('hi')"))).token
+        await asyncio.gather(*ex._background)
+        return batch, await ex.get_submission_result(token), ex.stats()
+
+    batch, polled, stats = _run(scenario)
+
+    assert [res.status_id for _, res in batch] == [3, 5]
+    assert polled.stdout == "hi\n"
+    assert stats["runs_total"] == 3
+    assert stats["runs_timed_out"] == 1
+
+
+def test_local_executor_applies_rlimits_to_the_submission():
+    code = (
+        "import resource\n"
+        "print(resource.getrlimit(resource.RLIMIT_CPU)[0], resource.getrlimit(resource.RLIMIT_AS)[0])"
+    )
+
+    _, result = _run(lambda ex: ex.execute_code_sync(_submission(code, cpu_time_limit=2, memory_limit=256000)))
+
+    assert result.stdout == f"2 {256000 * 1024}\n"
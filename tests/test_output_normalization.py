@@ -111,3 +111,124 @@ async def test_line_set_handles_reordered_output():
     result = await compare(expected, actual)
     assert result.passed is True
     assert result.mode_applied == ComparisonMode.LINE_SET
+
+
+@pytest.mark.anyio("asyncio")
+async def test_small_outputs_stay_inline_and_stop_at_first_pass(monkeypatch):
+    from app.features.submissions import comparison
+
+    class _NoPool:
+        def submit(self, *args, **kwargs):
+            raise AssertionError("small outputs must not use the comparator pool")
+
+    monkeypatch.setattr(comparison, "_COMPARATOR_EXECUTOR", _NoPool())
+    result = await compare("42", "42\n")
+    assert result.passed is True
+    assert result.mode_applied == ComparisonMode.TRIM_EOL
+    assert [att.mode for att in result.attempts] == [ComparisonMode.STRICT, ComparisonMode.TRIM_EOL]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_offloaded_strategies_give_the_same_result(monkeypatch):
+    from app.features.submissions import comparison
+
+    cases = [
+        ("('Alice', 20)", "( 'Alice' , 20 )\n"),
+        ("3.1415926", "3.141593"),
+        ("one\ntwo\nthree", "three\none\ntwo"),
+        ("a b c", "c b a"),
+        ("('Alice', 20)", "('Bob', 20)"),
+        ("Hello", "HELLO"),
+    ]
+    inline = [await compare(exp, act) for exp, act in cases]
+    monkeypatch.setattr(comparison, "INLINE_COMPARE_MAX_CHARS", 0)
+    pooled = [await compare(exp, act) for exp, act in cases]
+    for a, b in zip(inline, pooled):
+        assert (a.passed, a.mode_applied, a.normalisations_applied, a.reason) == (
+            b.passed,
+            b.mode_applied,
+            b.normalisations_applied,
+            b.reason,
+        )
+
+
+@pytest.mark.anyio("asyncio")
+async def test_expected_profile_is_normalised_once_and_shared_by_copies(monkeypatch):
+    from app.features.submissions import comparison
+    from app.features.submissions.schemas import QuestionTestSchema
+
+    parsed = []
+    real_parse = comparison._literal_parse
+    monkeypatch.setattr(comparison, "_literal_parse", lambda s: parsed.append(s) or real_parse(s))
+
+    test = QuestionTestSchema(question_id="q1", input="", expected="('Alice', 20)\r\n")
+    profile = test.expected_profile()
+    assert test.model_copy(deep=True).expected_profile() is profile
+
+    first = await compare(profile, "('Bob', 20)")
+    second = await compare(profile, "('Bob', 20)")
+    assert (first.mode_applied, first.reason) == (second.mode_applied, second.reason)
+    assert first.passed is False and first.mode_applied == ComparisonMode.STRICT
+    # Expected parsed once; FLOAT_EPS no longer parses the actual output for a non-numeric expectation
+    assert parsed == ["('Alice', 20)\n", "('Bob', 20)", "('Bob', 20)"]
+
+    nfd = await compare(profile, "('Alice', 20)", compare_config={"unicode_nf": "NFD"})
+    assert nfd.passed is True
+
+
+@pytest.mark.anyio("asyncio")
+async def test_compare_many_matches_compare_in_order(monkeypatch):
+    from app.features.submissions import comparison
+    from app.features.submissions.comparison import compare_many
+
+    pairs = [
+        ("('Alice', 20)", "( 'Alice' , 20 )\n"),
+        ("Hello", "HELLO"),
+        ("one\ntwo", "two\none"),
+        ("3.1415926", "3.141593"),
+        ("x" * 40, "y" * 40),
+    ]
+    configs = [(None, {}), ("AUTO", {"case_insensitive": True}), (None, None), ("FLOAT_EPS", {}), (None, {})]
+    singles = [await compare(exp, act, mode=mode, compare_config=cfg) for (exp, act), (mode, cfg) in zip(pairs, configs)]
+
+    # Force the last (longest) pair onto the pool; the others must stay inline
+    monkeypatch.setattr(comparison, "INLINE_COMPARE_MAX_CHARS", 60)
+    batched = await compare_many(pairs, configs)
+
+    assert [(r.passed, r.mode_applied, r.normalisations_applied, r.reason) for r in batched] == [
+        (r.passed, r.mode_applied, r.normalisations_applied, r.reason) for r in singles
+    ]
+    assert [r.mode_applied for r in batched][:4] == [
+        ComparisonMode.NORMALISE_WHITESPACE,
+        ComparisonMode.CASE_INSENSITIVE,
+        ComparisonMode.LINE_SET,
+        ComparisonMode.FLOAT_EPS,
+    ]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_large_outputs_are_compared_line_by_line(monkeypatch):
+    from app.features.submissions import comparison
+
+    expected = "\n".join(f"row {i}  =  {i * i}" for i in range(2000))
+    cases = [
+        (expected + "\r\n\r\n", ComparisonMode.TRIM_EOL),
+        (expected.replace("  ", " ").replace("\n", "\r\n"), ComparisonMode.NORMALISE_WHITESPACE),
+        ("\n".join(reversed(expected.split("\n"))), None),
+        (expected[:-1] + "é", None),
+    ]
+    plain = [await compare(expected, actual) for actual, _ in cases]
+
+    def _no_full_copy(actual, nf):
+        raise AssertionError("streamed comparisons must not normalise the whole output")
+
+    monkeypatch.setattr(comparison, "_normalise_actual", _no_full_copy)
+    streamed = [
+        await compare(comparison.ExpectedProfile(expected), actual, compare_config={"streaming_threshold": 1024})
+        for actual, _ in cases
+    ]
+
+    assert [(r.passed, r.mode_applied, r.normalisations_applied, r.reason) for r in streamed] == [
+        (r.passed, r.mode_applied, r.normalisations_applied, r.reason) for r in plain
+    ]
+    assert [r.mode_applied for r in streamed[:2]] == [mode for _, mode in cases[:2]]
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from app.Core.config import get_settings
+from app.features.judge0.schemas import CodeExecutionResult
+from app.features.judge0.service import judge0_service
+from app.features.submissions import harness
+from app.features.submissions.schemas import QuestionBundleSchema, QuestionTestSchema
+from app.features.submissions.service import submissions_service
+
+
+def _run_driver_locally(driver: str, cwd) -> str:
+    # Like Judge0: the driver is a script.py in the sandbox's working directory
+    (cwd / "script.py").write_text(driver)
+    proc = subprocess.run([sys.executable, "script.py"], capture_output=True, cwd=cwd, timeout=30)
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout.decode()
+
+
+def test_driver_reports_each_case_separately(tmp_path):
+    code = "n = int(input())\nprint(n * 2)\nif n == 3:\n    raise SystemExit(4)\n"
+    driver, nonce = harness.build_driver(code, ["1\n", "2\n", "3\n"], case_timeout=5)
+
+    records = harness.parse_driver_output(_run_driver_locally(driver, tmp_path), nonce, 3)
+
+    assert [rec["stdout"] for rec in records] == ["2\n", "4\n", "6\n"]
+    assert [rec["exit"] for rec in records] == [0, 0, 4]
+    assert all(rec["cpu"] >= 0 for rec in records)
+    pairs = harness._to_results("tok", records, ["2", "5", "6"], 71)
+    assert [res.status_id for _, res in pairs] == [3, 4, 11]
+
+
+def test_driver_flags_cases_that_touch_the_working_directory(tmp_path):
+    code = "open('state.txt', 'a').write(input())\nprint(open('state.txt').read())\n"
+    driver, nonce = harness.build_driver(code, ["a", "b"], case_timeout=5)
+
+    assert harness.parse_driver_output(_run_driver_locally(driver, tmp_path), nonce, 2) is None
+
+
+def test_driver_hides_its_inputs_and_output_from_the_student(tmp_path):
+    # The student's program looks for the driver source and tries to forge a record on its stdout
+    code = (
+        "import glob, os\n"
+        "ppid = os.getppid()\n"
+        "paths = glob.glob(f'/proc/{ppid}/cwd/*.py') + glob.glob('*.py')\n"
+        "leaked = sum('INPUTS' + ' = json.loads' in open(p).read() for p in paths)\n"
+        "try:\n"
+        "    open(f'/proc/{ppid}/fd/1', 'w').write('forged\\n')\n"
+        "    forged = True\n"
+        "except OSError:\n"
+        "    forged = False\n"
+        "print(leaked, forged, os.getcwd() == os.environ['DRIVER_CWD'])\n"
+    )
+    driver, nonce = harness.build_driver(code, ["1", "2"], case_timeout=5)
+    _, other = harness.build_driver(code, ["1", "2"], case_timeout=5)
+    (tmp_path / "script.py").write_text(driver)
+    proc = subprocess.run(
+        [sys.executable, "script.py"], capture_output=True, cwd=tmp_path, timeout=30,
+        env={**os.environ, "DRIVER_CWD": str(tmp_path)},
+    )
+
+    records = harness.parse_driver_output(proc.stdout.decode(), nonce, 2)
+
+    assert nonce != other
+    assert not (tmp_path / "script.py").exists()
+    assert [rec["stdout"].split()[::2] for rec in records] == [["0", "False"]] * 2
+    assert all(rec["max_rss_kb"] is None for rec in records)
+    if os.geteuid() != 0:  # root may ptrace anything, non-dumpable or not (Judge0 runs unprivileged)
+        assert "forged" not in proc.stdout.decode()
+        assert [rec["stdout"] for rec in records] == ["0 False False\n"] * 2
+
+
+def _bundle(tests):
+    return QuestionBundleSchema(
+        challenge_id="challenge-1",
+        question_id="question-1",
+        title="",
+        prompt="",
+        starter_code="",
+        reference_solution=None,
+        expected_output=None,
+        tier="base",
+        language_id=71,
+        points=100,
+        tests=[
+            QuestionTestSchema(id=f"test-{i}", question_id="question-1", input=stdin, expected=expected, visibility="public", order_index=i)
+            for i, (stdin, expected) in enumerate(tests)
+        ],
+    )
+
+
+def _evaluate(monkeypatch, tmp_path, source_code, tests):
+    monkeypatch.setattr(get_settings(), "python_multi_test_harness", True)
+    calls = {"harness": 0, "batch": 0}
+
+    async def fake_execute_code_sync(submission, fields="*", **kwargs):
+        calls["harness"] += 1
+        stdout = await asyncio.to_thread(_run_driver_locally, submission.source_code, tmp_path)
+        return "harness-token", CodeExecutionResult(
+            stdout=stdout,
+            status_id=3,
+            status_description="Accepted",
+            language_id=71,
+            success=True,
+            created_at=datetime.now(timezone.utc),
+        )
+
+    async def fake_execute_batch(submissions, **kwargs):
+        calls["batch"] += 1
+        return [
+            (f"tok-{idx}", CodeExecutionResult(
+                stdout=sub.expected_output,
+                status_id=3,
+                status_description="Accepted",
+                language_id=71,
+                success=True,
+                created_at=datetime.now(timezone.utc),
+            ))
+            for idx, sub in enumerate(submissions)
+        ]
+
+    monkeypatch.setattr(judge0_service, "execute_code_sync", fake_execute_code_sync)
+    monkeypatch.setattr(judge0_service, "execute_batch", fake_execute_batch)
+
+    result = asyncio.run(submissions_service.evaluate_question(
+        challenge_id="challenge-1",
+        question_id="question-1",
+        submitted_output=None,
+        source_code=source_code,
+        language_id=71,
+        bundle=_bundle(tests),
+        user_id=1,
+        attempt_number=1,
+        record_result=False,
+    ))
+    return result, calls
+
+
+def test_evaluate_question_grades_all_tests_from_one_harness_run(monkeypatch, tmp_path):
+    result, calls = _evaluate(
+        monkeypatch,
+        tmp_path,
+        "print(sum(map(int, input().split())))",
+        [("1 2", "3"), ("5 5", "10"), ("2 2", "5")],
+    )
+
+    assert calls == {"harness": 1, "batch": 0}
+    assert [t.passed for t in result.tests] == [True, True, False]
+    assert [t.status_id for t in result.tests] == [3, 3, 4]
+    assert result.tests[1].stdout == "10\n"
+
+
+def test_evaluate_question_falls_back_when_cases_interfere(monkeypatch, tmp_path):
+    result, calls = _evaluate(
+        monkeypatch,
+        tmp_path,
+        "open('seen.txt', 'a').write('x')\nprint(input())",
+        [("a", "a"), ("b", "b")],
+    )
+
+    assert calls == {"harness": 1, "batch": 1}
+    assert result.tests_passed == 2
@@ -0,0 +1,178 @@
+import asyncio
+
+import app.features.submissions.code_results_repository as code_results_module
+from app.features.submissions.code_results_repository import CodeResultsRepository, code_results_repository
+from app.features.submissions.result_writer import ResultWriter, result_writer
+from fake_supabase import FakeSupabase, log_test_batch, log_test_batches
+
+
+def _batch(n):
+    return code_results_repository.build_test_batch(
+        user_id=n,
+        language_id=71,
+        source_code=f"print({n})",
+        token=None,
+        test_records=[{"stdout": f"{n}\n", "status_id": 3, "status_description": "Accepted", "passed": True}],
+        question_id=f"q-{n}",
+    )
+
+
+def test_write_behind_returns_ids_at_once_and_flushes_in_one_bulk_call(monkeypatch):
+    fake = FakeSupabase(functions={"log_test_batch": log_test_batch, "log_test_batches": log_test_batches})
+    monkeypatch.setattr(code_results_module, "get_supabase", fake.get_supabase)
+    monkeypatch.setattr(CodeResultsRepository, "_missing_functions", set())
+    monkeypatch.setattr(result_writer, "enabled", True)
+    monkeypatch.setattr(result_writer, "flush_interval", 60.0)
+
+    async def _run():
+        ids = [
+            await code_results_repository.log_test_batch(
+                user_id=1,
+                language_id=71,
+                source_code="print(1)",
+                token=None,
+                test_records=[{"stdout": "1\n", "status_id": 3, "status_description": "Accepted", "passed": True}],
+                question_id=f"q-{n}",
+            )
+            for n in range(3)
+        ]
+        before = dict(fake.calls)
+        written = await result_writer.wait_written(ids[-1], timeout=5)
+        await result_writer.aclose()
+        return ids, before, written
+
+    ids, before, written = asyncio.run(_run())
+
+    assert before == {} and written
+    assert fake.calls == {("log_test_batches", "rpc"): 1}
+    assert [row["id"] for row in fake.tables["code_submissions"]] == ids
+    assert [row["submission_id"] for row in fake.tables["code_results"]] == ids
+    assert result_writer.stats()["flushed_batches"] >= 3
+
+
+def test_unwritten_batches_survive_in_the_spool_and_are_replayed(tmp_path):
+    spool = str(tmp_path / "results.spool")
+    written = []
+
+    async def database_down(batches):
+        raise ConnectionError("database unavailable")
+
+    async def database_up(batches):
+        written.extend(batch["p_submission"]["id"] for batch in batches)
+        return [batch["p_submission"]["id"] for batch in batches]
+
+    async def _crash():
+        writer = ResultWriter(enabled=True, flush_interval=0.01, spool_path=spool, writer=database_down)
+        await writer.start()
+        ids = [await writer.submit(_batch(n)) for n in range(2)]
+        await writer.aclose(timeout=0.1)
+        return ids, writer.stats()
+
+    async def _restart():
+        writer = ResultWriter(enabled=True, flush_interval=0.01, spool_path=spool, writer=database_up)
+        await writer.start()
+        assert await writer.flush(timeout=5)
+        await writer.aclose()
+        return writer.stats()
+
+    ids, crashed = asyncio.run(_crash())
+    restarted = asyncio.run(_restart())
+
+    assert crashed["flush_failures"] >= 1 and crashed["pending_batches"] == 2
+    assert restarted["recovered_total"] == 2 and written == ids
+    assert (tmp_path / "results.spool").read_text() == ""
+
+
+def test_full_queue_applies_backpressure_until_a_flush():
+    async def _run():
+        gate = asyncio.Event()
+
+        async def slow_database(batches):
+            await gate.wait()
+            return [batch["p_submission"]["id"] for batch in batches]
+
+        writer = ResultWriter(enabled=True, flush_interval=0.01, flush_rows=1, max_pending=1, writer=slow_database)
+        await writer.submit(_batch(1))
+        await asyncio.sleep(0.05)
+        await writer.submit(_batch(2))  # the first is in flight, so this one fits
+        blocked = asyncio.create_task(writer.submit(_batch(3)))
+        await asyncio.sleep(0.05)
+        waiting = not blocked.done()
+        gate.set()
+        await blocked
+        await writer.aclose()
+        return waiting, writer.stats()
+
+    waiting, stats = asyncio.run(_run())
+
+    assert waiting
+    assert stats["backpressure_waits"] == 1 and stats["overflowed_total"] == 0
+    assert stats["flushed_batches"] == 3 and stats["pending_batches"] == 0
+
+
+def test_rejected_batches_are_retried_then_dead_lettered_never_dropped(tmp_path):
+    spool = tmp_path / "results.spool"
+    rejections = {}
+
+    async def picky_database(batches):
+        # q-1 is rejected once, q-2 every time; q-0 always goes through
+        results = []
+        for batch in batches:
+            question = batch["p_submission"]["question_id"]
+            rejections[question] = rejections.get(question, 0) + 1
+            ok = question == "q-0" or (question == "q-1" and rejections[question] > 1)
+            results.append(batch["p_submission"]["id"] if ok else None)
+        return results
+
+    async def _run():
+        writer = ResultWriter(
+            enabled=True, flush_interval=0.01, spool_path=str(spool), max_batch_attempts=3, writer=picky_database
+        )
+        await writer.start()
+        ids = [await writer.submit(_batch(n)) for n in range(3)]
+        outcomes = [await writer.wait_written(submission_id, timeout=5) for submission_id in ids]
+        await writer.aclose()
+        return outcomes, writer.stats()
+
+    outcomes, stats = asyncio.run(_run())
+
+    assert outcomes == [True, True, False]
+    assert rejections == {"q-0": 1, "q-1": 2, "q-2": 3}
+    assert stats["failed_batches"] == 4 and stats["dead_lettered"] == 1 and stats["flushed_batches"] == 2
+    dead = (tmp_path / "results.spool.dead").read_text().splitlines()
+    assert len(dead) == 1 and '"question_id":"q-2"' in dead[0]
+    assert spool.read_text() == ""
+
+
+def test_bad_batch_in_a_failing_bulk_write_is_isolated_and_dead_lettered(tmp_path):
+    spool = tmp_path / "results.spool"
+    written = []
+    calls = {"bulk": 0, "single": 0}
+
+    async def bulk_rpc(batches):
+        # One transaction: a bad batch (q-1) fails every group it is part of
+        calls["bulk" if len(batches) > 1 else "single"] += 1
+        if any(batch["p_submission"]["question_id"] == "q-1" for batch in batches):
+            raise RuntimeError("violates foreign key constraint")
+        written.extend(batch["p_submission"]["question_id"] for batch in batches)
+        return [batch["p_submission"]["id"] for batch in batches]
+
+    async def _run():
+        writer = ResultWriter(
+            enabled=True, flush_interval=0.01, spool_path=str(spool), max_batch_attempts=2, writer=bulk_rpc
+        )
+        await writer.start()
+        ids = [await writer.submit(_batch(n)) for n in range(3)]
+        outcomes = [await writer.wait_written(submission_id, timeout=5) for submission_id in ids]
+        await writer.aclose()
+        return outcomes, writer.stats()
+
+    outcomes, stats = asyncio.run(_run())
+
+    assert outcomes == [True, False, True]
+    assert written == ["q-0", "q-2"]
+    assert calls == {"bulk": 1, "single": 4}
+    assert stats["split_flushes"] == 1 and stats["flush_failures"] == 0
+    assert stats["failed_batches"] == 2 and stats["dead_lettered"] == 1 and stats["flushed_batches"] == 2
+    dead = (tmp_path / "results.spool.dead").read_text().splitlines()
+    assert len(dead) == 1 and '"question_id":"q-1"' in dead[0]
@@ -0,0 +1,222 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+import app.features.submissions.rewards as rewards_module
+from app.common.deps import CurrentUser, get_current_user
+from app.features.achievements.service import achievements_service
+from app.features.submissions import endpoints
+from app.features.submissions.rewards import ChallengeFinalised, RewardPipeline, apply_challenge_rewards
+from app.features.submissions.schemas import ChallengeSubmissionBreakdown
+from fake_supabase import FakeSupabase, claim_challenge_rewards
+
+
+def _event(attempt_id="att-1", student_number=1001):
+    breakdown = ChallengeSubmissionBreakdown(
+        challenge_id="ch-1",
+        attempt_id=attempt_id,
+        gpa_score=80,
+        gpa_max_score=100,
+        elo_delta=12,
+        base_elo_total=10,
+        efficiency_bonus_total=2,
+        tests_total=4,
+        tests_passed_total=3,
+    )
+    return ChallengeFinalised(
+        attempt_id=attempt_id,
+        student_number=student_number,
+        challenge_id="ch-1",
+        tier="base",
+        breakdown=breakdown,
+    )
+
+
+def test_rewards_are_applied_once_per_attempt_and_failures_can_be_retried():
+    calls = []
+
+    async def _run():
+        gate = asyncio.Event()
+
+        async def applier(event):
+            calls.append(event.attempt_id)
+            await gate.wait()
+            if event.attempt_id == "att-2" and calls.count("att-2") == 1:
+                raise RuntimeError("database unavailable")
+            return {"achievement_summary": {"updated_elo": 1212}}
+
+        pipeline = RewardPipeline(workers=1, applier=applier)
+        first = await pipeline.publish(_event("att-1"))
+        again = await pipeline.publish(_event("att-1"))
+        failing = await pipeline.publish(_event("att-2"))
+        await asyncio.sleep(0.01)
+        queued = (first.status, failing.status)
+        gate.set()
+        await first.wait(timeout=5)
+        await failing.wait(timeout=5)
+        retried = await pipeline.publish(_event("att-2"))
+        await retried.wait(timeout=5)
+        await pipeline.aclose()
+        return first, again, failing, retried, queued, pipeline.stats()
+
+    first, again, failing, retried, queued, stats = asyncio.run(_run())
+
+    assert again is first and queued == ("running", "queued")
+    assert calls == ["att-1", "att-2", "att-2"]
+    assert first.snapshot()["achievement_summary"] == {"updated_elo": 1212}
+    assert failing.status == "failed" and failing.error == "database unavailable"
+    assert retried.status == "completed"
+    assert stats["deduplicated_total"] == 1 and stats["failed_total"] == 1 and stats["completed_total"] == 2
+
+
+def test_rewards_status_endpoint_is_scoped_to_the_student(monkeypatch):
+    async def applier(event):
+        return {"achievement_summary": {"updated_elo": 1212}}
+
+    pipeline = RewardPipeline(workers=1, applier=applier)
+    monkeypatch.setattr(endpoints, "reward_pipeline", pipeline)
+
+    def _client(user_id):
+        app = FastAPI()
+        app.include_router(endpoints.router)
+        app.dependency_overrides[get_current_user] = lambda: CurrentUser(id=user_id, email="s@example.com", role="student")
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def _run():
+        record = await pipeline.publish(_event("att-1", student_number=1001))
+        await record.wait(timeout=5)
+        async with _client("1001") as client:
+            own = await client.get("/submissions/rewards/att-1")
+        async with _client("2002") as client:
+            foreign = await client.get("/submissions/rewards/att-1")
+        await pipeline.aclose()
+        return own, foreign
+
+    own, foreign = asyncio.run(_run())
+
+    assert own.status_code == 200
+    assert own.json()["status"] == "completed"
+    assert own.json()["achievement_summary"] == {"updated_elo": 1212}
+    assert foreign.status_code == 404
+
+
+def test_apply_skips_attempts_already_recorded_in_elo_events(monkeypatch):
+    fake = FakeSupabase(tables={"elo_events": [{"id": 1, "challenge_attempt_id": "att-1", "elo_change": 12}]})
+    monkeypatch.setattr(rewards_module, "get_supabase", fake.get_supabase)
+
+    async def must_not_run(*args, **kwargs):
+        raise AssertionError("rewards applied twice")
+
+    monkeypatch.setattr(achievements_service, "check_achievements", must_not_run)
+
+    result = asyncio.run(apply_challenge_rewards(_event("att-1")))
+
+    assert result == {"achievement_summary": None, "already_applied": True}
+    assert fake.count("elo_events", "insert") == 0
+
+
+def test_rewards_are_claimed_in_the_database_before_they_are_applied(monkeypatch):
+    fake = FakeSupabase(
+        tables={"challenge_attempts": [{"id": "att-1", "status": "submitted"}]},
+        functions={"claim_challenge_rewards": claim_challenge_rewards},
+    )
+    monkeypatch.setattr(rewards_module, "get_supabase", fake.get_supabase)
+    applied = []
+
+    async def check_achievements(user_id, request):
+        applied.append(request.submission_id)
+        await asyncio.sleep(0.01)
+        return None
+
+    monkeypatch.setattr(achievements_service, "check_achievements", check_achievements)
+
+    async def _run():
+        # Two processes (say a recovery sweep and the original worker) racing for one attempt
+        return await asyncio.gather(apply_challenge_rewards(_event("att-1")), apply_challenge_rewards(_event("att-1")))
+
+    results = asyncio.run(_run())
+    again = asyncio.run(apply_challenge_rewards(_event("att-1")))
+
+    assert applied == ["att-1"]
+    assert sorted(result["already_applied"] for result in results) == [False, True]
+    assert again == {"achievement_summary": None, "already_applied": True}
+    [row] = fake.tables["challenge_attempts"]
+    assert row["rewards_claimed_at"] and row["rewards_applied_at"]
+    assert fake.count("elo_events", "insert") == 1
+
+
+def test_recovery_republishes_lost_attempts_once():
+    applied = []
+
+    async def applier(event):
+        applied.append(event.attempt_id)
+        return {"achievement_summary": {"updated_elo": 1212}}
+
+    async def recoverer(lookback_seconds, limit):
+        return [_event("att-1"), _event("att-lost")]
+
+    async def _run():
+        pipeline = RewardPipeline(workers=1, recovery_delay=0, applier=applier, recoverer=recoverer)
+        live = await pipeline.publish(_event("att-1"))
+        await live.wait(timeout=5)
+        await pipeline.start()
+        await pipeline._recovery_task
+        recovered = pipeline.get("att-lost")
+        await recovered.wait(timeout=5)
+        await pipeline.aclose()
+        return recovered, pipeline.stats()
+
+    recovered, stats = asyncio.run(_run())
+
+    # att-1 was published by this process already; only the lost attempt is republished
+    assert applied == ["att-1", "att-lost"]
+    assert recovered.status == "completed"
+    assert stats["recovered_total"] == 1
+
+
+def test_find_unrewarded_attempts_rebuilds_events_from_the_database(monkeypatch):
+    from datetime import datetime, timedelta, timezone
+
+    now = datetime.now(timezone.utc)
+    snapshot = [{"question_id": "q1", "points": 40}, {"question_id": "q2", "points": 60}, {"question_id": "q3", "points": 10}]
+
+    def attempt(attempt_id, submitted_at):
+        return {
+            "id": attempt_id, "user_id": 1001, "challenge_id": "ch-1", "status": "submitted",
+            "submitted_at": submitted_at.isoformat(), "snapshot_questions": snapshot, "score": 40,
+            "elo_delta": 12, "efficiency_bonus": 2, "tests_total": 5, "tests_passed": 4, "duration_seconds": 300,
+        }
+
+    def run(question_id, status_id, created_at, passed):
+        return {
+            "user_id": 1001, "challenge_id": "ch-1", "question_id": question_id, "language_id": 71,
+            "status_id": status_id, "created_at": created_at.isoformat(),
+            "additional_files": {"tier": "silver", "tests_total": 3 if question_id == "q1" else 2, "tests_passed": passed},
+        }
+
+    fake = FakeSupabase(tables={
+        "challenge_attempts": [
+            attempt("att-lost", now - timedelta(minutes=5)),
+            {**attempt("att-claimed", now - timedelta(minutes=6)), "rewards_claimed_at": now.isoformat()},
+            attempt("att-old", now - timedelta(days=3)),
+        ],
+        "code_submissions": [
+            run("q1", 4, now - timedelta(minutes=9), 1),
+            run("q1", 3, now - timedelta(minutes=8), 3),
+            run("q2", 4, now - timedelta(minutes=7), 1),
+            # After the submission: not part of this attempt's grading
+            run("q2", 3, now - timedelta(minutes=1), 2),
+        ],
+    })
+    monkeypatch.setattr(rewards_module, "get_supabase", fake.get_supabase)
+
+    [event] = asyncio.run(rewards_module.find_unrewarded_attempts(86400.0, 50))
+
+    breakdown = event.breakdown
+    assert (event.attempt_id, event.student_number, event.challenge_id) == ("att-lost", 1001, "ch-1")
+    assert (breakdown.elo_delta, breakdown.base_elo_total, breakdown.efficiency_bonus_total) == (12, 10, 2)
+    assert (breakdown.gpa_score, breakdown.gpa_max_score, breakdown.tests_passed_total) == (40, 110, 4)
+    assert breakdown.passed_questions == ["q1"] and breakdown.failed_questions == ["q2"]
+    assert breakdown.missing_questions == ["q3"] and breakdown.badge_tiers_awarded == ["silver"]
+    assert [(r.question_id, r.tests_passed, r.tests_total) for r in breakdown.question_results] == [("q1", 3, 3), ("q2", 1, 2)]
@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from app.common.deps import CurrentUser, get_current_user
+from app.features.submissions import endpoints
+from app.features.submissions.jobs import JobManagerClosed, JobQueueFull, SubmissionJobManager
+
+
+def _app(monkeypatch, manager, user_id="1001"):
+    monkeypatch.setattr(endpoints, "submission_jobs", manager)
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    app.dependency_overrides[get_current_user] = lambda: CurrentUser(id=user_id, email="student@example.com", role="student")
+    return app
+
+
+def _parse_sse(body: str):
+    events = []
+    for frame in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.split("\n") if not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_submit_challenge_job_mode_streams_progress_and_keeps_result(monkeypatch):
+    manager = SubmissionJobManager(workers=2)
+
+    async def fake_process(challenge_id, payload, student_number, *, progress=None):
+        progress("stage", {"stage": "grading", "questions": 2})
+        for qid in payload.submissions:
+            await asyncio.sleep(0.01)
+            progress("question", {"question_id": qid, "tests_passed": 1, "tests_total": 1})
+        progress("stage", {"stage": "finalizing"})
+        return {"result": {"challenge_id": challenge_id, "student": student_number}}
+
+    monkeypatch.setattr(endpoints, "_process_challenge_submission", fake_process)
+    app = _app(monkeypatch, manager)
+    body = {"submissions": {"q1": {"source_code": "print(1)"}, "q2": {"source_code": "print(2)"}}}
+
+    async def _run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            accepted = await client.post("/submissions/challenges/ch-1/submit-challenge?mode=job", json=body)
+            job_id = accepted.json()["job_id"]
+            stream = await client.get(f"/submissions/jobs/{job_id}/events")
+            resumed = await client.get(f"/submissions/jobs/{job_id}/events", headers={"Last-Event-ID": "4"})
+            polled = await client.get(f"/submissions/jobs/{job_id}")
+        other = _app(monkeypatch, manager, user_id="2002")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=other), base_url="http://test") as client:
+            foreign = await client.get(f"/submissions/jobs/{job_id}")
+        await manager.aclose()
+        return accepted, stream, resumed, polled, foreign
+
+    accepted, stream, resumed, polled, foreign = asyncio.run(_run())
+
+    assert accepted.status_code == 202
+    assert accepted.headers["location"] == f"/submissions/jobs/{accepted.json()['job_id']}"
+    assert stream.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(stream.text)
+    assert [name for name, _ in events] == ["queued", "started", "stage", "question", "question", "stage", "completed"]
+    assert events[-1][1]["result"] == {"result": {"challenge_id": "ch-1", "student": 1001}}
+    assert [name for name, _ in _parse_sse(resumed.text)] == ["question", "stage", "completed"]
+    snapshot = polled.json()
+    assert snapshot["status"] == "completed"
+    assert [q["question_id"] for q in snapshot["questions"]] == ["q1", "q2"]
+    assert snapshot["result"]["result"]["student"] == 1001
+    assert foreign.status_code == 404
+
+
+def test_job_manager_bounds_work_and_records_failures():
+    manager = SubmissionJobManager(workers=1, max_pending=1)
+
+    async def _run():
+        gate = asyncio.Event()
+        running = {"now": 0, "peak": 0}
+
+        async def slow(job):
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            await gate.wait()
+            running["now"] -= 1
+            raise HTTPException(status_code=429, detail="judge0_busy", headers={"Retry-After": "3"})
+
+        first = manager.submit(user_id=1, challenge_id="a", runner=slow)
+        await asyncio.sleep(0)
+        again = manager.submit(user_id=1, challenge_id="a", runner=slow)
+        second = manager.submit(user_id=2, challenge_id="a", runner=slow)
+        with pytest.raises(JobQueueFull):
+            manager.submit(user_id=3, challenge_id="a", runner=slow)
+        gate.set()
+        async for _ in manager.stream(second):
+            pass
+        await manager.aclose()
+        return first, again, second, running
+
+    first, again, second, running = asyncio.run(_run())
+
+    assert again is first
+    assert running["peak"] == 1
+    assert first.status == second.status == "failed"
+    assert first.error == {"status_code": 429, "detail": "judge0_busy", "retry_after": "3"}
+    stats = manager.stats()
+    assert stats["failed_total"] == 2
+    assert stats["rejected_total"] == 1
+
+
+def test_job_manager_drains_queued_and_running_jobs_on_close():
+    manager = SubmissionJobManager(workers=1, drain_timeout=5)
+
+    async def _run():
+        async def grade(job):
+            await asyncio.sleep(0.02)
+            return {"graded": job.user_id}
+
+        running = manager.submit(user_id=1, challenge_id="a", runner=grade)
+        queued = manager.submit(user_id=2, challenge_id="a", runner=grade)
+        await asyncio.sleep(0)
+        closing = asyncio.ensure_future(manager.aclose())
+        await asyncio.sleep(0)
+        with pytest.raises(JobManagerClosed):
+            manager.submit(user_id=3, challenge_id="a", runner=grade)
+        await closing
+        return running, queued
+
+    running, queued = asyncio.run(_run())
+
+    assert (running.status, queued.status) == ("completed", "completed")
+    assert queued.result == {"graded": 2}
+
+
+def test_job_manager_close_timeout_fails_unstarted_jobs_and_cancels_running_ones():
+    manager = SubmissionJobManager(workers=1, drain_timeout=0.05)
+
+    async def _run():
+        async def stuck(job):
+            await asyncio.Event().wait()
+
+        running = manager.submit(user_id=1, challenge_id="a", runner=stuck)
+        queued = manager.submit(user_id=2, challenge_id="a", runner=stuck)
+        await asyncio.sleep(0)
+        await manager.aclose()
+        return running, queued
+
+    running, queued = asyncio.run(_run())
+
+    assert running.error == {"status_code": 503, "detail": "submission_job_cancelled"}
+    assert queued.error == {"status_code": 503, "detail": "submission_job_not_started"}
+    assert [event["event"] for event in queued.events] == ["queued", "failed"]
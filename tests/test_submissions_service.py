@@ -169,3 +169,232 @@ async def test_evaluate_question_populates_stdout_with_judge0(monkeypatch):
     assert [test.stdout for test in result.tests] == expected_outs
     assert all(test.token.startswith("tok-") for test in result.tests if test.token)
     assert result.public_passed is True
+
+
+@pytest.mark.anyio("asyncio")
+async def test_submit_challenge_grades_questions_concurrently_in_order(monkeypatch):
+    import asyncio
+
+    from app.Core.config import get_settings
+    from app.features.challenges.repository import challenge_repository
+    from app.features.submissions.repository import submissions_repository
+    from app.features.submissions.schemas import BatchSubmissionEntry, QuestionEvaluationResponse
+
+    monkeypatch.setattr(get_settings(), "submission_grading_concurrency", 2)
+    question_ids = ["q1", "q2", "q3", "q4"]
+    fetches = {"questions": [], "tests": []}
+
+    async def fake_get_questions(ids):
+        fetches["questions"].append(list(ids))
+        return {qid: {"id": qid, "challenge_id": "challenge-1", "tier": "base", "points": 100} for qid in ids}
+
+    async def fake_list_tests_for_questions(ids):
+        fetches["tests"].append(list(ids))
+        return {
+            qid: [{"id": f"{qid}-t", "question_id": qid, "input": "", "expected": "ok", "visibility": "public", "order_index": 0}]
+            for qid in ids
+        }
+
+    async def fake_record_question_attempts(attempt_id, updates, *, max_attempts):
+        return None
+
+    running = {"now": 0, "peak": 0}
+    # Later questions finish first to prove results are re-ordered
+    delays = {"q1": 0.04, "q2": 0.03, "q3": 0.02, "q4": 0.01}
+
+    async def fake_evaluate_question(*, challenge_id, question_id, bundle, attempt_number, **kwargs):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(delays[question_id])
+        running["now"] -= 1
+        passed = question_id != "q2"
+        return QuestionEvaluationResponse(
+            challenge_id=challenge_id,
+            question_id=question_id,
+            tier=bundle.tier,
+            language_id=71,
+            gpa_weight=bundle.points,
+            gpa_awarded=bundle.points if passed else 0,
+            elo_awarded=25 if passed else -40,
+            elo_base=25 if passed else 0,
+            elo_efficiency_bonus=0 if passed else -40,
+            public_passed=passed,
+            tests_passed=1 if passed else 0,
+            tests_total=1,
+            attempt_number=attempt_number,
+            tests=[],
+        )
+
+    monkeypatch.setattr(submissions_repository, "get_questions", fake_get_questions)
+    monkeypatch.setattr(submissions_repository, "list_tests_for_questions", fake_list_tests_for_questions)
+    monkeypatch.setattr(challenge_repository, "record_question_attempts", fake_record_question_attempts)
+    monkeypatch.setattr(submissions_service, "evaluate_question", fake_evaluate_question)
+
+    completed = []
+    breakdown = await submissions_service.submit_challenge(
+        challenge_id="challenge-1",
+        attempt_id="attempt-1",
+        submissions={qid: BatchSubmissionEntry(source_code="print('ok')") for qid in question_ids[:3]},
+        language_overrides={qid: 71 for qid in question_ids},
+        question_weights={},
+        user_id=1,
+        tier="base",
+        attempt_counts={"q3": 3},
+        max_attempts=3,
+        on_question_result=lambda res: completed.append(res.question_id),
+    )
+
+    assert fetches == {"questions": [question_ids], "tests": [question_ids]}
+    assert running["peak"] == 2
+    assert [res.question_id for res in breakdown.question_results] == ["q1", "q2", "q3"]
+    assert breakdown.passed_questions == ["q1"]
+    assert breakdown.failed_questions == ["q2", "q3"]
+    assert breakdown.missing_questions == ["q4"]
+    assert breakdown.gpa_max_score == 400
+    assert breakdown.elo_delta == 25 - 40 - 40
+    assert completed == ["q2", "q3", "q1"]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_submit_challenge_rejects_before_grading_when_judge0_is_busy(monkeypatch):
+    from app.features.judge0.admission import AdmissionRejected, judge0_admission
+    from app.features.submissions.repository import submissions_repository
+    from app.features.submissions.schemas import BatchSubmissionEntry
+
+    async def fake_get_questions(ids):
+        return {qid: {"id": qid, "challenge_id": "challenge-1", "tier": "base", "points": 100} for qid in ids}
+
+    async def fake_list_tests_for_questions(ids):
+        return {
+            qid: [
+                {"id": f"{qid}-t{n}", "question_id": qid, "input": "", "expected": "ok", "visibility": "public", "order_index": n}
+                for n in range(3)
+            ]
+            for qid in ids
+        }
+
+    checked = []
+    graded = []
+
+    def busy_check(cost=1, **kwargs):
+        checked.append(cost)
+        raise AdmissionRejected(5.0, estimated_wait=30.0)
+
+    async def fake_evaluate_question(**kwargs):
+        graded.append(kwargs["question_id"])
+        raise AssertionError("graded despite the rejection")
+
+    monkeypatch.setattr(submissions_repository, "get_questions", fake_get_questions)
+    monkeypatch.setattr(submissions_repository, "list_tests_for_questions", fake_list_tests_for_questions)
+    monkeypatch.setattr(judge0_admission, "check", busy_check)
+    monkeypatch.setattr(submissions_service, "evaluate_question", fake_evaluate_question)
+
+    with pytest.raises(AdmissionRejected):
+        await submissions_service.submit_challenge(
+            challenge_id="challenge-1",
+            attempt_id="attempt-1",
+            submissions={qid: BatchSubmissionEntry(source_code="print('ok')") for qid in ("q1", "q2", "q3")},
+            language_overrides={qid: 71 for qid in ("q1", "q2", "q3", "q4")},
+            question_weights={},
+            user_id=1,
+            tier="base",
+            attempt_counts={"q3": 3},
+            max_attempts=3,
+        )
+
+    # One check for the tests of q1 and q2 (q3 is out of attempts, q4 unanswered); nothing graded
+    assert checked == [6]
+    assert graded == []
+
+
+@pytest.mark.anyio("asyncio")
+async def test_concurrent_challenge_submissions_grade_in_parallel(monkeypatch):
+    import asyncio
+
+    from app.Core.config import get_settings
+    from app.features.challenges.repository import challenge_repository
+    from app.features.judge0.admission import AdmissionController
+    from app.features.submissions import service as service_module
+    from app.features.submissions.code_results_repository import code_results_repository
+    from app.features.submissions.repository import submissions_repository
+    from app.features.submissions.schemas import BatchSubmissionEntry
+
+    monkeypatch.setattr(get_settings(), "submission_grading_concurrency", 3)
+    monkeypatch.setattr(get_settings(), "python_multi_test_harness", False)
+    # Default budget: 32 executions in flight
+    admission = AdmissionController(max_in_flight=32, default_deadline=20.0)
+    monkeypatch.setattr(service_module, "judge0_admission", admission)
+    question_ids = ["q1", "q2", "q3", "q4"]
+
+    async def fake_get_questions(ids):
+        return {qid: {"id": qid, "challenge_id": "challenge-1", "tier": "base", "points": 100} for qid in ids}
+
+    async def fake_list_tests_for_questions(ids):
+        return {
+            qid: [
+                {"id": f"{qid}-t{n}", "question_id": qid, "input": "", "expected": "ok", "visibility": "public", "order_index": n}
+                for n in range(5)
+            ]
+            for qid in ids
+        }
+
+    async def fake_record_question_attempts(attempt_id, updates, *, max_attempts):
+        return None
+
+    async def fake_log_test_batch(**kwargs):
+        return "submission-id"
+
+    running = {"now": 0, "peak": 0}
+
+    async def fake_execute_batch(submissions, timeout_seconds=None):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.02)
+        running["now"] -= 1
+        return [
+            (
+                f"tok-{idx}",
+                CodeExecutionResult(
+                    submission_id=None,
+                    stdout="ok",
+                    stderr=None,
+                    compile_output=None,
+                    execution_time="0.01",
+                    memory_used=64,
+                    status_id=3,
+                    status_description="Accepted",
+                    language_id=submission.language_id,
+                    success=True,
+                ),
+            )
+            for idx, submission in enumerate(submissions)
+        ]
+
+    monkeypatch.setattr(submissions_repository, "get_questions", fake_get_questions)
+    monkeypatch.setattr(submissions_repository, "list_tests_for_questions", fake_list_tests_for_questions)
+    monkeypatch.setattr(challenge_repository, "record_question_attempts", fake_record_question_attempts)
+    monkeypatch.setattr(code_results_repository, "log_test_batch", fake_log_test_batch)
+    monkeypatch.setattr(judge0_service, "execute_batch", fake_execute_batch)
+
+    async def submit(user_id):
+        return await submissions_service.submit_challenge(
+            challenge_id="challenge-1",
+            attempt_id=f"attempt-{user_id}",
+            submissions={qid: BatchSubmissionEntry(source_code="print('ok')") for qid in question_ids},
+            language_overrides={qid: 71 for qid in question_ids},
+            question_weights={},
+            user_id=user_id,
+            tier="base",
+            attempt_counts={},
+            max_attempts=3,
+        )
+
+    first, second = await asyncio.gather(submit(1), submit(2))
+
+    # Each submission holds at most 3 questions x 5 tests, so both fit in the budget at once
+    assert running["peak"] == 6
+    assert first.tests_passed_total == second.tests_passed_total == 20
+    stats = admission.stats()
+    assert stats["rejected"] == 0
+    assert stats["admitted"] == stats["admitted_immediately"] == 8
+    assert stats["in_flight"] == 0